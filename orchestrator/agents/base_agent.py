@@ -4,8 +4,9 @@ from datetime import datetime
 import json
 import os
 
-from claude_agent_sdk import query, ClaudeAgentOptions
+from claude_agent_sdk import ClaudeAgentOptions
 from ..utils.json_utils import extract_json_from_markdown
+from ..utils.llm_client import query_llm
 from ..load_env import setup_claude_env
 
 class BaseAgent:
@@ -37,15 +38,8 @@ class BaseAgent:
                 if system_prompt:
                     full_prompt = f"{system_prompt}\n\n{prompt}"
 
-                response_text = ""
-                async for message in query(prompt=full_prompt, options=options):
-                     if hasattr(message, "result"):
-                        return message.result
-                     if hasattr(message, "content"):
-                         # Accumulate partial content if needed, though usually result is final
-                         pass
-
-                return response_text
+                result = await query_llm(full_prompt, options, stage=type(self).__name__)
+                return result if result is not None else ""
 
             except Exception as e:
                 print(f"Agent Query Error: {e}")
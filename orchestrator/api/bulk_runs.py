@@ -0,0 +1,165 @@
+"""
+Bulk run rollups.
+
+Every `POST /runs/bulk` creates a BulkRun row, and its TestRuns point back
+to it via testrun.bulk_run_id. `summarize()` turns those into one progress
+record: counts by status, the runs that failed, elapsed time and an ETA.
+The ETA schedules the estimated durations of the unfinished runs
+(sharding.estimate_durations) longest-first over the execution slots, or
+sums the remaining runs of each shard for sharded bulk runs.
+
+Summaries are polled every few seconds by each open progress stream, so
+they only read counts and the few rows they list, and a bulk run's
+duration estimates are computed once and kept until it completes.
+"""
+
+import heapq
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from .models_db import ACTIVE_RUN_STATUSES, FAILED_RUN_STATUSES, BulkRun, TestRun
+from .sharding import Shard, estimate_durations
+
+ESTIMATES_CACHE_SIZE = 256
+
+# bulk_run_id -> {spec_name: estimated ms}, oldest first
+_estimates: Dict[str, Dict[str, float]] = {}
+
+
+def makespan_ms(durations: List[float], slots: int) -> float:
+    """Time to run `durations` on `slots` parallel slots, longest first."""
+    loads = [0.0] * max(1, slots)
+    for duration in sorted(durations, reverse=True):
+        heapq.heapreplace(loads, loads[0] + duration)
+    return max(loads)
+
+
+def status_counts(session: Session, bulk_run_id: str) -> Dict[str, int]:
+    rows = session.exec(
+        select(TestRun.status, func.count())
+        .where(TestRun.bulk_run_id == bulk_run_id)
+        .group_by(TestRun.status)
+    ).all()
+    return {status: count for status, count in rows}
+
+
+def refresh_status(
+    session: Session,
+    bulk_run_id: Optional[str],
+    counts: Optional[Dict[str, int]] = None,
+) -> Optional[BulkRun]:
+    """
+    Move a bulk run to running/completed from its runs' statuses (commits when
+    it changes). Pass `counts` when status_counts() was already queried.
+    """
+    bulk = session.get(BulkRun, bulk_run_id) if bulk_run_id else None
+    if bulk is None:
+        return None
+    counts = status_counts(session, bulk_run_id) if counts is None else counts
+    active = sum(counts.get(s, 0) for s in ACTIVE_RUN_STATUSES)
+    if not active:
+        status = "completed"
+    elif active < bulk.total or counts.get("running"):
+        status = "running"
+    else:
+        status = "pending"
+    if status != bulk.status:
+        bulk.status = status
+        bulk.finished_at = datetime.utcnow() if status == "completed" else None
+        session.add(bulk)
+        session.commit()
+        session.refresh(bulk)
+    return bulk
+
+
+def bulk_estimates(session: Session, bulk_run_id: str) -> Dict[str, float]:
+    """Estimated duration of each spec in a bulk run, computed once per bulk run."""
+    estimates = _estimates.get(bulk_run_id)
+    if estimates is None:
+        spec_names = session.exec(
+            select(TestRun.spec_name)
+            .where(TestRun.bulk_run_id == bulk_run_id)
+            .distinct()
+        ).all()
+        estimates = estimate_durations(session.connection(), list(spec_names))
+        while len(_estimates) >= ESTIMATES_CACHE_SIZE:
+            _estimates.pop(next(iter(_estimates)))
+        _estimates[bulk_run_id] = estimates
+    return estimates
+
+
+def summarize(
+    session: Session,
+    bulk: BulkRun,
+    slots: int,
+    shards: Optional[List[Shard]] = None,
+    counts: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    """
+    Progress, counts by status, failed runs and ETA of a bulk run. Pass
+    `counts` when status_counts() was already queried.
+    """
+    counts = status_counts(session, bulk.id) if counts is None else counts
+    total = sum(counts.values())
+    active = sum(counts.get(s, 0) for s in ACTIVE_RUN_STATUSES)
+    finished = total - active
+
+    failed_runs = []
+    if any(counts.get(s) for s in FAILED_RUN_STATUSES):
+        failed_runs = session.exec(
+            select(TestRun.id, TestRun.spec_name, TestRun.status).where(
+                TestRun.bulk_run_id == bulk.id, TestRun.status.in_(FAILED_RUN_STATUSES)
+            )
+        ).all()
+
+    eta_ms = 0.0
+    if active and shards:
+        # Each shard runs its specs one after another on one worker; jobs
+        # carry the estimate they were balanced with
+        eta_ms = max(
+            sum(
+                job["estimated_ms"]
+                for job in shard.jobs
+                if job["run_id"] not in shard.results
+            )
+            for shard in shards
+        )
+    elif active:
+        estimates = bulk_estimates(session, bulk.id)
+        unfinished = session.exec(
+            select(TestRun.spec_name).where(
+                TestRun.bulk_run_id == bulk.id, TestRun.status.in_(ACTIVE_RUN_STATUSES)
+            )
+        ).all()
+        eta_ms = makespan_ms([estimates[name] for name in unfinished], slots)
+    else:
+        _estimates.pop(bulk.id, None)
+
+    now = datetime.utcnow()
+    ended = bulk.finished_at or now
+    return {
+        "id": bulk.id,
+        "status": bulk.status,
+        "browser": bulk.browser,
+        "created_at": bulk.created_at.isoformat(),
+        "finished_at": bulk.finished_at.isoformat() if bulk.finished_at else None,
+        "total": total,
+        "skipped": json.loads(bulk.skipped_json or "[]"),
+        "finished": finished,
+        "progress": round(finished / total, 3) if total else 1.0,
+        "counts": counts,
+        "failed_runs": [
+            {"id": run_id, "spec_name": spec_name, "status": status}
+            for run_id, spec_name, status in failed_runs
+        ],
+        "elapsed_ms": round((ended - bulk.created_at).total_seconds() * 1000),
+        "eta_ms": round(eta_ms),
+        "estimated_finish_at": (
+            (now + timedelta(milliseconds=eta_ms)).isoformat() if active else None
+        ),
+        "shards": bulk.shards,
+    }
@@ -1,10 +1,15 @@
 from pathlib import Path
 import json
 import os
-from datetime import datetime
-from typing import Dict, List, Any
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
 from collections import defaultdict, Counter
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from sqlmodel import Session, select
+
+from .db import engine
+from .models_db import RunStage
+from .spec_catalog import spec_catalog
 
 router = APIRouter()
 
@@ -23,11 +28,7 @@ def get_dashboard_stats() -> Dict[str, Any]:
     error_counts = Counter()
     runs_list = []
     
-    total_specs = 0
-    # Process Specs
-    specs_dir = BASE_DIR / "specs"
-    if specs_dir.exists():
-        total_specs = len(list(specs_dir.glob("**/*.md")))
+    total_specs = spec_catalog.count()
 
     if not runs_dir.exists():
         return {
@@ -145,3 +146,38 @@ def get_dashboard_stats() -> Dict[str, Any]:
         "trends": trends,
         "errors": errors
     }
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return round(sorted_values[int(q * (len(sorted_values) - 1))], 1)
+
+@router.get("/dashboard/stages")
+def get_stage_stats(days: int = Query(7, ge=1, le=365)) -> Dict[str, Any]:
+    """
+    p50/p95 of wall time, CPU time, peak RSS and LLM queue wait per run stage
+    over the last `days` days (from run timelines).
+    """
+    since = datetime.now() - timedelta(days=days)
+    samples = defaultdict(lambda: defaultdict(list))
+    counts = defaultdict(Counter)
+    with Session(engine) as session:
+        for row in session.exec(select(RunStage).where(RunStage.started_at >= since)):
+            counts[row.stage]["runs"] += 1
+            counts[row.stage]["failed"] += row.status != "ok"
+            for metric in ("wall_ms", "cpu_ms", "peak_rss_mb", "llm_ms", "llm_queue_wait_ms"):
+                value = getattr(row, metric)
+                if value is not None:
+                    samples[row.stage][metric].append(value)
+
+    stages = []
+    for stage, metrics in samples.items():
+        entry = {"stage": stage, "runs": counts[stage]["runs"], "failed": counts[stage]["failed"]}
+        for metric, values in metrics.items():
+            values.sort()
+            entry[metric] = {"p50": _percentile(values, 0.5), "p95": _percentile(values, 0.95)}
+        stages.append(entry)
+    # Slowest stages first
+    stages.sort(key=lambda e: -(e.get("wall_ms", {}).get("p95") or 0))
+    return {"days": days, "stages": stages}
@@ -1,15 +1,195 @@
 from sqlmodel import create_engine, SQLModel, Session
-from typing import Generator
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import and_, func, literal, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from typing import AsyncGenerator, Generator, Any, Dict, Optional
+from pathlib import Path
+import argparse
 import os
 
-# Default to sqlite for local dev if not specified, but we aim for postgres
-DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./test.db")
+def database_url() -> str:
+    """DATABASE_URL as of now, with a relative SQLite path pinned to this
+    process's cwd, so child processes started from another directory open
+    the same database file."""
+    # Default to sqlite for local dev if not specified, but we aim for postgres
+    url = os.environ.get("DATABASE_URL", "sqlite:///./test.db")
+    if url.startswith("sqlite:///") and not url.startswith("sqlite:////"):
+        path = url[len("sqlite:///"):]
+        if path and path != ":memory:":
+            return "sqlite:///" + str(Path(path).resolve())
+    return url
 
-engine = create_engine(DATABASE_URL, echo=False)
+DATABASE_URL = database_url()
+
+class RawSQLStore:
+    """Base of the stores that keep their own tables and talk plain SQL.
+
+    The engine is created on first use, from `database_url` or else the
+    current DATABASE_URL, so CLI and workflow processes share the API's
+    database. `is_available()` probes `probe_table` once: without it (an
+    unmigrated database) or with the `switch_env` variable set to off, the
+    store is skipped instead of failing its caller.
+    """
+
+    probe_table: str = ""
+    switch_env: Optional[str] = None
+    unavailable_message: str = "Store unavailable"
+
+    def __init__(self, database_url: Optional[str] = None):
+        self.database_url = database_url
+        self._engine = None
+        self._available: Optional[bool] = None
+
+    def db(self):
+        if self._engine is None:
+            self._engine = create_engine(self.database_url or database_url(), pool_pre_ping=True)
+        return self._engine
+
+    def is_available(self) -> bool:
+        if self.switch_env and os.environ.get(self.switch_env, "on").lower() in ("off", "false", "0"):
+            return False
+        if self._available is None:
+            try:
+                with self.db().connect() as conn:
+                    conn.execute(text(f"SELECT 1 FROM {self.probe_table} WHERE 1 = 0"))
+                self._available = True
+            except SQLAlchemyError as e:
+                print(f"⚠️ {self.unavailable_message}: {str(e).splitlines()[0]}")
+                self._available = False
+        return self._available
+
+def _async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (asyncpg / aiosqlite)."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    for prefix in ("postgresql+psycopg2:", "postgresql:", "postgres:"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg:", 1)
+    return url
+
+ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL", _async_url(DATABASE_URL))
+
+def _pool_options(url: str) -> Dict[str, Any]:
+    """Connection pool settings, tunable through DB_POOL_* env vars.
+
+    SQLite gets none of the sizing options: in-memory databases use a
+    single-connection pool that rejects them, and file databases don't
+    benefit from a large pool.
+    """
+    options: Dict[str, Any] = {
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "true").lower() != "false",
+    }
+    if not url.startswith("sqlite"):
+        options.update({
+            "pool_size": int(os.environ.get("DB_POOL_SIZE", "10")),
+            "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "20")),
+            "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", "30")),
+            "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "1800")),
+        })
+    return options
+
+engine = create_engine(DATABASE_URL, echo=False, **_pool_options(DATABASE_URL))
+
+# Async engine for request handlers and background coroutines, so DB round
+# trips don't block the event loop. Shares the schema with `engine`.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False, **_pool_options(ASYNC_DATABASE_URL))
+async_session_maker = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+# Arbitrary key for pg_advisory_lock so concurrent API replicas starting up
+# don't run the same migrations at once.
+MIGRATION_LOCK_ID = 7_415_002
+
+def _alembic_config(connection):
+    from alembic.config import Config
+
+    cfg = Config()
+    cfg.set_main_option("script_location", str(MIGRATIONS_DIR))
+    cfg.attributes["connection"] = connection
+    return cfg
+
+def run_migrations(bind=None, revision: str = "head"):
+    """Upgrade the schema to `revision` (default: latest) with Alembic."""
+    from alembic import command
+
+    bind = bind if bind is not None else engine
+    with bind.connect() as connection:
+        is_postgres = connection.dialect.name == "postgresql"
+        if is_postgres:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_ID})
+            connection.commit()
+        try:
+            command.upgrade(_alembic_config(connection), revision)
+            connection.commit()
+        finally:
+            if is_postgres:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_ID})
+                connection.commit()
+
+def current_revision(bind=None) -> Optional[str]:
+    """Schema revision currently applied to the database, if any."""
+    from alembic.runtime.migration import MigrationContext
+
+    bind = bind if bind is not None else engine
+    with bind.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
 
 def init_db():
-    SQLModel.metadata.create_all(engine)
+    run_migrations()
+
+def json_contains(column, document: Dict[str, Any]):
+    """Filter expression: JSON `column` contains `document`.
+
+    Compiles to JSONB containment (@>) on Postgres, which is served by the
+    GIN indexes. Elsewhere nested keys are flattened into json_extract
+    comparisons, so only dict/scalar documents are supported there.
+    """
+    if engine.dialect.name == "postgresql":
+        return column.op("@>")(literal(document, JSONB))
+
+    def _flatten(doc, prefix):
+        for key, value in doc.items():
+            path = f"{prefix}.{key}"
+            if isinstance(value, dict):
+                yield from _flatten(value, path)
+            elif isinstance(value, list):
+                raise ValueError("List containment requires Postgres")
+            else:
+                yield func.json_extract(column, path) == value
+
+    return and_(*_flatten(document, "$"))
 
 def get_session() -> Generator[Session, None, None]:
     with Session(engine) as session:
         yield session
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    async with async_session_maker() as session:
+        yield session
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the Playwright Agent database schema.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    upgrade = sub.add_parser("upgrade", help="Apply migrations up to a revision (default: head)")
+    upgrade.add_argument("revision", nargs="?", default="head")
+    downgrade = sub.add_parser("downgrade", help="Revert migrations down to a revision")
+    downgrade.add_argument("revision")
+    sub.add_parser("current", help="Show the applied schema revision")
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        run_migrations(revision=args.revision)
+        print(f"✅ Database at revision {current_revision()}")
+    elif args.command == "downgrade":
+        from alembic import command
+
+        with engine.connect() as connection:
+            command.downgrade(_alembic_config(connection), args.revision)
+            connection.commit()
+        print(f"✅ Database at revision {current_revision()}")
+    else:
+        print(current_revision() or "<none>")
@@ -0,0 +1,190 @@
+"""
+Spec fingerprints for selective reruns.
+
+A spec's fingerprint hashes everything a run of it depends on:
+
+    spec (specs/<name>.md)
+      └─ generated test (tests/generated/<slug>.spec.ts)
+           └─ local modules it imports (./fixtures, ../helpers, ...)
+      └─ its newest plan (runs/<id>/plan.json of its latest run)
+
+Each finished run records the fingerprint of the inputs it ran with, so a
+spec only needs rerunning when its current fingerprint differs from the one
+recorded by its last green run, or when its last run was not green.
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+SPECS_DIR = BASE_DIR / "specs"
+RUNS_DIR = BASE_DIR / "runs"
+GENERATED_DIR = BASE_DIR / "tests" / "generated"
+
+GREEN_STATUSES = {"passed"}
+
+# import ... from './x' / require('../y') - bare package imports are ignored
+_LOCAL_IMPORT_RE = re.compile(
+    r"""(?:from\s+|require\(\s*|import\s+)['"](\.{1,2}/[^'"]+)['"]"""
+)
+_TS_EXTENSIONS = ("", ".ts", ".js", ".tsx", "/index.ts")
+
+
+@dataclass
+class Fingerprint:
+    spec_hash: Optional[str] = None
+    test_hash: Optional[str] = None
+    plan_hash: Optional[str] = None
+
+    @property
+    def value(self) -> str:
+        """Combined hash of all inputs; missing inputs hash as empty."""
+        parts = [self.spec_hash or "", self.test_hash or "", self.plan_hash or ""]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        return {**asdict(self), "fingerprint": self.value}
+
+
+def _hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def hash_file(path: Path) -> Optional[str]:
+    try:
+        return _hash_bytes(path.read_bytes())
+    except OSError:
+        return None
+
+
+def generated_test_path(spec_name: str) -> Path:
+    """Where the exporter writes the test for a spec (slug of the spec file stem)."""
+    stem = Path(spec_name).name.rsplit(".", 1)[0]
+    slug = re.sub(r"[^a-z0-9]+", "-", stem.lower()).strip("-")
+    return GENERATED_DIR / f"{slug}.spec.ts"
+
+
+def _resolve_import(base: Path, ref: str) -> Optional[Path]:
+    for ext in _TS_EXTENSIONS:
+        candidate = (base.parent / (ref + ext)).resolve()
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def generated_test_dependencies(test_path: Path) -> List[Path]:
+    """The test file followed by the local modules it imports, transitively."""
+    seen: Set[Path] = set()
+    order: List[Path] = []
+    pending = [test_path.resolve()]
+    while pending:
+        path = pending.pop()
+        if path in seen or not path.is_file():
+            continue
+        seen.add(path)
+        order.append(path)
+        try:
+            source = path.read_text(errors="replace")
+        except OSError:
+            continue
+        for ref in _LOCAL_IMPORT_RE.findall(source):
+            dep = _resolve_import(path, ref)
+            if dep:
+                pending.append(dep)
+    return order
+
+
+def hash_test(test_path: Path) -> Optional[str]:
+    files = generated_test_dependencies(test_path)
+    if not files:
+        return None
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        digest.update(
+            str(
+                path.relative_to(BASE_DIR) if path.is_relative_to(BASE_DIR) else path
+            ).encode()
+        )
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def _plan_spec_name(plan_file: Path) -> Optional[str]:
+    try:
+        spec_path = json.loads(plan_file.read_text()).get("specFilePath")
+    except (OSError, ValueError):
+        return None
+    if not spec_path or not Path(spec_path).is_relative_to(SPECS_DIR):
+        return None
+    return Path(spec_path).relative_to(SPECS_DIR).as_posix()
+
+
+def latest_plans() -> Dict[str, Path]:
+    """Newest plan.json of each spec across all run directories, keyed by spec name."""
+    plans = []
+    for plan_file in RUNS_DIR.glob("*/plan.json"):
+        try:
+            plans.append((plan_file.stat().st_mtime_ns, plan_file))
+        except OSError:
+            continue
+    latest: Dict[str, Path] = {}
+    for _, plan_file in sorted(plans):
+        spec_name = _plan_spec_name(plan_file)
+        if spec_name:
+            latest[spec_name] = plan_file
+    return latest
+
+
+def run_fingerprint(run_dir: Path, spec_name: str) -> Fingerprint:
+    """Inputs a finished run used: its spec snapshot, the generated test and its own plan."""
+    return Fingerprint(
+        spec_hash=hash_file(run_dir / "spec.md"),
+        test_hash=hash_test(generated_test_path(spec_name)),
+        plan_hash=hash_file(run_dir / "plan.json"),
+    )
+
+
+def current_fingerprint(
+    spec_name: str, plans: Optional[Dict[str, Path]] = None
+) -> Fingerprint:
+    """
+    Inputs a run would use now: the spec on disk, the generated test and the
+    spec's newest plan. Pass `plans` (latest_plans()) when checking many specs.
+    """
+    plans = latest_plans() if plans is None else plans
+    plan_hash = hash_file(plans[spec_name]) if spec_name in plans else None
+    return Fingerprint(
+        spec_hash=hash_file(SPECS_DIR / spec_name),
+        test_hash=hash_test(generated_test_path(spec_name)),
+        plan_hash=plan_hash,
+    )
+
+
+def rerun_reason(
+    spec_name: str, last_run, plans: Optional[Dict[str, Path]] = None
+) -> Optional[str]:
+    """
+    Why `spec_name` needs rerunning given its last finished run (a TestRun row
+    with recorded hashes), or None when nothing changed since it went green.
+    """
+    if last_run is None:
+        return "no previous run"
+    if last_run.status not in GREEN_STATUSES:
+        return f"last run {last_run.status}"
+    current = current_fingerprint(spec_name, plans)
+    if current.value == last_run.fingerprint:
+        return None
+    changed = [
+        label
+        for label, now, then in (
+            ("spec", current.spec_hash, last_run.spec_hash),
+            ("generated test", current.test_hash, last_run.test_hash),
+            ("plan", current.plan_hash, last_run.plan_hash),
+        )
+        if now != then
+    ]
+    return f"{', '.join(changed) or 'inputs'} changed"
@@ -1,9 +1,20 @@
 import csv
+import hashlib
 import io
-from typing import List, Dict, Any
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Iterator, Optional, TextIO
 from pathlib import Path
 import re
 
+from sqlmodel import Session, select
+
+from .db import engine
+from .models_db import SpecMetadata as DBSpecMetadata
+
+IMPORT_BATCH_SIZE = 500
+
 def sanitize_filename(name: str) -> str:
     """Sanitize string to be safe for filenames."""
     # Replace invalid chars with underscore
@@ -16,14 +27,20 @@ def parse_testrail_csv(content: bytes) -> List[Dict[str, str]]:
     Parse TestRail CSV content and return a list of test specs.
     Returns a list of dicts with keys: name, content.
     """
-    # Read the header line first to handle duplicate columns
     text = content.decode('utf-8-sig') # Handle BOM
-    f = io.StringIO(text)
-    reader_raw = csv.reader(f)
+    return list(iter_testrail_specs(io.StringIO(text)))
+
+def iter_testrail_specs(lines: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """
+    Stream test specs out of TestRail CSV text, one row at a time.
+    `lines` can be any line iterator, e.g. a text-mode file opened with newline="".
+    """
+    # Read the header line first to handle duplicate columns
+    reader_raw = csv.reader(lines)
     try:
         headers = next(reader_raw)
     except StopIteration:
-        return []
+        return
         
     # Deduplicate headers
     unique_headers = []
@@ -36,85 +53,216 @@ def parse_testrail_csv(content: bytes) -> List[Dict[str, str]]:
             seen[h] = 0
             unique_headers.append(h)
     
-    # Use DictReader with unique headers
-    reader = csv.DictReader(f, fieldnames=unique_headers)
-    
-    specs = []
+    for values in reader_raw:
+        yield _row_to_spec(dict(zip(unique_headers, values)))
+
+def _row_to_spec(row: Dict[str, str]) -> Dict[str, str]:
+    """Convert one TestRail CSV row into a spec (name, title, content)."""
+    # Extract fields
+    test_id = row.get("ID", "").strip()
+    title = row.get("Title", "").strip()
+
+    # Description parts
+    description_parts = []
+    if test_id:
+        description_parts.append(f"ID: {test_id}")
+
+    desc_text = row.get("Goals", "") or row.get("Mission", "") or ""
+    if desc_text:
+        description_parts.append(desc_text)
+
+    preconditions = row.get("Preconditions", "")
+    if preconditions:
+        description_parts.append("Preconditions: " + preconditions)
+
+    expected = row.get("Expected Result", "")
+    if expected:
+        description_parts.append("Expected Result: " + expected)
+
+    description_combined = "\n".join(description_parts)
+
+    # Steps
+    # Check "Steps" and "Steps_1" (duplicate), and "Steps (Step)"
+    steps_text = row.get("Steps", "")
+    if not steps_text:
+        # Try duplicate steps column
+         steps_text = row.get("Steps_1", "")
+
+    step_lines = []
+    if steps_text:
+        for line in steps_text.split('\n'):
+            line = line.strip()
+            if not line: continue
+
+            # Check if it already has numbering
+            if not re.match(r'^\d+\.', line):
+                # No numbering, so we will handle it when joining
+                step_lines.append(line)
+            else:
+                # Has numbering
+                step_lines.append(line)
+
+    # Granular steps "Steps (Step)"
+    steps_step = row.get("Steps (Step)", "")
+    if steps_step:
+        step_lines.append(steps_step)
+        steps_expected = row.get("Steps (Expected Result)", "")
+        if steps_expected:
+            step_lines.append(f"Expected: {steps_expected}")
+
+    # Construct content
+    # SpecBuilder format
+    spec_content = f"# {title}\n\n"
+    if description_combined:
+        spec_content += f"{description_combined}\n\n"
+
+    if step_lines:
+        for i, step in enumerate(step_lines):
+            # Ensure it starts with number dot
+            if re.match(r'^\d+\.', step):
+                spec_content += f"{step}\n"
+            else:
+                spec_content += f"{i+1}. {step}\n"
+    else:
+        pass
+
+    file_name = f"{sanitize_filename(title)}_{test_id.lower()}.md"
     
-    for row in reader:
-        # Extract fields
-        test_id = row.get("ID", "").strip()
-        title = row.get("Title", "").strip()
-        
-        # Description parts
-        description_parts = []
-        if test_id:
-            description_parts.append(f"ID: {test_id}")
-            
-        desc_text = row.get("Goals", "") or row.get("Mission", "") or ""
-        if desc_text:
-            description_parts.append(desc_text)
-            
-        preconditions = row.get("Preconditions", "")
-        if preconditions:
-            description_parts.append("Preconditions: " + preconditions)
-
-        expected = row.get("Expected Result", "")
-        if expected:
-            description_parts.append("Expected Result: " + expected)
-            
-        description_combined = "\n".join(description_parts)
-        
-        # Steps
-        # Check "Steps" and "Steps_1" (duplicate), and "Steps (Step)"
-        steps_text = row.get("Steps", "")
-        if not steps_text:
-            # Try duplicate steps column
-             steps_text = row.get("Steps_1", "")
-        
-        step_lines = []
-        if steps_text:
-            for line in steps_text.split('\n'):
-                line = line.strip()
-                if not line: continue
-                
-                # Check if it already has numbering
-                if not re.match(r'^\d+\.', line):
-                    # No numbering, so we will handle it when joining
-                    step_lines.append(line)
-                else:
-                    # Has numbering
-                    step_lines.append(line)
-        
-        # Granular steps "Steps (Step)"
-        steps_step = row.get("Steps (Step)", "")
-        if steps_step:
-            step_lines.append(steps_step)
-            steps_expected = row.get("Steps (Expected Result)", "")
-            if steps_expected:
-                step_lines.append(f"Expected: {steps_expected}")
-
-        # Construct content
-        # SpecBuilder format
-        spec_content = f"# {title}\n\n"
-        if description_combined:
-            spec_content += f"{description_combined}\n\n"
-            
-        if step_lines:
-            for i, step in enumerate(step_lines):
-                # Ensure it starts with number dot
-                if re.match(r'^\d+\.', step):
-                    spec_content += f"{step}\n"
-                else:
-                    spec_content += f"{i+1}. {step}\n"
-        else:
-            pass
-            
-        file_name = f"{sanitize_filename(title)}_{test_id.lower()}.md"
-        
-        specs.append({
-            "name": file_name,
-            "content": spec_content
-        })
-        
-    return specs
+    return {
+        "name": file_name,
+        "title": title,
+        "content": spec_content
+    }
+
+# ========= Bulk import =========
+
+@dataclass
+class ImportProgress:
+    """Progress and dedup statistics of a TestRail import."""
+    id: str
+    status: str = "running"  # running, completed, failed
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    duplicates: int = 0  # rows mapping to a spec name already seen in this upload
+    metadata_created: int = 0
+    batches: int = 0
+    error: Optional[str] = None
+    started_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    finished_at: Optional[str] = None
+    files: List[str] = field(default_factory=list)
+
+    def to_dict(self, include_files: bool = False) -> Dict[str, Any]:
+        data = {k: v for k, v in self.__dict__.items() if k != "files"}
+        data["count"] = self.created + self.updated + self.unchanged
+        if include_files:
+            data["files"] = self.files
+        return data
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _write_batch(batch: Dict[str, Dict[str, str]], specs_dir: Path, progress: ImportProgress,
+                 flushed: set) -> List[str]:
+    """
+    Write one batch of specs, skipping files whose content is unchanged.
+    `flushed` holds names written by earlier batches of the same upload; those
+    are rewritten (last row wins) but not counted again. Returns names written.
+    """
+    written = []
+    for name, spec in batch.items():
+        fpath = specs_dir / name
+        counted = name not in flushed
+        flushed.add(name)
+        if counted:
+            progress.files.append(name)
+        if fpath.exists():
+            if _digest(fpath.read_text()) == _digest(spec["content"]):
+                if counted:
+                    progress.unchanged += 1
+                continue
+            if counted:
+                progress.updated += 1
+        elif counted:
+            progress.created += 1
+        fpath.parent.mkdir(parents=True, exist_ok=True)
+        fpath.write_text(spec["content"])
+        written.append(name)
+    return written
+
+def _create_metadata(batch: Dict[str, Dict[str, str]], progress: ImportProgress):
+    """Bulk-create SpecMetadata rows for specs that don't have one yet."""
+    with Session(engine) as session:
+        existing = set(session.exec(
+            select(DBSpecMetadata.spec_name).where(DBSpecMetadata.spec_name.in_(list(batch)))
+        ).all())
+        now = datetime.utcnow()
+        rows = [
+            DBSpecMetadata(spec_name=name, tags_json='["testrail"]', description=spec.get("title") or None,
+                           author="TestRail import", last_modified=now)
+            for name, spec in batch.items() if name not in existing
+        ]
+        session.add_all(rows)
+        session.commit()
+        progress.metadata_created += len(rows)
+
+def import_testrail_stream(stream: TextIO, specs_dir: Path, progress: ImportProgress,
+                           batch_size: int = IMPORT_BATCH_SIZE, on_batch=None) -> ImportProgress:
+    """
+    Import specs from a TestRail CSV text stream in batches.
+
+    Rows are parsed as they're read, so memory stays bounded by the batch
+    size. Blocking (file and DB I/O) - run it in a worker thread.
+    `on_batch(names)` is called with the spec names written by each batch.
+    """
+    seen = set()
+    flushed = set()
+    batch: Dict[str, Dict[str, str]] = {}
+
+    def flush():
+        if not batch:
+            return
+        written = _write_batch(batch, specs_dir, progress, flushed)
+        _create_metadata(batch, progress)
+        progress.batches += 1
+        if on_batch:
+            on_batch(written)
+        batch.clear()
+
+    try:
+        specs_dir.mkdir(parents=True, exist_ok=True)
+        for spec in iter_testrail_specs(stream):
+            progress.rows += 1
+            name = spec["name"]
+            # Ensure safe filename
+            if not name.endswith(".md"):
+                name += ".md"
+            if name in seen:
+                # Later rows win, as they did when each row was written in turn
+                progress.duplicates += 1
+            seen.add(name)
+            batch[name] = spec
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+        progress.status = "completed"
+    except Exception as e:
+        progress.status = "failed"
+        progress.error = str(e)
+    finally:
+        progress.finished_at = datetime.utcnow().isoformat()
+    return progress
+
+# In-memory registry of background imports, for progress polling
+MAX_IMPORT_JOBS = 50
+IMPORT_JOBS: Dict[str, ImportProgress] = {}
+_IMPORT_JOBS_LOCK = threading.Lock()
+
+def register_job(progress: ImportProgress):
+    with _IMPORT_JOBS_LOCK:
+        IMPORT_JOBS[progress.id] = progress
+        # Forget the oldest finished jobs
+        finished = [job_id for job_id, job in IMPORT_JOBS.items() if job.status != "running"]
+        for job_id in finished[:max(0, len(IMPORT_JOBS) - MAX_IMPORT_JOBS)]:
+            del IMPORT_JOBS[job_id]
@@ -0,0 +1,116 @@
+"""
+LLM usage endpoints: limiter queue depth, per-call telemetry and per-stage
+latency/token/cost summaries.
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Query
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from orchestrator.utils.llm_limiter import QUEUE_WAIT_RETENTION_SECONDS, queue_stats
+from .db import engine
+
+router = APIRouter()
+
+
+@router.get("/llm/limiter")
+def get_limiter_stats(
+    window_minutes: int = Query(60, ge=1, le=QUEUE_WAIT_RETENTION_SECONDS // 60)
+) -> Dict[str, Any]:
+    """Per provider: waiting tickets by priority, queries in flight, limits and
+    queue-wait p50/p95 over the window."""
+    try:
+        with engine.connect() as conn:
+            return {"providers": queue_stats(conn, since_seconds=window_minutes * 60)}
+    except SQLAlchemyError as e:
+        return {"providers": {}, "error": str(e).splitlines()[0]}
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[int(q * (len(sorted_values) - 1))] if sorted_values else 0.0
+
+
+@router.get("/llm/calls")
+def list_llm_calls(
+    run_id: Optional[str] = None,
+    stage: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+) -> List[Dict[str, Any]]:
+    """Most recent LLM calls, optionally for one run or stage."""
+    filters = []
+    params: Dict[str, Any] = {"limit": limit}
+    if run_id:
+        filters.append("run_id = :run_id")
+        params["run_id"] = run_id
+    if stage:
+        filters.append("stage = :stage")
+        params["stage"] = stage
+    where = f"WHERE {' AND '.join(filters)} " if filters else ""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                f"SELECT * FROM llm_call {where}ORDER BY created_at DESC LIMIT :limit"
+            ),
+            params,
+        )
+        return [dict(row._mapping) for row in rows]
+
+
+@router.get("/llm/stages")
+def get_stage_stats(
+    window_minutes: int = Query(24 * 60, ge=1, le=30 * 24 * 60),
+    run_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Per stage: call count, errors, retries, latency p50/p95, queue wait, tokens and cost."""
+    params: Dict[str, Any] = {"since": time.time() - window_minutes * 60}
+    run_filter = ""
+    if run_id:
+        run_filter = " AND run_id = :run_id"
+        params["run_id"] = run_id
+    stages: Dict[str, Dict[str, Any]] = {}
+    durations: Dict[str, List[float]] = {}
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT stage, status, attempts, duration_ms, queue_wait_ms, input_tokens, output_tokens, "
+                "cache_read_tokens, cost_usd FROM llm_call WHERE created_at >= :since"
+                + run_filter
+            ),
+            params,
+        )
+        for r in rows:
+            entry = stages.setdefault(
+                r.stage,
+                {
+                    "calls": 0,
+                    "errors": 0,
+                    "retries": 0,
+                    "queue_wait_ms": 0.0,
+                    "input_tokens": 0,
+                    "output_tokens": 0,
+                    "cache_read_tokens": 0,
+                    "cost_usd": 0.0,
+                },
+            )
+            entry["calls"] += 1
+            entry["errors"] += r.status != "ok"
+            entry["retries"] += max(0, r.attempts - 1)
+            entry["queue_wait_ms"] += r.queue_wait_ms
+            entry["input_tokens"] += r.input_tokens
+            entry["output_tokens"] += r.output_tokens
+            entry["cache_read_tokens"] += r.cache_read_tokens
+            entry["cost_usd"] += r.cost_usd
+            durations.setdefault(r.stage, []).append(r.duration_ms)
+    for stage, entry in stages.items():
+        values = sorted(durations[stage])
+        entry["duration_ms"] = {
+            "p50": _percentile(values, 0.5),
+            "p95": _percentile(values, 0.95),
+            "total": sum(values),
+        }
+        entry["queue_wait_ms"] = round(entry["queue_wait_ms"] / entry["calls"], 1)
+        entry["cost_usd"] = round(entry["cost_usd"], 4)
+    return {"stages": stages}
@@ -1,22 +1,36 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, UploadFile, File
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, UploadFile, File, Query, Request
+from fastapi.responses import FileResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
+import io
 import json
+import mimetypes
+import shutil
+import tempfile
+import time
 import uuid
 from datetime import datetime
-import subprocess
-import sys
 import os
 import asyncio
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from pydantic import BaseModel
 
 from .models import TestSpec, TestRun, CreateSpecRequest, UpdateSpecRequest, UpdateMetadataRequest, BulkRunRequest
-from .models_db import TestRun as DBTestRun, SpecMetadata as DBSpecMetadata, AgentRun
-from .db import init_db, get_session, engine
-from . import dashboard, settings, import_utils
+from .models_db import TestRun as DBTestRun, SpecMetadata as DBSpecMetadata, AgentRun, BulkRun
+from .db import init_db, get_session, get_async_session, async_session_maker, engine, json_contains, DATABASE_URL
+from . import dashboard, settings, import_utils, search, fingerprints, llm, metrics, sharding, bulk_runs, scheduling, retention
+from .spec_catalog import SpecEntry, spec_catalog
+from .runner import BLOB_STORE, execute_run_task, apply_run_results, load_run_stages
+from orchestrator.utils import timeline as run_timeline
+from orchestrator.utils import tracing
+from orchestrator.utils.export_cache import ExportCache
+from orchestrator.utils.selector_heals import HealingStore
+from orchestrator.utils.flakiness import FlakeHistory
+from orchestrator.utils.log_store import LogReader
+from orchestrator.utils.blob_store import load_manifest
+from orchestrator.utils import thumbnails
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 SPECS_DIR = BASE_DIR / "specs"
@@ -27,7 +41,10 @@ app = FastAPI(title="Playwright Agent API")
 
 app.include_router(dashboard.router)
 app.include_router(settings.router)
-app.mount("/artifacts", StaticFiles(directory=RUNS_DIR), name="artifacts")
+app.include_router(search.router)
+app.include_router(llm.router)
+app.include_router(metrics.router)
+RUNS_DIR.mkdir(parents=True, exist_ok=True)
 
 app.add_middleware(
     CORSMiddleware,
@@ -37,8 +54,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """One server span per request when tracing is enabled (see utils/tracing.py)."""
+    if not tracing.is_enabled():
+        return await call_next(request)
+    with tracing.span(f"{request.method} {request.url.path}", kind="server",
+                      context=tracing.extract_headers(request.headers),
+                      **{"http.request.method": request.method, "url.path": request.url.path}) as current:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None and hasattr(route, "path"):
+            current.update_name(f"{request.method} {route.path}")
+            current.set_attribute("http.route", route.path)
+        current.set_attribute("http.response.status_code", response.status_code)
+        if response.status_code >= 500:
+            tracing.mark_failed(current)
+        return response
+
 # Limit concurrent test executions
+MAX_CONCURRENT_RUNS = 2
+LOG_INLINE_BYTES = 256 * 1024  # Tail of execution.log included in GET /runs/{id}
+ARTIFACT_MAX_AGE = 365 * 86400  # Versioned (?v=) URLs of stored artifacts never change
 EXECUTION_SEMAPHORE: Optional[asyncio.Semaphore] = None
+metrics.EXECUTION_SLOTS.set(MAX_CONCURRENT_RUNS)
+
+# The event loop only keeps weak references to tasks, so fire-and-forget
+# tasks are held here until they finish
+BACKGROUND_TASKS: set = set()
+
+def spawn_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    BACKGROUND_TASKS.add(task)
+    task.add_done_callback(BACKGROUND_TASKS.discard)
+    return task
 
 def sync_data_from_files():
     """Sync existing file-based runs and metadata to DB on startup."""
@@ -57,7 +106,7 @@ def sync_data_from_files():
         # 1. Sync Runs
         if RUNS_DIR.exists():
             for d in RUNS_DIR.iterdir():
-                if not d.is_dir(): continue
+                if not d.is_dir() or d.name.startswith("."): continue  # .blobs
                 run_id = d.name
                 
                 # Check if exists
@@ -95,7 +144,7 @@ def sync_data_from_files():
                         status = "completed"
                 elif status_file.exists():
                     status = status_file.read_text().strip()
-                elif plan_file.exists() or execution_log.exists():
+                elif plan_file.exists() or LogReader(execution_log).exists:
                     status = "failed" # Assume failed if incomplete and old
                 
                 # Spec Name from spec.md if available
@@ -152,7 +201,8 @@ def sync_data_from_files():
 @app.on_event("startup")
 async def startup_event():
     global EXECUTION_SEMAPHORE
-    EXECUTION_SEMAPHORE = asyncio.Semaphore(2)
+    EXECUTION_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+    tracing.init_tracing("playwright-agent-api")
     
     # Initialize DB
     init_db()
@@ -160,6 +210,32 @@ async def startup_event():
     # Run Sync in background or immediate? Immediate is safer for consistency on first load
     sync_data_from_files()
 
+    # Load spec catalog once; a file watcher keeps it current afterwards
+    spec_catalog.start()
+
+    # Keep the search index in step with spec changes, and catch up on
+    # anything that changed while we were down
+    spec_catalog.add_listener(reindex_spec)
+    asyncio.get_running_loop().run_in_executor(None, search.backfill, spec_catalog, RUNS_DIR)
+
+    if RETENTION_INTERVAL_HOURS > 0:
+        spawn_background(retention_loop())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    spec_catalog.stop()
+
+def reindex_spec(name: str, entry: Optional[SpecEntry]):
+    """Catalog listener: update the search index for a changed spec, or drop a removed one (entry is None)."""
+    if entry is None:
+        search.remove("spec", name)
+        return
+    try:
+        content = entry.path.read_text()
+    except OSError:
+        return  # Removed again since; the removal notifies us too
+    search.index_spec(name, content, entry.title, entry.mtime)
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -167,15 +243,14 @@ def health():
 # ========= Specs =========
 
 @app.get("/specs", response_model=List[TestSpec])
-def list_specs():
+def list_specs(include_content: bool = False):
+    """List specs from the in-memory catalog. Content is only read when asked for."""
     specs = []
-    if SPECS_DIR.exists():
-        for f in SPECS_DIR.glob("**/*.md"):
-            specs.append(TestSpec(
-                name=str(f.relative_to(SPECS_DIR)),
-                path=str(f.absolute()),
-                content=f.read_text()
-            ))
+    for entry in spec_catalog.entries():
+        spec = TestSpec(**entry.to_dict())
+        if include_content:
+            spec.content = spec_catalog.read_content(entry.name)
+        specs.append(spec)
     return specs
 
 @app.get("/specs/{name:path}")
@@ -199,6 +274,7 @@ def create_spec(request: CreateSpecRequest):
         raise HTTPException(status_code=400, detail="Spec already exists")
     f.parent.mkdir(parents=True, exist_ok=True)
     f.write_text(request.content)
+    spec_catalog.refresh(name)
     return {"status": "created", "path": str(f.absolute())}
 
 @app.put("/specs/{name:path}")
@@ -207,48 +283,57 @@ def update_spec(name: str, request: UpdateSpecRequest):
     if not f.exists():
         raise HTTPException(status_code=404, detail="Spec not found")
     f.write_text(request.content)
-    f.write_text(request.content)
+    spec_catalog.refresh(name)
     return {"status": "updated", "path": str(f.absolute())}
 
-@app.post("/import/testrail")
-async def import_testrail(file: UploadFile = File(...)):
+def _run_testrail_import(stream, progress: import_utils.ImportProgress) -> import_utils.ImportProgress:
+    """Blocking import of a CSV byte stream; runs in a worker thread."""
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="") # Handle BOM
     try:
-        content = await file.read()
-        specs = import_utils.parse_testrail_csv(content)
-        
-        saved_files = []
-        for spec in specs:
-            fname = spec["name"]
-            # Ensure safe filename
-            if not fname.endswith(".md"):
-                fname += ".md"
-            
-            fpath = SPECS_DIR / fname
-            # Ensure specs dir exists
-            SPECS_DIR.mkdir(parents=True, exist_ok=True)
-            
-            fpath.write_text(spec["content"])
-            saved_files.append(fname)
-            
-            # Sync to DB if needed? 
-            # The system syncs on startup, but maybe we should add to DB here too?
-            # existing sync_data_from_files() logic runs at startup.
-            # But the user might want to see them immediately.
-            # However, spec metadata is separately managed. 
-            # The list_specs() endpoint reads from file system directly, so it should be fine.
-            
-        return {"count": len(saved_files), "files": saved_files}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        return import_utils.import_testrail_stream(
+            text_stream, SPECS_DIR, progress,
+            on_batch=lambda names: [spec_catalog.refresh(name) for name in names],
+        )
+    finally:
+        text_stream.close()
+
+@app.post("/import/testrail")
+async def import_testrail(file: UploadFile = File(...), background: bool = False):
+    """
+    Import a TestRail CSV export. Rows are streamed from the upload and written
+    in batches off the event loop. With `background=true` the import continues
+    after the response and its progress is served by GET /import/testrail/{job_id}.
+    """
+    progress = import_utils.ImportProgress(id=str(uuid.uuid4()))
+    if background:
+        import_utils.register_job(progress)
+        # The upload is closed when the request ends, so spool it to our own temp file
+        spool = tempfile.TemporaryFile()
+        await asyncio.to_thread(shutil.copyfileobj, file.file, spool)
+        spool.seek(0)
+        spawn_background(asyncio.to_thread(_run_testrail_import, spool, progress))
+        return {"job_id": progress.id, **progress.to_dict()}
+
+    await asyncio.to_thread(_run_testrail_import, file.file, progress)
+    if progress.status == "failed":
+        raise HTTPException(status_code=400, detail=progress.error)
+    return {"count": len(progress.files), "files": progress.files, "stats": progress.to_dict()}
+
+@app.get("/import/testrail/{job_id}")
+def get_import_progress(job_id: str):
+    progress = import_utils.IMPORT_JOBS.get(job_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return progress.to_dict()
 
 
 # ========= Runs =========
 
 @app.get("/runs", response_model=List[TestRun])
-def list_runs(session: Session = Depends(get_session)):
+async def list_runs(session: AsyncSession = Depends(get_async_session)):
     # Fetch from DB
     statement = select(DBTestRun).order_by(DBTestRun.created_at.desc())
-    runs_db = session.exec(statement).all()
+    runs_db = (await session.exec(statement)).all()
     
     # Convert to API model
     results = []
@@ -267,8 +352,8 @@ def list_runs(session: Session = Depends(get_session)):
     return results
 
 @app.get("/runs/{id}")
-def get_run(id: str, session: Session = Depends(get_session)):
-    run_db = session.get(DBTestRun, id)
+async def get_run(id: str, session: AsyncSession = Depends(get_async_session)):
+    run_db = await session.get(DBTestRun, id)
     # If not in DB, it might be a very old run or filesystem issue, but we sync on startup.
     # So we trust DB for existence.
     if not run_db:
@@ -279,6 +364,170 @@ def get_run(id: str, session: Session = Depends(get_session)):
     if not run_dir.exists():
         return {"id": id, "status": run_db.status, "note": "Files missing"}
 
+    # File loading is blocking I/O, keep it off the event loop
+    return await asyncio.to_thread(load_run_details, id, run_dir)
+
+def locate_artifact(path: str) -> Tuple[Path, str, str, Optional[Path]]:
+    """(runs root, run id, path in the run, file in the run directory if there); 404 outside the runs."""
+    runs_root = RUNS_DIR.resolve()
+    target = (runs_root / path).resolve()
+    # Dot-directories (.blobs, .thumbs) are internal
+    if runs_root not in target.parents or target.relative_to(runs_root).parts[0].startswith("."):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    run_id, _, rel = target.relative_to(runs_root).as_posix().partition("/")
+    return runs_root, run_id, rel, target if target.is_file() else None
+
+def artifact_version(sha256: str) -> str:
+    """The ?v= of a stored artifact's URL: the URL then always names the same bytes."""
+    return sha256[:16]
+
+def cache_headers(request: Request, etag: str, version: Optional[str] = None) -> Dict[str, str]:
+    """ETag, and Cache-Control: cached for good under a versioned URL, otherwise revalidated."""
+    immutable = version is not None and request.query_params.get("v") == version
+    return {"ETag": etag,
+            "Cache-Control": f"public, max-age={ARTIFACT_MAX_AGE}, immutable" if immutable else "no-cache"}
+
+def not_modified(request: Request, headers: Dict[str, str]) -> Optional[Response]:
+    """304 when If-None-Match has the ETag in `headers`."""
+    tags = {tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")}
+    if headers["ETag"] in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
+    return None
+
+def file_etag(stat_result: os.stat_result, suffix: str = "") -> str:
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}{suffix}"'
+
+@app.api_route("/artifacts/{path:path}", methods=["GET", "HEAD"])
+def get_artifact(path: str, request: Request):
+    """
+    A run file: from the run directory, or from the blob store through the
+    run's artifacts.json. Range requests are supported (video seeking), and
+    If-None-Match is answered with 304.
+    """
+    runs_root, run_id, rel, file = locate_artifact(path)
+    if file is not None:
+        stat_result = file.stat()
+        headers = cache_headers(request, file_etag(stat_result))
+        return not_modified(request, headers) or FileResponse(file, headers=headers, stat_result=stat_result)
+    blob = BLOB_STORE.resolve(runs_root / run_id, rel) if rel else None
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    headers = cache_headers(request, f'"{blob["sha256"]}"', artifact_version(blob["sha256"]))
+    response = not_modified(request, headers)
+    if response is not None:
+        return response
+    media_type = mimetypes.guess_type(rel)[0]
+    if blob["path"] is not None:
+        return FileResponse(blob["path"], media_type=media_type, headers=headers)
+    return serve_stored_blob(blob, request, media_type, headers)
+
+def serve_stored_blob(blob: Dict[str, Any], request: Request, media_type: Optional[str],
+                      headers: Dict[str, str]) -> Response:
+    """A blob in object storage: a redirect to a presigned URL, or proxied with Range support."""
+    storage, size = blob["storage"], blob["size"]
+    url = storage.presigned_url(blob["key"]) if storage.redirect else None
+    if url:
+        # Not cached past the presigned URL's expiry
+        return RedirectResponse(url, status_code=307, headers={"ETag": headers["ETag"], "Cache-Control": "no-cache"})
+    headers = {**headers, "Accept-Ranges": "bytes"}
+    byte_range = parse_byte_range(request.headers.get("range"), size)
+    start, end = byte_range or (0, size - 1)
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end + 1 - start)
+    status_code = 206 if byte_range is not None else 200
+    if request.method == "HEAD":
+        return Response(status_code=status_code, media_type=media_type, headers=headers)
+    try:
+        body = storage.read_range(blob["key"], start, end + 1)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    except OSError as e:
+        print(f"⚠️ Artifact storage read failed: {e}")
+        raise HTTPException(status_code=502, detail="Artifact storage unavailable")
+    return StreamingResponse(body, status_code=status_code, media_type=media_type, headers=headers)
+
+@app.api_route("/thumbnails/{path:path}", methods=["GET", "HEAD"])
+def get_thumbnail(path: str, request: Request):
+    """WebP thumbnail of a screenshot artifact, rendered on the first request and kept (utils/thumbnails.py)."""
+    runs_root, run_id, rel, file = locate_artifact(path)
+    if Path(rel).suffix.lower() not in thumbnails.IMAGE_SUFFIXES:
+        raise HTTPException(status_code=404, detail="Not an image artifact")
+    # Without Pillow, or for an image it can't read, the full image stands in
+    full_size = RedirectResponse(f"/artifacts/{path}", status_code=307)
+    if not thumbnails.is_available():
+        return full_size
+    suffix = f"-w{thumbnails.THUMB_PX}"
+    try:
+        if file is not None:
+            stat_result = file.stat()
+            headers = cache_headers(request, file_etag(stat_result, suffix))
+            return not_modified(request, headers) or FileResponse(
+                thumbnails.file_thumbnail(file, runs_root, f"{run_id}/{rel}"), media_type="image/webp", headers=headers)
+        blob = BLOB_STORE.resolve(runs_root / run_id, rel)
+        if blob is None:
+            raise HTTPException(status_code=404, detail="Artifact not found")
+        headers = cache_headers(request, f'"{blob["sha256"]}{suffix}"', artifact_version(blob["sha256"]))
+        response = not_modified(request, headers)
+        if response is not None:
+            return response
+        storage, key = blob["storage"], thumbnails.blob_thumbnail(blob)
+        local = storage.local_path(key)
+        if local is not None:
+            return FileResponse(local, media_type="image/webp", headers=headers)
+        url = storage.presigned_url(key) if storage.redirect else None
+        if url:
+            return RedirectResponse(url, status_code=307, headers={"ETag": headers["ETag"], "Cache-Control": "no-cache"})
+        return Response(storage.get_bytes(key), media_type="image/webp", headers=headers)
+    except (OSError, ValueError, thumbnails.Image.DecompressionBombError) as e:
+        print(f"⚠️ No thumbnail for {path}: {e}")
+        return full_size
+
+@app.get("/runs/{id}/log")
+async def get_run_log(id: str, request: Request, line_start: Optional[int] = Query(None, ge=0),
+                      line_end: Optional[int] = Query(None, ge=0), tail: Optional[int] = Query(None, ge=0)):
+    """
+    Part of a run's execution.log: the last `tail` lines, lines
+    [line_start, line_end), or a byte range via the Range header.
+    Compressed logs only decompress the chunks the range covers.
+    """
+    log = LogReader(RUNS_DIR / id / "execution.log")
+    if not log.exists:
+        raise HTTPException(status_code=404, detail="Log not found")
+    headers = {"Accept-Ranges": "bytes"}
+    if tail is not None or line_start is not None or line_end is not None:
+        lines = await asyncio.to_thread(log.tail, tail) if tail is not None else \
+            await asyncio.to_thread(log.read_lines, line_start or 0, line_end)
+        return PlainTextResponse("".join(line + "\n" for line in lines), headers=headers)
+
+    size = await asyncio.to_thread(lambda: log.size)
+    byte_range = parse_byte_range(request.headers.get("range"), size)
+    if byte_range is None:
+        return PlainTextResponse(await asyncio.to_thread(log.read_text), headers=headers)
+    start, end = byte_range
+    body = await asyncio.to_thread(log.read_bytes, start, end + 1)
+    return Response(body, status_code=206, media_type="text/plain; charset=utf-8",
+                    headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}"})
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(first, last) byte of a single "bytes=" Range header, or None without one; 416 when unsatisfiable."""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if not first:  # bytes=-N: the last N bytes
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+def load_run_details(id: str, run_dir: Path) -> Dict[str, Any]:
+    """Assemble plan/run/export/validation files, log and artifacts of a run."""
     # Load file details
     plan_file = run_dir / "plan.json"
     run_file = run_dir / "run.json"
@@ -305,21 +554,31 @@ def get_run(id: str, session: Session = Depends(get_session)):
     if validation_file.exists():
         data["validation"] = json.loads(validation_file.read_text())
     
-    execution_log = run_dir / "execution.log"
-    if execution_log.exists():
-        data["log"] = execution_log.read_text()
+    log = LogReader(run_dir / "execution.log")
+    if log.exists:
+        # Long logs are inlined from the tail; GET /runs/{id}/log serves the rest
+        size = log.size
+        data["log"] = log.read_bytes(max(0, size - LOG_INLINE_BYTES)).decode(errors="replace")
+        data["log_size"] = size
+        data["log_truncated"] = size > LOG_INLINE_BYTES
         
     artifacts = []
-    for f in run_dir.glob("**/*"):
-        if f.is_file() and f.suffix.lower() in [".png", ".jpg", ".jpeg", ".webm", ".mp4"]:
-            try:
-                rel_path = f.relative_to(RUNS_DIR)
-                artifacts.append({
-                    "name": f.name,
-                    "path": f"/artifacts/{rel_path}",
-                    "type": "image" if f.suffix.lower() in [".png", ".jpg", ".jpeg"] else "video"
-                })
-            except ValueError: continue
+    # On disk while the run is in progress, in the blob store (artifacts.json) after
+    rel_paths = {f.relative_to(run_dir).as_posix() for f in run_dir.glob("**/*") if f.is_file()}
+    manifest = load_manifest(run_dir)
+    for rel in sorted(rel_paths | set(manifest)):
+        suffix = Path(rel).suffix.lower()
+        if suffix in [".png", ".jpg", ".jpeg", ".webm", ".mp4"]:
+            # Stored artifacts get versioned URLs the browser can cache for good
+            query = f"?v={artifact_version(manifest[rel]['sha256'])}" if rel not in rel_paths else ""
+            artifact = {
+                "name": Path(rel).name,
+                "path": f"/artifacts/{id}/{rel}{query}",
+                "type": "image" if suffix in thumbnails.IMAGE_SUFFIXES else "video"
+            }
+            if artifact["type"] == "image":
+                artifact["thumbnail"] = f"/thumbnails/{id}/{rel}{query}"
+            artifacts.append(artifact)
     data["artifacts"] = artifacts
     
     report_index = run_dir / "report" / "index.html"
@@ -330,50 +589,59 @@ def get_run(id: str, session: Session = Depends(get_session)):
 
 # ========= Execution Logic =========
 
-def execute_run_task(spec_path: str, run_dir: str, try_code_path: str = None, browser: str = "chromium"):
-    cmd = [sys.executable, "orchestrator/cli.py", spec_path, "--run-dir", run_dir, "--browser", browser]
-    if try_code_path:
-        cmd.extend(["--try-code", try_code_path])
-    
-    log_file = Path(run_dir) / "execution.log"
-    with open(log_file, "w") as f:
-        subprocess.run(cmd, cwd=BASE_DIR, stdout=f, stderr=subprocess.STDOUT)
-
-async def execute_run_task_wrapper(spec_path: str, run_dir: str, run_id: str, try_code_path: str = None, browser: str = "chromium"):
+async def execute_run_task_wrapper(spec_path: str, run_dir: str, run_id: str, try_code_path: str = None, browser: str = "chromium", priority: str = "interactive"):
     global EXECUTION_SEMAPHORE
     if EXECUTION_SEMAPHORE is None:
-        EXECUTION_SEMAPHORE = asyncio.Semaphore(2)
-        
-    async with EXECUTION_SEMAPHORE:
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, execute_run_task, spec_path, run_dir, try_code_path, browser)
-        
-        # Update DB Status
-        with Session(engine) as session:
-            run = session.get(DBTestRun, run_id)
-            if run:
-                status_file = Path(run_dir) / "status.txt"
-                if status_file.exists():
-                    run.status = status_file.read_text().strip()
-                
-                run_file = Path(run_dir) / "run.json"
-                if run_file.exists():
-                    try:
-                        run_data = json.loads(run_file.read_text())
-                        run.status = run_data.get("finalState", run.status)
-                        run.steps_completed = len(run_data.get("steps", []))
-                    except: pass
-                
-                plan_file = Path(run_dir) / "plan.json"
-                if plan_file.exists():
-                     try:
-                        plan_data = json.loads(plan_file.read_text())
-                        run.test_name = plan_data.get("testName", run.test_name)
-                        run.total_steps = len(plan_data.get("steps", []))
-                     except: pass
+        EXECUTION_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+
+    with tracing.span("run", **{"run.id": run_id, "run.spec": spec_path, "run.priority": priority}) as current:
+        queued_at = time.time()
+        queue_start = time.perf_counter()
+        async with metrics.execution_slot(EXECUTION_SEMAPHORE):
+            queue_entry = run_timeline.stage_entry("queue", "api", queued_at,
+                                                   wall_ms=(time.perf_counter() - queue_start) * 1000,
+                                                   cpu_ms=None, peak_rss_mb=None)
+            tracing.set_attributes(current, **{"run.queue_wait_ms": queue_entry["wall_ms"]})
+            bulk_run_id = await mark_run_started(run_id)
+            # to_thread carries the span context into execute_run_task
+            run_entry = await asyncio.to_thread(execute_run_task, spec_path, run_dir, try_code_path, browser, priority)
+            await asyncio.to_thread(run_timeline.append_stages, Path(run_dir), [queue_entry, run_entry])
+
+            # Update DB Status
+            async with async_session_maker() as session:
+                run = await session.get(DBTestRun, run_id)
+                if run:
+                    await asyncio.to_thread(apply_run_results, run, Path(run_dir))
+                    session.add(run)
+                    session.add_all(await asyncio.to_thread(load_run_stages, run_id, Path(run_dir)))
+                    await session.commit()
+
+            if bulk_run_id:
+                await asyncio.to_thread(refresh_bulk_run, bulk_run_id)
+            await asyncio.to_thread(metrics.observe_run, Path(run_dir), run.status if run else run_entry["status"], priority)
 
-                session.add(run)
-                session.commit()
+            try:
+                await asyncio.to_thread(search.index_run, run_id, Path(run_dir), run.spec_name if run else None)
+            except Exception as e:
+                print(f"⚠️ Failed to index run {run_id}: {e}")
+
+async def mark_run_started(run_id: str) -> Optional[str]:
+    """Set a run to running once it has an execution slot; returns its bulk run id, if any."""
+    async with async_session_maker() as session:
+        run = await session.get(DBTestRun, run_id)
+        if run is None:
+            return None
+        run.status = "running"
+        session.add(run)
+        await session.commit()
+        bulk_run_id = run.bulk_run_id
+    if bulk_run_id:
+        await asyncio.to_thread(refresh_bulk_run, bulk_run_id)
+    return bulk_run_id
+
+def refresh_bulk_run(bulk_run_id: str):
+    with Session(engine) as session:
+        bulk_runs.refresh_status(session, bulk_run_id)
 
 class RunRequest(BaseModel):
     spec_name: str
@@ -394,7 +662,7 @@ def get_try_code_path(spec_name: str, spec_path: Path) -> Optional[str]:
     # 1. Search previous runs (File based search is still valid or we could search DB)
     # Using filesystem for code discovery is fine
     if RUNS_DIR.exists():
-        run_dirs = sorted([d for d in RUNS_DIR.iterdir() if d.is_dir()], 
+        run_dirs = sorted([d for d in RUNS_DIR.iterdir() if d.is_dir() and not d.name.startswith(".")], 
                          key=lambda x: os.path.getmtime(x), reverse=True)
         for r_dir in run_dirs:
             # ... identical logic to original ...
@@ -430,19 +698,22 @@ def get_try_code_path(spec_name: str, spec_path: Path) -> Optional[str]:
                 break
     return try_code_path
 
+def prepare_run_dir(run_dir: Path, spec_name: str, spec_path: Path) -> Optional[str]:
+    """Create a pending run directory and look up reusable generated code."""
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / "spec.md").write_text(spec_path.read_text())
+    (run_dir / "status.txt").write_text("pending")
+    return get_try_code_path(spec_name, spec_path)
+
 @app.post("/runs")
-def create_run(request: RunRequest, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
+async def create_run(request: RunRequest, background_tasks: BackgroundTasks, session: AsyncSession = Depends(get_async_session)):
     spec_path = SPECS_DIR / request.spec_name
     if not spec_path.exists():
         raise HTTPException(status_code=404, detail="Spec not found")
         
     run_id = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
     run_dir = RUNS_DIR / run_id
-    run_dir.mkdir(parents=True, exist_ok=True)
-    (run_dir / "spec.md").write_text(spec_path.read_text())
-    (run_dir / "status.txt").write_text("pending")
-    
-    try_code_path = get_try_code_path(request.spec_name, spec_path)
+    try_code_path = await asyncio.to_thread(prepare_run_dir, run_dir, request.spec_name, spec_path)
     
     # Create DB Entry
     run = DBTestRun(
@@ -453,41 +724,253 @@ def create_run(request: RunRequest, background_tasks: BackgroundTasks, session:
         browser=request.browser or "chromium"
     )
     session.add(run)
-    session.commit()
+    await session.commit()
     
     background_tasks.add_task(execute_run_task_wrapper, str(spec_path), str(run_dir), run_id, try_code_path, request.browser)
     return {"id": run_id, "status": "started"}
 
 @app.post("/runs/bulk")
-def create_bulk_run(request: BulkRunRequest, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
+async def create_bulk_run(request: BulkRunRequest, background_tasks: BackgroundTasks, session: AsyncSession = Depends(get_async_session)):
     run_ids = []
+    skipped = []
+    reasons = {}
+    jobs = []
+    bulk_run_id = "bulk_" + datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S") + f"_{uuid.uuid4().hex[:6]}"
+    if request.order not in scheduling.ORDERS:
+        raise HTTPException(status_code=400, detail=f"order must be one of {', '.join(scheduling.ORDERS)}")
+    if request.changed_only:
+        reasons = await changed_since_last_green(session, request.spec_names)
     
     for spec_name in request.spec_names:
         spec_path = SPECS_DIR / spec_name
         if not spec_path.exists(): continue
+        if request.changed_only and reasons.get(spec_name) is None:
+            skipped.append(spec_name)
+            continue
             
         run_id = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S") + f"_{spec_name.replace('/', '_')}"
         run_dir = RUNS_DIR / run_id
-        run_dir.mkdir(parents=True, exist_ok=True)
-        (run_dir / "spec.md").write_text(spec_path.read_text())
-        (run_dir / "status.txt").write_text("pending")
-        
-        try_code_path = get_try_code_path(spec_name, spec_path)
+        try_code_path = await asyncio.to_thread(prepare_run_dir, run_dir, spec_name, spec_path)
         
         run = DBTestRun(
             id=run_id,
             spec_name=spec_name,
             test_name=spec_name,  # Set test_name from spec_name
             status="pending",
-            browser=request.browser
+            browser=request.browser,
+            bulk_run_id=bulk_run_id,
         )
         session.add(run)
         
-        background_tasks.add_task(execute_run_task_wrapper, str(spec_path), str(run_dir), run_id, try_code_path, request.browser)
+        jobs.append({"spec_name": spec_name, "run_id": run_id, "spec_path": str(spec_path),
+                     "run_dir": str(run_dir), "try_code_path": try_code_path})
         run_ids.append(run_id)
         
-    session.commit()
-    return {"run_ids": run_ids, "count": len(run_ids)}
+    session.add(BulkRun(
+        id=bulk_run_id,
+        status="pending" if run_ids else "completed",
+        browser=request.browser,
+        total=len(run_ids),
+        shards=request.shards if request.shards and jobs else None,
+        skipped_json=json.dumps(skipped),
+        finished_at=None if run_ids else datetime.utcnow(),
+    ))
+    await session.commit()
+    response = {"bulk_run_id": bulk_run_id, "run_ids": run_ids, "count": len(run_ids), "skipped": skipped}
+    if jobs and not request.shards:
+        jobs = await asyncio.to_thread(schedule_bulk_jobs, jobs, request.order)
+        background_tasks.add_task(run_bulk_jobs, jobs, request.browser)
+        response["scheduled_run_ids"] = [job["run_id"] for job in jobs]
+    elif jobs:
+        # Shard workers on any host sharing the database and runs/ pick these up
+        shard_jobs = [{"spec_name": job["spec_name"], "run_id": job["run_id"],
+                       "try_code_path": sharding.relative_path(job["try_code_path"])} for job in jobs]
+        shards = await asyncio.to_thread(SHARD_QUEUE.create, bulk_run_id, shard_jobs, request.shards, request.browser,
+                                         request.order)
+        if sharding.LOCAL_WORKERS:
+            background_tasks.add_task(sharding.spawn_local_workers, sharding.LOCAL_WORKERS, bulk_run_id, DATABASE_URL)
+        response["shards"] = [{"index": s.shard_index, "run_ids": [j["run_id"] for j in s.jobs],
+                               "estimated_ms": s.estimated_ms} for s in shards]
+    return response
+
+def schedule_bulk_jobs(jobs: List[Dict[str, Any]], order: str) -> List[Dict[str, Any]]:
+    """Jobs in the order they queue for execution slots (see scheduling.order_jobs)."""
+    if order == "request":
+        return jobs
+    with engine.connect() as conn:
+        history = scheduling.spec_history(conn, [job["spec_name"] for job in jobs], RUNS_DIR)
+    return scheduling.order_jobs(jobs, history, order)
+
+async def run_bulk_jobs(jobs: List[Dict[str, Any]], browser: str):
+    # Starting them together queues them on the semaphore in schedule order,
+    # so MAX_CONCURRENT_RUNS of them run at a time, longest first
+    results = await asyncio.gather(*(
+        execute_run_task_wrapper(job["spec_path"], job["run_dir"], job["run_id"], job["try_code_path"], browser, "bulk")
+        for job in jobs
+    ), return_exceptions=True)
+    for job, result in zip(jobs, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ Bulk run job {job['run_id']} failed: {result}")
+
+SHARD_QUEUE = sharding.ShardQueue(DATABASE_URL)
+BULK_STREAM_POLL_SECONDS = 2
+BULK_STREAM_KEEPALIVE_SECONDS = 15
+
+def bulk_run_summary(bulk_run_id: str) -> Optional[Dict[str, Any]]:
+    with Session(engine) as session:
+        counts = bulk_runs.status_counts(session, bulk_run_id)
+        bulk = bulk_runs.refresh_status(session, bulk_run_id, counts)
+        if bulk is None:
+            return None
+        shards = SHARD_QUEUE.shards(bulk_run_id) if bulk.shards else None
+        summary = bulk_runs.summarize(session, bulk, MAX_CONCURRENT_RUNS, shards, counts)
+    if shards:
+        summary["sharding"] = SHARD_QUEUE.summary(bulk_run_id, shards)
+    return summary
+
+@app.get("/runs/bulk/{bulk_run_id}")
+async def get_bulk_run(bulk_run_id: str):
+    """Progress of a bulk run: counts by status, failed runs, elapsed time and ETA."""
+    summary = await asyncio.to_thread(bulk_run_summary, bulk_run_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Bulk run not found")
+    return summary
+
+@app.get("/runs/bulk/{bulk_run_id}/events")
+async def stream_bulk_run(bulk_run_id: str, request: Request):
+    """Server-sent events: "progress" with the summary whenever a run changes state, then "done"."""
+    summary = await asyncio.to_thread(bulk_run_summary, bulk_run_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Bulk run not found")
+
+    async def events():
+        nonlocal summary
+        last_state, last_sent = None, 0.0
+        while True:
+            state = (summary["status"], summary["counts"])
+            if state != last_state:
+                yield f"event: progress\ndata: {json.dumps(summary)}\n\n"
+                last_state, last_sent = state, time.monotonic()
+            elif time.monotonic() - last_sent >= BULK_STREAM_KEEPALIVE_SECONDS:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            if summary["status"] == "completed":
+                yield f"event: done\ndata: {json.dumps(summary)}\n\n"
+                return
+            await asyncio.sleep(BULK_STREAM_POLL_SECONDS)
+            if await request.is_disconnected():
+                return
+            summary = await asyncio.to_thread(bulk_run_summary, bulk_run_id) or summary
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+async def last_finished_runs(session: AsyncSession, spec_names: List[str]) -> Dict[str, DBTestRun]:
+    """Latest run with recorded fingerprints for each spec."""
+    result = await session.exec(
+        select(DBTestRun)
+        .where(DBTestRun.spec_name.in_(spec_names), DBTestRun.fingerprint.is_not(None))
+        .order_by(DBTestRun.created_at.desc())
+    )
+    latest = {}
+    for run in result.all():
+        latest.setdefault(run.spec_name, run)
+    return latest
+
+async def changed_since_last_green(session: AsyncSession, spec_names: List[str]) -> Dict[str, Optional[str]]:
+    """Map each spec to why it needs rerunning, or None if unchanged since its last green run."""
+    latest = await last_finished_runs(session, spec_names)
+
+    def reasons():
+        plans = fingerprints.latest_plans()
+        return {name: fingerprints.rerun_reason(name, latest.get(name), plans) for name in spec_names}
+
+    return await asyncio.to_thread(reasons)
+
+@app.get("/fingerprints/{spec_name:path}")
+async def get_spec_fingerprint(spec_name: str, session: AsyncSession = Depends(get_async_session)):
+    """Current input fingerprint of a spec against the one its last finished run recorded."""
+    if not (SPECS_DIR / spec_name).exists():
+        raise HTTPException(status_code=404, detail="Spec not found")
+    last_run = (await last_finished_runs(session, [spec_name])).get(spec_name)
+    plans = await asyncio.to_thread(fingerprints.latest_plans)
+    current = await asyncio.to_thread(fingerprints.current_fingerprint, spec_name, plans)
+    reason = await asyncio.to_thread(fingerprints.rerun_reason, spec_name, last_run, plans)
+    return {
+        "spec_name": spec_name,
+        "current": current.to_dict(),
+        "last_run": {
+            "id": last_run.id,
+            "status": last_run.status,
+            "spec_hash": last_run.spec_hash,
+            "test_hash": last_run.test_hash,
+            "plan_hash": last_run.plan_hash,
+            "fingerprint": last_run.fingerprint,
+        } if last_run else None,
+        "needs_rerun": reason is not None,
+        "reason": reason,
+    }
+
+@app.get("/exporter/cache")
+def get_export_cache_stats():
+    """Entries, hits, misses and invalidations of the exporter's trace cache."""
+    return ExportCache().stats()
+
+@app.delete("/exporter/cache")
+def invalidate_export_cache(keep_version: Optional[str] = None):
+    """Drop cached exports, or only those not produced by prompt version `keep_version`."""
+    return {"removed": ExportCache().invalidate(keep_version=keep_version)}
+
+HEALING_STORE = HealingStore(DATABASE_URL)
+
+@app.get("/selector-heals")
+def list_selector_heals(url: Optional[str] = None, min_confidence: float = 0.0, limit: int = 200):
+    """Healed selectors learned from validator fixes (those for pages matching `url`), most confident first."""
+    if url:
+        heals = HEALING_STORE.known_heals([url], min_confidence=min_confidence, limit=limit)
+    else:
+        heals = HEALING_STORE.list_heals(min_confidence=min_confidence, limit=limit)
+    return [h.to_dict() for h in heals]
+
+FLAKE_HISTORY = FlakeHistory(DATABASE_URL)
+
+@app.get("/flakiness")
+def list_flakiness(min_score: float = 0.0, limit: int = 200):
+    """Per-test flakiness scores from validator run history, flakiest first."""
+    return [s.to_dict() for s in FLAKE_HISTORY.scores(min_score=min_score, limit=limit)]
+
+@app.get("/flakiness/{test_key:path}")
+def get_flakiness(test_key: str):
+    """Flakiness score and classification of one test (path relative to the project root)."""
+    score = FLAKE_HISTORY.score(test_key)
+    if not score.runs:
+        raise HTTPException(status_code=404, detail="No history for this test")
+    return score.to_dict()
+
+RETENTION_INTERVAL_HOURS = float(os.environ.get("RETENTION_INTERVAL_HOURS", "0"))
+
+@app.get("/retention/usage")
+def get_disk_usage():
+    """Bytes under runs/ per spec, by kind, largest first."""
+    return retention.disk_usage(RUNS_DIR, engine)
+
+@app.post("/retention/run")
+def run_retention(dry_run: bool = True):
+    """One retention pass (compress old logs, delete expired videos and traces); a dry run by default."""
+    return retention.apply_retention(RUNS_DIR, engine, dry_run=dry_run, blobs=BLOB_STORE).to_dict()
+
+@app.get("/retention/blobs")
+def get_blob_stats():
+    """Artifact blobs stored, references to them, and bytes saved by storing each once."""
+    return BLOB_STORE.stats()
+
+async def retention_loop():
+    while True:
+        await asyncio.sleep(RETENTION_INTERVAL_HOURS * 3600)
+        try:
+            report = await asyncio.to_thread(retention.apply_retention, RUNS_DIR, engine, blobs=BLOB_STORE)
+            print(f"🧹 Retention: freed {report.bytes_freed / 1e6:.1f} MB across {report.runs_scanned} runs")
+        except Exception as e:
+            print(f"⚠️ Retention pass failed: {e}")
 
 # ========= Metadata =========
 
@@ -535,6 +1018,11 @@ def update_spec_metadata(spec_name: str, request: UpdateMetadataRequest, session
     session.add(m)
     session.commit()
     session.refresh(m)
+
+    # Tags and description are searchable alongside the spec content
+    entry = spec_catalog.get(spec_name)
+    if entry:
+        search.index_spec(spec_name, spec_catalog.read_content(spec_name) or "", entry.title, entry.mtime, m)
     
     return {"status": "success", "metadata": {
         "tags": m.tags,
@@ -567,11 +1055,6 @@ class SpecSynthesisRequest(BaseModel):
 
 
 async def execute_agent_background(run_id: str, agent_type: str, config: dict):
-    from .db import engine
-    from sqlmodel import Session
-    from .models_db import AgentRun
-
-
     try:
         from orchestrator.agents.exploratory_agent import ExploratoryAgent
         from orchestrator.agents.spec_writer_agent import SpecWriterAgent
@@ -591,28 +1074,28 @@ async def execute_agent_background(run_id: str, agent_type: str, config: dict):
             result = await agent.run(config)
 
         # Update DB success
-        with Session(engine) as session:
-            run = session.get(AgentRun, run_id)
+        async with async_session_maker() as session:
+            run = await session.get(AgentRun, run_id)
             if run:
                 run.status = "completed"
                 run.result = result
                 session.add(run)
-                session.commit()
+                await session.commit()
 
     except Exception as e:
         import traceback
         traceback.print_exc()
         # Update DB failure
-        with Session(engine) as session:
-            run = session.get(AgentRun, run_id)
+        async with async_session_maker() as session:
+            run = await session.get(AgentRun, run_id)
             if run:
                 run.status = "failed"
                 run.result = {"error": str(e)}
                 session.add(run)
-                session.commit()
+                await session.commit()
 
 @app.post("/api/agents/runs")
-async def run_agent(request: AgentRunRequest, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
+async def run_agent(request: AgentRunRequest, background_tasks: BackgroundTasks, session: AsyncSession = Depends(get_async_session)):
     """Run an autonomous agent in background"""
     
     # Create DB Record
@@ -620,11 +1103,11 @@ async def run_agent(request: AgentRunRequest, background_tasks: BackgroundTasks,
     run = AgentRun(
         id=run_id,
         agent_type=request.agent_type,
-        config_json=json.dumps(request.config),
+        config_json=request.config,
         status="running"
     )
     session.add(run)
-    session.commit()
+    await session.commit()
     
     # Start Background Task
     background_tasks.add_task(execute_agent_background, run_id, request.agent_type, request.config)
@@ -632,9 +1115,27 @@ async def run_agent(request: AgentRunRequest, background_tasks: BackgroundTasks,
     return {"status": "started", "run_id": run_id}
 
 @app.get("/api/agents/runs")
-def list_agent_runs(session: Session = Depends(get_session)):
-    statement = select(AgentRun).order_by(AgentRun.created_at.desc())
-    runs = session.exec(statement).all()
+async def list_agent_runs(
+    agent_type: Optional[str] = None,
+    status: Optional[str] = None,
+    termination_reason: Optional[str] = None,
+    min_coverage: Optional[float] = None,
+    min_flows: Optional[int] = None,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """List agent runs, optionally filtered server-side on result fields."""
+    statement = select(AgentRun)
+    if agent_type:
+        statement = statement.where(AgentRun.agent_type == agent_type)
+    if status:
+        statement = statement.where(AgentRun.status == status)
+    if termination_reason:
+        statement = statement.where(json_contains(AgentRun.result_json, {"termination_reason": termination_reason}))
+    if min_coverage is not None:
+        statement = statement.where(AgentRun.result_json[("coverage", "coverage_score")].as_float() >= min_coverage)
+    if min_flows is not None:
+        statement = statement.where(AgentRun.result_json["total_flows_discovered"].as_integer() >= min_flows)
+    runs = (await session.exec(statement.order_by(AgentRun.created_at.desc()))).all()
     # Manually serialize to handle properties
     return [
         {
@@ -650,8 +1151,8 @@ def list_agent_runs(session: Session = Depends(get_session)):
     ]
 
 @app.get("/api/agents/runs/{id}")
-def get_agent_run(id: str, session: Session = Depends(get_session)):
-    r = session.get(AgentRun, id)
+async def get_agent_run(id: str, session: AsyncSession = Depends(get_async_session)):
+    r = await session.get(AgentRun, id)
     if not r:
         raise HTTPException(status_code=404, detail="Run not found")
     return {
@@ -666,7 +1167,7 @@ def get_agent_run(id: str, session: Session = Depends(get_session)):
 # ========= Enhanced Exploratory Testing Endpoints =========
 
 @app.post("/api/agents/exploratory")
-async def run_exploratory_agent(request: ExploratoryRunRequest, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
+async def run_exploratory_agent(request: ExploratoryRunRequest, background_tasks: BackgroundTasks, session: AsyncSession = Depends(get_async_session)):
     """
     Run enhanced exploratory testing with 10-15 minute autonomous exploration.
 
@@ -702,11 +1203,11 @@ async def run_exploratory_agent(request: ExploratoryRunRequest, background_tasks
     run = AgentRun(
         id=run_id,
         agent_type="exploratory",
-        config_json=json.dumps(config),
+        config_json=config,
         status="running"
     )
     session.add(run)
-    session.commit()
+    await session.commit()
 
     # Start background task
     background_tasks.add_task(execute_agent_background, run_id, "exploratory", config)
@@ -715,7 +1216,7 @@ async def run_exploratory_agent(request: ExploratoryRunRequest, background_tasks
 
 
 @app.post("/api/agents/exploratory/{run_id}/synthesize")
-async def synthesize_specs(run_id: str, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
+async def synthesize_specs(run_id: str, background_tasks: BackgroundTasks, session: AsyncSession = Depends(get_async_session)):
     """
     Generate .md test specs from exploration results.
 
@@ -723,7 +1224,7 @@ async def synthesize_specs(run_id: str, background_tasks: BackgroundTasks, sessi
     production-ready .md specs that work with the existing pipeline.
     """
     # Get exploration run
-    exploration_run = session.get(AgentRun, run_id)
+    exploration_run = await session.get(AgentRun, run_id)
     if not exploration_run:
         raise HTTPException(status_code=404, detail="Exploration run not found")
 
@@ -750,11 +1251,11 @@ async def synthesize_specs(run_id: str, background_tasks: BackgroundTasks, sessi
     synthesis_run = AgentRun(
         id=synthesis_run_id,
         agent_type="spec-synthesis",
-        config_json=json.dumps(synthesis_config),
+        config_json=synthesis_config,
         status="running"
     )
     session.add(synthesis_run)
-    session.commit()
+    await session.commit()
 
     # Start background task
     background_tasks.add_task(execute_agent_background, synthesis_run_id, "spec-synthesis", synthesis_config)
@@ -767,7 +1268,7 @@ async def synthesize_specs(run_id: str, background_tasks: BackgroundTasks, sessi
 
 
 @app.get("/api/agents/exploratory/{run_id}/specs")
-async def get_exploration_specs(run_id: str, session: Session = Depends(get_session)):
+async def get_exploration_specs(run_id: str, session: AsyncSession = Depends(get_async_session)):
     """
     Get generated specs from an exploration run.
 
@@ -775,10 +1276,11 @@ async def get_exploration_specs(run_id: str, session: Session = Depends(get_sess
     """
     # Get synthesis runs for this exploration
     statement = select(AgentRun).where(
-        AgentRun.config_json.contains(run_id)
+        AgentRun.agent_type == "spec-synthesis",
+        json_contains(AgentRun.config_json, {"run_id": run_id})
     ).order_by(AgentRun.created_at.desc())
 
-    synthesis_runs = session.exec(statement).all()
+    synthesis_runs = (await session.exec(statement)).all()
 
     if not synthesis_runs:
         return {"specs": {}, "message": "No specs generated yet. Run /synthesize first."}
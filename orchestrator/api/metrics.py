@@ -0,0 +1,260 @@
+"""
+Prometheus metrics at GET /metrics.
+
+Counters and histograms are observed by this API process: runs when they
+finish (stage durations from timeline.json, LLM calls from llm_calls.jsonl,
+validator attempts, artifact bytes) and LLM calls the API makes itself
+(exploratory agents). Like any Prometheus counter they restart from zero
+with the process.
+
+Gauges are read at scrape time: run counts per status from the database,
+runs waiting for an execution slot, slots in use, and the fleet-wide LLM
+queue (llm_queue table).
+"""
+
+import json
+import os
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from pathlib import Path
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from orchestrator.utils import llm_client
+from orchestrator.utils.blob_store import load_manifest
+from orchestrator.utils.llm_limiter import PRIORITIES
+from orchestrator.utils.timeline import load_timeline
+from .db import engine
+
+router = APIRouter()
+
+REGISTRY = CollectorRegistry()
+
+RUNS_COMPLETED = Counter(
+    "playwright_agent_runs_completed_total",
+    "Runs finished by this API process",
+    ["status", "priority"],
+    registry=REGISTRY,
+)
+RUN_QUEUE_DEPTH = Gauge(
+    "playwright_agent_run_queue_depth",
+    "Runs waiting for an execution slot",
+    registry=REGISTRY,
+)
+EXECUTION_SLOTS = Gauge(
+    "playwright_agent_execution_slots", "Concurrent run capacity", registry=REGISTRY
+)
+EXECUTION_SLOTS_IN_USE = Gauge(
+    "playwright_agent_execution_slots_in_use",
+    "Runs currently executing",
+    registry=REGISTRY,
+)
+STAGE_DURATION = Histogram(
+    "playwright_agent_stage_duration_seconds",
+    "Wall time per run stage",
+    ["stage", "source", "status"],
+    registry=REGISTRY,
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600),
+)
+LLM_CALL_DURATION = Histogram(
+    "playwright_agent_llm_call_duration_seconds",
+    "LLM call latency including retries and queue wait",
+    ["stage", "provider", "status"],
+    registry=REGISTRY,
+    buckets=(1, 2, 5, 10, 20, 30, 60, 120, 300, 600),
+)
+LLM_QUEUE_WAIT = Histogram(
+    "playwright_agent_llm_queue_wait_seconds",
+    "Time LLM calls waited for the limiter",
+    ["stage", "provider"],
+    registry=REGISTRY,
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300),
+)
+LLM_TOKENS = Counter(
+    "playwright_agent_llm_tokens_total",
+    "LLM tokens by kind",
+    ["stage", "provider", "kind"],
+    registry=REGISTRY,
+)
+LLM_COST = Counter(
+    "playwright_agent_llm_cost_usd_total",
+    "LLM cost reported by the provider",
+    ["stage", "provider"],
+    registry=REGISTRY,
+)
+VALIDATOR_ATTEMPTS = Histogram(
+    "playwright_agent_validator_attempts",
+    "Validator attempts per run",
+    ["status"],
+    registry=REGISTRY,
+    buckets=(1, 2, 3, 4, 5, 10),
+)
+ARTIFACT_BYTES = Counter(
+    "playwright_agent_artifact_bytes_total",
+    "Bytes of run artifacts written",
+    ["kind"],
+    registry=REGISTRY,
+)
+
+ARTIFACT_KINDS = {
+    ".webm": "video",
+    ".mp4": "video",
+    ".zip": "trace",
+    ".png": "screenshot",
+    ".jpg": "screenshot",
+    ".jpeg": "screenshot",
+    ".webp": "screenshot",
+    ".log": "log",
+    ".txt": "log",
+    ".gz": "log",
+    ".zst": "log",
+    ".idx": "log",
+    ".json": "json",
+    ".jsonl": "json",
+    ".html": "report",
+}
+PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
+
+
+@asynccontextmanager
+async def execution_slot(semaphore):
+    """Acquire an execution slot, tracking queue depth and occupancy."""
+    RUN_QUEUE_DEPTH.inc()
+    try:
+        await semaphore.acquire()
+    finally:
+        RUN_QUEUE_DEPTH.dec()
+    EXECUTION_SLOTS_IN_USE.inc()
+    try:
+        yield
+    finally:
+        EXECUTION_SLOTS_IN_USE.dec()
+        semaphore.release()
+
+
+def observe_llm_call(call: dict):
+    labels = {
+        "stage": call.get("stage") or "unknown",
+        "provider": call.get("provider") or "unknown",
+    }
+    LLM_CALL_DURATION.labels(status=call.get("status") or "ok", **labels).observe(
+        (call.get("duration_ms") or 0) / 1000
+    )
+    LLM_QUEUE_WAIT.labels(**labels).observe((call.get("queue_wait_ms") or 0) / 1000)
+    for kind in ("input", "output", "cache_read", "cache_creation"):
+        LLM_TOKENS.labels(kind=kind, **labels).inc(call.get(f"{kind}_tokens") or 0)
+    LLM_COST.labels(**labels).inc(call.get("cost_usd") or 0)
+
+
+def _observe_api_llm_call(call: llm_client.LLMCall):
+    # Run subprocesses log to llm_calls.jsonl, picked up by observe_run
+    if call.run_id is None:
+        observe_llm_call(asdict(call))
+
+
+llm_client.CALL_LISTENERS.append(_observe_api_llm_call)
+
+
+def _artifact_bytes(run_dir: Path) -> dict:
+    totals: dict = {}
+    for root, _, files in os.walk(run_dir):
+        for name in files:
+            path = Path(root) / name
+            try:
+                size = path.stat().st_size
+            except OSError:
+                continue
+            kind = ARTIFACT_KINDS.get(path.suffix.lower(), "other")
+            totals[kind] = totals.get(kind, 0) + size
+    # Artifacts already moved to the blob store
+    for rel, entry in load_manifest(run_dir).items():
+        kind = ARTIFACT_KINDS.get(Path(rel).suffix.lower(), "other")
+        totals[kind] = totals.get(kind, 0) + entry["size"]
+    return totals
+
+
+def observe_run(run_dir: Path, status: str, priority: str = "interactive"):
+    """Record a finished run's stages, LLM calls, validator attempts and artifacts."""
+    run_dir = Path(run_dir)
+    RUNS_COMPLETED.labels(status=status or "unknown", priority=priority).inc()
+
+    for entry in load_timeline(run_dir):
+        STAGE_DURATION.labels(
+            stage=entry.get("stage"),
+            source=entry.get("source"),
+            status=entry.get("status"),
+        ).observe((entry.get("wall_ms") or 0) / 1000)
+
+    try:
+        lines = (run_dir / "llm_calls.jsonl").read_text().splitlines()
+    except OSError:
+        lines = []
+    for line in lines:
+        try:
+            observe_llm_call(json.loads(line))
+        except ValueError:
+            continue
+
+    try:
+        validation = json.loads((run_dir / "validation.json").read_text())
+        if validation.get("attempts"):
+            VALIDATOR_ATTEMPTS.labels(
+                status=validation.get("status", "unknown")
+            ).observe(validation["attempts"])
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    for kind, size in _artifact_bytes(run_dir).items():
+        ARTIFACT_BYTES.labels(kind=kind).inc(size)
+
+
+class DatabaseCollector:
+    """Gauges read from the database on every scrape."""
+
+    def collect(self):
+        runs = GaugeMetricFamily(
+            "playwright_agent_runs", "Runs in the database by status", labels=["status"]
+        )
+        llm_queue = GaugeMetricFamily(
+            "playwright_agent_llm_queue_depth",
+            "LLM calls waiting for or holding a limiter slot",
+            labels=["provider", "priority", "state"],
+        )
+        try:
+            with engine.connect() as conn:
+                for status, count in conn.execute(
+                    text("SELECT status, COUNT(*) FROM testrun GROUP BY status")
+                ):
+                    runs.add_metric([status or "unknown"], count)
+                for provider, priority, state, count in conn.execute(
+                    text(
+                        "SELECT provider, priority, state, COUNT(*) FROM llm_queue GROUP BY provider, priority, state"
+                    )
+                ):
+                    llm_queue.add_metric(
+                        [provider, PRIORITY_NAMES.get(priority, str(priority)), state],
+                        count,
+                    )
+        except SQLAlchemyError as e:
+            print(f"⚠️ Failed to read metrics from DB: {str(e).splitlines()[0]}")
+        yield runs
+        yield llm_queue
+
+
+REGISTRY.register(DatabaseCollector())
+
+
+@router.get("/metrics")
+def get_metrics() -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -4,7 +4,10 @@ from typing import List, Optional
 class TestSpec(BaseModel):
     name: str
     path: str
-    content: str
+    content: Optional[str] = None
+    size: Optional[int] = None
+    modified: Optional[str] = None
+    title: Optional[str] = None
 
 class TestRun(BaseModel):
     id: str
@@ -36,3 +39,6 @@ class UpdateMetadataRequest(BaseModel):
 class BulkRunRequest(BaseModel):
     spec_names: List[str]
     browser: str = "chromium"
+    changed_only: bool = False  # Skip specs unchanged since their last green run
+    shards: Optional[int] = None  # Split across shard workers instead of running on the API process
+    order: str = "longest_first"  # longest_first, failing_first or request (see scheduling.py)
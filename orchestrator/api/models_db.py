@@ -1,21 +1,55 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Index, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 import json
 
+# JSONB on Postgres (binary, GIN-indexable, queryable server-side).
+# Other dialects (SQLite) fall back to JSON stored as text.
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
+# TestRun.status: pending and running until the run finishes, then passed,
+# failed, error (finished without recording an outcome) or unknown (imported
+# from a run directory without run.json)
+ACTIVE_RUN_STATUSES = {"pending", "running"}
+FAILED_RUN_STATUSES = {"failed", "error"}
+
 class TestRun(SQLModel, table=True):
     id: str = Field(primary_key=True)
-    spec_name: str
-    status: str
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    spec_name: str = Field(index=True)
+    status: str = Field(index=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     test_name: Optional[str] = None
     steps_completed: int = 0
     total_steps: int = 0
     browser: str = "chromium"
+
+    # Input hashes recorded when the run finishes (see fingerprints.py)
+    spec_hash: Optional[str] = None
+    test_hash: Optional[str] = None
+    plan_hash: Optional[str] = None
+    fingerprint: Optional[str] = None
+
+    # Set for runs started by POST /runs/bulk
+    bulk_run_id: Optional[str] = Field(default=None, index=True)
+    # Kept fresh by the shard worker executing the run (see sharding.py)
+    heartbeat_at: Optional[datetime] = None
     
     # We can store heavy JSONs as text/jsonb if needed, or stick to file for big logs.
     # For now, let's keep metadata in DB.
     
+class BulkRun(SQLModel, table=True):
+    """One POST /runs/bulk request; its runs have testrun.bulk_run_id set."""
+    id: str = Field(primary_key=True)
+    status: str = Field(default="pending", index=True)  # pending, running, completed
+    browser: str = "chromium"
+    total: int = 0
+    shards: Optional[int] = None
+    skipped_json: str = "[]"  # Specs left out by changed_only
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    finished_at: Optional[datetime] = None
+
 class SpecMetadata(SQLModel, table=True):
     spec_name: str = Field(primary_key=True)
     tags_json: str = "[]" # Stored as JSON string
@@ -35,28 +69,46 @@ class SpecMetadata(SQLModel, table=True):
         self.tags_json = json.dumps(value)
 
 class AgentRun(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_agentrun_config_json_gin", "config_json", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_agentrun_result_json_gin", "result_json", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
     id: str = Field(primary_key=True)
-    agent_type: str
-    config_json: str = "{}"
-    result_json: Optional[str] = None
+    agent_type: str = Field(index=True)
+    # Documents are decoded once when the row is loaded, so repeated
+    # access to `config`/`result` on the same instance doesn't re-parse.
+    config_json: Dict[str, Any] = Field(default_factory=dict, sa_column=Column("config_json", JSONDocument, nullable=False))
+    result_json: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column("result_json", JSONDocument))
     status: str = "running" # running, completed, failed
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     
     @property
     def config(self) -> dict:
-        try: return json.loads(self.config_json)
-        except: return {}
+        return self.config_json or {}
         
     @config.setter
     def config(self, value: dict):
-        self.config_json = json.dumps(value)
+        self.config_json = value
         
     @property
     def result(self) -> Optional[dict]:
-        if not self.result_json: return None
-        try: return json.loads(self.result_json)
-        except: return None
+        return self.result_json
         
     @result.setter
     def result(self, value: dict):
-        self.result_json = json.dumps(value)
+        self.result_json = value
+
+class RunStage(SQLModel, table=True):
+    """One stage of a run's timeline.json (plan, execute, export, ...)."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    run_id: str = Field(index=True)
+    stage: str = Field(index=True)
+    source: str = "cli"  # cli or api
+    status: str = "ok"
+    started_at: datetime = Field(index=True)
+    wall_ms: float = 0
+    cpu_ms: Optional[float] = None
+    peak_rss_mb: Optional[float] = None
+    llm_ms: Optional[float] = None
+    llm_queue_wait_ms: Optional[float] = None
@@ -0,0 +1,368 @@
+"""
+Retention and compaction for runs/.
+
+Every run keeps its screenshots, test-results, reports, videos, GIFs and
+logs forever unless something removes them. A retention pass walks the run
+directories of each spec, newest first, and:
+
+  - leaves the last RETENTION_KEEP_RUNS runs of each spec untouched;
+  - compresses the logs of older runs that are still plain text (utils/log_store.py);
+  - deletes videos, traces and GIFs of older runs past RETENTION_MEDIA_DAYS
+    (releasing them in the blob store, whose unreferenced blobs are then deleted);
+  - never deletes run.json or any other JSON (plan, export, validation, timeline).
+
+Passes are incremental: a run whose media is gone is marked in its
+.retention.json and skipped by later passes, and one pass handles at most
+RETENTION_BATCH runs, oldest first. Runs still pending or running are never
+touched. The API runs a pass every RETENTION_INTERVAL_HOURS (off by default).
+
+    python -m orchestrator.api.retention [--dry-run] [--usage]
+
+    RETENTION_KEEP_RUNS=10
+    RETENTION_MEDIA_DAYS=14
+    RETENTION_BATCH=500
+    RETENTION_INTERVAL_HOURS=0
+"""
+
+import argparse
+import calendar
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from orchestrator.utils import log_store
+from orchestrator.utils.blob_store import BlobStore, load_manifest
+from orchestrator.utils.log_store import compact_log
+from .db import database_url
+from .models_db import ACTIVE_RUN_STATUSES
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+RUNS_DIR = BASE_DIR / "runs"
+
+MARKER = ".retention.json"
+LOG_SUFFIXES = {".log"}
+MEDIA_SUFFIXES = {".webm", ".mp4", ".gif", ".zip"}  # Videos, GIFs and Playwright traces
+# Disk usage buckets; anything else is "other"
+USAGE_KINDS = {
+    ".log": "logs",
+    ".gz": "logs",
+    ".zst": "logs",
+    ".idx": "logs",
+    ".txt": "logs",
+    ".webm": "media",
+    ".mp4": "media",
+    ".gif": "media",
+    ".zip": "media",
+    ".png": "screenshots",
+    ".jpg": "screenshots",
+    ".jpeg": "screenshots",
+    ".webp": "screenshots",
+    ".json": "json",
+    ".jsonl": "json",
+    ".html": "reports",
+}
+
+
+@dataclass
+class RetentionPolicy:
+    keep_runs: int = 10
+    media_days: float = 14
+    batch: int = 500
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        return cls(
+            keep_runs=int(os.environ.get("RETENTION_KEEP_RUNS", "10")),
+            media_days=float(os.environ.get("RETENTION_MEDIA_DAYS", "14")),
+            batch=int(os.environ.get("RETENTION_BATCH", "500")),
+        )
+
+
+@dataclass
+class RunInfo:
+    run_id: str
+    path: Path
+    spec: str
+    created_at: float
+    status: Optional[str] = None
+
+
+@dataclass
+class RetentionReport:
+    dry_run: bool
+    runs_scanned: int = 0
+    runs_kept: int = 0
+    runs_skipped: int = 0  # Already compacted, or still active
+    logs_compressed: int = 0
+    media_deleted: int = 0
+    blobs_deleted: int = 0
+    bytes_freed: int = 0
+    actions: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _db_runs(engine) -> Dict[str, Dict[str, Any]]:
+    """spec_name, status and created_at of the runs known to the database."""
+    if engine is None:
+        return {}
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT id, spec_name, status, created_at FROM testrun")
+            ).all()
+    except SQLAlchemyError as e:
+        print(f"⚠️ Retention: run history unavailable, using run files only: {e}")
+        return {}
+    return {
+        row.id: {
+            "spec": row.spec_name,
+            "status": row.status,
+            "created_at": row.created_at,
+        }
+        for row in rows
+    }
+
+
+def _spec_from_files(run_dir: Path) -> str:
+    for name in ("run.json", "plan.json"):
+        try:
+            test_name = json.loads((run_dir / name).read_text()).get("testName")
+        except (OSError, ValueError, AttributeError):
+            continue
+        if test_name:
+            return test_name
+    return "unknown"
+
+
+def _timestamp(value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    # created_at is stored in UTC without tzinfo
+    return float(calendar.timegm(value.timetuple()))
+
+
+def list_runs(runs_dir: Path = RUNS_DIR, engine=None) -> List[RunInfo]:
+    """Run directories with their spec (from the database, else run.json/plan.json) and creation time."""
+    known = _db_runs(engine)
+    runs = []
+    for path in runs_dir.iterdir() if runs_dir.exists() else []:
+        if not path.is_dir() or path.name.startswith("."):
+            continue
+        row = known.get(path.name, {})
+        created_at = _timestamp(row.get("created_at")) or path.stat().st_mtime
+        spec = (
+            row.get("spec")
+            if row.get("spec") not in (None, "unknown")
+            else _spec_from_files(path)
+        )
+        runs.append(RunInfo(path.name, path, spec, created_at, row.get("status")))
+    return runs
+
+
+def read_marker(run_dir: Path) -> Dict[str, Any]:
+    try:
+        return json.loads((run_dir / MARKER).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def compress_log(path: Path) -> int:
+    """Compact a plain log into chunks and an index; returns bytes freed."""
+    before = path.stat().st_size
+    target = compact_log(path, log_store.default_codec() or "gzip")
+    return (
+        before
+        - target.stat().st_size
+        - target.with_name(path.name + log_store.INDEX_SUFFIX).stat().st_size
+    )
+
+
+def _compact(
+    run: RunInfo,
+    policy: RetentionPolicy,
+    now: float,
+    report: RetentionReport,
+    blobs: BlobStore,
+):
+    media_expired = now - run.created_at > policy.media_days * 86400
+    freed_before = report.bytes_freed
+    for path in sorted(p for p in run.path.rglob("*") if p.is_file()):
+        suffix = path.suffix.lower()
+        if suffix in LOG_SUFFIXES:
+            action = "compress"
+        elif suffix in MEDIA_SUFFIXES and media_expired:
+            action = "delete"
+        else:
+            continue
+        size = path.stat().st_size
+        report.actions.append(
+            {
+                "run_id": run.run_id,
+                "spec": run.spec,
+                "action": action,
+                "path": str(path.relative_to(run.path)),
+                "bytes": size,
+            }
+        )
+        if action == "compress":
+            report.logs_compressed += 1
+            report.bytes_freed += size if report.dry_run else compress_log(path)
+        else:
+            report.media_deleted += 1
+            report.bytes_freed += size
+            if not report.dry_run:
+                path.unlink()
+
+    # Media in the blob store: release the run's references; gc() frees blobs nobody else uses
+    released = (
+        [
+            rel
+            for rel in load_manifest(run.path)
+            if Path(rel).suffix.lower() in MEDIA_SUFFIXES
+        ]
+        if media_expired
+        else []
+    )
+    for rel in released:
+        report.actions.append(
+            {"run_id": run.run_id, "spec": run.spec, "action": "release", "path": rel}
+        )
+        report.media_deleted += 1
+    if released and not report.dry_run:
+        blobs.release(run.path, released)
+
+    if not report.dry_run:
+        marker = read_marker(run.path)
+        marker.update(
+            {
+                "compacted_at": now,
+                "media_deleted": media_expired or marker.get("media_deleted", False),
+                "bytes_freed": marker.get("bytes_freed", 0)
+                + report.bytes_freed
+                - freed_before,
+            }
+        )
+        (run.path / MARKER).write_text(json.dumps(marker))
+
+
+def apply_retention(
+    runs_dir: Path = RUNS_DIR,
+    engine=None,
+    policy: Optional[RetentionPolicy] = None,
+    dry_run: bool = False,
+    now: Optional[float] = None,
+    blobs: Optional[BlobStore] = None,
+) -> RetentionReport:
+    """
+    One retention pass. With dry_run, reports what would be compressed or
+    deleted without changing anything (bytes_freed then counts whole logs,
+    and leaves out blobs that would lose their last reference).
+    """
+    policy = policy or RetentionPolicy.from_env()
+    now = now or time.time()
+    if blobs is None:
+        blobs = BlobStore(
+            engine.url.render_as_string(hide_password=False)
+            if engine is not None
+            else None
+        )
+    report = RetentionReport(dry_run=dry_run)
+    by_spec: Dict[str, List[RunInfo]] = {}
+    for run in list_runs(runs_dir, engine):
+        by_spec.setdefault(run.spec, []).append(run)
+
+    candidates = []
+    for runs in by_spec.values():
+        runs.sort(key=lambda r: r.created_at, reverse=True)
+        report.runs_kept += len(runs[: policy.keep_runs])
+        for run in runs[policy.keep_runs :]:
+            if run.status in ACTIVE_RUN_STATUSES or read_marker(run.path).get(
+                "media_deleted"
+            ):
+                report.runs_skipped += 1
+            else:
+                candidates.append(run)
+
+    candidates.sort(key=lambda r: r.created_at)
+    for run in candidates[: policy.batch]:
+        report.runs_scanned += 1
+        _compact(run, policy, now, report, blobs)
+
+    collected = blobs.gc(runs_dir, dry_run=dry_run)
+    report.blobs_deleted = collected["blobs"]
+    report.bytes_freed += collected["bytes"]
+    return report
+
+
+def disk_usage(runs_dir: Path = RUNS_DIR, engine=None) -> Dict[str, Dict[str, Any]]:
+    """
+    Bytes per spec, by kind (logs, media, screenshots, json, reports, other),
+    largest first. Artifacts in the blob store count in full for every run
+    that references them.
+    """
+    usage: Dict[str, Dict[str, Any]] = {}
+    for run in list_runs(runs_dir, engine):
+        spec = usage.setdefault(run.spec, {"runs": 0, "bytes": 0, "by_kind": {}})
+        spec["runs"] += 1
+        for path in run.path.rglob("*"):
+            if not path.is_file():
+                continue
+            size = path.stat().st_size
+            kind = USAGE_KINDS.get(path.suffix.lower(), "other")
+            spec["bytes"] += size
+            spec["by_kind"][kind] = spec["by_kind"].get(kind, 0) + size
+        for rel, entry in load_manifest(run.path).items():
+            kind = USAGE_KINDS.get(Path(rel).suffix.lower(), "other")
+            spec["bytes"] += entry["size"]
+            spec["by_kind"][kind] = spec["by_kind"].get(kind, 0) + entry["size"]
+    return dict(sorted(usage.items(), key=lambda item: item[1]["bytes"], reverse=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress and prune old run artifacts")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what would change without changing it",
+    )
+    parser.add_argument(
+        "--usage", action="store_true", help="Print disk usage per spec and exit"
+    )
+    parser.add_argument("--runs-dir", type=Path, default=RUNS_DIR)
+    args = parser.parse_args()
+    engine = create_engine(database_url())
+
+    if args.usage:
+        for spec, entry in disk_usage(args.runs_dir, engine).items():
+            kinds = ", ".join(
+                f"{kind} {size / 1e6:.1f} MB"
+                for kind, size in sorted(entry["by_kind"].items())
+            )
+            print(
+                f"{entry['bytes'] / 1e6:10.1f} MB  {entry['runs']:4d} runs  {spec}  ({kinds})"
+            )
+        return
+
+    report = apply_retention(args.runs_dir, engine, dry_run=args.dry_run)
+    verb = "Would free" if args.dry_run else "Freed"
+    print(
+        f"🧹 {verb} {report.bytes_freed / 1e6:.1f} MB: {report.logs_compressed} logs compressed, "
+        f"{report.media_deleted} videos/traces deleted, {report.blobs_deleted} blobs freed "
+        f"across {report.runs_scanned} runs "
+        f"({report.runs_kept} kept in full, {report.runs_skipped} skipped)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Running one spec and recording its outcome.
+
+`execute_run_task()` runs a spec through the CLI in a subprocess and
+returns its timeline entry; `apply_run_results()` and `load_run_stages()`
+copy the finished run directory onto its TestRun and RunStage rows. The
+API (main.py) and the shard workers of sharded bulk runs (sharding.py)
+both execute runs through these, so a worker never imports the API app.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from orchestrator.utils import timeline as run_timeline
+from orchestrator.utils import tracing
+from orchestrator.utils.blob_store import BlobStore
+from orchestrator.utils.log_store import compact_log
+from . import fingerprints
+from .db import DATABASE_URL
+from .models_db import ACTIVE_RUN_STATUSES, RunStage, TestRun as DBTestRun
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+BLOB_STORE = BlobStore(DATABASE_URL)
+
+
+def execute_run_task(
+    spec_path: str,
+    run_dir: str,
+    try_code_path: Optional[str] = None,
+    browser: str = "chromium",
+    priority: str = "interactive",
+):
+    cmd = [
+        sys.executable,
+        "orchestrator/cli.py",
+        spec_path,
+        "--run-dir",
+        run_dir,
+        "--browser",
+        browser,
+    ]
+    if try_code_path:
+        cmd.extend(["--try-code", try_code_path])
+
+    # Workflow subprocesses share the API's database for the LLM limiter,
+    # and queue their LLM calls behind interactive runs when part of a bulk run
+    env = {**os.environ, "DATABASE_URL": DATABASE_URL, "LLM_PRIORITY": priority}
+
+    log_file = Path(run_dir) / "execution.log"
+    started_at = time.time()
+    wall_start = time.perf_counter()
+    with (
+        open(log_file, "w") as f,
+        tracing.span("cli", **{"run.dir": run_dir, "run.browser": browser}) as current,
+    ):
+        proc = subprocess.Popen(
+            cmd,
+            cwd=BASE_DIR,
+            stdout=f,
+            stderr=subprocess.STDOUT,
+            env=tracing.inject_env(env),
+        )
+        # wait4 reports CPU time and peak RSS of the CLI and the stage
+        # subprocesses it reaped, without counting other concurrent runs
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        tracing.set_attributes(current, **{"process.exit.code": proc.returncode})
+        if proc.returncode != 0:
+            tracing.mark_failed(current)
+
+    try:
+        compact_log(log_file)
+    except Exception as e:
+        print(f"⚠️ Failed to compress {log_file}: {e}")
+    # Screenshots, videos and traces go to the shared blob store
+    BLOB_STORE.ingest_run(Path(run_dir))
+
+    return run_timeline.stage_entry(
+        "run",
+        "api",
+        started_at,
+        wall_ms=(time.perf_counter() - wall_start) * 1000,
+        cpu_ms=(usage.ru_utime + usage.ru_stime) * 1000,
+        peak_rss_mb=run_timeline.maxrss_mb(usage.ru_maxrss),
+        status="ok" if proc.returncode == 0 else "failed",
+    )
+
+
+def load_run_stages(run_id: str, run_dir: Path) -> List[RunStage]:
+    """RunStage rows for the entries of a run's timeline.json."""
+    stages = []
+    for entry in run_timeline.load_timeline(run_dir):
+        try:
+            stages.append(
+                RunStage(
+                    run_id=run_id,
+                    stage=entry["stage"],
+                    source=entry.get("source", "cli"),
+                    status=entry.get("status", "ok"),
+                    started_at=datetime.fromisoformat(entry["started_at"]),
+                    wall_ms=entry.get("wall_ms") or 0,
+                    cpu_ms=entry.get("cpu_ms"),
+                    peak_rss_mb=entry.get("peak_rss_mb"),
+                    llm_ms=entry.get("llm_ms"),
+                    llm_queue_wait_ms=entry.get("llm_queue_wait_ms"),
+                )
+            )
+        except (KeyError, ValueError) as e:
+            print(f"⚠️ Skipping malformed timeline entry in {run_dir}: {e}")
+    return stages
+
+
+def apply_run_results(run: DBTestRun, run_dir: Path):
+    """Copy status and progress from a finished run directory onto its DB row."""
+    status_file = run_dir / "status.txt"
+    if status_file.exists():
+        run.status = status_file.read_text().strip()
+
+    run_file = run_dir / "run.json"
+    if run_file.exists():
+        try:
+            run_data = json.loads(run_file.read_text())
+            run.status = run_data.get("finalState", run.status)
+            run.steps_completed = len(run_data.get("steps", []))
+        except:
+            pass
+
+    plan_file = run_dir / "plan.json"
+    if plan_file.exists():
+        try:
+            plan_data = json.loads(plan_file.read_text())
+            run.test_name = plan_data.get("testName", run.test_name)
+            run.total_steps = len(plan_data.get("steps", []))
+        except:
+            pass
+
+    fingerprint = fingerprints.run_fingerprint(run_dir, run.spec_name)
+    run.spec_hash = fingerprint.spec_hash
+    run.test_hash = fingerprint.test_hash
+    run.plan_hash = fingerprint.plan_hash
+    run.fingerprint = fingerprint.value
+
+    # Finished without recording an outcome (e.g. the CLI failed before the run stage)
+    if run.status in ACTIVE_RUN_STATUSES:
+        run.status = "error"
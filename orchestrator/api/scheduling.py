@@ -0,0 +1,132 @@
+"""
+Bulk run scheduling from run history.
+
+Runs of a bulk run share a few execution slots, so the order they are
+queued in sets the makespan: a long spec that starts last stretches the
+whole bulk run. `order_jobs()` queues the longest specs first (LPT), using
+each spec's median duration from its recent TestRuns (the "run" stage in the
+DB, or run.json's duration for runs without one). "failing_first" puts the
+specs whose last run failed at the front for fast feedback, longest first
+within each group.
+
+`simulate()` replays an order on N slots; scripts/benchmark_bulk_scheduling.py
+uses it to compare orders on generate_fake_runs.py data.
+"""
+
+import heapq
+import json
+import statistics
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, text
+
+from .models_db import ACTIVE_RUN_STATUSES, FAILED_RUN_STATUSES
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+RUNS_DIR = BASE_DIR / "runs"
+
+DEFAULT_SPEC_MS = 120_000  # estimate for specs that never ran
+HISTORY_RUNS = 10  # recent runs per spec the estimate is the median of
+ORDERS = ("request", "longest_first", "failing_first")
+
+
+@dataclass
+class SpecHistory:
+    durations_ms: List[float] = field(default_factory=list)
+    last_status: Optional[str] = None
+    estimated_ms: float = DEFAULT_SPEC_MS
+
+    @property
+    def last_failed(self) -> bool:
+        return self.last_status in FAILED_RUN_STATUSES
+
+
+def run_json_duration_ms(run_dir: Path) -> Optional[float]:
+    try:
+        duration = json.loads((run_dir / "run.json").read_text()).get("duration")
+    except (OSError, ValueError, AttributeError):
+        return None
+    return (
+        float(duration) * 1000
+        if isinstance(duration, (int, float)) and duration > 0
+        else None
+    )
+
+
+def spec_history(
+    conn, spec_names: List[str], runs_dir: Path = RUNS_DIR
+) -> Dict[str, SpecHistory]:
+    """Recent durations, last outcome and duration estimate of each spec."""
+    history = {name: SpecHistory() for name in spec_names}
+    if not spec_names:
+        return history
+    # The HISTORY_RUNS most recent runs of each spec, newest first
+    rows = conn.execute(
+        text(
+            "SELECT id, spec_name, status, wall_ms FROM ("
+            "  SELECT t.id, t.spec_name, t.status, t.created_at, s.wall_ms, ROW_NUMBER() OVER ("
+            "    PARTITION BY t.spec_name ORDER BY t.created_at DESC, t.id DESC) AS recent"
+            "  FROM testrun t"
+            "  LEFT JOIN runstage s ON s.run_id = t.id AND s.stage = 'run' AND s.source = 'api'"
+            "  WHERE t.spec_name IN :names"
+            ") ranked WHERE recent <= :limit ORDER BY spec_name, created_at DESC, id DESC"
+        ).bindparams(bindparam("names", expanding=True)),
+        {"names": sorted(set(spec_names)), "limit": HISTORY_RUNS},
+    )
+    for run_id, spec_name, status, wall_ms in rows:
+        spec = history[spec_name]
+        if spec.last_status is None and status not in ACTIVE_RUN_STATUSES:
+            spec.last_status = status
+        duration = wall_ms or run_json_duration_ms(runs_dir / run_id)
+        if duration:
+            spec.durations_ms.append(duration)
+
+    known = [
+        statistics.median(s.durations_ms) for s in history.values() if s.durations_ms
+    ]
+    # Specs without history are assumed typical for this suite
+    default = statistics.median(known) if known else DEFAULT_SPEC_MS
+    for spec in history.values():
+        spec.estimated_ms = (
+            statistics.median(spec.durations_ms) if spec.durations_ms else default
+        )
+    return history
+
+
+def order_jobs(
+    jobs: List[Dict[str, Any]],
+    history: Dict[str, SpecHistory],
+    order: str = "longest_first",
+) -> List[Dict[str, Any]]:
+    """Jobs ({"spec_name", ...}) in the order they should be queued."""
+    if order == "request":
+        return list(jobs)
+    positions = {id(job): index for index, job in enumerate(jobs)}
+
+    def key(job):
+        spec = history.get(job["spec_name"]) or SpecHistory()
+        failing_group = 0 if order == "failing_first" and spec.last_failed else 1
+        return failing_group, -spec.estimated_ms, positions[id(job)]
+
+    return sorted(jobs, key=key)
+
+
+def simulate(
+    durations_ms: List[float], slots: int, failed: Optional[List[bool]] = None
+) -> Dict[str, float]:
+    """
+    Replay jobs queued in this order on `slots` slots, each starting on the
+    first free slot. Returns the makespan and when the first failure finished.
+    """
+    free_at = [0.0] * max(1, slots)
+    makespan, first_failure = 0.0, None
+    for index, duration in enumerate(durations_ms):
+        start = heapq.heappop(free_at)
+        end = start + duration
+        heapq.heappush(free_at, end)
+        makespan = max(makespan, end)
+        if failed and failed[index]:
+            first_failure = end if first_failure is None else min(first_failure, end)
+    return {"makespan_ms": makespan, "first_failure_ms": first_failure}
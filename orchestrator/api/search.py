@@ -0,0 +1,251 @@
+"""
+Full-text search over specs and runs.
+
+Backed by an FTS5 virtual table on SQLite and a weighted tsvector column on
+Postgres (see migration 0004). Documents are (kind, key) pairs: specs are
+keyed by spec name, runs by run id. The index is updated incrementally when
+specs are written and runs finish; `backfill` catches up on anything that
+changed while the API was down.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Query
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from .db import engine, async_session_maker
+from .models_db import SpecMetadata as DBSpecMetadata
+
+router = APIRouter()
+
+MAX_BODY_CHARS = 200_000
+
+
+def _is_postgres() -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def _upsert(kind: str, key: str, title: str, body: str, tags: str, updated: float):
+    params = {
+        "kind": kind,
+        "key": key,
+        "title": title or "",
+        "body": (body or "")[:MAX_BODY_CHARS],
+        "tags": tags or "",
+        "updated": updated,
+    }
+    with engine.begin() as conn:
+        if _is_postgres():
+            conn.execute(
+                text(
+                    "INSERT INTO search_index (kind, key, title, body, tags, updated) "
+                    "VALUES (:kind, :key, :title, :body, :tags, :updated) "
+                    "ON CONFLICT (kind, key) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body, "
+                    "tags = EXCLUDED.tags, updated = EXCLUDED.updated"
+                ),
+                params,
+            )
+        else:
+            # FTS5 tables have no primary key to conflict on
+            conn.execute(
+                text("DELETE FROM search_index WHERE kind = :kind AND key = :key"),
+                params,
+            )
+            conn.execute(
+                text(
+                    "INSERT INTO search_index (kind, key, title, body, tags, updated) "
+                    "VALUES (:kind, :key, :title, :body, :tags, :updated)"
+                ),
+                params,
+            )
+
+
+def remove(kind: str, key: str):
+    with engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM search_index WHERE kind = :kind AND key = :key"),
+            {"kind": kind, "key": key},
+        )
+
+
+def _indexed_versions(kind: str) -> Dict[str, float]:
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT key, updated FROM search_index WHERE kind = :kind"),
+            {"kind": kind},
+        )
+        return {key: float(updated or 0) for key, updated in rows}
+
+
+# ========= Specs =========
+
+
+def index_spec(
+    name: str,
+    content: str,
+    title: Optional[str] = None,
+    updated: float = 0,
+    meta: Optional[DBSpecMetadata] = None,
+):
+    """Index a spec's content together with its SpecMetadata tags/description."""
+    if meta is None:
+        with Session(engine) as session:
+            meta = session.get(DBSpecMetadata, name)
+    tag_text = ""
+    if meta:
+        tag_text = " ".join(meta.tags + [meta.description or "", meta.author or ""])
+    _upsert("spec", name, title or name, content, tag_text, updated)
+
+
+def backfill_specs(catalog):
+    """Index specs that are new or changed since they were last indexed."""
+    indexed = _indexed_versions("spec")
+    with Session(engine) as session:
+        metas = {m.spec_name: m for m in session.exec(select(DBSpecMetadata)).all()}
+    names = set()
+    for entry in catalog.entries():
+        names.add(entry.name)
+        if indexed.get(entry.name) == entry.mtime:
+            continue
+        content = catalog.read_content(entry.name)
+        if content is not None:
+            index_spec(
+                entry.name, content, entry.title, entry.mtime, metas.get(entry.name)
+            )
+    for name in set(indexed) - names:
+        remove("spec", name)
+
+
+# ========= Runs =========
+
+
+def _read_json(path: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def index_run(run_id: str, run_dir: Path, spec_name: Optional[str] = None):
+    """Index a finished run: test names, status and error messages."""
+    plan = _read_json(run_dir / "plan.json")
+    run = _read_json(run_dir / "run.json")
+    validation = _read_json(run_dir / "validation.json")
+    if not (plan or run or validation):
+        return
+
+    test_name = run.get("testName") or plan.get("testName") or spec_name or run_id
+    parts = [
+        test_name,
+        plan.get("description", ""),
+        run.get("summary", ""),
+        run.get("finalState", ""),
+    ]
+    for step in run.get("steps", []):
+        if step.get("error"):
+            parts.append(str(step["error"]))
+    for issue in validation.get("remainingIssues") or []:
+        parts.append(str(issue))
+    if validation.get("lastError"):
+        parts.append(str(validation["lastError"]))
+
+    tags = " ".join(
+        filter(
+            None,
+            [
+                spec_name or plan.get("specFileName"),
+                run.get("browser") or plan.get("browser"),
+            ],
+        )
+    )
+    updated = (
+        (run_dir / "run.json").stat().st_mtime if (run_dir / "run.json").exists() else 0
+    )
+    _upsert("run", run_id, test_name, "\n".join(p for p in parts if p), tags, updated)
+
+
+def backfill_runs(runs_dir: Path):
+    """Index finished runs that aren't in the index yet."""
+    if not runs_dir.exists():
+        return
+    indexed = _indexed_versions("run")
+    for run_dir in runs_dir.iterdir():
+        if (
+            run_dir.is_dir()
+            and run_dir.name not in indexed
+            and (run_dir / "run.json").exists()
+        ):
+            index_run(run_dir.name, run_dir)
+
+
+def backfill(catalog, runs_dir: Path):
+    try:
+        backfill_specs(catalog)
+        backfill_runs(runs_dir)
+    except Exception as e:
+        print(f"⚠️ Search index backfill failed: {e}")
+
+
+# ========= Query =========
+
+
+def _fts5_query(q: str) -> str:
+    """Turn free text into a safe FTS5 query: quoted terms, prefix on the last one."""
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return ""
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+@router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1),
+    kind: Optional[str] = Query(None, pattern="^(spec|run)$"),
+    limit: int = Query(20, ge=1, le=100),
+) -> Dict[str, Any]:
+    """Ranked full-text search over specs and runs with highlighted snippets."""
+    params: Dict[str, Any] = {"kind": kind, "limit": limit}
+    kind_filter = " AND kind = :kind" if kind else ""
+    if _is_postgres():
+        params["q"] = q
+        sql = (
+            "SELECT kind, key, title, "
+            "ts_headline('english', body, query, 'StartSel=<mark>,StopSel=</mark>,MaxWords=24,MinWords=8') AS snippet, "
+            "ts_rank_cd(tsv, query) AS score "
+            "FROM search_index, websearch_to_tsquery('english', :q) AS query "
+            f"WHERE tsv @@ query{kind_filter} "
+            "ORDER BY score DESC LIMIT :limit"
+        )
+    else:
+        params["q"] = _fts5_query(q)
+        if not params["q"]:
+            return {"query": q, "results": []}
+        # bm25 column weights: kind, key, title, body, tags, updated
+        sql = (
+            "SELECT kind, key, title, "
+            "snippet(search_index, 3, '<mark>', '</mark>', '…', 16) AS snippet, "
+            "-bm25(search_index, 0, 0, 10.0, 1.0, 5.0, 0) AS score "
+            f"FROM search_index WHERE search_index MATCH :q{kind_filter} "
+            "ORDER BY score DESC LIMIT :limit"
+        )
+
+    async with async_session_maker() as session:
+        rows = (await session.execute(text(sql), params)).all()
+
+    results: List[Dict[str, Any]] = [
+        {
+            "kind": r.kind,
+            "key": r.key,
+            "title": r.title,
+            "snippet": r.snippet,
+            "score": round(float(r.score), 4),
+        }
+        for r in rows
+    ]
+    return {"query": q, "results": results}
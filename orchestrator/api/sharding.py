@@ -0,0 +1,604 @@
+"""
+Sharded bulk runs across execution hosts.
+
+A sharded bulk run is split into shards balanced by each spec's historical
+run duration (longest spec first, onto the least loaded shard). Shards are
+rows in bulk_shard (migration 0011). Workers on any host sharing DATABASE_URL
+and the runs/ volume claim them, run each spec through the CLI the same way
+the API does, update the spec's TestRun row and report back to the shard.
+A worker that stops heartbeating loses its shard to the next worker, which
+skips the specs already finished. Workers also heartbeat the run they are
+executing (testrun.heartbeat_at), so the new worker waits for a spec its
+previous worker is still running instead of starting it a second time.
+
+    python -m orchestrator.api.sharding worker [--bulk-run-id ID] [--exit-when-idle]
+    python -m orchestrator.api.sharding local --workers 4 [--bulk-run-id ID]   # several hosts, on one
+
+    BULK_LOCAL_WORKERS=0       worker processes the API starts for each sharded bulk run
+                               (output in runs/.logs/<bulk_run_id>.workers.log)
+    SHARD_STALE_SECONDS=300    heartbeat age after which a claimed shard is taken over
+"""
+
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session
+
+from orchestrator.utils import timeline as run_timeline
+from .db import RawSQLStore, database_url as current_database_url
+from .models_db import ACTIVE_RUN_STATUSES, TestRun as DBTestRun
+from .runner import apply_run_results, execute_run_task, load_run_stages
+from .scheduling import DEFAULT_SPEC_MS, order_jobs, spec_history
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+SPECS_DIR = BASE_DIR / "specs"
+RUNS_DIR = BASE_DIR / "runs"
+
+HEARTBEAT_SECONDS = 10
+POLL_SECONDS = 2
+STALE_SECONDS = float(os.environ.get("SHARD_STALE_SECONDS", "300"))
+LOCAL_WORKERS = int(os.environ.get("BULK_LOCAL_WORKERS", "0"))
+
+
+def estimate_durations(
+    conn, spec_names: List[str], runs_dir: Path = RUNS_DIR
+) -> Dict[str, float]:
+    """Median wall time (ms) of each spec's recent runs (see scheduling.spec_history)."""
+    return {
+        name: spec.estimated_ms
+        for name, spec in spec_history(conn, spec_names, runs_dir).items()
+    }
+
+
+def balance_shards(
+    jobs: List[Dict[str, Any]], shard_count: int
+) -> List[List[Dict[str, Any]]]:
+    """Greedy longest-first split of jobs (with "estimated_ms") into shards of similar total duration."""
+    shard_count = max(1, min(shard_count, len(jobs)))
+    shards: List[List[Dict[str, Any]]] = [[] for _ in range(shard_count)]
+    loads = [(0.0, index) for index in range(shard_count)]
+    for job in sorted(jobs, key=lambda j: (-j["estimated_ms"], j["run_id"])):
+        load, index = heapq.heappop(loads)
+        shards[index].append(job)
+        heapq.heappush(loads, (load + job["estimated_ms"], index))
+    return [shard for shard in shards if shard]
+
+
+def relative_path(path: Optional[str]) -> Optional[str]:
+    """`path` relative to the project root, so hosts with another checkout location can resolve it."""
+    if not path:
+        return None
+    try:
+        return str(Path(path).resolve().relative_to(BASE_DIR))
+    except ValueError:
+        return path
+
+
+@dataclass
+class Shard:
+    id: int
+    bulk_run_id: str
+    shard_index: int
+    status: str  # pending, claimed, done
+    browser: str
+    jobs: List[Dict[str, Any]]
+    results: Dict[str, Dict[str, Any]]
+    estimated_ms: float
+    worker_id: Optional[str] = None
+    attempts: int = 0
+    claimed_at: Optional[float] = None
+    heartbeat_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    version: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_SHARD_COLUMNS = (
+    "id, bulk_run_id, shard_index, status, browser, jobs, results, estimated_ms, worker_id, "
+    "attempts, claimed_at, heartbeat_at, finished_at, version"
+)
+
+
+def _shard(row) -> Shard:
+    values = dict(row._mapping)
+    values["jobs"] = json.loads(values["jobs"])
+    values["results"] = json.loads(values["results"])
+    return Shard(**values)
+
+
+class ShardQueue(RawSQLStore):
+    def create(
+        self,
+        bulk_run_id: str,
+        jobs: List[Dict[str, Any]],
+        shard_count: int,
+        browser: str = "chromium",
+        order: str = "longest_first",
+    ) -> List[Shard]:
+        """
+        Split jobs ({"spec_name", "run_id", "try_code_path"}) into pending shards.
+        Each shard runs its specs longest first, or previously failing ones
+        first with order="failing_first".
+        """
+        now = time.time()
+        with self.db().begin() as conn:
+            history = spec_history(conn, [job["spec_name"] for job in jobs])
+            jobs = [
+                {**job, "estimated_ms": history[job["spec_name"]].estimated_ms}
+                for job in jobs
+            ]
+            for index, shard_jobs in enumerate(balance_shards(jobs, shard_count)):
+                if order == "failing_first":
+                    shard_jobs = order_jobs(shard_jobs, history, order)
+                conn.execute(
+                    text(
+                        "INSERT INTO bulk_shard (bulk_run_id, shard_index, status, browser, jobs, results, estimated_ms, "
+                        "attempts, created_at, version) VALUES (:bulk_run_id, :index, 'pending', :browser, :jobs, '{}', "
+                        ":estimated_ms, 0, :now, 0)"
+                    ),
+                    {
+                        "bulk_run_id": bulk_run_id,
+                        "index": index,
+                        "browser": browser,
+                        "jobs": json.dumps(shard_jobs),
+                        "estimated_ms": sum(job["estimated_ms"] for job in shard_jobs),
+                        "now": now,
+                    },
+                )
+        return self.shards(bulk_run_id)
+
+    def shards(self, bulk_run_id: str) -> List[Shard]:
+        with self.db().connect() as conn:
+            rows = conn.execute(
+                text(
+                    f"SELECT {_SHARD_COLUMNS} FROM bulk_shard WHERE bulk_run_id = :id ORDER BY shard_index"
+                ),
+                {"id": bulk_run_id},
+            )
+            return [_shard(row) for row in rows]
+
+    def claim(
+        self, worker_id: str, bulk_run_id: Optional[str] = None
+    ) -> Optional[Shard]:
+        """Take the next pending (or abandoned) shard; None when there's nothing to do."""
+        now = time.time()
+        where = "(status = 'pending' OR (status = 'claimed' AND heartbeat_at < :stale))"
+        if bulk_run_id:
+            where += " AND bulk_run_id = :bulk_run_id"
+        with self.db().begin() as conn:
+            candidates = conn.execute(
+                text(
+                    f"SELECT {_SHARD_COLUMNS} FROM bulk_shard WHERE {where} "
+                    "ORDER BY created_at, estimated_ms DESC, shard_index LIMIT 5"
+                ),
+                {"stale": now - STALE_SECONDS, "bulk_run_id": bulk_run_id},
+            ).all()
+            for row in candidates:
+                shard = _shard(row)
+                # Optimistic versioning: another worker may have claimed it since the SELECT
+                updated = conn.execute(
+                    text(
+                        "UPDATE bulk_shard SET status = 'claimed', worker_id = :worker, claimed_at = :now, "
+                        "heartbeat_at = :now, attempts = attempts + 1, version = version + 1 "
+                        "WHERE id = :id AND version = :version"
+                    ),
+                    {
+                        "worker": worker_id,
+                        "now": now,
+                        "id": shard.id,
+                        "version": shard.version,
+                    },
+                )
+                if updated.rowcount == 1:
+                    (
+                        shard.status,
+                        shard.worker_id,
+                        shard.claimed_at,
+                        shard.heartbeat_at,
+                    ) = ("claimed", worker_id, now, now)
+                    shard.attempts += 1
+                    shard.version += 1
+                    return shard
+        return None
+
+    def heartbeat(self, shard: Shard, worker_id: str, results: bool = False) -> bool:
+        """Keep the claim alive (and save results); False if the shard was taken over."""
+        values = {
+            "id": shard.id,
+            "worker": worker_id,
+            "now": time.time(),
+            "results": json.dumps(shard.results),
+        }
+        with self.db().begin() as conn:
+            updated = conn.execute(
+                text(
+                    "UPDATE bulk_shard SET heartbeat_at = :now"
+                    + (", results = :results" if results else "")
+                    + " WHERE id = :id AND worker_id = :worker AND status = 'claimed'"
+                ),
+                values,
+            )
+        return updated.rowcount == 1
+
+    def finish(self, shard: Shard, worker_id: str) -> bool:
+        with self.db().begin() as conn:
+            updated = conn.execute(
+                text(
+                    "UPDATE bulk_shard SET status = 'done', results = :results, finished_at = :now, "
+                    "version = version + 1 WHERE id = :id AND worker_id = :worker AND status = 'claimed'"
+                ),
+                {
+                    "id": shard.id,
+                    "worker": worker_id,
+                    "now": time.time(),
+                    "results": json.dumps(shard.results),
+                },
+            )
+        return updated.rowcount == 1
+
+    def summary(
+        self, bulk_run_id: str, shards: Optional[List[Shard]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """One record for the whole bulk run, aggregated from its shards (loaded unless given)."""
+        shards = self.shards(bulk_run_id) if shards is None else shards
+        if not shards:
+            return None
+        by_status: Dict[str, int] = {}
+        for shard in shards:
+            for result in shard.results.values():
+                by_status[result.get("status") or "unknown"] = (
+                    by_status.get(result.get("status") or "unknown", 0) + 1
+                )
+        total = sum(len(shard.jobs) for shard in shards)
+        finished = sum(by_status.values())
+        started = [s.claimed_at for s in shards if s.claimed_at]
+        done = all(s.status == "done" for s in shards)
+        ended = (
+            max((s.finished_at for s in shards if s.finished_at), default=None)
+            if done
+            else time.time()
+        )
+        return {
+            "bulk_run_id": bulk_run_id,
+            "status": "done" if done else ("running" if started else "pending"),
+            "total": total,
+            "finished": finished,
+            "progress": round(finished / total, 3) if total else 1.0,
+            "by_status": by_status,
+            "workers": sorted({s.worker_id for s in shards if s.worker_id}),
+            "estimated_makespan_ms": max(s.estimated_ms for s in shards),
+            "elapsed_ms": (
+                round((ended - min(started)) * 1000) if started and ended else None
+            ),
+            "shards": [
+                {
+                    "index": s.shard_index,
+                    "status": s.status,
+                    "worker_id": s.worker_id,
+                    "attempts": s.attempts,
+                    "jobs": len(s.jobs),
+                    "finished": len(s.results),
+                    "estimated_ms": s.estimated_ms,
+                }
+                for s in shards
+            ],
+        }
+
+
+# Runs one spec: (spec_path, run_dir, try_code_path, browser, priority) -> timeline entry
+Executor = Callable[[str, str, Optional[str], str, str], Dict[str, Any]]
+
+
+@dataclass
+class ShardWorker:
+    queue: ShardQueue
+    worker_id: str = field(
+        default_factory=lambda: f"{socket.gethostname()}-{os.getpid()}"
+    )
+    bulk_run_id: Optional[str] = None
+    execute: Optional[Executor] = None
+    specs_dir: Path = SPECS_DIR
+    runs_dir: Path = RUNS_DIR
+
+    def _retry(self, method: Callable, *args, **kwargs):
+        """Call a queue method, retrying when other workers hold the database (SQLite locks)."""
+        for attempt in range(1, 6):
+            try:
+                return method(*args, **kwargs)
+            except SQLAlchemyError as e:
+                if attempt == 5:
+                    raise
+                print(
+                    f"⚠️ {self.worker_id}: {method.__name__} failed, retrying: {str(e).splitlines()[0]}"
+                )
+                time.sleep(0.2 * attempt)
+
+    def run(
+        self, exit_when_idle: bool = False, poll_seconds: float = POLL_SECONDS
+    ) -> int:
+        """Claim and run shards until there are none left (or forever). Returns shards finished."""
+        finished = 0
+        print(f"👷 Shard worker {self.worker_id} started")
+        while True:
+            shard = self._retry(self.queue.claim, self.worker_id, self.bulk_run_id)
+            if shard is None:
+                if exit_when_idle:
+                    print(
+                        f"👷 Shard worker {self.worker_id} idle, {finished} shard(s) done"
+                    )
+                    return finished
+                time.sleep(poll_seconds)
+                continue
+            finished += self.run_shard(shard)
+
+    def run_shard(self, shard: Shard) -> bool:
+        print(
+            f"📦 {self.worker_id}: shard {shard.shard_index} of {shard.bulk_run_id} "
+            f"({len(shard.jobs)} specs, ~{shard.estimated_ms / 1000:.0f}s)"
+        )
+        lost = threading.Event()
+        stop = threading.Event()
+        running: Dict[str, Optional[str]] = {"run_id": None}
+
+        def keep_alive():
+            while not stop.wait(HEARTBEAT_SECONDS):
+                try:
+                    # Even once the shard is lost, so its new worker waits for this run
+                    if running["run_id"]:
+                        self._touch_run(running["run_id"])
+                    if not lost.is_set() and not self.queue.heartbeat(
+                        shard, self.worker_id
+                    ):
+                        lost.set()
+                except SQLAlchemyError:
+                    continue  # Try again next beat
+
+        heartbeat = threading.Thread(target=keep_alive, daemon=True)
+        heartbeat.start()
+        try:
+            for job in shard.jobs:
+                if job["run_id"] in shard.results:
+                    continue  # Finished by the worker this shard was taken over from
+                if lost.is_set():
+                    break
+                # A taken-over shard's previous worker may have run this spec already
+                result = self.previous_result(job) if shard.attempts > 1 else None
+                if result is None:
+                    running["run_id"] = job["run_id"]
+                    result = self.run_job(job, shard.browser)
+                    running["run_id"] = None
+                shard.results[job["run_id"]] = result
+                if not self._retry(
+                    self.queue.heartbeat, shard, self.worker_id, results=True
+                ):
+                    lost.set()
+        finally:
+            stop.set()
+            heartbeat.join()
+        if lost.is_set():
+            print(
+                f"⚠️ {self.worker_id}: lost shard {shard.shard_index} of {shard.bulk_run_id} to another worker"
+            )
+            return False
+        return self._retry(self.queue.finish, shard, self.worker_id)
+
+    def run_job(self, job: Dict[str, Any], browser: str) -> Dict[str, Any]:
+        """Run one spec and update its TestRun row, like the API's execute_run_task_wrapper."""
+        from . import search
+
+        run_dir = self.runs_dir / job["run_id"]
+        run_dir.mkdir(parents=True, exist_ok=True)
+        self._update_run(job["run_id"], status="running")
+        try_code_path = (
+            str(BASE_DIR / job["try_code_path"]) if job.get("try_code_path") else None
+        )
+        entry = (self.execute or execute_run_task)(
+            str(self.specs_dir / job["spec_name"]),
+            str(run_dir),
+            try_code_path,
+            browser,
+            "bulk",
+        )
+        run_timeline.append_stages(run_dir, [entry])
+
+        status = self._update_run(job["run_id"], run_dir=run_dir) or entry.get("status")
+        try:
+            search.index_run(job["run_id"], run_dir, job["spec_name"])
+        except Exception as e:
+            print(f"⚠️ Failed to index run {job['run_id']}: {e}")
+        print(
+            f"   {'✅' if status == 'passed' else '❌'} {job['spec_name']}: {status} ({entry['wall_ms'] / 1000:.1f}s)"
+        )
+        return {
+            "spec_name": job["spec_name"],
+            "status": status,
+            "duration_ms": entry["wall_ms"],
+            "worker_id": self.worker_id,
+            "finished_at": time.time(),
+        }
+
+    def previous_result(self, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        The result of a spec the shard's previous worker started: waits while
+        that worker still heartbeats the run. None when the spec has to be run
+        (again): it never started, or its worker stopped heartbeating it.
+        """
+        run_dir = self.runs_dir / job["run_id"]
+        while True:
+            try:
+                with Session(self.queue.db()) as session:
+                    run = session.get(DBTestRun, job["run_id"])
+                    status, heartbeat_at = (
+                        (run.status, run.heartbeat_at) if run else (None, None)
+                    )
+            except SQLAlchemyError as e:
+                print(
+                    f"⚠️ Failed to read run {job['run_id']}: {str(e).splitlines()[0]}"
+                )
+                return None
+            if status is None or status == "pending":
+                return None
+            if status not in ACTIVE_RUN_STATUSES:
+                stages = [
+                    entry
+                    for entry in run_timeline.load_timeline(run_dir)
+                    if entry.get("stage") == "run"
+                ]
+                print(
+                    f"   ↪️ {job['spec_name']}: {status} (run by the previous worker)"
+                )
+                return {
+                    "spec_name": job["spec_name"],
+                    "status": status,
+                    "duration_ms": stages[-1].get("wall_ms") if stages else None,
+                    "worker_id": None,
+                    "finished_at": time.time(),
+                }
+            if heartbeat_at is None or datetime.utcnow() - heartbeat_at > timedelta(
+                seconds=STALE_SECONDS
+            ):
+                return None
+            time.sleep(POLL_SECONDS)
+
+    def _touch_run(self, run_id: str):
+        with Session(self.queue.db()) as session:
+            run = session.get(DBTestRun, run_id)
+            if run is not None:
+                run.heartbeat_at = datetime.utcnow()
+                session.add(run)
+                session.commit()
+
+    def _update_run(
+        self, run_id: str, status: Optional[str] = None, run_dir: Optional[Path] = None
+    ) -> Optional[str]:
+        """Set a run's status, or copy a finished run directory onto it; refreshes its bulk run."""
+        from . import bulk_runs
+
+        try:
+            with Session(self.queue.db()) as session:
+                run = session.get(DBTestRun, run_id)
+                if run is None:
+                    return None
+                if run_dir is not None:
+                    apply_run_results(run, run_dir)
+                    session.add_all(load_run_stages(run_id, run_dir))
+                if status:
+                    run.status = status
+                    run.heartbeat_at = datetime.utcnow()
+                session.add(run)
+                session.commit()
+                bulk_runs.refresh_status(session, run.bulk_run_id)
+                return run.status
+        except SQLAlchemyError as e:
+            print(f"⚠️ Failed to update run {run_id}: {str(e).splitlines()[0]}")
+            return None
+
+
+def _run_local_worker(
+    database_url: str,
+    worker_id: str,
+    bulk_run_id: Optional[str],
+    execute: Optional[Executor],
+    runs_dir: Path,
+):
+    from .db import engine
+
+    # Pooled connections inherited from the parent process must not be reused
+    engine.dispose(close=False)
+    queue = ShardQueue(database_url)
+    ShardWorker(queue, worker_id, bulk_run_id, execute, runs_dir=runs_dir).run(
+        exit_when_idle=True
+    )
+
+
+def start_local_workers(
+    count: int,
+    bulk_run_id: Optional[str] = None,
+    database_url: Optional[str] = None,
+    execute: Optional[Executor] = None,
+    runs_dir: Path = RUNS_DIR,
+) -> List[multiprocessing.Process]:
+    """Stand-in for several execution hosts: `count` worker processes that exit once idle."""
+    database_url = database_url or current_database_url()
+    workers = []
+    for index in range(count):
+        process = multiprocessing.Process(
+            target=_run_local_worker,
+            args=(
+                database_url,
+                f"{socket.gethostname()}-local-{index}",
+                bulk_run_id,
+                execute,
+                runs_dir,
+            ),
+            daemon=False,
+        )
+        process.start()
+        workers.append(process)
+    return workers
+
+
+def spawn_local_workers(count: int, bulk_run_id: str, database_url: str):
+    """Start local workers for one bulk run from the API, detached from its event loop."""
+    cmd = [
+        sys.executable,
+        "-m",
+        "orchestrator.api.sharding",
+        "local",
+        "--workers",
+        str(count),
+        "--bulk-run-id",
+        bulk_run_id,
+    ]
+    env = {**os.environ, "DATABASE_URL": database_url, "LLM_PRIORITY": "bulk"}
+    # Dot directories under runs/ are skipped by the run sync and not served as artifacts
+    log_dir = RUNS_DIR / ".logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    with open(log_dir / f"{bulk_run_id}.workers.log", "a") as f:
+        subprocess.Popen(cmd, cwd=BASE_DIR, stdout=f, stderr=subprocess.STDOUT, env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run bulk-run shards")
+    parser.add_argument(
+        "mode",
+        choices=["worker", "local"],
+        help="one worker, or several local worker processes",
+    )
+    parser.add_argument("--workers", type=int, default=2, help="local worker processes")
+    parser.add_argument("--worker-id", help="worker name (default: host-pid)")
+    parser.add_argument("--bulk-run-id", help="only claim shards of this bulk run")
+    parser.add_argument(
+        "--exit-when-idle", action="store_true", help="stop when no shard is left"
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_PRIORITY", "bulk")
+    if args.mode == "local":
+        for process in start_local_workers(args.workers, args.bulk_run_id):
+            process.join()
+        return
+    worker = ShardWorker(ShardQueue(), bulk_run_id=args.bulk_run_id)
+    if args.worker_id:
+        worker.worker_id = args.worker_id
+    worker.run(exit_when_idle=args.exit_when_idle)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+In-memory catalog of spec files.
+
+The catalog is loaded once and kept current by a watchdog observer (inotify
+on Linux) or, when watchdog isn't installed, by a background thread polling
+file mtimes. It only holds metadata (name, size, mtime, title); spec content
+is read per spec on demand.
+"""
+
+import itertools
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # Fall back to mtime polling
+    Observer = None
+    FileSystemEventHandler = object
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+SPECS_DIR = BASE_DIR / "specs"
+
+POLL_INTERVAL_SECONDS = float(os.environ.get("SPEC_CATALOG_POLL_SECONDS", "2"))
+
+
+@dataclass
+class SpecEntry:
+    """Metadata for a single spec file."""
+
+    name: str
+    path: Path
+    size: int
+    mtime: float
+    title: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "path": str(self.path.absolute()),
+            "size": self.size,
+            "modified": datetime.fromtimestamp(self.mtime).isoformat(),
+            "title": self.title,
+        }
+
+
+def _read_title(path: Path) -> Optional[str]:
+    """First markdown H1 within the first few lines of a spec."""
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in itertools.islice(f, 20):
+                if line.startswith("# "):
+                    return line[2:].replace("Test:", "").strip()
+    except OSError:
+        pass
+    return None
+
+
+class _SpecEventHandler(FileSystemEventHandler):
+    """Routes watchdog events for *.md files into the catalog."""
+
+    def __init__(self, catalog: "SpecCatalog"):
+        self.catalog = catalog
+
+    def on_any_event(self, event):
+        if event.event_type not in ("created", "modified", "deleted", "moved"):
+            return
+        if event.is_directory:
+            # Directory moves/deletes affect many specs at once
+            if event.event_type in ("deleted", "moved"):
+                self.catalog.rescan()
+            return
+        for attr in ("src_path", "dest_path"):
+            path = getattr(event, attr, None)
+            if path and str(path).endswith(".md"):
+                self.catalog.refresh_path(Path(os.fsdecode(path)))
+
+
+class SpecCatalog:
+    """Metadata-only view of `root/**/*.md`, kept current in the background."""
+
+    def __init__(
+        self, root: Path = SPECS_DIR, poll_interval: float = POLL_INTERVAL_SECONDS
+    ):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._entries: Dict[str, SpecEntry] = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._observer = None
+        self._poll_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._listeners: List[Callable[[str, Optional[SpecEntry]], None]] = []
+
+    def add_listener(self, callback: Callable[[str, Optional[SpecEntry]], None]):
+        """Call `callback(name, entry)` when a spec changes (entry is None when removed)."""
+        self._listeners.append(callback)
+
+    def _notify(self, name: str, entry: Optional[SpecEntry]):
+        for callback in self._listeners:
+            try:
+                callback(name, entry)
+            except Exception as e:
+                print(f"⚠️ Spec catalog listener failed for {name}: {e}")
+
+    # ----- lifecycle -----
+
+    def start(self):
+        """Load the catalog and start watching for changes."""
+        self._ensure_loaded()
+        if self._observer or self._poll_thread or not self.root.exists():
+            return
+        self._stop.clear()
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(
+                _SpecEventHandler(self), str(self.root), recursive=True
+            )
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            self._poll_thread = threading.Thread(
+                target=self._poll_loop, name="spec-catalog-poll", daemon=True
+            )
+            self._poll_thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        if self._poll_thread:
+            self._poll_thread.join(timeout=5)
+            self._poll_thread = None
+
+    @property
+    def watch_mode(self) -> str:
+        if self._observer:
+            return "watchdog"
+        return "polling" if self._poll_thread else "off"
+
+    # ----- queries -----
+
+    def entries(self) -> List[SpecEntry]:
+        self._ensure_loaded()
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda e: e.name)
+
+    def get(self, name: str) -> Optional[SpecEntry]:
+        self._ensure_loaded()
+        with self._lock:
+            return self._entries.get(name)
+
+    def count(self) -> int:
+        self._ensure_loaded()
+        with self._lock:
+            return len(self._entries)
+
+    def read_content(self, name: str) -> Optional[str]:
+        entry = self.get(name)
+        if not entry:
+            return None
+        try:
+            return entry.path.read_text()
+        except OSError:
+            return None
+
+    # ----- invalidation -----
+
+    def refresh(self, name: str):
+        """Re-read a single spec after it was written through the API."""
+        self.refresh_path(self.root / name)
+
+    def refresh_path(self, path: Path):
+        try:
+            name = str(path.resolve().relative_to(self.root.resolve()))
+        except ValueError:
+            return
+        try:
+            stat = path.stat()
+        except OSError:
+            with self._lock:
+                removed = self._entries.pop(name, None)
+            if removed:
+                self._notify(name, None)
+            return
+        with self._lock:
+            previous = self._entries.get(name)
+        if (
+            previous
+            and previous.mtime == stat.st_mtime
+            and previous.size == stat.st_size
+        ):
+            return
+        entry = SpecEntry(
+            name=name,
+            path=self.root / name,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            title=_read_title(path),
+        )
+        with self._lock:
+            self._entries[name] = entry
+        self._notify(name, entry)
+
+    def rescan(self):
+        """Reconcile with the filesystem, re-reading only changed specs."""
+        current = self._stat_all()
+        with self._lock:
+            removed = [name for name in self._entries if name not in current]
+            for name in removed:
+                del self._entries[name]
+            known = dict(self._entries)
+        for name in removed:
+            self._notify(name, None)
+        for name, (size, mtime) in current.items():
+            entry = known.get(name)
+            if entry is None or entry.mtime != mtime or entry.size != size:
+                self.refresh_path(self.root / name)
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.rescan()
+
+    def _stat_all(self) -> Dict[str, tuple]:
+        """Map spec name -> (size, mtime) using stat calls only."""
+        stats = {}
+        if not self.root.exists():
+            return stats
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.endswith(".md"):
+                    continue
+                full = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                stats[os.path.relpath(full, self.root)] = (st.st_size, st.st_mtime)
+        return stats
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.rescan()
+            except Exception as e:
+                print(f"⚠️ Spec catalog poll failed: {e}")
+
+
+spec_catalog = SpecCatalog()
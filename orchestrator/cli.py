@@ -5,6 +5,7 @@ Entry point for natural language test generation.
 """
 
 import argparse
+import os
 import sys
 import json
 import shutil
@@ -13,6 +14,13 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+try:
+    from orchestrator.utils import tracing
+    from orchestrator.utils.timeline import Timeline
+except ImportError:  # Run as a script (python orchestrator/cli.py), with orchestrator/ on sys.path
+    from utils import tracing
+    from utils.timeline import Timeline
+
 
 def run_command(
     command: str, 
@@ -21,7 +29,8 @@ def run_command(
     is_python: bool = True
 ) -> subprocess.CompletedProcess:
     """
-    Run a shell command using the current python executable.
+    Run a shell command using the current python executable. The command
+    inherits the current trace context (see utils/tracing.py).
 
     Args:
         command: The command string
@@ -41,7 +50,7 @@ def run_command(
 
     if interactive:
         # Run interactively, inheriting stdio
-        return subprocess.run(full_cmd, shell=True)
+        return subprocess.run(full_cmd, shell=True, env=tracing.inject_env())
 
     if stream_output:
         process = subprocess.Popen(
@@ -51,6 +60,7 @@ def run_command(
             stderr=subprocess.PIPE,
             text=True,
             bufsize=1,
+            env=tracing.inject_env(),
         )
 
         stdout_lines = []
@@ -71,7 +81,7 @@ def run_command(
         result.stderr = stderr
         return result
     else:
-        return subprocess.run(full_cmd, shell=True, capture_output=True, text=True)
+        return subprocess.run(full_cmd, shell=True, capture_output=True, text=True, env=tracing.inject_env())
 
 
 def print_output(result: subprocess.CompletedProcess):
@@ -123,6 +133,10 @@ def main():
         run_dir = Path(f"runs/{run_id}")
     
     run_dir.mkdir(parents=True, exist_ok=True)
+    tracing.init_tracing("playwright-agent-cli")
+    # Stage subprocesses log their LLM calls into the run directory
+    os.environ["RUN_DIR"] = str(run_dir.resolve())
+    timeline = Timeline(run_dir, reset=True)
 
     print("=" * 80)
     print(f"🚀 CONVERTING TEST: {spec_file.name}")
@@ -174,7 +188,12 @@ def main():
             print(f"   Executing: {cmd}")
             sys.stdout.flush() 
             
-            result = run_command(cmd, stream_output=True, is_python=False)
+            with timeline.stage("try_code") as stage, \
+                    tracing.span("npx playwright test", **{"playwright.test_file": str(code_path),
+                                                           "playwright.browser": args.browser}) as current:
+                result = run_command(cmd, stream_output=True, is_python=False)
+                tracing.set_attributes(current, **{"process.exit.code": result.returncode})
+                stage["status"] = "ok" if result.returncode == 0 else "failed"
             
             if result.returncode == 0:
                 print("✅ Existing code passed! Skipping generation.")
@@ -207,7 +226,9 @@ def main():
         # --- STAGE 1: PLAN ---
         print("📋 Stage 1: Creating test plan...")
         # Invoke inner modules using -m to ensure package resolution works
-        result = run_command(f"-m orchestrator.workflows.planner '{spec_path}'")
+        with timeline.stage("plan", llm_stage="planner") as stage:
+            result = run_command(f"-m orchestrator.workflows.planner '{spec_path}'")
+            stage["status"] = "ok" if result.returncode == 0 else "failed"
         print_output(result)
 
         plan_src = Path("runs/test_plan.json")
@@ -271,7 +292,9 @@ def main():
         if args.interactive:
             cmd += " --interactive"
 
-        result = run_command(cmd, stream_output=True, interactive=args.interactive)
+        with timeline.stage("execute", llm_stage="operator") as stage:
+            result = run_command(cmd, stream_output=True, interactive=args.interactive)
+            stage["status"] = "ok" if result.returncode == 0 else "failed"
         if not args.interactive:
             print_output(result)
 
@@ -289,18 +312,22 @@ def main():
             sys.exit(1)
 
         # --- REPORT GENERATION ---
-        try:
-            from orchestrator.reporting.report_generator import ReportGenerator
+        with timeline.stage("report") as stage:
+            try:
+                from orchestrator.reporting.report_generator import ReportGenerator
 
-            generator = ReportGenerator(str(run_dir))
-            generator.generate()
-        except Exception as e:
-            print(f"⚠️ Report generation failed: {e}")
+                generator = ReportGenerator(str(run_dir))
+                generator.generate()
+            except Exception as e:
+                stage["status"] = "failed"
+                print(f"⚠️ Report generation failed: {e}")
         print()
 
         # --- STAGE 3: EXPORT ---
         print("📤 Stage 3: Generating test code...")
-        result = run_command(f"-m orchestrator.workflows.exporter '{run_dir / 'run.json'}'")
+        with timeline.stage("export", llm_stage="exporter") as stage:
+            result = run_command(f"-m orchestrator.workflows.exporter '{run_dir / 'run.json'}'")
+            stage["status"] = "ok" if result.returncode == 0 else "failed"
         print_output(result)
 
         export_file = run_dir / "export.json"
@@ -322,9 +349,11 @@ def main():
     # --- STAGE 4: VALIDATE ---
     if test_path:
         print("🔍 Stage 4: Validating generated test...")
-        result = run_command(
-            f"-m orchestrator.workflows.validator '{test_path}' '{run_dir}' '{args.browser}'"
-        )
+        with timeline.stage("validate", llm_stage="validator") as stage:
+            result = run_command(
+                f"-m orchestrator.workflows.validator '{test_path}' '{run_dir}' '{args.browser}'"
+            )
+            stage["status"] = "ok" if result.returncode == 0 else "failed"
         print_output(result)
 
         validation_file = run_dir / "validation.json"
@@ -0,0 +1,37 @@
+"""
+Alembic environment.
+
+Migrations are driven programmatically through `orchestrator.api.db.run_migrations`,
+which hands over an open connection via `config.attributes["connection"]`.
+"""
+
+from alembic import context
+from sqlmodel import SQLModel
+
+from orchestrator.api import models_db  # noqa: F401 - registers tables on the metadata
+
+config = context.config
+
+
+def run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=SQLModel.metadata,
+        # Each revision commits on its own so online (CONCURRENTLY) index builds
+        # can leave the transaction without taking earlier revisions with them.
+        transaction_per_migration=True,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if config.attributes.get("connection") is not None:
+    run_migrations(config.attributes["connection"])
+else:
+    # Run directly through the alembic CLI: open (and close) our own connection
+    from orchestrator.api.db import engine
+
+    with engine.connect() as connection:
+        run_migrations(connection)
+        connection.commit()
@@ -0,0 +1,67 @@
+"""Baseline schema: testrun, specmetadata, agentrun
+
+Deployments created before migrations existed already have these tables
+(from SQLModel.metadata.create_all), so each table is only created when
+missing.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Spelled out rather than imported from models_db, so later model changes
+# don't rewrite this revision
+JSON_DOCUMENT = sa.JSON().with_variant(JSONB(), "postgresql")
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "testrun" not in existing:
+        op.create_table(
+            "testrun",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("spec_name", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("test_name", sa.String(), nullable=True),
+            sa.Column("steps_completed", sa.Integer(), nullable=False),
+            sa.Column("total_steps", sa.Integer(), nullable=False),
+            sa.Column("browser", sa.String(), nullable=False),
+        )
+
+    if "specmetadata" not in existing:
+        op.create_table(
+            "specmetadata",
+            sa.Column("spec_name", sa.String(), primary_key=True),
+            sa.Column("tags_json", sa.String(), nullable=False),
+            sa.Column("description", sa.String(), nullable=True),
+            sa.Column("author", sa.String(), nullable=True),
+            sa.Column("last_modified", sa.DateTime(), nullable=True),
+        )
+
+    if "agentrun" not in existing:
+        op.create_table(
+            "agentrun",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("agent_type", sa.String(), nullable=False),
+            sa.Column("config_json", JSON_DOCUMENT, nullable=False),
+            sa.Column("result_json", JSON_DOCUMENT, nullable=True),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("agentrun")
+    op.drop_table("specmetadata")
+    op.drop_table("testrun")
@@ -0,0 +1,47 @@
+"""Convert agentrun config/result to JSONB with GIN indexes (Postgres only)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+COLUMNS = ("config_json", "result_json")
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    types = {c["name"]: c["type"] for c in sa.inspect(bind).get_columns("agentrun")}
+    for name in COLUMNS:
+        if not isinstance(types.get(name), JSONB):
+            op.execute(
+                f"ALTER TABLE agentrun ALTER COLUMN {name} TYPE JSONB USING {name}::jsonb"
+            )
+
+    with op.get_context().autocommit_block():
+        for name in COLUMNS:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_agentrun_{name}_gin "
+                f"ON agentrun USING gin ({name})"
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for name in COLUMNS:
+        op.execute(f"DROP INDEX IF EXISTS ix_agentrun_{name}_gin")
+        op.execute(
+            f"ALTER TABLE agentrun ALTER COLUMN {name} TYPE TEXT USING {name}::text"
+        )
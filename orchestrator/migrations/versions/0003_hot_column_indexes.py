@@ -0,0 +1,38 @@
+"""Index hot filter/sort columns on testrun and agentrun
+
+Built with CREATE INDEX CONCURRENTLY on Postgres so existing deployments
+keep serving reads and writes while the indexes are created.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_testrun_status", "testrun", "status"),
+    ("ix_testrun_created_at", "testrun", "created_at"),
+    ("ix_testrun_spec_name", "testrun", "spec_name"),
+    ("ix_agentrun_agent_type", "agentrun", "agent_type"),
+    ("ix_agentrun_created_at", "agentrun", "created_at"),
+]
+
+
+def upgrade():
+    concurrently = "CONCURRENTLY " if op.get_bind().dialect.name == "postgresql" else ""
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.execute(
+                f"CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({column})"
+            )
+
+
+def downgrade():
+    for name, _, _ in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
@@ -0,0 +1,49 @@
+"""Full-text search index over specs and runs
+
+SQLite gets an FTS5 virtual table; Postgres a plain table with a weighted,
+generated tsvector column (title > tags > body) and a GIN index.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("""
+            CREATE TABLE IF NOT EXISTS search_index (
+                kind VARCHAR NOT NULL,
+                key VARCHAR NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                body TEXT NOT NULL DEFAULT '',
+                tags TEXT NOT NULL DEFAULT '',
+                updated DOUBLE PRECISION NOT NULL DEFAULT 0,
+                tsv TSVECTOR GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', title), 'A') ||
+                    setweight(to_tsvector('english', tags), 'B') ||
+                    setweight(to_tsvector('english', body), 'C')
+                ) STORED,
+                PRIMARY KEY (kind, key)
+            )
+            """)
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_search_index_tsv ON search_index USING gin (tsv)"
+        )
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            "kind UNINDEXED, key UNINDEXED, title, body, tags, updated UNINDEXED, "
+            "tokenize = 'porter unicode61')"
+        )
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS search_index")
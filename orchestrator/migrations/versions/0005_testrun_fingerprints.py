@@ -0,0 +1,34 @@
+"""Record input fingerprints on testrun
+
+Adds the spec/generated-test/plan hashes a run finished with, used to select
+only changed specs for bulk reruns.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+COLUMNS = ["spec_hash", "test_hash", "plan_hash", "fingerprint"]
+
+
+def upgrade():
+    # Tables created by create_all from the current models already have them
+    existing = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("testrun")}
+    with op.batch_alter_table("testrun") as batch:
+        for column in COLUMNS:
+            if column not in existing:
+                batch.add_column(sa.Column(column, sa.String(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("testrun") as batch:
+        for column in reversed(COLUMNS):
+            batch.drop_column(column)
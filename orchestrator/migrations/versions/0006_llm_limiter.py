@@ -0,0 +1,58 @@
+"""LLM rate limiter state: token buckets, priority queue, queue-wait samples
+
+Shared by every process that queries an LLM (see utils/llm_limiter.py).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "llm_rate_bucket",
+        sa.Column("provider", sa.String(), primary_key=True),
+        sa.Column("request_tokens", sa.Float(), nullable=False),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.Float(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "llm_queue",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("provider", sa.String(), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("state", sa.String(), nullable=False),
+        sa.Column("enqueued_at", sa.Float(), nullable=False),
+        sa.Column("heartbeat_at", sa.Float(), nullable=False),
+        sa.Column("lease_expires_at", sa.Float(), nullable=True),
+    )
+    op.create_index(
+        "ix_llm_queue_order",
+        "llm_queue",
+        ["provider", "state", "priority", "enqueued_at"],
+    )
+    op.create_table(
+        "llm_queue_wait",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("provider", sa.String(), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("wait_ms", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.Float(), nullable=False),
+    )
+    op.create_index("ix_llm_queue_wait_created_at", "llm_queue_wait", ["created_at"])
+
+
+def downgrade():
+    op.drop_table("llm_queue_wait")
+    op.drop_index("ix_llm_queue_order", table_name="llm_queue")
+    op.drop_table("llm_queue")
+    op.drop_table("llm_rate_bucket")
@@ -0,0 +1,49 @@
+"""Per-call LLM telemetry: latency, queue wait, attempts, tokens and cost
+
+Written by utils/llm_client.py for every stage and agent query.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "llm_call",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("run_id", sa.String(), nullable=True),
+        sa.Column("stage", sa.String(), nullable=False),
+        sa.Column("provider", sa.String(), nullable=False),
+        sa.Column("model", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.Float(), nullable=False),
+        sa.Column("duration_ms", sa.Float(), nullable=False),
+        sa.Column("api_duration_ms", sa.Float(), nullable=False),
+        sa.Column("queue_wait_ms", sa.Float(), nullable=False),
+        sa.Column("num_turns", sa.Integer(), nullable=False),
+        sa.Column("input_tokens", sa.Integer(), nullable=False),
+        sa.Column("output_tokens", sa.Integer(), nullable=False),
+        sa.Column("cache_read_tokens", sa.Integer(), nullable=False),
+        sa.Column("cache_creation_tokens", sa.Integer(), nullable=False),
+        sa.Column("cost_usd", sa.Float(), nullable=False),
+        sa.Column("prompt_chars", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_llm_call_run_id", "llm_call", ["run_id"])
+    op.create_index("ix_llm_call_created_at", "llm_call", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_llm_call_created_at", table_name="llm_call")
+    op.drop_index("ix_llm_call_run_id", table_name="llm_call")
+    op.drop_table("llm_call")
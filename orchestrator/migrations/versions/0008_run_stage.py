@@ -0,0 +1,40 @@
+"""Per-stage run timings (wall, CPU, peak RSS) from timeline.json
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "runstage" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "runstage",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("run_id", sa.String(), nullable=False),
+        sa.Column("stage", sa.String(), nullable=False),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("wall_ms", sa.Float(), nullable=False),
+        sa.Column("cpu_ms", sa.Float(), nullable=True),
+        sa.Column("peak_rss_mb", sa.Float(), nullable=True),
+        sa.Column("llm_ms", sa.Float(), nullable=True),
+        sa.Column("llm_queue_wait_ms", sa.Float(), nullable=True),
+    )
+    op.create_index("ix_runstage_run_id", "runstage", ["run_id"])
+    op.create_index("ix_runstage_stage", "runstage", ["stage"])
+    op.create_index("ix_runstage_started_at", "runstage", ["started_at"])
+
+
+def downgrade():
+    op.drop_table("runstage")
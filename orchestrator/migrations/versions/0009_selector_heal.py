@@ -0,0 +1,41 @@
+"""Selector healing store: broken selector + page URL pattern -> healed selector
+
+Shared by the validator, operator and exporter (see utils/selector_heals.py).
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "selector_heal",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("selector_key", sa.String(), nullable=False),
+        sa.Column("old_selector", sa.Text(), nullable=False),
+        sa.Column("url_pattern", sa.String(), nullable=False),
+        sa.Column("healed_selector", sa.Text(), nullable=False),
+        sa.Column("confidence", sa.Float(), nullable=False),
+        sa.Column("successes", sa.Integer(), nullable=False),
+        sa.Column("failures", sa.Integer(), nullable=False),
+        sa.Column("source", sa.String(), nullable=True),
+        sa.Column("created_at", sa.Float(), nullable=False),
+        sa.Column("last_verified_at", sa.Float(), nullable=True),
+    )
+    op.create_index(
+        "ix_selector_heal_lookup", "selector_heal", ["selector_key", "url_pattern"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_selector_heal_lookup", table_name="selector_heal")
+    op.drop_table("selector_heal")
@@ -0,0 +1,41 @@
+"""Per-test execution history: every validator run of a test, pass or fail
+
+Feeds the flake classifier and the validator's rerun-before-fix policy
+(see utils/flakiness.py).
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "test_result",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("test_key", sa.String(), nullable=False),
+        sa.Column("run_id", sa.String(), nullable=True),
+        sa.Column("browser", sa.String(), nullable=True),
+        sa.Column("code_hash", sa.String(), nullable=True),
+        sa.Column("passed", sa.Boolean(), nullable=False),
+        sa.Column("rerun", sa.Boolean(), nullable=False),
+        sa.Column("failure_kind", sa.String(), nullable=True),
+        sa.Column("duration_ms", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.Float(), nullable=False),
+    )
+    op.create_index(
+        "ix_test_result_key_created", "test_result", ["test_key", "created_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_test_result_key_created", table_name="test_result")
+    op.drop_table("test_result")
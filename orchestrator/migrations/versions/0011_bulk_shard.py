@@ -0,0 +1,46 @@
+"""Bulk run shards claimed by execution workers
+
+Written by the API when a bulk run is sharded, claimed and updated by
+workers on any host sharing the database (see api/sharding.py).
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "bulk_shard",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("bulk_run_id", sa.String(), nullable=False),
+        sa.Column("shard_index", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("browser", sa.String(), nullable=False),
+        sa.Column("jobs", sa.Text(), nullable=False),
+        sa.Column("results", sa.Text(), nullable=False),
+        sa.Column("estimated_ms", sa.Float(), nullable=False),
+        sa.Column("worker_id", sa.String(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.Float(), nullable=False),
+        sa.Column("claimed_at", sa.Float(), nullable=True),
+        sa.Column("heartbeat_at", sa.Float(), nullable=True),
+        sa.Column("finished_at", sa.Float(), nullable=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_bulk_shard_bulk_run_id", "bulk_shard", ["bulk_run_id"])
+    op.create_index("ix_bulk_shard_status", "bulk_shard", ["status"])
+
+
+def downgrade():
+    op.drop_index("ix_bulk_shard_status", table_name="bulk_shard")
+    op.drop_index("ix_bulk_shard_bulk_run_id", table_name="bulk_shard")
+    op.drop_table("bulk_shard")
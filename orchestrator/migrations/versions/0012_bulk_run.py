@@ -0,0 +1,47 @@
+"""Bulk runs as an entity: bulkrun table and testrun.bulk_run_id
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Tables created by create_all from the current models already have these
+    if "bulkrun" not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            "bulkrun",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("browser", sa.String(), nullable=False),
+            sa.Column("total", sa.Integer(), nullable=False),
+            sa.Column("shards", sa.Integer(), nullable=True),
+            sa.Column("skipped_json", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_bulkrun_status", "bulkrun", ["status"])
+        op.create_index("ix_bulkrun_created_at", "bulkrun", ["created_at"])
+
+    if "bulk_run_id" not in {
+        c["name"] for c in sa.inspect(bind).get_columns("testrun")
+    }:
+        with op.batch_alter_table("testrun") as batch:
+            batch.add_column(sa.Column("bulk_run_id", sa.String(), nullable=True))
+        op.create_index("ix_testrun_bulk_run_id", "testrun", ["bulk_run_id"])
+
+
+def downgrade():
+    op.drop_index("ix_testrun_bulk_run_id", table_name="testrun")
+    with op.batch_alter_table("testrun") as batch:
+        batch.drop_column("bulk_run_id")
+    op.drop_table("bulkrun")
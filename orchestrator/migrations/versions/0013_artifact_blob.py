@@ -0,0 +1,35 @@
+"""Content-addressed artifact blobs and their reference counts
+
+Run artifacts are stored once under runs/.blobs by SHA-256 and referenced
+from each run's artifacts.json; refcount is the number of references, and
+blobs at zero are garbage collected (see utils/blob_store.py).
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "artifact_blob",
+        sa.Column("sha256", sa.String(64), primary_key=True),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("refcount", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.Float(), nullable=False),
+    )
+    op.create_index("ix_artifact_blob_refcount", "artifact_blob", ["refcount"])
+
+
+def downgrade():
+    op.drop_index("ix_artifact_blob_refcount", table_name="artifact_blob")
+    op.drop_table("artifact_blob")
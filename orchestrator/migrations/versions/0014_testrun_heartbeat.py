@@ -0,0 +1,32 @@
+"""Heartbeat of runs executed by shard workers: testrun.heartbeat_at
+
+A worker that takes over an abandoned shard checks it before rerunning a
+spec, so a run its previous worker is still executing isn't started twice
+(see api/sharding.py).
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0014"
+down_revision = "0013"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tables created by create_all from the current models already have it
+    if "heartbeat_at" not in {
+        c["name"] for c in sa.inspect(op.get_bind()).get_columns("testrun")
+    }:
+        with op.batch_alter_table("testrun") as batch:
+            batch.add_column(sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("testrun") as batch:
+        batch.drop_column("heartbeat_at")
@@ -0,0 +1,32 @@
+"""Shared LLM circuit breaker state: llm_breaker
+
+One row per provider whose circuit has recorded failures, so the API and
+every stage subprocess trip and recover the same circuit (see
+utils/llm_client.py). Times are epoch seconds like the limiter tables.
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0015"
+down_revision = "0014"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "llm_breaker",
+        sa.Column("provider", sa.String(), primary_key=True),
+        sa.Column("failures", sa.Integer(), nullable=False),
+        sa.Column("opened_at", sa.Float(), nullable=True),
+        sa.Column("probe_expires_at", sa.Float(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("llm_breaker")
@@ -0,0 +1,131 @@
+"""
+Shared fixtures: a migrated SQLite database, the stores and API engines
+pointed at it, and the API pointed at per-test spec and run directories,
+all under pytest's tmp_path so nothing outlives the test session's temp dirs.
+
+The API binds its engines and stores to DATABASE_URL when first imported,
+so the session gets a throwaway database of its own (TEST_DATABASE_URL
+overrides it) instead of the developer's ./test.db.
+"""
+
+import asyncio
+import importlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from sqlalchemy import create_engine
+
+_SESSION_DIR = tempfile.TemporaryDirectory(prefix="pw-agent-tests-")
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL", f"sqlite:///{_SESSION_DIR.name}/test.db"
+)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+# Workflows import utils.* as top-level modules (orchestrator/ on sys.path),
+# so their store singletons are separate objects from orchestrator.utils.*
+PROJECT_PACKAGES = {"orchestrator", "api", "utils", "workflows", "agents"}
+# API modules holding the engine / async session maker imported from api.db
+API_DB_MODULES = ("db", "main", "search", "dashboard", "llm", "metrics", "import_utils")
+
+
+def pytest_unconfigure(config):
+    _SESSION_DIR.cleanup()
+
+
+def loaded_stores():
+    """Every RawSQLStore instance held by a loaded project module."""
+    from orchestrator.api.db import RawSQLStore
+
+    stores = {}
+    for name, module in list(sys.modules.items()):
+        if module is None or name.split(".")[0] not in PROJECT_PACKAGES:
+            continue
+        for value in list(vars(module).values()):
+            if isinstance(value, RawSQLStore):
+                stores[id(value)] = value
+    return list(stores.values())
+
+
+@pytest.fixture
+def db_url(tmp_path) -> str:
+    """URL of a fully migrated SQLite database in the test's temp dir."""
+    from orchestrator.api.db import run_migrations
+
+    url = f"sqlite:///{tmp_path}/test.db"
+    engine = create_engine(url)
+    run_migrations(engine)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def isolated_stores(db_url, monkeypatch) -> str:
+    """Point DATABASE_URL and every loaded store singleton at db_url for this test."""
+    monkeypatch.setenv("DATABASE_URL", db_url)
+    stores = loaded_stores()
+    for store in stores:
+        monkeypatch.setattr(store, "database_url", db_url)
+        monkeypatch.setattr(store, "_engine", None)
+        monkeypatch.setattr(store, "_available", None)
+    yield db_url
+    for store in stores:
+        if store._engine is not None:
+            store._engine.dispose()
+
+
+@pytest.fixture
+def api_db(isolated_stores, monkeypatch) -> str:
+    """Serve the API from db_url: its engines, session makers and stores."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from orchestrator.api.db import _async_url
+
+    engine = create_engine(isolated_stores)
+    async_engine = create_async_engine(_async_url(isolated_stores))
+    session_maker = async_sessionmaker(
+        async_engine, class_=AsyncSession, expire_on_commit=False
+    )
+    for name in API_DB_MODULES:
+        module = importlib.import_module(f"orchestrator.api.{name}")
+        if hasattr(module, "engine"):
+            monkeypatch.setattr(module, "engine", engine)
+        if hasattr(module, "async_session_maker"):
+            monkeypatch.setattr(module, "async_session_maker", session_maker)
+    yield isolated_stores
+    engine.dispose()
+    asyncio.run(async_engine.dispose())
+
+
+@pytest.fixture
+def api_project(tmp_path, monkeypatch) -> Path:
+    """Point the API at empty specs/ and runs/ dirs under tmp_path, restored afterwards."""
+    from orchestrator.api import main
+
+    (tmp_path / "specs").mkdir()
+    (tmp_path / "runs").mkdir()
+    monkeypatch.setattr(main, "SPECS_DIR", tmp_path / "specs")
+    monkeypatch.setattr(main, "RUNS_DIR", tmp_path / "runs")
+    # Runs wait on the semaphore, binding it to the event loop of the request that created it
+    monkeypatch.setattr(main, "EXECUTION_SEMAPHORE", None)
+    return tmp_path
+
+
+@pytest.fixture
+def blob_store(db_url, api_project, monkeypatch):
+    """A BlobStore on db_url that the API serves api_project's artifacts from."""
+    from orchestrator.api import main
+    from orchestrator.utils.blob_store import BlobStore
+
+    store = BlobStore(db_url)
+    monkeypatch.setattr(main, "BLOB_STORE", store)
+    return store
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test 9: API Load
+Fires 200 concurrent clients at the hot read endpoints (served through the
+async DB session path) and checks p99 latency stays within a fixed budget
+(LOAD_TEST_P99_BUDGET seconds).
+
+Uses a throwaway SQLite database unless LOAD_TEST_DATABASE_URL points at a
+real deployment database (e.g. the docker-compose Postgres). The database is
+only swapped in for this test, through the API's session dependency.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from orchestrator.api.main import app
+from orchestrator.api.db import (
+    _async_url,
+    _pool_options,
+    get_async_session,
+    run_migrations,
+)
+from orchestrator.api.models_db import TestRun as DBTestRun, AgentRun
+
+CONCURRENT_CLIENTS = int(os.environ.get("LOAD_TEST_CLIENTS", "200"))
+REQUESTS_PER_CLIENT = int(os.environ.get("LOAD_TEST_REQUESTS", "3"))
+P99_BUDGET_SECONDS = float(os.environ.get("LOAD_TEST_P99_BUDGET", "5.0"))
+PATHS = ["/runs", "/runs/load_{:05d}", "/api/agents/runs"]
+
+
+@pytest.fixture
+async def load_db(tmp_path: Path):
+    """A seeded database served by the API's async session dependency for the duration of the test."""
+    url = os.environ.get("LOAD_TEST_DATABASE_URL", f"sqlite:///{tmp_path}/load.db")
+    engine = create_engine(url, **_pool_options(url))
+    run_migrations(engine)
+    seed(engine)
+    async_engine = create_async_engine(_async_url(url), **_pool_options(url))
+    session_maker = async_sessionmaker(
+        async_engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    async def override():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = override
+    try:
+        yield engine
+    finally:
+        app.dependency_overrides.pop(get_async_session, None)
+        engine.dispose()
+        await async_engine.dispose()
+
+
+def seed(engine, run_count: int = 100):
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        for i in range(run_count):
+            run_id = f"load_{i:05d}"
+            if session.get(DBTestRun, run_id):
+                continue
+            session.add(
+                DBTestRun(
+                    id=run_id,
+                    spec_name=f"load/spec_{i % 20}.md",
+                    test_name=f"Load {i}",
+                    status="passed" if i % 3 else "failed",
+                    created_at=now - timedelta(minutes=i),
+                )
+            )
+            session.add(
+                AgentRun(
+                    id=f"agent_{i:05d}",
+                    agent_type="exploratory",
+                    config_json={"url": "https://example.com"},
+                    result_json={"summary": "ok", "termination_reason": "completed"},
+                    status="completed",
+                )
+            )
+        session.commit()
+
+
+async def client_session(client: httpx.AsyncClient, index: int, latencies: list):
+    for i in range(REQUESTS_PER_CLIENT):
+        path = PATHS[(index + i) % len(PATHS)].format(index % 100)
+        start = time.perf_counter()
+        response = await client.get(path)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, f"{path}: {response.status_code}"
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def serial_latency(client: httpx.AsyncClient, rounds: int = 10) -> float:
+    """Mean latency of the load's requests sent one at a time (after a warm-up request each)."""
+    latencies = []
+    for i in range(rounds + 1):
+        for path in PATHS:
+            start = time.perf_counter()
+            await client.get(path.format(i))
+            if i:
+                latencies.append(time.perf_counter() - start)
+    return sum(latencies) / len(latencies)
+
+
+async def test_api_load(load_db):
+    """p99 latency under CONCURRENT_CLIENTS concurrent clients"""
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        serial = await serial_latency(client)  # Also warms up each endpoint
+        await asyncio.gather(
+            *(client_session(client, i, latencies) for i in range(CONCURRENT_CLIENTS))
+        )
+
+    p50, p95, p99 = (percentile(latencies, p) for p in (50, 95, 99))
+    assert len(latencies) == CONCURRENT_CLIENTS * REQUESTS_PER_CLIENT
+    assert p99 < P99_BUDGET_SECONDS, (
+        f"p99 {p99:.3f}s exceeds the {P99_BUDGET_SECONDS}s budget "
+        f"({len(latencies)} requests from {CONCURRENT_CLIENTS} concurrent clients: "
+        f"p50 {p50 * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms, serial {serial * 1000:.1f}ms)"
+    )
+
+
+def test_sqlite_pool_options():
+    """In-memory SQLite only has a single-connection pool, which takes no sizing options"""
+    with create_engine(
+        "sqlite://", **_pool_options("sqlite://")
+    ).connect() as connection:
+        assert connection.exec_driver_sql("SELECT 1").scalar() == 1
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test 10: Schema Migrations
+Verifies Alembic migrations bring fresh and legacy (pre-migration) databases
+to head, and that the hot list/filter queries are served by the new indexes.
+
+Runs against a throwaway SQLite database, or against
+MIGRATION_TEST_DATABASE_URL (e.g. a scratch Postgres) when set.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+
+from orchestrator.api.db import run_migrations, current_revision, MIGRATIONS_DIR
+from orchestrator.api.models_db import TestRun as DBTestRun, AgentRun
+
+HEAD_REVISION = ScriptDirectory(str(MIGRATIONS_DIR)).get_current_head()
+
+HOT_QUERIES = {
+    "ix_testrun_created_at": select(DBTestRun).order_by(DBTestRun.created_at.desc()),
+    "ix_testrun_status": select(DBTestRun).where(DBTestRun.status == "pending"),
+    "ix_testrun_spec_name": select(DBTestRun).where(
+        DBTestRun.spec_name == "auth/login_flow.md"
+    ),
+    "ix_agentrun_agent_type": select(AgentRun).where(
+        AgentRun.agent_type == "exploratory"
+    ),
+    "ix_agentrun_created_at": select(AgentRun).order_by(AgentRun.created_at.desc()),
+}
+
+LEGACY_SCHEMA = [
+    """CREATE TABLE testrun (id VARCHAR NOT NULL PRIMARY KEY, spec_name VARCHAR NOT NULL,
+    status VARCHAR NOT NULL, created_at TIMESTAMP NOT NULL, test_name VARCHAR,
+    steps_completed INTEGER NOT NULL, total_steps INTEGER NOT NULL, browser VARCHAR NOT NULL)""",
+    """CREATE TABLE specmetadata (spec_name VARCHAR NOT NULL PRIMARY KEY, tags_json VARCHAR NOT NULL,
+    description VARCHAR, author VARCHAR, last_modified TIMESTAMP)""",
+    """CREATE TABLE agentrun (id VARCHAR NOT NULL PRIMARY KEY, agent_type VARCHAR NOT NULL,
+    config_json VARCHAR NOT NULL, result_json VARCHAR, status VARCHAR NOT NULL,
+    created_at TIMESTAMP NOT NULL)""",
+]
+
+
+def make_engine(name: str):
+    url = os.environ.get("MIGRATION_TEST_DATABASE_URL")
+    if url:
+        engine = create_engine(url)
+        with engine.begin() as conn:
+            for table in (
+                "alembic_version",
+                "artifact_blob",
+                "bulkrun",
+                "bulk_shard",
+                "test_result",
+                "selector_heal",
+                "runstage",
+                "llm_call",
+                "llm_breaker",
+                "llm_queue_wait",
+                "llm_queue",
+                "llm_rate_bucket",
+                "search_index",
+                "agentrun",
+                "specmetadata",
+                "testrun",
+            ):
+                conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        return engine
+    return create_engine(f"sqlite:///{tempfile.mkdtemp()}/{name}.db")
+
+
+def query_plan(engine, statement) -> str:
+    if engine.dialect.name == "postgresql":
+        sql = str(
+            statement.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+        )
+        with engine.connect() as conn:
+            # Tables are tiny here; make the planner show whether an index is usable
+            conn.execute(text("SET enable_seqscan = off"))
+            return "\n".join(r[0] for r in conn.execute(text(f"EXPLAIN {sql}")))
+    sql = str(
+        statement.compile(
+            dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    with engine.connect() as conn:
+        return "\n".join(r[-1] for r in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def test_fresh_database_reaches_head():
+    engine = make_engine("fresh")
+    run_migrations(engine)
+
+    assert current_revision(engine) == HEAD_REVISION
+    indexes = {i["name"] for i in inspect(engine).get_indexes("testrun")}
+    assert {
+        "ix_testrun_status",
+        "ix_testrun_created_at",
+        "ix_testrun_spec_name",
+    } <= indexes
+
+
+def test_legacy_database_is_upgraded_in_place():
+    engine = make_engine("legacy")
+    with engine.begin() as conn:
+        for ddl in LEGACY_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(
+            text(
+                "INSERT INTO agentrun VALUES ('a1', 'exploratory', '{\"url\": \"https://example.com\"}', NULL, 'completed', '2026-01-01 00:00:00')"
+            )
+        )
+
+    run_migrations(engine)
+
+    assert current_revision(engine) == HEAD_REVISION
+    with engine.connect() as conn:
+        row = conn.execute(select(AgentRun).where(AgentRun.id == "a1")).one()
+    assert row.config_json == {"url": "https://example.com"}
+    assert "fingerprint" in {c["name"] for c in inspect(engine).get_columns("testrun")}
+
+
+def test_hot_queries_use_indexes():
+    engine = make_engine("plans")
+    run_migrations(engine)
+
+    for index_name, statement in HOT_QUERIES.items():
+        plan = query_plan(engine, statement)
+        print(f"{index_name}: {plan}")
+        assert index_name in plan, f"{index_name} not used:\n{plan}"
+
+
+if __name__ == "__main__":
+    test_fresh_database_reaches_head()
+    test_legacy_database_is_upgraded_in_place()
+    test_hot_queries_use_indexes()
+    print("✅ Migrations and query plans OK")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test 11: Spec Catalog
+Verifies the in-memory spec catalog loads metadata only, picks up external
+edits through its watcher (watchdog or mtime polling), and serves content on
+demand.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from orchestrator.api import spec_catalog as catalog_module
+from orchestrator.api.spec_catalog import SpecCatalog
+
+
+def wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return predicate()
+
+
+def make_specs() -> Path:
+    root = Path(tempfile.mkdtemp(prefix="pw-agent-specs-"))
+    (root / "auth").mkdir()
+    (root / "auth" / "login.md").write_text(
+        "# Test: Login Flow\n\n1. Navigate to /login\n"
+    )
+    (root / "smoke.md").write_text("# Smoke\n")
+    (root / "spec-metadata.json").write_text("{}")
+    return root
+
+
+def check_watching(catalog: SpecCatalog, root: Path):
+    catalog.start()
+    try:
+        assert [e.name for e in catalog.entries()] == ["auth/login.md", "smoke.md"]
+        assert catalog.get("auth/login.md").title == "Login Flow"
+
+        (root / "auth" / "logout.md").write_text("# Logout\n")
+        assert wait_for(lambda: catalog.get("auth/logout.md") is not None)
+
+        (root / "smoke.md").unlink()
+        assert wait_for(lambda: catalog.get("smoke.md") is None)
+
+        assert catalog.read_content("auth/login.md").startswith("# Test: Login Flow")
+    finally:
+        catalog.stop()
+
+
+def test_catalog_with_watchdog():
+    root = make_specs()
+    catalog = SpecCatalog(root)
+    check_watching(catalog, root)
+
+
+def test_catalog_with_polling_fallback():
+    root = make_specs()
+    observer = catalog_module.Observer
+    catalog_module.Observer = None
+    try:
+        catalog = SpecCatalog(root, poll_interval=0.1)
+        check_watching(catalog, root)
+        assert catalog.watch_mode == "off"
+    finally:
+        catalog_module.Observer = observer
+
+
+def test_refresh_after_api_write():
+    root = make_specs()
+    catalog = SpecCatalog(root)
+    assert catalog.count() == 2
+
+    (root / "new.md").write_text("# New Spec\n")
+    catalog.refresh("new.md")
+    assert catalog.get("new.md").title == "New Spec"
+
+
+if __name__ == "__main__":
+    test_catalog_with_watchdog()
+    test_catalog_with_polling_fallback()
+    test_refresh_after_api_write()
+    print("✅ Spec catalog OK")
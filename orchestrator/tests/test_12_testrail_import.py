@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test 12: TestRail Bulk Import
+Streams a generated TestRail CSV through the batched importer and checks the
+written specs, SpecMetadata rows and dedup statistics.
+"""
+
+import asyncio
+import csv
+import gc
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_tmp_dir = tempfile.mkdtemp(prefix="pw-agent-import-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp_dir}/import.db")
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from sqlmodel import Session
+
+from orchestrator.api.db import init_db, engine
+from orchestrator.api.import_utils import (
+    ImportProgress,
+    import_testrail_stream,
+    parse_testrail_csv,
+)
+from orchestrator.api.models_db import SpecMetadata as DBSpecMetadata
+
+
+def make_csv(rows: int, duplicate_every: int = 0) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(["ID", "Title", "Goals", "Steps", "Steps"])
+    for i in range(rows):
+        case_id = i // 2 if duplicate_every and i % duplicate_every == 1 else i
+        writer.writerow(
+            [
+                f"C{case_id}",
+                f"Case {case_id}",
+                "Check it",
+                f"Open page {case_id}\nClick go",
+                "",
+            ]
+        )
+    return buf.getvalue()
+
+
+def test_streaming_import_batches_and_dedups():
+    init_db()
+    specs_dir = Path(tempfile.mkdtemp(prefix="pw-agent-specs-"))
+    written_batches = []
+
+    # Every 4th row (i % 4 == 1) repeats an earlier case id
+    progress = import_testrail_stream(
+        io.StringIO(make_csv(40, duplicate_every=4)),
+        specs_dir,
+        ImportProgress(id="t1"),
+        batch_size=8,
+        on_batch=written_batches.append,
+    )
+    assert progress.status == "completed", progress.error
+    assert progress.rows == 40
+    assert progress.duplicates == 10
+    assert progress.created == 30
+    assert progress.batches >= 4
+    assert len(list(specs_dir.glob("*.md"))) == 30
+    assert sum(len(names) for names in written_batches) >= 30
+
+    with Session(engine) as session:
+        meta = session.get(DBSpecMetadata, "case_0_c0.md")
+        assert meta is not None and "testrail" in meta.tags
+
+    # Re-importing the same export leaves files alone
+    again = import_testrail_stream(
+        io.StringIO(make_csv(40, duplicate_every=4)),
+        specs_dir,
+        ImportProgress(id="t2"),
+        batch_size=8,
+    )
+    assert again.unchanged == 30 and again.created == 0 and again.updated == 0
+    assert again.metadata_created == 0
+
+
+def test_parse_compat():
+    specs = parse_testrail_csv(("﻿" + make_csv(3)).encode("utf-8"))
+    assert [s["name"] for s in specs] == [
+        "case_0_c0.md",
+        "case_1_c1.md",
+        "case_2_c2.md",
+    ]
+    assert "1. Open page 0\n2. Click go" in specs[0]["content"]
+
+
+def test_background_import_task_is_kept():
+    from orchestrator.api import main
+
+    async def scenario():
+        release = asyncio.Event()
+        task = main.spawn_background(release.wait())
+        gc.collect()
+        assert task in main.BACKGROUND_TASKS
+        release.set()
+        await task
+        await asyncio.sleep(0)  # Done callbacks run on the next loop iteration
+        assert task not in main.BACKGROUND_TASKS
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_streaming_import_batches_and_dedups()
+    test_parse_compat()
+    test_background_import_task_is_kept()
+    print("✅ TestRail import OK")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test 13: Spec Fingerprints
+Verifies run fingerprints cover the spec, the generated test (and the local
+modules it imports) and the plan, and that the "changed since last green"
+selector only picks specs whose inputs changed or whose last run was red.
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from orchestrator.api import fingerprints
+
+SPEC = "auth/Login_Flow.md"
+
+
+def write_plan(root: Path, run_id: str, steps) -> Path:
+    run_dir = root / "runs" / run_id
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / "spec.md").write_text((root / "specs" / SPEC).read_text())
+    (run_dir / "plan.json").write_text(
+        json.dumps(
+            {
+                "testName": "Login",
+                "steps": steps,
+                "specFilePath": str(root / "specs" / SPEC),
+            }
+        )
+    )
+    return run_dir
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch) -> Path:
+    monkeypatch.setattr(fingerprints, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(fingerprints, "SPECS_DIR", tmp_path / "specs")
+    monkeypatch.setattr(fingerprints, "RUNS_DIR", tmp_path / "runs")
+    monkeypatch.setattr(fingerprints, "GENERATED_DIR", tmp_path / "tests" / "generated")
+    (tmp_path / "specs" / "auth").mkdir(parents=True)
+    (tmp_path / "specs" / SPEC).write_text("# Login\n\n1. Open /login\n")
+    (tmp_path / "tests" / "generated").mkdir(parents=True)
+    (tmp_path / "tests" / "helpers.ts").write_text("export const user = 'tom';\n")
+    (tmp_path / "tests" / "generated" / "login-flow.spec.ts").write_text(
+        "import { test } from '@playwright/test';\nimport { user } from '../helpers';\n"
+    )
+    write_plan(tmp_path, "r1", ["Open /login"])
+    return tmp_path
+
+
+def finished_run(status: str, run_id: str = "r1") -> SimpleNamespace:
+    fp = fingerprints.run_fingerprint(fingerprints.RUNS_DIR / run_id, SPEC)
+    return SimpleNamespace(
+        id=run_id,
+        status=status,
+        fingerprint=fp.value,
+        **{k: v for k, v in fp.to_dict().items() if k != "fingerprint"},
+    )
+
+
+def test_generated_test_path_matches_exporter_slug(project):
+    assert fingerprints.generated_test_path(SPEC).name == "login-flow.spec.ts"
+
+
+def test_unchanged_green_run_is_skipped(project):
+    run = finished_run("passed")
+    assert run.test_hash is not None and run.plan_hash is not None
+    assert fingerprints.rerun_reason(SPEC, run) is None
+    assert fingerprints.rerun_reason(SPEC, finished_run("failed")) == "last run failed"
+    assert fingerprints.rerun_reason(SPEC, None) == "no previous run"
+
+
+def test_changed_inputs_trigger_rerun(project):
+    run = finished_run("passed")
+
+    (project / "tests" / "helpers.ts").write_text("export const user = 'ann';\n")
+    assert fingerprints.rerun_reason(SPEC, run) == "generated test changed"
+
+    (project / "specs" / SPEC).write_text("# Login\n\n1. Open /signin\n")
+    assert fingerprints.rerun_reason(SPEC, run) == "spec, generated test changed"
+
+
+def test_newer_plan_triggers_rerun(project):
+    run = finished_run("passed")
+    time.sleep(0.01)
+    # A later run (e.g. still in progress, or replanned) has a different plan
+    write_plan(project, "r2", ["Open /login", "Submit"])
+    assert fingerprints.latest_plans() == {SPEC: project / "runs" / "r2" / "plan.json"}
+    assert fingerprints.rerun_reason(SPEC, run) == "plan changed"
+    assert (
+        fingerprints.current_fingerprint(SPEC).plan_hash
+        == finished_run("passed", "r2").plan_hash
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Test 14: LLM Limiter
+Verifies the database-backed LLM limiter caps concurrency, lets interactive
+queries jump ahead of bulk ones, throttles on the tokens/min bucket, settles
+estimates against real usage, backs off while waiting and records queue-wait
+samples, pruning those older than the longest stats window.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from sqlalchemy import create_engine, text
+
+from orchestrator.api.db import run_migrations
+from orchestrator.utils.llm_limiter import (
+    LLMLimiter,
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    QUEUE_WAIT_RETENTION_SECONDS,
+    queue_stats,
+)
+
+
+def make_limiter(**limits) -> LLMLimiter:
+    url = f"sqlite:///{tempfile.mkdtemp(prefix='pw-agent-llm-')}/limiter.db"
+    run_migrations(create_engine(url))
+    os.environ.update(
+        {
+            "LLM_RPM_TEST": "600",
+            "LLM_TPM_TEST": "1000000",
+            "LLM_MAX_CONCURRENCY_TEST": "1",
+        }
+    )
+    os.environ.update({f"{k.upper()}_TEST": str(v) for k, v in limits.items()})
+    return LLMLimiter(url)
+
+
+def test_interactive_beats_bulk():
+    limiter = make_limiter()
+    order = []
+
+    async def call(name: str, priority: int, hold: float = 0.0):
+        async with limiter.slot("x", provider="test", priority=priority):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def scenario():
+        first = asyncio.create_task(call("first", PRIORITY_BULK, hold=1.0))
+        await asyncio.sleep(0.3)
+        bulk = asyncio.create_task(call("bulk", PRIORITY_BULK))
+        await asyncio.sleep(0.1)
+        interactive = asyncio.create_task(call("interactive", PRIORITY_INTERACTIVE))
+        await asyncio.gather(first, bulk, interactive)
+
+    asyncio.run(scenario())
+    assert order == ["first", "interactive", "bulk"]
+
+    with limiter.db().connect() as conn:
+        stats = queue_stats(conn)["test"]
+    assert stats["active"] == 0 and not stats["waiting"]
+    assert stats["queue_wait_ms"]["count"] == 3
+    assert stats["queue_wait_ms"]["max"] >= 500
+
+
+def test_token_bucket_throttles():
+    # 2000 tokens/s refill; each query is estimated at ~1024 tokens
+    limiter = make_limiter(llm_tpm=120000, llm_max_concurrency=4)
+
+    async def acquire() -> float:
+        async with limiter.slot(
+            "x", provider="test", priority=PRIORITY_INTERACTIVE
+        ) as lease:
+            return lease.queue_wait_ms
+
+    asyncio.run(acquire())  # creates the bucket row
+    with limiter.db().begin() as conn:
+        conn.execute(
+            text("UPDATE llm_rate_bucket SET tokens = 0, updated_at = :now"),
+            {"now": time.time()},
+        )
+
+    waited = asyncio.run(acquire())
+    assert 300 <= waited <= 3000, waited
+
+
+def test_tokens_settled_on_success_and_failure():
+    limiter = make_limiter(llm_tpm=6000, llm_max_concurrency=4)
+
+    async def query(usage, fail: bool):
+        async with limiter.slot(
+            "x", provider="test", priority=PRIORITY_INTERACTIVE
+        ) as lease:
+            lease.record_usage(usage)
+            if fail:
+                raise RuntimeError("boom")
+
+    def tokens_after(usage, fail: bool) -> float:
+        with limiter.db().begin() as conn:
+            # A full bucket, so the refill since the last call can't skew the result
+            conn.execute(
+                text("UPDATE llm_rate_bucket SET tokens = 6000, updated_at = :now"),
+                {"now": time.time()},
+            )
+        try:
+            asyncio.run(query(usage, fail))
+        except RuntimeError:
+            assert fail
+        with limiter.db().connect() as conn:
+            return conn.execute(
+                text("SELECT tokens FROM llm_rate_bucket WHERE provider = 'test'")
+            ).scalar()
+
+    asyncio.run(query(None, False))  # creates the bucket row
+    assert tokens_after({"input_tokens": 20, "output_tokens": 5}, False) == 6000 - 25
+    assert tokens_after({"input_tokens": 3000}, True) == 6000 - 3000
+    assert (
+        tokens_after(None, True) == 6000 - 1024
+    )  # No usage reported: the estimate stays charged
+
+
+def test_waiters_back_off():
+    limiter = make_limiter()
+    attempts = []
+    attempt = limiter._attempt
+
+    def counted(*args):
+        attempts.append(args)
+        return attempt(*args)
+
+    limiter._attempt = counted
+
+    async def call(hold: float):
+        async with limiter.slot("x", provider="test", priority=PRIORITY_INTERACTIVE):
+            await asyncio.sleep(hold)
+
+    async def scenario():
+        holder = asyncio.create_task(call(3.0))
+        await asyncio.sleep(0.3)
+        attempts.clear()  # Only the waiter's polls from here on
+        await asyncio.gather(holder, call(0.0))
+
+    asyncio.run(scenario())
+    # Polling every 0.25 s would take about a dozen attempts in 2.7 s
+    assert len(attempts) <= 8, len(attempts)
+
+
+def test_old_queue_wait_samples_are_pruned():
+    limiter = make_limiter(llm_max_concurrency=4)
+    old = time.time() - QUEUE_WAIT_RETENTION_SECONDS - 60
+    with limiter.db().begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO llm_queue_wait (provider, priority, wait_ms, created_at) "
+                "VALUES ('test', 0, 5, :old)"
+            ),
+            {"old": old},
+        )
+
+    async def query():
+        async with limiter.slot("x", provider="test", priority=PRIORITY_INTERACTIVE):
+            pass
+
+    asyncio.run(query())  # creates the bucket row
+    asyncio.run(query())
+    with limiter.db().connect() as conn:
+        created = (
+            conn.execute(text("SELECT created_at FROM llm_queue_wait")).scalars().all()
+        )
+    assert len(created) == 2 and min(created) > old
+
+
+if __name__ == "__main__":
+    test_interactive_beats_bulk()
+    test_token_bucket_throttles()
+    test_tokens_settled_on_success_and_failure()
+    test_waiters_back_off()
+    test_old_queue_wait_samples_are_pruned()
+    print("✅ LLM limiter OK")
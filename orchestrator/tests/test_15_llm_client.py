@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Test 15: LLM Query Client
+Verifies the shared query client retries transient failures with backoff,
+fails fast on other errors and once its circuit opens, shares the circuit
+across processes through the database, lets a single trial call through a
+half-open circuit, and records per-call telemetry to the run directory and
+the llm_call table.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from claude_agent_sdk import (
+    ClaudeAgentOptions,
+    CLIConnectionError,
+    CLINotFoundError,
+    ProcessError,
+)
+from claude_agent_sdk.types import ResultMessage
+from sqlalchemy import create_engine, text
+
+from orchestrator.api.db import run_migrations
+from orchestrator.utils import llm_client
+from orchestrator.utils.llm_limiter import llm_limiter
+
+REAL_QUERY = llm_client.query
+
+
+def result_message(result: str, is_error: bool = False) -> ResultMessage:
+    return ResultMessage(
+        subtype="success",
+        duration_ms=10,
+        duration_api_ms=8,
+        is_error=is_error,
+        num_turns=2,
+        session_id="s",
+        total_cost_usd=0.01,
+        result=result,
+        usage={"input_tokens": 100, "output_tokens": 20},
+    )
+
+
+def fake_query(outcomes):
+    """Stand-in for the SDK query(): each call plays the next outcome."""
+    calls = []
+
+    async def query(prompt, options):
+        calls.append(prompt)
+        outcome = outcomes[min(len(calls), len(outcomes)) - 1]
+        if isinstance(outcome, float):
+            await asyncio.sleep(outcome)
+            outcome = result_message("slow")
+        if isinstance(outcome, Exception):
+            raise outcome
+        yield outcome
+
+    return query, calls
+
+
+def setup():
+    tmp = Path(tempfile.mkdtemp(prefix="pw-agent-llmclient-"))
+    url = f"sqlite:///{tmp}/client.db"
+    run_migrations(create_engine(url))
+    for store in (llm_limiter, llm_client.breaker_store):
+        store.database_url, store._engine, store._available = url, None, None
+    run_dir = tmp / "runs" / "run-1"
+    run_dir.mkdir(parents=True)
+    os.environ["RUN_DIR"] = str(run_dir)
+    llm_client.BACKOFF_BASE = 0.01
+    llm_client._breakers.clear()
+    return run_dir
+
+
+def teardown_function(function):
+    llm_client.query = REAL_QUERY
+    os.environ.pop("RUN_DIR", None)
+
+
+def test_retries_transient_failures_and_records_call():
+    run_dir = setup()
+    query, calls = fake_query(
+        [
+            CLIConnectionError("connection reset"),
+            result_message("API Error: 529 overloaded", is_error=True),
+            result_message('{"ok": true}'),
+        ]
+    )
+    llm_client.query = query
+
+    result = asyncio.run(
+        llm_client.query_llm("plan this", ClaudeAgentOptions(), stage="planner")
+    )
+    assert result == '{"ok": true}'
+    assert len(calls) == 3
+
+    logged = [
+        json.loads(line)
+        for line in (run_dir / "llm_calls.jsonl").read_text().splitlines()
+    ]
+    assert logged[0]["stage"] == "planner" and logged[0]["attempts"] == 3
+    assert (
+        logged[0]["input_tokens"] == 200
+    )  # the overloaded attempt still consumed tokens
+
+    with llm_limiter.db().connect() as conn:
+        row = conn.execute(
+            text("SELECT run_id, status, attempts, cost_usd FROM llm_call")
+        ).one()
+    assert row.run_id == "run-1" and row.status == "ok" and row.attempts == 3
+    assert abs(row.cost_usd - 0.02) < 1e-9
+
+
+def test_non_transient_error_is_not_retried():
+    setup()
+    query, calls = fake_query([ValueError("bad prompt")])
+    llm_client.query = query
+    try:
+        asyncio.run(llm_client.query_llm("x", ClaudeAgentOptions(), stage="exporter"))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert len(calls) == 1
+
+
+def test_transient_classification():
+    assert llm_client.is_transient(CLIConnectionError("connection reset by peer"))
+    assert llm_client.is_transient(ConnectionResetError())
+    assert llm_client.is_transient(
+        ProcessError("Command failed", 1, 'API Error: 529 {"type":"overloaded_error"}')
+    )
+    assert llm_client.is_transient(
+        ProcessError("Command failed", 1, "API Error: 429 rate_limit_error")
+    )
+    assert not llm_client.is_transient(CLINotFoundError())
+    assert not llm_client.is_transient(
+        ProcessError("Command failed", 1, "API Error: 400 invalid_request_error")
+    )
+    # Not an SDK transport or API status error, whatever the message says
+    assert not llm_client.is_transient(ValueError("connection string is malformed"))
+    assert not llm_client.is_transient(RuntimeError("took 500ms"))
+
+
+def test_circuit_opens_after_repeated_failures():
+    setup()
+    query, calls = fake_query([CLIConnectionError("connection refused")])
+    llm_client.query = query
+    llm_client.MAX_RETRIES = 0
+    breaker = llm_client.breaker_for(llm_client.detect_provider())
+    try:
+        for _ in range(breaker.threshold):
+            try:
+                asyncio.run(
+                    llm_client.query_llm("x", ClaudeAgentOptions(), stage="operator")
+                )
+            except CLIConnectionError:
+                pass
+        assert breaker.state == "open"
+        try:
+            asyncio.run(
+                llm_client.query_llm("x", ClaudeAgentOptions(), stage="operator")
+            )
+            assert False, "expected CircuitOpenError"
+        except llm_client.CircuitOpenError:
+            pass
+        assert len(calls) == breaker.threshold
+        # Another process (its own breaker object) sees the same open circuit
+        other = llm_client.CircuitBreaker(breaker.provider)
+        try:
+            other.check()
+            assert False, "expected CircuitOpenError"
+        except llm_client.CircuitOpenError:
+            pass
+    finally:
+        llm_client.MAX_RETRIES = 3
+
+
+def cool_down(breaker):
+    """Open the provider's shared circuit with its cooldown already over."""
+    with llm_client.breaker_store.db().begin() as conn:
+        conn.execute(text("DELETE FROM llm_breaker"))
+        conn.execute(
+            text(
+                "INSERT INTO llm_breaker (provider, failures, opened_at) VALUES (:provider, :failures, :opened_at)"
+            ),
+            {
+                "provider": breaker.provider,
+                "failures": breaker.threshold,
+                "opened_at": time.time() - breaker.cooldown - 1,
+            },
+        )
+
+
+def test_circuit_is_per_process_without_the_table(tmp_path):
+    store = llm_client.BreakerStore(f"sqlite:///{tmp_path}/unmigrated.db")
+    breaker = llm_client.CircuitBreaker("test", threshold=2, cooldown=60, store=store)
+    breaker.record_failure()
+    assert breaker.check() is False
+    breaker.record_failure()
+    assert breaker.state == "open" and not store.is_available()
+    try:
+        breaker.check()
+        assert False, "expected CircuitOpenError"
+    except llm_client.CircuitOpenError:
+        pass
+
+
+def test_half_open_lets_one_trial_through():
+    setup()
+    query, calls = fake_query([0.2])
+    llm_client.query = query
+    breaker = llm_client.breaker_for(llm_client.detect_provider())
+    cool_down(breaker)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(
+                llm_client.query_llm("x", ClaudeAgentOptions(), stage="operator")
+                for _ in range(3)
+            ),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+    assert results.count("slow") == 1 and len(calls) == 1
+    assert sum(isinstance(r, llm_client.CircuitOpenError) for r in results) == 2
+    assert breaker.state == "closed"
+
+    # A trial that times out hands the next call the trial instead of wedging the circuit
+    cool_down(breaker)
+    try:
+        asyncio.run(
+            llm_client.query_llm(
+                "x", ClaudeAgentOptions(), stage="operator", timeout_seconds=0.01
+            )
+        )
+        assert False, "expected TimeoutError"
+    except asyncio.TimeoutError:
+        pass
+    assert breaker.state == "half-open" and not breaker.probing
+    assert (
+        asyncio.run(llm_client.query_llm("x", ClaudeAgentOptions(), stage="operator"))
+        == "slow"
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test 16: Run Timeline
+Verifies per-stage wall/CPU/peak-RSS recording into timeline.json, loading
+timelines into RunStage rows, the per-stage p50/p95 dashboard endpoint, and
+that the CLI recording them starts as a module, console script or script.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+_tmp_dir = tempfile.mkdtemp(prefix="pw-agent-timeline-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp_dir}/timeline.db")
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from orchestrator.api.db import init_db, engine
+from orchestrator.api.main import app
+from orchestrator.api.runner import load_run_stages
+from orchestrator.utils.timeline import Timeline, load_timeline
+
+# Burns CPU and holds ~80 MB for a moment
+CHILD = "import time; b = bytearray(80 * 1024 * 1024); t = time.time()\nwhile time.time() - t < 0.3: pass"
+
+
+def test_stages_record_wall_cpu_and_rss():
+    run_dir = Path(tempfile.mkdtemp(prefix="pw-agent-run-"))
+    (run_dir / "llm_calls.jsonl").write_text(
+        json.dumps(
+            {
+                "stage": "planner",
+                "started_at": 9e12,
+                "duration_ms": 1200,
+                "queue_wait_ms": 300,
+            }
+        )
+        + "\n"
+    )
+    timeline = Timeline(run_dir, reset=True)
+
+    with timeline.stage("plan", llm_stage="planner") as stage:
+        result = subprocess.run([sys.executable, "-c", CHILD])
+        stage["status"] = "ok" if result.returncode == 0 else "failed"
+    try:
+        with timeline.stage("export"):
+            sys.exit(1)
+    except SystemExit:
+        pass
+
+    plan, export = load_timeline(run_dir)
+    assert plan["stage"] == "plan" and plan["status"] == "ok"
+    assert plan["wall_ms"] >= 300 and plan["cpu_ms"] >= 200
+    assert plan["peak_rss_mb"] >= 80
+    assert plan["llm_calls"] == 1 and plan["llm_queue_wait_ms"] == 300
+    assert export["status"] == "failed"
+
+    rows = load_run_stages("run-1", run_dir)
+    assert [r.stage for r in rows] == ["plan", "export"]
+    assert rows[0].llm_ms == 1200
+
+
+def test_dashboard_stage_percentiles():
+    init_db()
+    run_dir = Path(tempfile.mkdtemp(prefix="pw-agent-run-"))
+    timeline = Timeline(run_dir)
+    for _ in range(3):
+        with timeline.stage("tl_test_stage"):
+            pass
+    with Session(engine) as session:
+        session.add_all(load_run_stages("run-2", run_dir))
+        session.commit()
+
+    stats = TestClient(app).get("/dashboard/stages").json()
+    entry = next(s for s in stats["stages"] if s["stage"] == "tl_test_stage")
+    assert entry["runs"] == 3 and entry["failed"] == 0
+    assert (
+        entry["wall_ms"]["p50"] is not None
+        and entry["wall_ms"]["p95"] >= entry["wall_ms"]["p50"]
+    )
+
+
+def test_cli_imports_as_package():
+    # python -m orchestrator.cli (Docker) and the playwright-agent console script import the package
+    import orchestrator.cli as cli
+
+    assert cli.Timeline is Timeline
+    root = Path(__file__).resolve().parent.parent.parent
+    for command, cwd in (
+        ([sys.executable, "-m", "orchestrator.cli", "--help"], root),
+        ([sys.executable, str(root / "orchestrator" / "cli.py"), "--help"], _tmp_dir),
+    ):
+        result = subprocess.run(
+            command, cwd=cwd, capture_output=True, text=True, timeout=60
+        )
+        assert result.returncode == 0 and "usage:" in result.stdout, result.stderr
+
+
+if __name__ == "__main__":
+    test_stages_record_wall_cpu_and_rss()
+    test_dashboard_stage_percentiles()
+    test_cli_imports_as_package()
+    print("✅ Run timeline OK")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test 17: Tracing
+Verifies OpenTelemetry spans are written by the file exporter, that trace
+context reaches child processes through the environment, and that API
+requests and run timeline stages produce spans.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+# Add project root to path for package imports
+sys.path.insert(0, PROJECT_ROOT)
+
+from fastapi.testclient import TestClient
+
+from orchestrator.api.main import app
+from orchestrator.utils import tracing
+from orchestrator.utils.timeline import Timeline
+
+CHILD = "from orchestrator.utils import tracing\nwith tracing.span('child'): pass"
+TRACES = Path(tempfile.mkdtemp(prefix="pw-agent-traces-")) / "traces.jsonl"
+
+
+def setup_function(function):
+    os.environ["OTEL_TRACES_EXPORTER"] = "file"
+    os.environ["OTEL_TRACES_FILE"] = str(TRACES)
+    tracing._initialized, tracing._tracer = False, None
+
+
+def teardown_function(function):
+    os.environ.pop("OTEL_TRACES_EXPORTER", None)
+    os.environ.pop("OTEL_TRACES_FILE", None)
+    tracing._initialized, tracing._tracer = True, None
+
+
+def read_spans():
+    return {s["name"]: s for s in map(json.loads, TRACES.read_text().splitlines())}
+
+
+def test_trace_context_reaches_child_process():
+    with tracing.span("parent") as parent:
+        env = tracing.inject_env()
+        subprocess.run(
+            [sys.executable, "-c", CHILD], cwd=PROJECT_ROOT, env=env, check=True
+        )
+    assert env["TRACEPARENT"].startswith("00-")
+
+    spans = read_spans()
+    assert spans["child"]["parent_id"] == spans["parent"]["context"]["span_id"]
+    assert (
+        spans["child"]["context"]["trace_id"] == spans["parent"]["context"]["trace_id"]
+    )
+    assert parent.get_span_context().trace_id == int(
+        spans["child"]["context"]["trace_id"], 16
+    )
+
+
+def test_request_and_stage_spans():
+    traceparent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    assert (
+        TestClient(app).get("/health", headers={"traceparent": traceparent}).status_code
+        == 200
+    )
+
+    timeline = Timeline(Path(tempfile.mkdtemp(prefix="pw-agent-run-")))
+    with timeline.stage("export") as stage:
+        stage["status"] = "failed"
+
+    spans = read_spans()
+    request = spans["GET /health"]
+    assert request["kind"] == "SpanKind.SERVER"
+    assert request["context"]["trace_id"] == "0x0af7651916cd43dd8448eb211c80319c"
+    assert request["attributes"]["http.response.status_code"] == 200
+    assert spans["stage export"]["status"]["status_code"] == "ERROR"
+    assert spans["stage export"]["attributes"]["run.stage"] == "export"
+
+
+if __name__ == "__main__":
+    for test in (
+        test_trace_context_reaches_child_process,
+        test_request_and_stage_spans,
+    ):
+        setup_function(test)
+        test()
+        teardown_function(test)
+    print("✅ Tracing OK")
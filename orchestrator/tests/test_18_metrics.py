@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test 18: Prometheus Metrics
+Verifies /metrics exposes finished-run observations (stages, LLM calls,
+validator attempts, artifact bytes), execution slot occupancy and run
+status counts from the database.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_tmp_dir = tempfile.mkdtemp(prefix="pw-agent-metrics-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp_dir}/metrics.db")
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+from sqlmodel import Session
+
+from orchestrator.api import metrics
+from orchestrator.api.db import init_db, engine
+from orchestrator.api.main import app
+from orchestrator.api.models_db import TestRun as DBTestRun
+from orchestrator.utils.timeline import Timeline
+
+
+def scrape():
+    body = TestClient(app).get("/metrics").text
+    return {
+        (s.name, tuple(sorted(s.labels.items()))): s.value
+        for family in text_string_to_metric_families(body)
+        for s in family.samples
+    }
+
+
+def make_run_dir() -> Path:
+    run_dir = Path(tempfile.mkdtemp(prefix="pw-agent-run-"))
+    with Timeline(run_dir).stage("metrics_test_stage"):
+        pass
+    (run_dir / "llm_calls.jsonl").write_text(
+        json.dumps(
+            {
+                "stage": "metrics_test_llm",
+                "provider": "anthropic",
+                "status": "ok",
+                "duration_ms": 2500,
+                "queue_wait_ms": 100,
+                "input_tokens": 1000,
+                "output_tokens": 50,
+                "cost_usd": 0.01,
+            }
+        )
+        + "\n"
+    )
+    (run_dir / "validation.json").write_text(
+        json.dumps({"status": "success", "attempts": 2})
+    )
+    (run_dir / "test-results").mkdir()
+    (run_dir / "test-results" / "video.webm").write_bytes(b"x" * 4096)
+    return run_dir
+
+
+def test_finished_run_observations():
+    before = scrape()
+    metrics.observe_run(make_run_dir(), "passed", priority="bulk")
+    after = scrape()
+
+    def delta(name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        return after.get(key, 0) - before.get(key, 0)
+
+    assert (
+        delta("playwright_agent_runs_completed_total", status="passed", priority="bulk")
+        == 1
+    )
+    assert (
+        delta(
+            "playwright_agent_stage_duration_seconds_count",
+            stage="metrics_test_stage",
+            source="cli",
+            status="ok",
+        )
+        == 1
+    )
+    assert (
+        delta(
+            "playwright_agent_llm_call_duration_seconds_bucket",
+            stage="metrics_test_llm",
+            provider="anthropic",
+            status="ok",
+            le="5.0",
+        )
+        == 1
+    )
+    assert (
+        delta(
+            "playwright_agent_llm_tokens_total",
+            stage="metrics_test_llm",
+            provider="anthropic",
+            kind="input",
+        )
+        == 1000
+    )
+    assert delta("playwright_agent_validator_attempts_sum", status="success") == 2
+    assert delta("playwright_agent_artifact_bytes_total", kind="video") == 4096
+
+
+def test_slots_and_status_counts():
+    init_db()
+    with Session(engine) as session:
+        session.add(
+            DBTestRun(
+                id="metrics-run-1", spec_name="metrics.md", status="metrics_test_status"
+            )
+        )
+        session.commit()
+
+    async def hold_slots():
+        semaphore = asyncio.Semaphore(1)
+        async with metrics.execution_slot(semaphore):
+            waiter = asyncio.create_task(metrics.execution_slot(semaphore).__aenter__())
+            await asyncio.sleep(0)
+            samples = scrape()
+            waiter.cancel()
+            return samples
+
+    samples = asyncio.run(hold_slots())
+    assert samples[("playwright_agent_execution_slots_in_use", ())] == 1
+    assert samples[("playwright_agent_run_queue_depth", ())] == 1
+    assert samples[("playwright_agent_execution_slots", ())] == 2
+
+    after = scrape()
+    assert after[("playwright_agent_execution_slots_in_use", ())] == 0
+    assert after[("playwright_agent_run_queue_depth", ())] == 0
+    assert after[("playwright_agent_runs", (("status", "metrics_test_status"),))] == 1
+
+
+if __name__ == "__main__":
+    test_finished_run_observations()
+    test_slots_and_status_counts()
+    print("✅ Metrics OK")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test 19: Exporter Cache
+Verifies identical traces (up to timestamps, durations and details) reuse a
+cached export without an LLM round trip, that the prompt version follows
+the exporter's prompt template and a version change invalidates entries,
+and that cache statistics are reported and survive the event log being
+rolled up into running totals.
+"""
+
+import asyncio
+import copy
+import hashlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# Add project root to path for package imports
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from orchestrator.utils import export_cache
+from orchestrator.utils.export_cache import ExportCache, trace_hash
+from orchestrator.workflows import exporter as exporter_module
+from orchestrator.workflows.exporter import Exporter
+
+RUN = {
+    "testName": "Login",
+    "startTime": "2026-10-19T10:00:00Z",
+    "duration": 12.5,
+    "specFileName": "login.md",
+    "steps": [
+        {
+            "stepNumber": 1,
+            "action": "navigate",
+            "target": "https://example.com",
+            "result": "success",
+            "timestamp": "2026-10-19T10:00:01Z",
+            "details": "Loaded",
+            "description": "Open site",
+        },
+        {
+            "stepNumber": 2,
+            "action": "click",
+            "selector": "page.getByRole('button', { name: 'Login' })",
+            "result": "success",
+            "timestamp": "2026-10-19T10:00:03Z",
+            "details": "Clicked",
+            "description": "Log in",
+        },
+        # No code template for select, so the export goes to the LLM
+        {
+            "stepNumber": 3,
+            "action": "select",
+            "selector": "#country",
+            "value": "NL",
+            "result": "success",
+            "timestamp": "2026-10-19T10:00:05Z",
+            "details": "Selected",
+            "description": "Pick country",
+        },
+    ],
+}
+EXPORT = {
+    "testFilePath": "tests/generated/login.spec.ts",
+    "code": "test('login', async () => {});",
+    "dependencies": ["@playwright/test"],
+    "notes": [],
+}
+
+
+def make_exporter(cache: ExportCache):
+    exporter = Exporter(
+        schema_path=str(PROJECT_ROOT / "schemas" / "export.schema.json"), cache=cache
+    )
+    calls = []
+
+    async def fake_query_agent(prompt):
+        calls.append(prompt)
+        return copy.deepcopy(EXPORT)
+
+    exporter._query_agent = fake_query_agent
+    return exporter, calls
+
+
+def test_identical_traces_hit_cache():
+    tmp = Path(tempfile.mkdtemp(prefix="pw-agent-exportcache-"))
+    cache = ExportCache(tmp / "cache", prompt_version="1")
+    exporter, calls = make_exporter(cache)
+
+    rerun = copy.deepcopy(RUN)
+    rerun["duration"] = 30.1
+    for step in rerun["steps"]:
+        step["timestamp"] = "2026-10-20T08:00:00Z"
+        step["details"] = "Different wording"
+    assert trace_hash(rerun) == trace_hash(RUN)
+
+    first = asyncio.run(
+        exporter.export(copy.deepcopy(RUN), test_dir=str(tmp / "generated"))
+    )
+    second = asyncio.run(exporter.export(rerun, test_dir=str(tmp / "generated")))
+    assert len(calls) == 1
+    assert second["code"] == first["code"] and second["traceHash"] == first["traceHash"]
+    assert (tmp / "generated" / "login.spec.ts").read_text() == EXPORT["code"]
+
+    changed = copy.deepcopy(RUN)
+    changed["steps"][1]["selector"] = "#login"
+    asyncio.run(exporter.export(changed, test_dir=str(tmp / "generated")))
+    assert len(calls) == 2
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["entries"] == 2
+
+
+def test_prompt_version_invalidates():
+    tmp = Path(tempfile.mkdtemp(prefix="pw-agent-exportcache-"))
+    exporter, calls = make_exporter(ExportCache(tmp / "cache", prompt_version="1"))
+    asyncio.run(exporter.export(copy.deepcopy(RUN), test_dir=str(tmp / "generated")))
+
+    bumped = ExportCache(tmp / "cache", prompt_version="2")
+    exporter, calls = make_exporter(bumped)
+    asyncio.run(exporter.export(copy.deepcopy(RUN), test_dir=str(tmp / "generated")))
+    assert len(calls) == 1
+    assert bumped.stats()["invalidations"] == 1
+
+    assert bumped.invalidate(keep_version="2") == 0
+    assert bumped.invalidate() == 1 and bumped.stats()["entries"] == 0
+
+
+def test_prompt_version_follows_template(tmp_path):
+    template = exporter_module.EXPORT_PROMPT_TEMPLATE
+    assert (
+        exporter_module.PROMPT_VERSION
+        == hashlib.sha256(template.encode()).hexdigest()[:12]
+    )
+
+    exporter, calls = make_exporter(ExportCache(tmp_path / "cache"))
+    asyncio.run(
+        exporter.export(copy.deepcopy(RUN), test_dir=str(tmp_path / "generated"))
+    )
+    assert "{trace}" not in calls[0] and '"testName": "Login"' in calls[0]
+
+
+def test_event_log_is_rolled_up(monkeypatch, tmp_path):
+    monkeypatch.setattr(export_cache, "EVENTS_MAX_BYTES", 1024)
+    cache = ExportCache(tmp_path / "cache", prompt_version="1")
+    cache.put("a" * 64, EXPORT)
+    for _ in range(50):
+        cache.get("a" * 64)
+        cache.get("b" * 64)
+    assert (tmp_path / "cache" / export_cache.EVENTS_FILE).stat().st_size < 1024
+    assert (tmp_path / "cache" / export_cache.COUNTERS_FILE).exists()
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stores"], stats["entries"]) == (
+        50,
+        50,
+        1,
+        1,
+    )
+    # The totals file is not a cache entry
+    assert cache.invalidate() == 1 and cache.stats()["hits"] == 50
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
+    print("✅ Export cache OK")
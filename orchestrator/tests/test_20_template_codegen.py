@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test 20: Template Code Generation
+Verifies simple traces with recorded selectors are turned into Playwright
+code without an LLM, and that anything else falls back to the LLM exporter.
+"""
+
+import asyncio
+import copy
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# Add project root to path for package imports
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from orchestrator.utils.export_cache import ExportCache
+from orchestrator.utils.template_codegen import generate_from_trace, locator_expression
+from orchestrator.workflows.exporter import Exporter
+
+RUN = {
+    "testName": "Login works",
+    "specFileName": "01_login.md",
+    "steps": [
+        {
+            "stepNumber": 1,
+            "action": "navigate",
+            "target": "https://the-internet.herokuapp.com/login",
+            "result": "success",
+            "description": "Open login page",
+        },
+        {
+            "stepNumber": 2,
+            "action": "fill",
+            "selector": "page.getByLabel('Username')",
+            "selectorType": "label",
+            "value": "{{LOGIN_USERNAME}}",
+            "result": "success",
+            "description": "Enter username",
+        },
+        {
+            "stepNumber": 3,
+            "action": "fill",
+            "selector": "#password",
+            "selectorType": "css",
+            "value": "{{LOGIN_PASSWORD}}",
+            "result": "success",
+            "description": "Enter password",
+        },
+        {
+            "stepNumber": 4,
+            "action": "click",
+            "selector": "getByRole('button', { name: 'Login' })",
+            "selectorType": "role",
+            "result": "success",
+            "description": "Submit",
+        },
+        {
+            "stepNumber": 5,
+            "action": "assert",
+            "selector": "#flash",
+            "selectorType": "css",
+            "value": "You logged into a secure area!",
+            "result": "success",
+            "description": "Check welcome",
+        },
+        {
+            "stepNumber": 6,
+            "action": "screenshot",
+            "result": "success",
+            "description": "Secure area",
+        },
+    ],
+}
+
+
+def test_generates_code_for_simple_trace():
+    code = generate_from_trace(RUN)["code"]
+    assert "await page.goto('https://the-internet.herokuapp.com/login');" in code
+    assert (
+        "await page.getByLabel('Username').fill(process.env.LOGIN_USERNAME!);" in code
+    )
+    assert "await page.locator('#password').fill(process.env.LOGIN_PASSWORD!);" in code
+    assert "await page.getByRole('button', { name: 'Login' }).click();" in code
+    assert (
+        "await expect(page.locator('#flash')).toContainText('You logged into a secure area!');"
+        in code
+    )
+    assert "await expect(page).toHaveScreenshot('secure-area.png');" in code
+    assert code.count("await test.step(") == 6
+
+
+def test_falls_back_when_a_step_is_not_templatable():
+    for change in (
+        {"selector": None},
+        {"action": "hover"},
+        {"result": "failed"},
+        {"selector": "the login button"},
+    ):
+        run = copy.deepcopy(RUN)
+        run["steps"][3].update(change)
+        assert generate_from_trace(run) is None, change
+    assert locator_expression("page.getByText('x'); await page.close()") is None
+
+
+def test_exporter_skips_llm_for_simple_trace(isolated_stores, tmp_path):
+    exporter = Exporter(
+        schema_path=str(PROJECT_ROOT / "schemas" / "export.schema.json"),
+        cache=ExportCache(tmp_path / "cache"),
+    )
+
+    async def no_llm(prompt):
+        raise AssertionError("LLM should not be queried")
+
+    exporter._query_agent = no_llm
+    result = asyncio.run(
+        exporter.export(copy.deepcopy(RUN), test_dir=str(tmp_path / "generated"))
+    )
+    assert result["generator"] == "template"
+    assert (tmp_path / "generated" / "01-login.spec.ts").read_text() == result["code"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
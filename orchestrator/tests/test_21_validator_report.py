@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Test 21: Validator JSON Report
+Verifies Playwright JSON reports are parsed into structured failure records,
+that the validator sends only the failing excerpt to the fixer, that prompt
+size and fix latency are recorded per attempt, that a test passing on a
+Playwright retry counts as passed but is reported as flaky, and that a report
+written to a temp dir is removed once parsed.
+"""
+
+import asyncio
+import json
+import os
+import stat
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from orchestrator.utils.playwright_report import failure_excerpt, parse_report
+from orchestrator.workflows.validator import Validator
+
+ERROR = (
+    "Error: \x1b[2mexpect(\x1b[22mlocator).toBeVisible()\n\nLocator: locator('#flash')\n"
+    "Expected: visible\nReceived: <element(s) not found>\nCall log:\n"
+    "  - waiting for locator('#flash')\n"
+)
+REPORT = {
+    "stats": {"expected": 1, "unexpected": 1, "flaky": 0, "skipped": 0},
+    "errors": [],
+    "suites": [
+        {
+            "title": "login.spec.ts",
+            "file": "login.spec.ts",
+            "specs": [],
+            "suites": [
+                {
+                    "title": "Login",
+                    "specs": [
+                        {
+                            "title": "opens",
+                            "file": "login.spec.ts",
+                            "line": 3,
+                            "tests": [
+                                {
+                                    "projectName": "chromium",
+                                    "status": "expected",
+                                    "results": [{"status": "passed"}],
+                                }
+                            ],
+                        },
+                        {
+                            "title": "logs in",
+                            "file": "login.spec.ts",
+                            "line": 9,
+                            "tests": [
+                                {
+                                    "projectName": "chromium",
+                                    "status": "unexpected",
+                                    "results": [
+                                        {
+                                            "status": "failed",
+                                            "error": {
+                                                "message": ERROR,
+                                                "location": {
+                                                    "file": "/t/login.spec.ts",
+                                                    "line": 14,
+                                                },
+                                                "snippet": "> 14 |   await expect(page.locator('#flash')).toBeVisible();",
+                                            },
+                                            "steps": [
+                                                {"title": "Submit", "steps": []},
+                                                {
+                                                    "title": "Check welcome",
+                                                    "error": {"message": ERROR},
+                                                    "steps": [],
+                                                },
+                                            ],
+                                            "attachments": [
+                                                {
+                                                    "name": "screenshot",
+                                                    "path": "/t/test-failed-1.png",
+                                                },
+                                                {"name": "trace", "body": "inline"},
+                                            ],
+                                        }
+                                    ],
+                                }
+                            ],
+                        },
+                    ],
+                }
+            ],
+        }
+    ],
+}
+
+# Run with retries: "logs in" failed on the first try and passed on the second
+FLAKY_REPORT = {
+    "stats": {"expected": 1, "unexpected": 0, "flaky": 1, "skipped": 0},
+    "errors": [],
+    "suites": [
+        {
+            "title": "login.spec.ts",
+            "file": "login.spec.ts",
+            "specs": [],
+            "suites": [
+                {
+                    "title": "Login",
+                    "specs": [
+                        REPORT["suites"][0]["suites"][0]["specs"][0],
+                        {
+                            "title": "logs in",
+                            "file": "login.spec.ts",
+                            "line": 9,
+                            "tests": [
+                                {
+                                    "projectName": "chromium",
+                                    "status": "flaky",
+                                    "results": [
+                                        {
+                                            "status": "failed",
+                                            "retry": 0,
+                                            "error": {"message": ERROR},
+                                            "steps": [],
+                                        },
+                                        {"status": "passed", "retry": 1, "steps": []},
+                                    ],
+                                }
+                            ],
+                        },
+                    ],
+                }
+            ],
+        }
+    ],
+}
+
+
+def fake_npx(report: dict, exit_code: int) -> str:
+    """Stand-in for npx: writes the JSON report and a lot of noise, then exits."""
+    return f"""#!{sys.executable}
+import os, sys
+open(os.environ["PLAYWRIGHT_JSON_OUTPUT_NAME"], "w").write({json.dumps(json.dumps(report))})
+print("noise " * 20000)
+sys.exit({exit_code})
+"""
+
+
+def run_validator(
+    tmp: Path, npx_source: str, validator: Validator, output_dir: str = "out"
+) -> dict:
+    bin_dir = tmp / "bin"
+    bin_dir.mkdir()
+    npx = bin_dir / "npx"
+    npx.write_text(npx_source)
+    npx.chmod(npx.stat().st_mode | stat.S_IEXEC)
+    test_file = tmp / "login.spec.ts"
+    test_file.write_text("test('logs in', async () => {});")
+    path = os.environ["PATH"]
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{path}"
+    try:
+        return asyncio.run(
+            validator.validate_and_fix(
+                str(test_file), str(tmp / output_dir) if output_dir else None
+            )
+        )
+    finally:
+        os.environ["PATH"] = path
+
+
+def test_parse_report():
+    parsed = parse_report(REPORT)
+    assert len(parsed["failures"]) == 1
+    failure = parsed["failures"][0]
+    assert failure.test == "Login > logs in" and failure.project == "chromium"
+    assert failure.step == "Check welcome"
+    assert failure.locator == "locator('#flash')"
+    assert failure.location == "/t/login.spec.ts:14"
+    assert failure.attachments == ["/t/test-failed-1.png"]
+    assert "\x1b" not in failure.error
+
+    excerpt = failure_excerpt(parsed["failures"])
+    assert "Step: Check welcome" in excerpt and "Locator: locator('#flash')" in excerpt
+    assert parsed["flaky"] == []
+
+    flaky = parse_report(FLAKY_REPORT)
+    assert flaky["failures"] == []
+    assert [f.test for f in flaky["flaky"]] == ["Login > logs in"]
+    assert (
+        flaky["flaky"][0].status == "failed"
+        and flaky["flaky"][0].locator == "locator('#flash')"
+    )
+
+
+def test_validator_sends_excerpt_and_tracks_attempts(isolated_stores, tmp_path):
+    validator = Validator(max_attempts=2)
+    excerpts = []
+
+    async def fake_fix(test_file, error_output, test_code):
+        excerpts.append(error_output)
+        return {"status": "fixed", "promptChars": len(error_output) + 1000}
+
+    validator._fix_test = fake_fix
+    result = run_validator(tmp_path, fake_npx(REPORT, 1), validator)
+
+    assert result["status"] == "failed" and result["attempts"] == 2
+    assert len(excerpts) == 1 and "noise" not in excerpts[0] and len(excerpts[0]) < 2000
+    first, second = result["attemptDetails"]
+    assert first["fixPromptChars"] == len(excerpts[0]) + 1000 and first["fixMs"] >= 0
+    assert first["failures"][0]["locator"] == "locator('#flash')"
+    assert "fixMs" not in second
+    saved = json.loads((tmp_path / "out" / "validation.json").read_text())
+    assert saved["attemptDetails"][0]["fixStatus"] == "fixed"
+
+
+def test_flaky_retry_passes_without_fix(isolated_stores, tmp_path):
+    validator = Validator(max_attempts=2)
+    fixes = []
+
+    async def fake_fix(test_file, error_output, test_code):
+        fixes.append(error_output)
+        return {"status": "fixed"}
+
+    validator._fix_test = fake_fix
+    # Playwright exits 0 when the only failures passed on retry
+    result = run_validator(tmp_path, fake_npx(FLAKY_REPORT, 0), validator)
+    assert result["status"] == "success" and result["attempts"] == 1 and fixes == []
+    assert result["flaky"] is True and result["flakyTests"] == ["Login > logs in"]
+
+
+def test_report_without_output_dir_is_removed(isolated_stores, tmp_path, monkeypatch):
+    temp_root = tmp_path / "tmp"
+    temp_root.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(temp_root))
+    result = run_validator(
+        tmp_path, fake_npx(FLAKY_REPORT, 0), Validator(max_attempts=1), output_dir=None
+    )
+    assert result["status"] == "success" and result["flaky"] is True
+    assert list(temp_root.iterdir()) == []
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test 22: Selector Healing Store
+Verifies heals are stored per selector and URL pattern with confidence,
+that the validator tries known heals before the LLM fixer, and that heals
+are learned from LLM fixes.
+"""
+
+import asyncio
+import json
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from orchestrator.utils.selector_heals import HealingStore, apply_heals
+from orchestrator.workflows import validator as validator_module
+
+OLD = "getByRole('button', { name: 'Log in' })"
+NEW = "getByRole('button', { name: 'Sign in' })"
+PAGE = "https://example.com/accounts/1/login"
+TEST_CODE = f"""import {{ test }} from '@playwright/test';
+test('login', async ({{ page }}) => {{
+  await page.goto('https://example.com/accounts/42/login');
+  await page.{OLD}.click();
+}});
+"""
+
+# Stand-in for npx: passes once the test uses the new button name
+FAKE_NPX = f"""#!{sys.executable}
+import json, os, sys
+passed = "Sign in" in open(sys.argv[3]).read()
+failure = {{"title": "login", "file": "t.spec.ts", "line": 2, "tests": [{{"projectName": "chromium",
+    "status": "unexpected", "results": [{{"status": "failed", "error": {{"message":
+    "TimeoutError: locator.click: Timeout 5000ms exceeded.\\nCall log:\\n  - waiting for {OLD}\\n"}}}}]}}]}}
+report = {{"stats": {{"expected": int(passed), "unexpected": int(not passed)}}, "errors": [],
+          "suites": [] if passed else [{{"title": "t.spec.ts", "specs": [failure]}}]}}
+open(os.environ["PLAYWRIGHT_JSON_OUTPUT_NAME"], "w").write(json.dumps(report))
+sys.exit(0 if passed else 1)
+"""
+
+
+def setup_validator(tmp: Path):
+    """Point `npx` at the stand-in."""
+    (tmp / "bin").mkdir()
+    npx = tmp / "bin" / "npx"
+    npx.write_text(FAKE_NPX)
+    npx.chmod(npx.stat().st_mode | stat.S_IEXEC)
+    test_file = tmp / "login.spec.ts"
+    test_file.write_text(TEST_CODE)
+    return tmp, test_file
+
+
+def run_validator(validator, tmp: Path, test_file: Path):
+    path = os.environ["PATH"]
+    os.environ["PATH"] = f"{tmp / 'bin'}{os.pathsep}{path}"
+    try:
+        return asyncio.run(validator.validate_and_fix(str(test_file), str(tmp / "out")))
+    finally:
+        os.environ["PATH"] = path
+
+
+def test_store_matches_selector_and_url_pattern(db_url):
+    store = HealingStore(db_url)
+    heal_id = store.record_heal(OLD, NEW, url="https://example.com/accounts/42/login")
+
+    (heal,) = store.find(
+        "page.getByRole('button',{name:'Log in'})",
+        url="https://example.com/accounts/7/login",
+    )
+    assert heal.healed_selector == NEW and heal.last_verified_at is not None
+    assert abs(heal.confidence - 2 / 3) < 1e-9
+    assert store.find(OLD, url="https://example.com/settings") == []
+
+    store.record_result(heal_id, ok=False)
+    store.record_result(heal_id, ok=False)
+    assert store.find(OLD, PAGE, min_confidence=0.0)[0].confidence == 0.4
+    assert store.known_heals([PAGE]) == []
+    assert [h.id for h in store.list_heals()] == [heal_id]
+
+    code, applied = apply_heals(TEST_CODE, store.find(OLD, PAGE, min_confidence=0.0))
+    assert NEW in code and OLD not in code and len(applied) == 1
+
+
+def test_unknown_page_matches_nothing(db_url):
+    store = HealingStore(db_url)
+    assert store.record_heal(OLD, NEW, url=None) is None  # Could never be matched
+    assert store.list_heals() == []
+    store.record_heal(OLD, NEW, url=PAGE)
+    # Code without a page.goto(): no url to match on, so no heal applies
+    assert (
+        store.find(OLD, None) == []
+        and store.known_heals([None]) == []
+        and store.known_heals([]) == []
+    )
+    assert len(store.known_heals([None, PAGE], min_confidence=0.0)) == 1
+
+
+def test_validator_applies_known_heal_without_llm(isolated_stores, tmp_path):
+    url = isolated_stores
+    HealingStore(url).record_heal(OLD, NEW, url="https://example.com/accounts/1/login")
+    tmp, test_file = setup_validator(tmp_path)
+    validator = validator_module.Validator(max_attempts=2)
+
+    async def no_llm(*args):
+        raise AssertionError("LLM fixer should not be called")
+
+    validator._fix_test = no_llm
+    result = run_validator(validator, tmp, test_file)
+    assert result["status"] == "success" and result["attempts"] == 1
+    assert result["attemptDetails"][0]["localHeals"][0]["healed_selector"] == NEW
+    assert NEW in test_file.read_text()
+    assert HealingStore(url).find(OLD, PAGE)[0].successes == 2
+
+
+def test_validator_learns_heal_from_llm_fix(isolated_stores, tmp_path):
+    url = isolated_stores
+    tmp, test_file = setup_validator(tmp_path)
+    validator = validator_module.Validator(max_attempts=2)
+
+    async def fake_fix(test_file, error_output, test_code):
+        Path(test_file).write_text(
+            test_code.replace("name: 'Log in'", "name: 'Sign in'")
+        )
+        return {"status": "fixed", "promptChars": 100}
+
+    validator._fix_test = fake_fix
+    result = run_validator(validator, tmp, test_file)
+    assert result["status"] == "success" and result["attempts"] == 2
+    (heal,) = HealingStore(url).find(OLD, url="https://example.com/accounts/9/login")
+    assert (
+        heal.healed_selector == NEW
+        and heal.url_pattern == "example.com/accounts/*/login"
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test 24: Sharded Bulk Runs
+Verifies shards are balanced by historical spec duration, that several
+worker processes claim every shard exactly once and update the runs, that
+an abandoned shard is taken over without rerunning finished specs or
+starting a spec its previous worker is still running, and that
+results roll up into one bulk-run summary.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from sqlalchemy import create_engine, text
+from sqlmodel import Session
+
+from orchestrator.api import sharding
+from orchestrator.api.models_db import RunStage, TestRun as DBTestRun
+from orchestrator.utils import timeline as run_timeline
+
+
+def fake_execute(spec_path, run_dir, try_code_path, browser, priority):
+    """Stands in for the CLI: marks the run passed and notes which process ran it."""
+    started = time.time()
+    time.sleep(0.05)
+    Path(run_dir, "run.json").write_text(
+        json.dumps({"finalState": "passed", "steps": [{}, {}]})
+    )
+    with open(Path(run_dir, "executions.txt"), "a") as f:
+        f.write(f"{os.getpid()}\n")
+    return run_timeline.stage_entry(
+        "run",
+        "api",
+        started,
+        wall_ms=(time.time() - started) * 1000,
+        cpu_ms=None,
+        peak_rss_mb=None,
+    )
+
+
+def add_runs(engine, run_ids, spec_name="spec.md"):
+    with Session(engine) as session:
+        for run_id in run_ids:
+            session.add(DBTestRun(id=run_id, spec_name=spec_name, status="pending"))
+        session.commit()
+
+
+def test_balance_and_estimates(db_url):
+    jobs = [
+        {"run_id": f"r{i}", "estimated_ms": ms}
+        for i, ms in enumerate([50, 40, 30, 20, 10, 10])
+    ]
+    shards = sharding.balance_shards(jobs, 2)
+    assert sorted(sum(j["estimated_ms"] for j in shard) for shard in shards) == [80, 80]
+    assert len(sharding.balance_shards(jobs[:1], 4)) == 1
+
+    engine = create_engine(db_url)
+    add_runs(engine, ["slow-1", "slow-2", "slow-3"], "slow.md")
+    add_runs(engine, ["fast-1"], "fast.md")
+    with Session(engine) as session:
+        for run_id, ms in [
+            ("slow-1", 90_000),
+            ("slow-2", 100_000),
+            ("slow-3", 400_000),
+            ("fast-1", 10_000),
+        ]:
+            session.add(
+                RunStage(
+                    run_id=run_id,
+                    stage="run",
+                    source="api",
+                    started_at=datetime.utcnow(),
+                    wall_ms=ms,
+                )
+            )
+        session.commit()
+    with engine.connect() as conn:
+        durations = sharding.estimate_durations(conn, ["slow.md", "fast.md", "new.md"])
+    assert durations == {"slow.md": 100_000, "fast.md": 10_000, "new.md": 55_000}
+
+
+def set_runs(engine, **runs):
+    """run_id=(status, heartbeat_at) for runs another worker is executing."""
+    with Session(engine) as session:
+        for run_id, (status, heartbeat_at) in runs.items():
+            run = session.get(DBTestRun, run_id)
+            run.status, run.heartbeat_at = status, heartbeat_at
+            session.add(run)
+        session.commit()
+
+
+def test_workers_run_every_shard_once(db_url, isolated_stores, tmp_path):
+    url, engine = db_url, create_engine(db_url)
+    runs_dir = tmp_path / "runs"
+    run_ids = [f"run-{i}" for i in range(8)]
+    add_runs(engine, run_ids)
+    queue = sharding.ShardQueue(url)
+    shards = queue.create(
+        "bulk-1", [{"spec_name": "spec.md", "run_id": r} for r in run_ids], 4
+    )
+    assert len(shards) == 4 and all(len(s.jobs) == 2 for s in shards)
+
+    workers = sharding.start_local_workers(
+        3, "bulk-1", url, execute=fake_execute, runs_dir=runs_dir
+    )
+    for process in workers:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    for run_id in run_ids:
+        assert len((runs_dir / run_id / "executions.txt").read_text().split()) == 1
+    with Session(engine) as session:
+        assert {session.get(DBTestRun, r).status for r in run_ids} == {"passed"}
+
+    summary = queue.summary("bulk-1")
+    assert summary["status"] == "done" and summary["progress"] == 1.0
+    assert summary["by_status"] == {"passed": 8} and summary["total"] == 8
+    assert all(s["status"] == "done" for s in summary["shards"])
+    assert queue.summary("no-such-bulk") is None
+
+
+def test_abandoned_shard_is_taken_over(db_url, isolated_stores, tmp_path, monkeypatch):
+    monkeypatch.setattr(sharding, "POLL_SECONDS", 0.05)
+    url, engine = db_url, create_engine(db_url)
+    runs_dir = tmp_path / "runs"
+    run_ids = ["a", "b", "c", "d"]
+    add_runs(engine, run_ids)
+    queue = sharding.ShardQueue(url)
+    queue.create("bulk-2", [{"spec_name": "spec.md", "run_id": r} for r in run_ids], 1)
+
+    shard = queue.claim("crashed-worker", "bulk-2")
+    shard.results["a"] = {"status": "passed"}
+    assert queue.heartbeat(shard, "crashed-worker", results=True)
+    assert queue.claim("other-worker", "bulk-2") is None  # Still alive
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE bulk_shard SET heartbeat_at = 0"))
+    # b finished before its result was saved, c's worker died while running
+    # it, and d is still running on the worker that lost the shard
+    set_runs(engine, b=("passed", None), c=("running", datetime(2020, 1, 1)))
+    set_runs(engine, d=("running", datetime.utcnow()))
+    finish_d = threading.Timer(0.3, set_runs, [engine], {"d": ("failed", None)})
+    finish_d.start()
+
+    worker = sharding.ShardWorker(
+        queue, "other-worker", "bulk-2", fake_execute, runs_dir=runs_dir
+    )
+    assert worker.run(exit_when_idle=True) == 1
+    finish_d.join()
+    assert sorted(p.name for p in runs_dir.iterdir()) == ["c"]
+    assert len((runs_dir / "c" / "executions.txt").read_text().split()) == 1
+    assert not queue.heartbeat(shard, "crashed-worker")
+    (done,) = queue.shards("bulk-2")
+    assert done.status == "done" and done.attempts == 2
+    assert {r: result["status"] for r, result in done.results.items()} == {
+        "a": "passed",
+        "b": "passed",
+        "c": "passed",
+        "d": "failed",
+    }
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
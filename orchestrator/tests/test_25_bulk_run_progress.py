@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test 25: Bulk Run Progress
+Verifies a bulk run is recorded as one BulkRun linked to its TestRuns, that
+its summary reports counts by status, failed runs and an ETA from
+historical durations, that the estimates are computed once per bulk run,
+and that progress streams as server-sent events.
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlmodel import Session
+
+from orchestrator.api import bulk_runs, main, sharding
+from orchestrator.api.models_db import BulkRun, TestRun as DBTestRun
+from orchestrator.utils import timeline as run_timeline
+
+
+def fake_execute(
+    spec_path, run_dir, try_code_path=None, browser="chromium", priority="interactive"
+):
+    """Stands in for the CLI: specs named fail_* fail, the rest pass."""
+    started = time.time()
+    state = "failed" if Path(spec_path).name.startswith("fail_") else "passed"
+    Path(run_dir, "run.json").write_text(json.dumps({"finalState": state, "steps": []}))
+    return run_timeline.stage_entry(
+        "run", "api", started, wall_ms=5, cpu_ms=None, peak_rss_mb=None
+    )
+
+
+def make_specs(names):
+    """Spec files with names unique to this test."""
+    prefix = f"bulk_{uuid.uuid4().hex[:8]}"
+    specs = [
+        (
+            f"{prefix}_{name}.md"
+            if not name.startswith("fail_")
+            else f"fail_{prefix}_{name}.md"
+        )
+        for name in names
+    ]
+    for spec in specs:
+        (main.SPECS_DIR / spec).write_text(f"# {spec}\n")
+    return specs
+
+
+def test_makespan():
+    assert bulk_runs.makespan_ms([5, 4, 3, 3], 2) == 8
+    assert bulk_runs.makespan_ms([10, 1], 4) == 10
+    assert bulk_runs.makespan_ms([], 2) == 0
+
+
+def test_bulk_run_summary_and_stream(api_db, api_project, monkeypatch):
+    specs = make_specs(["a", "b", "fail_c"])
+    client = TestClient(main.app)
+    with monkeypatch.context() as patch:
+        patch.setattr(main, "execute_run_task", fake_execute)
+        created = client.post("/runs/bulk", json={"spec_names": specs}).json()
+
+    summary = client.get(f"/runs/bulk/{created['bulk_run_id']}").json()
+    assert summary["status"] == "completed" and summary["progress"] == 1.0
+    assert summary["counts"] == {"passed": 2, "failed": 1} and summary["eta_ms"] == 0
+    assert [r["spec_name"] for r in summary["failed_runs"]] == [specs[2]]
+    assert summary["finished_at"] is not None
+
+    with client.stream(
+        "GET", f"/runs/bulk/{created['bulk_run_id']}/events"
+    ) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+    events = [
+        line.split(": ", 1)[1]
+        for line in body.splitlines()
+        if line.startswith("event: ")
+    ]
+    assert events == ["progress", "done"]
+    assert client.get("/runs/bulk/no-such-bulk").status_code == 404
+
+
+def test_sharded_bulk_run_eta_and_completion(api_db, api_project):
+    specs = make_specs(["x", "y", "z", "w"])
+    client = TestClient(main.app)
+    created = client.post("/runs/bulk", json={"spec_names": specs, "shards": 2}).json()
+    bulk_run_id = created["bulk_run_id"]
+
+    pending = client.get(f"/runs/bulk/{bulk_run_id}").json()
+    assert pending["status"] == "pending" and pending["counts"] == {"pending": 4}
+    # No history: every spec is estimated at the default, two per shard
+    assert pending["eta_ms"] == 2 * sharding.DEFAULT_SPEC_MS
+    assert pending["sharding"]["total"] == 4
+
+    worker = sharding.ShardWorker(
+        main.SHARD_QUEUE,
+        "test-worker",
+        bulk_run_id,
+        fake_execute,
+        specs_dir=main.SPECS_DIR,
+        runs_dir=main.RUNS_DIR,
+    )
+    assert worker.run(exit_when_idle=True) == 2
+
+    done = client.get(f"/runs/bulk/{bulk_run_id}").json()
+    assert done["status"] == "completed" and done["counts"] == {"passed": 4}
+    assert done["sharding"]["status"] == "done"
+
+
+def test_summary_estimates_once(db_url, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        bulk_runs,
+        "estimate_durations",
+        lambda conn, names: calls.append(sorted(names))
+        or {name: 1000.0 for name in names},
+    )
+    with Session(create_engine(db_url)) as session:
+        session.add(BulkRun(id="bulk-cached", total=4))
+        for run_id, spec_name, status in [
+            ("r1", "a.md", "passed"),
+            ("r2", "b.md", "failed"),
+            ("r3", "c.md", "running"),
+            ("r4", "c.md", "pending"),
+        ]:
+            session.add(
+                DBTestRun(
+                    id=run_id,
+                    spec_name=spec_name,
+                    status=status,
+                    bulk_run_id="bulk-cached",
+                )
+            )
+        session.commit()
+        bulk = session.get(BulkRun, "bulk-cached")
+
+        first = bulk_runs.summarize(session, bulk, slots=1)
+        assert first["counts"] == {"passed": 1, "failed": 1, "running": 1, "pending": 1}
+        assert (
+            first["total"] == 4 and first["finished"] == 2 and first["eta_ms"] == 2000
+        )
+        assert first["failed_runs"] == [
+            {"id": "r2", "spec_name": "b.md", "status": "failed"}
+        ]
+        assert bulk_runs.summarize(session, bulk, slots=2)["eta_ms"] == 1000
+        assert calls == [["a.md", "b.md", "c.md"]]
+
+        for run_id in ("r3", "r4"):
+            session.get(DBTestRun, run_id).status = "passed"
+        session.commit()
+        assert bulk_runs.summarize(session, bulk, slots=1)["eta_ms"] == 0
+        assert "bulk-cached" not in bulk_runs._estimates
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
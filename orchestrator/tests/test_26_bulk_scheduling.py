@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Test 26: Bulk Run Scheduling
+Verifies spec durations are estimated from TestRun history (run stages, or
+run.json for runs without one), that bulk runs queue longest-first or
+previously-failing-first, and that the simulation reports the makespan.
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlmodel import Session
+
+from orchestrator.api import main, scheduling
+from orchestrator.api.models_db import RunStage, TestRun as DBTestRun
+from orchestrator.utils import timeline as run_timeline
+
+
+def add_history(db, runs_dir, runs):
+    """runs: (run_id, spec_name, status, wall_ms or None, run.json duration in seconds or None), oldest first."""
+    started = datetime.utcnow() - timedelta(hours=1)
+    with Session(db) as session:
+        for offset, (run_id, spec_name, status, wall_ms, duration) in enumerate(runs):
+            created = started + timedelta(seconds=offset)
+            session.add(
+                DBTestRun(
+                    id=run_id, spec_name=spec_name, status=status, created_at=created
+                )
+            )
+            if wall_ms:
+                session.add(
+                    RunStage(
+                        run_id=run_id,
+                        stage="run",
+                        source="api",
+                        started_at=created,
+                        wall_ms=wall_ms,
+                    )
+                )
+            if duration:
+                (runs_dir / run_id).mkdir(parents=True)
+                (runs_dir / run_id / "run.json").write_text(
+                    json.dumps({"duration": duration})
+                )
+        session.commit()
+
+
+def test_history_and_order(db_url, tmp_path):
+    db = create_engine(db_url)
+    runs_dir = tmp_path / "runs"
+    add_history(
+        db,
+        runs_dir,
+        [
+            ("long-1", "long.md", "passed", 300_000, None),
+            (
+                "long-2",
+                "long.md",
+                "passed",
+                None,
+                200,
+            ),  # No run stage: run.json duration
+            ("short-1", "short.md", "passed", 10_000, None),
+            ("short-2", "short.md", "failed", 20_000, None),
+            ("short-3", "short.md", "running", None, None),
+        ],
+    )
+    with db.connect() as conn:
+        history = scheduling.spec_history(
+            conn, ["short.md", "long.md", "new.md"], runs_dir
+        )
+    assert (
+        history["long.md"].estimated_ms == 250_000
+        and history["long.md"].last_status == "passed"
+    )
+    assert (
+        history["short.md"].estimated_ms == 15_000 and history["short.md"].last_failed
+    )
+    assert (
+        history["new.md"].estimated_ms == 132_500
+        and history["new.md"].last_status is None
+    )
+
+    # Only the HISTORY_RUNS newest finished runs of a spec count
+    add_history(
+        db,
+        runs_dir,
+        [
+            (f"many-{i}", "many.md", "passed", 900_000 if i < 5 else 1_000, None)
+            for i in range(5 + scheduling.HISTORY_RUNS)
+        ],
+    )
+    with db.connect() as conn:
+        assert (
+            scheduling.spec_history(conn, ["many.md"], runs_dir)["many.md"].durations_ms
+            == [1_000] * scheduling.HISTORY_RUNS
+        )
+
+    jobs = [{"spec_name": name} for name in ("short.md", "new.md", "long.md")]
+    names = lambda order: [
+        j["spec_name"] for j in scheduling.order_jobs(jobs, history, order)
+    ]
+    assert names("request") == ["short.md", "new.md", "long.md"]
+    assert names("longest_first") == ["long.md", "new.md", "short.md"]
+    assert names("failing_first") == ["short.md", "long.md", "new.md"]
+
+
+def test_simulate():
+    assert scheduling.simulate([1, 1, 4], 2)["makespan_ms"] == 5
+    assert scheduling.simulate([4, 1, 1], 2)["makespan_ms"] == 4
+    result = scheduling.simulate([4, 1, 1], 2, failed=[False, False, True])
+    assert result["first_failure_ms"] == 2
+    assert scheduling.simulate([1], 2)["first_failure_ms"] is None
+
+
+def make_specs(db_url, tag):
+    """Specs quick, slow and medium with one past run each; quick's failed."""
+    prefix = f"sched_{uuid.uuid4().hex[:8]}_{tag}"
+    specs = [f"{prefix}_{name}.md" for name in ("quick", "slow", "medium")]
+    for spec in specs:
+        (main.SPECS_DIR / spec).write_text(f"# {spec}\n")
+    add_history(
+        create_engine(db_url),
+        main.RUNS_DIR,
+        [
+            (f"{spec}-old", spec, "failed" if i == 0 else "passed", ms, None)
+            for i, (spec, ms) in enumerate(zip(specs, (5_000, 60_000, 30_000)))
+        ],
+    )
+    return specs
+
+
+def test_bulk_run_is_scheduled_longest_first(api_db, api_project, monkeypatch):
+    # One slot, so runs execute exactly in queue order
+    monkeypatch.setattr(main, "MAX_CONCURRENT_RUNS", 1)
+    executed = []
+
+    def fake_execute(spec_path, run_dir, *args):
+        executed.append(Path(spec_path).name)
+        return run_timeline.stage_entry(
+            "run", "api", time.time(), wall_ms=5, cpu_ms=None, peak_rss_mb=None
+        )
+
+    monkeypatch.setattr(main, "execute_run_task", fake_execute)
+    client = TestClient(main.app)
+    specs = make_specs(api_db, "lpt")
+    created = client.post("/runs/bulk", json={"spec_names": specs}).json()
+    assert executed == [specs[1], specs[2], specs[0]]
+    assert created["scheduled_run_ids"] == [created["run_ids"][i] for i in (1, 2, 0)]
+
+    executed.clear()
+    # Each request without a lifespan gets its own event loop, and the
+    # semaphore is bound to the loop it first made a run wait on
+    main.EXECUTION_SEMAPHORE = None
+    specs = make_specs(api_db, "failing")
+    client.post("/runs/bulk", json={"spec_names": specs, "order": "failing_first"})
+    assert executed == [specs[0], specs[1], specs[2]]
+    assert (
+        client.post(
+            "/runs/bulk", json={"spec_names": specs, "order": "random"}
+        ).status_code
+        == 400
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
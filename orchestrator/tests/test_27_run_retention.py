@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test 27: Run Retention
+Verifies a retention pass keeps the newest runs of each spec in full,
+compresses older logs, deletes videos and traces only past the media age, never
+touches run.json or active runs, changes nothing in dry-run mode, skips
+compacted runs on the next pass, and reports disk usage per spec.
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from sqlalchemy import create_engine
+from sqlmodel import Session
+
+from orchestrator.api import main, retention
+from orchestrator.api.models_db import TestRun as DBTestRun
+from orchestrator.utils.log_store import LogReader
+
+DAY = 86400
+POLICY = retention.RetentionPolicy(keep_runs=1, media_days=7, batch=100)
+
+
+def make_runs(root: Path, db_url: str):
+    """Spec a.md: runs 30, 10 and 2 days old plus an active one; b.md: one run, only in files."""
+    engine = create_engine(db_url)
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        for run_id, age, status in [
+            ("a-30", 30, "passed"),
+            ("a-10", 10, "failed"),
+            ("a-2", 2, "passed"),
+            ("a-40-running", 40, "running"),
+        ]:
+            session.add(
+                DBTestRun(
+                    id=run_id,
+                    spec_name="a.md",
+                    status=status,
+                    created_at=now - timedelta(days=age),
+                )
+            )
+            run_dir = root / "runs" / run_id
+            (run_dir / "test-results").mkdir(parents=True)
+            (run_dir / "run.json").write_text(json.dumps({"finalState": status}))
+            (run_dir / "execution.log").write_text("step ok\n" * 2000)
+            (run_dir / "test-results" / "video.webm").write_bytes(b"v" * 1000)
+            (run_dir / "test-results" / "trace.zip").write_bytes(b"t" * 500)
+            (run_dir / "screenshot.png").write_bytes(b"p" * 100)
+        session.commit()
+    other = root / "runs" / "b-1"
+    other.mkdir()
+    (other / "run.json").write_text(json.dumps({"testName": "Spec B"}))
+    os.utime(other, (time.time() - 60 * DAY,) * 2)
+    return root / "runs", engine
+
+
+def test_dry_run_changes_nothing(tmp_path, db_url):
+    runs_dir, engine = make_runs(tmp_path, db_url)
+    report = retention.apply_retention(runs_dir, engine, POLICY, dry_run=True)
+    assert (
+        report.runs_kept == 2 and report.runs_skipped == 1 and report.runs_scanned == 2
+    )
+    assert report.logs_compressed == 2 and report.media_deleted == 4
+    assert all((runs_dir / r / "execution.log").exists() for r in ("a-30", "a-10"))
+    assert not (runs_dir / "a-30" / retention.MARKER).exists()
+
+
+def test_retention_pass(tmp_path, db_url):
+    runs_dir, engine = make_runs(tmp_path, db_url)
+    report = retention.apply_retention(runs_dir, engine, POLICY)
+    assert (
+        report.logs_compressed == 2
+        and report.media_deleted == 4
+        and report.bytes_freed > 4 * 1500
+    )
+
+    old, recent, newest, active = (
+        runs_dir / r for r in ("a-30", "a-10", "a-2", "a-40-running")
+    )
+    for run_dir in (old, recent):
+        assert not (run_dir / "execution.log").exists()
+        assert LogReader(run_dir / "execution.log").read_text() == "step ok\n" * 2000
+        assert (run_dir / "run.json").exists() and (run_dir / "screenshot.png").exists()
+    # Past the media age only for the 30 and 10 day old runs
+    assert (
+        not (old / "test-results" / "video.webm").exists()
+        and not (recent / "test-results" / "trace.zip").exists()
+    )
+    for run_dir in (newest, active):
+        assert (run_dir / "execution.log").exists() and (
+            run_dir / "test-results" / "video.webm"
+        ).exists()
+    assert "step ok" in main.load_run_details("a-30", old)["log"]
+
+    again = retention.apply_retention(runs_dir, engine, POLICY)
+    assert (
+        again.runs_scanned == 0 and again.bytes_freed == 0 and again.runs_skipped == 3
+    )
+
+
+def test_disk_usage(tmp_path, db_url):
+    runs_dir, engine = make_runs(tmp_path, db_url)
+    usage = retention.disk_usage(runs_dir, engine)
+    assert list(usage) == ["a.md", "Spec B"]
+    assert usage["a.md"]["runs"] == 4 and usage["a.md"]["by_kind"]["media"] == 4 * 1500
+    assert usage["a.md"]["bytes"] == sum(usage["a.md"]["by_kind"].values())
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test 28: Compressed Run Logs
+Verifies execution.log is compacted into line-aligned compressed chunks
+with an index, that byte ranges, line ranges and the tail read back exactly
+from the plain and compacted forms, and that the API serves them (including
+HTTP Range requests) and rejects negative line numbers, while GET /runs/{id}
+only inlines the tail.
+"""
+
+import os
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from fastapi.testclient import TestClient
+
+from orchestrator.api import main
+from orchestrator.utils import log_store
+from orchestrator.utils.log_store import LogReader, compact_log
+
+
+def write_log(path: Path) -> bytes:
+    rng = random.Random(3)
+    lines = [
+        f"[{i:05d}] step {rng.choice(['click', 'fill', 'goto'])} ok"
+        for i in range(3000)
+    ]
+    lines[1500] = "x" * 5000  # Longer than a chunk
+    data = ("\n".join(lines) + "\n" + "no trailing newline").encode()
+    path.write_bytes(data)
+    return data
+
+
+def test_compacted_log_reads_back(tmp_path):
+    path = tmp_path / "execution.log"
+    data = write_log(path)
+    plain = LogReader(path)
+    assert plain.kind == "plain" and plain.line_count == 3001
+
+    compressed = compact_log(path, codec="gzip", chunk_bytes=4096)
+    assert compressed.name == "execution.log.gz" and not path.exists()
+    assert compressed.stat().st_size < len(data) / 3
+    log = LogReader(path)
+    assert log.kind == "chunked" and len(log.index["chunks"]) > 10
+    assert log.size == len(data) and log.line_count == 3001
+    assert log.read_text().encode() == data
+
+    text_lines = data.decode().splitlines()
+    rng = random.Random(5)
+    for _ in range(50):
+        start = rng.randrange(len(data))
+        end = start + rng.randrange(1, 20000)
+        assert log.read_bytes(start, end) == data[start:end]
+        first = rng.randrange(3001)
+        assert log.read_lines(first, first + 37) == text_lines[first : first + 37]
+    assert log.tail(3) == text_lines[-3:]
+    assert log.read_lines(2990) == text_lines[2990:]
+    assert log.read_bytes(len(data), len(data) + 10) == b""
+
+
+def test_only_newlines_split_lines(tmp_path):
+    # Progress bars, CRLF output and page text: none of these end a line
+    lines = [
+        line
+        for i in range(300)
+        for line in (
+            f"[{i:03d}] 50%\r100%",
+            "crlf\r",
+            "page\x0cbreak",
+            "para\u2028sep",
+            "vt\x0bx\x1c\x85",
+        )
+    ]
+    path = tmp_path / "execution.log"
+    path.write_bytes(("\n".join(lines) + "\n").encode())
+    for compacted in (False, True):
+        if compacted:
+            compact_log(path, codec="gzip", chunk_bytes=1024)
+        log = LogReader(path)
+        assert log.kind == (
+            "chunked" if compacted else "plain"
+        ) and log.line_count == len(lines)
+        assert (
+            log.read_lines(0, 5) == lines[:5]
+            and log.read_lines(1001, 1010) == lines[1001:1010]
+        )
+        assert (
+            log.tail(4) == lines[-4:] and log.read_lines(len(lines) - 1) == lines[-1:]
+        )
+
+
+def test_empty_log(tmp_path):
+    path = tmp_path / "execution.log"
+    path.write_text("")
+    compact_log(path, codec="gzip")
+    log = LogReader(path)
+    assert (
+        log.size == 0
+        and log.line_count == 0
+        and log.tail(5) == []
+        and log.read_text() == ""
+    )
+
+
+def test_log_api(api_project, monkeypatch):
+    run_dir = main.RUNS_DIR / "run-1"
+    run_dir.mkdir()
+    data = write_log(run_dir / "execution.log")
+    compact_log(
+        run_dir / "execution.log", codec=log_store.default_codec(), chunk_bytes=4096
+    )
+    client = TestClient(main.app)
+
+    response = client.get("/runs/run-1/log", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206 and response.content == data[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(data)}"
+    assert (
+        client.get("/runs/run-1/log", headers={"Range": "bytes=-19"}).content
+        == data[-19:]
+    )
+    assert (
+        client.get(
+            "/runs/run-1/log", headers={"Range": f"bytes={len(data)}-"}
+        ).status_code
+        == 416
+    )
+    assert client.get("/runs/run-1/log").content == data
+
+    lines = data.decode().splitlines()
+    assert client.get("/runs/run-1/log?tail=2").text == "\n".join(lines[-2:]) + "\n"
+    assert (
+        client.get("/runs/run-1/log?line_start=10&line_end=12").text
+        == "\n".join(lines[10:12]) + "\n"
+    )
+    assert client.get("/runs/missing/log").status_code == 404
+    for query in ("tail=-1", "line_start=-5", "line_end=-1", "tail=x"):
+        assert client.get(f"/runs/run-1/log?{query}").status_code == 422, query
+
+    monkeypatch.setattr(main, "LOG_INLINE_BYTES", 1000)
+    details = main.load_run_details("run-1", run_dir)
+    assert details["log_truncated"] and details["log_size"] == len(data)
+    assert details["log"].encode() == data[-1000:]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test 29: Artifact Blob Store
+Verifies identical artifacts of different runs are stored once under
+runs/.blobs with reference counts, that /artifacts serves them through the
+runs' manifests, and that retention releases references so unreferenced
+blobs are garbage collected.
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from orchestrator.api import main, retention
+from orchestrator.utils import blob_store
+from orchestrator.utils.blob_store import BlobStore
+
+LOGIN_PNG = b"\x89PNG login page" * 100
+VIDEO = b"webm" * 500
+
+
+def make_runs(runs_dir: Path):
+    for run_id, extra in [("run-a", b"only in a"), ("run-b", b"only in b")]:
+        run_dir = runs_dir / run_id
+        (run_dir / "test-results").mkdir(parents=True)
+        (run_dir / "run.json").write_text(json.dumps({"testName": "Login"}))
+        (run_dir / "login.png").write_bytes(LOGIN_PNG)
+        (run_dir / "unique.png").write_bytes(extra)
+        (run_dir / "test-results" / "video.webm").write_bytes(VIDEO)
+
+
+def refcounts(engine):
+    with engine.connect() as conn:
+        return dict(
+            conn.execute(text("SELECT sha256, refcount FROM artifact_blob")).all()
+        )
+
+
+def test_ingest_deduplicates(tmp_path, db_url):
+    store, engine, runs_dir = (
+        BlobStore(db_url),
+        create_engine(db_url),
+        tmp_path / "runs",
+    )
+    make_runs(runs_dir)
+    first = store.ingest_run(runs_dir / "run-a")
+    second = store.ingest_run(runs_dir / "run-b")
+    assert first["files"] == 3 and first["new_blobs"] == 3
+    assert second["new_blobs"] == 1 and second["deduplicated_bytes"] == len(
+        LOGIN_PNG
+    ) + len(VIDEO)
+    assert store.ingest_run(runs_dir / "run-a")["files"] == 0  # Nothing new
+
+    assert (
+        not (runs_dir / "run-a" / "login.png").exists()
+        and (runs_dir / "run-a" / "run.json").exists()
+    )
+    manifest = blob_store.load_manifest(runs_dir / "run-a")
+    assert set(manifest) == {"login.png", "unique.png", "test-results/video.webm"}
+    login = store.resolve(runs_dir / "run-b", "login.png")
+    assert (
+        login["path"].read_bytes() == LOGIN_PNG
+        and login["sha256"] == manifest["login.png"]["sha256"]
+    )
+    assert refcounts(engine)[login["sha256"]] == 2
+    stats = store.stats()
+    assert stats["blobs"] == 4 and stats["references"] == 6
+    assert stats["saved_bytes"] == len(LOGIN_PNG) + len(VIDEO)
+
+
+def test_artifacts_served_through_store(blob_store):
+    store, runs_dir = blob_store, main.RUNS_DIR
+    make_runs(runs_dir)
+    store.ingest_run(runs_dir / "run-a")
+    (runs_dir / "run-a" / "live.png").write_bytes(b"still on disk")
+    client = TestClient(main.app)
+
+    response = client.get("/artifacts/run-a/login.png")
+    assert response.status_code == 200 and response.content == LOGIN_PNG
+    assert response.headers["content-type"] == "image/png"
+    etag = response.headers["etag"]
+    assert (
+        client.get(
+            "/artifacts/run-a/login.png", headers={"If-None-Match": etag}
+        ).status_code
+        == 304
+    )
+    assert client.get("/artifacts/run-a/live.png").content == b"still on disk"
+    assert client.get("/artifacts/run-a/missing.png").status_code == 404
+    sha = etag.strip('"')
+    assert client.get(f"/artifacts/.blobs/{sha[:2]}/{sha}").status_code == 404
+
+    names = {
+        a["name"]
+        for a in main.load_run_details("run-a", runs_dir / "run-a")["artifacts"]
+    }
+    assert names == {"login.png", "unique.png", "live.png", "video.webm"}
+
+
+def test_retention_releases_and_collects(tmp_path, db_url):
+    store, engine, runs_dir = (
+        BlobStore(db_url),
+        create_engine(db_url),
+        tmp_path / "runs",
+    )
+    make_runs(runs_dir)
+    store.ingest_run(runs_dir / "run-a")
+    store.ingest_run(runs_dir / "run-b")
+    video_sha = blob_store.load_manifest(runs_dir / "run-a")["test-results/video.webm"][
+        "sha256"
+    ]
+    policy = retention.RetentionPolicy(keep_runs=0, media_days=0, batch=10)
+
+    report = retention.apply_retention(
+        runs_dir, engine, policy, now=time.time() + 10, blobs=store
+    )
+    assert (
+        report.media_deleted == 2
+        and report.blobs_deleted == 1
+        and report.bytes_freed >= len(VIDEO)
+    )
+    assert not blob_store.blob_path(
+        runs_dir, video_sha
+    ).exists() and video_sha not in refcounts(engine)
+    assert store.resolve(runs_dir / "run-a", "login.png") is not None
+
+    # Recount after refcounts drift, e.g. a crash between storing and referencing
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE artifact_blob SET refcount = 9"))
+    assert store.rebuild_refcounts(runs_dir) == {"blobs": 3, "references": 4}
+    assert sorted(refcounts(engine).values()) == [1, 1, 2]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
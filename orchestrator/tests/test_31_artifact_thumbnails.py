@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test 31: Artifact Thumbnails and Caching
+Verifies screenshots get WebP thumbnails rendered once and shared by every
+run with the same screenshot, that artifacts and thumbnails carry ETags
+(answered with 304) and long-lived Cache-Control under versioned URLs, and
+that videos are served with HTTP Range support.
+"""
+
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from orchestrator.api import main
+from orchestrator.utils import thumbnails
+from orchestrator.utils.blob_store import blob_path
+
+VIDEO = bytes(range(256)) * 40
+
+
+def png(width: int, height: int, color=(200, 30, 30, 255)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGBA", (width, height), color).save(out, "PNG")
+    return out.getvalue()
+
+
+def make_runs(store):
+    runs_dir = main.RUNS_DIR
+    for run_id in ("run-a", "run-b"):
+        (runs_dir / run_id).mkdir(parents=True)
+        (runs_dir / run_id / "login.png").write_bytes(
+            png(1280, 4000)
+        )  # Full-page screenshot
+        (runs_dir / run_id / "video.webm").write_bytes(VIDEO)
+    for run_id in ("run-a", "run-b"):
+        store.ingest_run(runs_dir / run_id)
+    return runs_dir
+
+
+def test_thumbnails_rendered_once(blob_store, monkeypatch):
+    store = blob_store
+    runs_dir = make_runs(store)
+    client = TestClient(main.app)
+    artifacts = {
+        a["name"]: a
+        for a in main.load_run_details("run-a", runs_dir / "run-a")["artifacts"]
+    }
+    login = artifacts["login.png"]
+    assert (
+        login["thumbnail"].startswith("/thumbnails/run-a/login.png?v=")
+        and "?v=" in login["path"]
+    )
+    assert "thumbnail" not in artifacts["video.webm"]
+
+    rendered, render = [], thumbnails.render
+    with monkeypatch.context() as patch:
+        patch.setattr(
+            thumbnails,
+            "render",
+            lambda data, *args: rendered.append(1) or render(data, *args),
+        )
+        response = client.get(login["thumbnail"])
+        again = client.get(login["thumbnail"].replace("run-a", "run-b"))
+    assert (
+        response.status_code == 200 and response.headers["content-type"] == "image/webp"
+    )
+    assert again.content == response.content and len(rendered) == 1
+    image = Image.open(io.BytesIO(response.content))
+    assert image.format == "WEBP" and image.size == (
+        thumbnails.THUMB_PX,
+        2 * thumbnails.THUMB_PX,
+    )
+    sha = store.resolve(runs_dir / "run-a", "login.png")["sha256"]
+    assert len(response.content) < blob_path(runs_dir, sha).stat().st_size
+    assert "immutable" in response.headers["cache-control"]
+    assert (
+        client.get("/thumbnails/run-a/login.png").headers["cache-control"] == "no-cache"
+    )
+
+    etag = response.headers["etag"]
+    assert (
+        client.get(
+            login["thumbnail"], headers={"If-None-Match": f'W/{etag}, "other"'}
+        ).status_code
+        == 304
+    )
+    assert client.get("/thumbnails/run-a/video.webm").status_code == 404
+
+    # Thumbnails sit next to the blobs but aren't blobs themselves
+    assert store.rebuild_refcounts(runs_dir) == {"blobs": 2, "references": 4}
+    assert store.gc(runs_dir)["blobs"] == 0 and store.storage_for(runs_dir).exists(
+        thumbnails.thumbnail_key(sha)
+    )
+
+    # gc removes the thumbnail with its blob
+    store.release(runs_dir / "run-a", ["login.png"])
+    store.release(runs_dir / "run-b", ["login.png"])
+    store.gc(runs_dir)
+    assert not store.storage_for(runs_dir).exists(thumbnails.thumbnail_key(sha))
+
+
+def test_artifact_caching_and_ranges(blob_store):
+    runs_dir = make_runs(blob_store)
+    client = TestClient(main.app)
+    video = next(
+        a
+        for a in main.load_run_details("run-a", runs_dir / "run-a")["artifacts"]
+        if a["name"] == "video.webm"
+    )
+
+    response = client.get(video["path"], headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206 and response.content == VIDEO[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(VIDEO)}"
+    assert response.headers["accept-ranges"] == "bytes"
+    full = client.get(video["path"])
+    assert full.content == VIDEO and "immutable" in full.headers["cache-control"]
+    assert (
+        client.get(
+            video["path"], headers={"If-None-Match": full.headers["etag"]}
+        ).status_code
+        == 304
+    )
+
+    # A run in progress: files still in the run directory, revalidated by ETag
+    live = runs_dir / "run-a" / "live.png"
+    live.write_bytes(png(800, 600))
+    response = client.get("/thumbnails/run-a/live.png")
+    assert (
+        response.status_code == 200 and response.headers["cache-control"] == "no-cache"
+    )
+    assert Image.open(io.BytesIO(response.content)).size == (thumbnails.THUMB_PX, 360)
+    revalidated = client.get(
+        "/thumbnails/run-a/live.png",
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+    assert revalidated.status_code == 304
+    cached = (
+        Path(thumbnails.THUMBS_DIR) / "run-a" / f"live.png.w{thumbnails.THUMB_PX}.webp"
+    )
+    assert (runs_dir / cached).exists() and client.get(
+        f"/artifacts/{cached.as_posix()}"
+    ).status_code == 404
+
+    time.sleep(0.01)
+    live.write_bytes(png(400, 400, color=(0, 0, 255, 255)))
+    changed = client.get(
+        "/thumbnails/run-a/live.png",
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+    assert changed.status_code == 200 and Image.open(
+        io.BytesIO(changed.content)
+    ).size == (400, 400)
+    assert (
+        client.get("/artifacts/run-a/live.png", headers={"Range": "bytes=0-3"}).content
+        == b"\x89PNG"
+    )
+
+    # An image Pillow can't read falls back to the full-size artifact
+    (runs_dir / "run-a" / "broken.png").write_bytes(b"not a png")
+    response = client.get("/thumbnails/run-a/broken.png", follow_redirects=False)
+    assert (
+        response.status_code == 307
+        and response.headers["location"] == "/artifacts/run-a/broken.png"
+    )
+
+    # Once the run's files are stored, their cached thumbnails are dropped
+    main.BLOB_STORE.ingest_run(runs_dir / "run-a")
+    assert not (runs_dir / thumbnails.THUMBS_DIR / "run-a").exists()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test 32: Full-Text Search
+Verifies free text becomes a safe FTS5 query, that /search ranks title
+matches above body matches and highlights snippets, that backfill indexes
+new and changed specs and finished runs and drops removed specs, and that
+the catalog listener indexes the entry it is given.
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for package imports
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from fastapi.testclient import TestClient
+
+from orchestrator.api import main, search
+from orchestrator.api.spec_catalog import SpecEntry
+
+PREFIX = "test32/"
+
+
+class FakeCatalog:
+    def __init__(self, root: Path):
+        self.root = root
+        self.specs = {}
+
+    def write(self, name: str, content: str, title: str):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        self.specs[name] = SpecEntry(
+            name=name,
+            path=path,
+            size=len(content),
+            mtime=path.stat().st_mtime,
+            title=title,
+        )
+        return self.specs[name]
+
+    def entries(self):
+        return list(self.specs.values())
+
+    def read_content(self, name: str):
+        return self.specs[name].path.read_text() if name in self.specs else None
+
+
+def indexed(kind: str):
+    return {
+        key: value
+        for key, value in search._indexed_versions(kind).items()
+        if key.startswith(PREFIX)
+    }
+
+
+def results(client: TestClient, q: str, **params):
+    response = client.get("/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return [r for r in response.json()["results"] if r["key"].startswith(PREFIX)]
+
+
+def test_fts5_query_escaping():
+    assert search._fts5_query("login page") == '"login" "page"*'
+    # FTS5 operators and syntax characters become plain quoted terms
+    assert (
+        search._fts5_query('checkout" OR (cart NEAR -pay*')
+        == '"checkout" "OR" "cart" "NEAR" "pay"*'
+    )
+    assert search._fts5_query('"()*-:') == ""
+
+
+def test_search_ranking_and_snippets(api_db, tmp_path):
+    search.index_spec(
+        PREFIX + "body.md",
+        "Open the page, then the checkout button appears",
+        "Cart page",
+        1,
+    )
+    search.index_spec(
+        PREFIX + "title.md", "Pay with a card and confirm", "Checkout flow", 1
+    )
+    run_dir = make_run(
+        tmp_path / "run-1", "Checkout smoke", "Timeout waiting for checkout button"
+    )
+    search.index_run(PREFIX + "run-1", run_dir)
+    client = TestClient(main.app)
+
+    found = results(client, "checkout")
+    assert [r["key"] for r in found if r["kind"] == "spec"] == [
+        PREFIX + "title.md",
+        PREFIX + "body.md",
+    ]
+    body = next(r for r in found if r["key"] == PREFIX + "body.md")
+    assert "<mark>checkout</mark>" in body["snippet"]
+    assert [r["kind"] for r in results(client, "checkout", kind="run")] == ["run"]
+    assert [
+        r["key"] for r in results(client, "check")
+    ] != []  # Prefix match on the last term
+    # Unbalanced quotes and parentheses are not FTS5 syntax errors
+    assert (
+        len(results(client, 'checkout" (button')) == 2 and results(client, "()") == []
+    )
+
+
+def make_run(run_dir: Path, test_name: str, error: str) -> Path:
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / "run.json").write_text(
+        json.dumps(
+            {
+                "testName": test_name,
+                "finalState": "failed",
+                "steps": [{"error": error}],
+            }
+        )
+    )
+    return run_dir
+
+
+def test_backfill(api_db, tmp_path):
+    catalog = FakeCatalog(tmp_path / "specs")
+    catalog.write(PREFIX + "a.md", "Search for widgets", "Widgets")
+    catalog.write(PREFIX + "b.md", "Delete the account", "Account")
+    make_run(
+        tmp_path / "runs" / (PREFIX.rstrip("/") + "-run"),
+        "Widget run",
+        "Element not found",
+    )
+    search.backfill(catalog, tmp_path / "runs")
+    assert set(indexed("spec")) == {PREFIX + "a.md", PREFIX + "b.md"}
+    assert "test32-run" in search._indexed_versions("run")
+
+    time.sleep(0.01)
+    catalog.write(PREFIX + "a.md", "Search for gadgets", "Gadgets")
+    del catalog.specs[PREFIX + "b.md"]
+    search.backfill(catalog, tmp_path / "runs")
+    assert set(indexed("spec")) == {PREFIX + "a.md"}
+    client = TestClient(main.app)
+    assert [r["title"] for r in results(client, "gadgets")] == ["Gadgets"]
+    assert results(client, "widgets", kind="spec") == []
+    search.remove("run", "test32-run")
+
+
+def test_reindex_spec_uses_given_entry(api_db, tmp_path):
+    catalog = FakeCatalog(tmp_path)
+    entry = catalog.write(
+        PREFIX + "listener.md", "Reset the password", "Password reset"
+    )
+    # Not in the API's own catalog: the listener must use the entry it is handed
+    main.reindex_spec(entry.name, entry)
+    client = TestClient(main.app)
+    assert [r["title"] for r in results(client, "password")] == ["Password reset"]
+    main.reindex_spec(entry.name, None)
+    assert results(client, "password") == []
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,377 @@
+"""
+Where artifact blobs are kept: on local disk, or in an S3-compatible bucket
+(AWS S3, MinIO, R2, ...) so API replicas serve the same artifacts without a
+shared filesystem.
+
+BlobStore (blob_store.py) decides what is stored under which key; a storage
+only moves bytes. Uploads stream the file part by part (an S3 multipart
+upload once it is larger than a part), reads fetch byte ranges, and S3
+downloads can be handed to the client as presigned URLs instead of passing
+through the API. S3 requests go through boto3, which is only needed when
+ARTIFACT_STORAGE=s3.
+
+    ARTIFACT_STORAGE=local            local (runs/.blobs) | s3
+    S3_ENDPOINT_URL=http://localhost:9000
+    S3_PUBLIC_URL=                    endpoint browsers use for presigned URLs, if different
+    S3_BUCKET=playwright-agent
+    S3_PREFIX=artifacts/
+    S3_REGION=us-east-1
+    S3_ACCESS_KEY_ID, S3_SECRET_ACCESS_KEY   (default: AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY)
+    S3_PART_MB=8                      multipart part size (S3 needs at least 5)
+    ARTIFACT_REDIRECT=on              redirect downloads to presigned URLs; off: proxy them
+"""
+
+import os
+import shutil
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+try:
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import BotoCoreError, ClientError
+except ImportError:  # Only needed for ARTIFACT_STORAGE=s3
+    boto3 = None
+
+READ_CHUNK = 256 * 1024
+
+
+class StorageError(OSError):
+    """A storage request failed; missing keys raise FileNotFoundError instead."""
+
+
+def _store(source: Path, target: Path):
+    """Put a copy of `source` at `target` (a hard link when possible), atomically."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copyfile(source, tmp)
+    os.replace(tmp, target)
+
+
+def _read_file(f, start: int, end: Optional[int]) -> Iterator[bytes]:
+    with f:
+        f.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            block = f.read(
+                READ_CHUNK if remaining is None else min(READ_CHUNK, remaining)
+            )
+            if not block:
+                return
+            if remaining is not None:
+                remaining -= len(block)
+            yield block
+
+
+def _iter_body(body) -> Iterator[bytes]:
+    with body:
+        yield from body.iter_chunks(READ_CHUNK)
+
+
+class ArtifactStorage(ABC):
+    """Bytes under string keys such as "ab/ab12cd..."."""
+
+    redirect = False  # Downloads go to presigned_url() rather than through the API
+
+    @abstractmethod
+    def put_file(self, key: str, path: Path): ...
+
+    @abstractmethod
+    def put_bytes(self, key: str, data: bytes): ...
+
+    @abstractmethod
+    def get_bytes(self, key: str) -> Optional[bytes]: ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def read_range(
+        self, key: str, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """Bytes [start, end) of an object; raises FileNotFoundError before yielding when it is missing."""
+
+    @abstractmethod
+    def delete(self, key: str): ...
+
+    @abstractmethod
+    def list(self) -> Iterator[Tuple[str, int]]:
+        """(key, size) of every object."""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """The object as a file on this machine, if it is one."""
+        return None
+
+    def presigned_url(self, key: str, expires: Optional[int] = None) -> Optional[str]:
+        return None
+
+
+class LocalStorage(ArtifactStorage):
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def put_file(self, key: str, path: Path):
+        _store(Path(path), self.root / key)
+
+    def put_bytes(self, key: str, data: bytes):
+        target = self.root / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, target)
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            return (self.root / key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).is_file()
+
+    def read_range(
+        self, key: str, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        return _read_file(open(self.root / key, "rb"), start, end)
+
+    def delete(self, key: str):
+        (self.root / key).unlink(missing_ok=True)
+
+    def list(self) -> Iterator[Tuple[str, int]]:
+        for path in self.root.rglob("*"):
+            if not path.name.startswith(".") and path.is_file():
+                yield path.relative_to(self.root).as_posix(), path.stat().st_size
+
+    def local_path(self, key: str) -> Optional[Path]:
+        path = self.root / key
+        return path if path.is_file() else None
+
+
+class S3Storage(ArtifactStorage):
+    """Path-style S3 client over boto3: works with AWS S3 and with MinIO and other stand-ins."""
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        prefix: str = "",
+        part_size: int = 8 * 1024 * 1024,
+        redirect: bool = True,
+        public_url: Optional[str] = None,
+        url_ttl: int = 900,
+    ):
+        if boto3 is None:
+            raise RuntimeError("S3 artifact storage needs boto3 (pip install boto3)")
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.public_url = (public_url or endpoint_url).rstrip("/")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.part_size = part_size
+        self.redirect = redirect
+        self.url_ttl = url_ttl
+        session = boto3.session.Session(
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name=region,
+        )
+        config = Config(
+            s3={"addressing_style": "path"},
+            signature_version="s3v4",
+            connect_timeout=10,
+            read_timeout=60,
+            retries={"max_attempts": 3, "mode": "standard"},
+            # MinIO, R2 and other stand-ins don't all accept the checksums newer SDKs add by default
+            request_checksum_calculation="when_required",
+            response_checksum_validation="when_required",
+        )
+        self.client = session.client(
+            "s3", endpoint_url=self.endpoint_url, config=config
+        )
+        # Presigned URLs are signed for the host browsers reach
+        self.presign_client = (
+            self.client
+            if self.public_url == self.endpoint_url
+            else session.client("s3", endpoint_url=self.public_url, config=config)
+        )
+        self._bucket_ready = False
+
+    @contextmanager
+    def _errors(self, operation: str, key: Optional[str] = None):
+        """Raise FileNotFoundError for a missing key or bucket and StorageError for other failures."""
+        target = f"/{self.bucket}" + ("" if key is None else f"/{self.prefix}{key}")
+        try:
+            yield
+        except ClientError as e:
+            status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            if status == 404:
+                raise FileNotFoundError(f"{operation} {target}: not found") from e
+            code = e.response.get("Error", {}).get("Code", "")
+            raise StorageError(
+                f"{operation} {target}: HTTP {status} {code}".rstrip()
+            ) from e
+        except BotoCoreError as e:
+            raise StorageError(f"{operation} {target}: {e}") from e
+
+    def _ensure_bucket(self):
+        if self._bucket_ready:
+            return
+        try:
+            with self._errors("HeadBucket"):
+                self.client.head_bucket(Bucket=self.bucket)
+        except FileNotFoundError:
+            params = {"Bucket": self.bucket}
+            region = self.client.meta.region_name
+            if region != "us-east-1":
+                params["CreateBucketConfiguration"] = {"LocationConstraint": region}
+            with self._errors("CreateBucket"):
+                self.client.create_bucket(**params)
+            print(f"🪣 Created bucket {self.bucket}")
+        self._bucket_ready = True
+
+    def put_file(self, key: str, path: Path):
+        """Upload a file, in parts of `part_size` once it is larger than one; memory stays at one part."""
+        self._ensure_bucket()
+        name = self.prefix + key
+        with open(path, "rb") as f:
+            data = f.read(self.part_size + 1)
+            if len(data) <= self.part_size:
+                with self._errors("PutObject", key):
+                    self.client.put_object(Bucket=self.bucket, Key=name, Body=data)
+                return
+            f.seek(0)
+            with self._errors("CreateMultipartUpload", key):
+                upload_id = self.client.create_multipart_upload(
+                    Bucket=self.bucket, Key=name
+                )["UploadId"]
+            try:
+                parts = []
+                for number, part in enumerate(
+                    iter(lambda: f.read(self.part_size), b""), 1
+                ):
+                    with self._errors("UploadPart", key):
+                        response = self.client.upload_part(
+                            Bucket=self.bucket,
+                            Key=name,
+                            PartNumber=number,
+                            UploadId=upload_id,
+                            Body=part,
+                        )
+                    parts.append({"PartNumber": number, "ETag": response["ETag"]})
+                with self._errors("CompleteMultipartUpload", key):
+                    self.client.complete_multipart_upload(
+                        Bucket=self.bucket,
+                        Key=name,
+                        UploadId=upload_id,
+                        MultipartUpload={"Parts": parts},
+                    )
+            except BaseException:
+                try:
+                    self.client.abort_multipart_upload(
+                        Bucket=self.bucket, Key=name, UploadId=upload_id
+                    )
+                except (BotoCoreError, ClientError):
+                    pass  # The bucket's lifecycle rules clean up abandoned uploads
+                raise
+
+    def put_bytes(self, key: str, data: bytes):
+        self._ensure_bucket()
+        with self._errors("PutObject", key):
+            self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            with self._errors("GetObject", key):
+                body = self.client.get_object(
+                    Bucket=self.bucket, Key=self.prefix + key
+                )["Body"]
+                with body:
+                    return body.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key: str) -> bool:
+        try:
+            with self._errors("HeadObject", key):
+                self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def read_range(
+        self, key: str, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        if end is not None and end <= start:
+            return iter(())
+        params = {"Bucket": self.bucket, "Key": self.prefix + key}
+        if start or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
+        with self._errors("GetObject", key):
+            body = self.client.get_object(**params)["Body"]
+        return _iter_body(body)
+
+    def delete(self, key: str):
+        try:
+            with self._errors("DeleteObject", key):
+                self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+        except FileNotFoundError:
+            pass
+
+    def list(self) -> Iterator[Tuple[str, int]]:
+        pages = self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket, Prefix=self.prefix
+        )
+        try:
+            with self._errors("ListObjectsV2"):
+                for page in pages:
+                    for item in page.get("Contents", ()):
+                        yield item["Key"][len(self.prefix) :], item["Size"]
+        except FileNotFoundError:
+            return  # No bucket yet
+
+    def presigned_url(self, key: str, expires: Optional[int] = None) -> Optional[str]:
+        """A GET URL for the object that needs no credentials until it expires."""
+        return self.presign_client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self.prefix + key},
+            ExpiresIn=expires or self.url_ttl,
+        )
+
+
+def storage_from_env() -> Optional[ArtifactStorage]:
+    """The configured object storage, or None for local disk under each runs directory's .blobs."""
+    kind = os.environ.get("ARTIFACT_STORAGE", "local").lower()
+    if kind == "local":
+        return None
+    endpoint_url = os.environ.get("S3_ENDPOINT_URL")
+    if kind != "s3" or not endpoint_url:
+        print(
+            f"⚠️ ARTIFACT_STORAGE={kind} needs ARTIFACT_STORAGE=s3 and S3_ENDPOINT_URL, using local disk"
+        )
+        return None
+    if boto3 is None:
+        print(
+            "⚠️ ARTIFACT_STORAGE=s3 needs boto3 (pip install boto3), using local disk"
+        )
+        return None
+    return S3Storage(
+        endpoint_url,
+        bucket=os.environ.get("S3_BUCKET", "playwright-agent"),
+        access_key=os.environ.get("S3_ACCESS_KEY_ID")
+        or os.environ.get("AWS_ACCESS_KEY_ID", ""),
+        secret_key=os.environ.get("S3_SECRET_ACCESS_KEY")
+        or os.environ.get("AWS_SECRET_ACCESS_KEY", ""),
+        region=os.environ.get("S3_REGION", "us-east-1"),
+        prefix=os.environ.get("S3_PREFIX", "artifacts/"),
+        part_size=int(float(os.environ.get("S3_PART_MB", "8")) * 1024 * 1024),
+        redirect=os.environ.get("ARTIFACT_REDIRECT", "on").lower()
+        not in ("off", "false", "0"),
+        public_url=os.environ.get("S3_PUBLIC_URL") or None,
+    )
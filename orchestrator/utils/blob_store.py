@@ -0,0 +1,354 @@
+"""
+Content-addressed store for run artifacts (artifact_blob table, migration 0013).
+
+The same login-page screenshot or toHaveScreenshot baseline is written by
+run after run. After a run finishes, its screenshots, videos, GIFs and
+traces are hashed and moved to runs/.blobs/<sha[:2]>/<sha256>, stored once
+however many runs produced them. The run directory keeps artifacts.json,
+mapping each artifact's relative path to its blob; `/artifacts` resolves
+paths through it, so URLs don't change.
+
+artifact_blob counts the references to each blob. Retention releases the
+references of the artifacts it drops, and `gc()` deletes blobs nobody
+references. `rebuild_refcounts()` recounts from the manifests after a crash
+between storing a blob and writing the manifest.
+
+Blobs are kept by an ArtifactStorage (artifact_storage.py): runs/.blobs by
+default, or an S3-compatible bucket shared by all API replicas. With a
+bucket, each run's manifest is uploaded next to the blobs as
+runs/<run id>/artifacts.json, so a replica without the run directory can
+still resolve its artifacts.
+
+    python -m orchestrator.utils.blob_store ingest|gc|fsck|stats [--runs-dir runs]
+
+    ARTIFACT_DEDUP=off     keep artifacts in the run directories
+    ARTIFACT_STORAGE=s3    see artifact_storage.py
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from .artifact_storage import ArtifactStorage, LocalStorage, storage_from_env
+from orchestrator.api.db import RawSQLStore
+from .thumbnails import THUMBS_DIR, thumbnail_key
+
+RUNS_DIR = Path(__file__).resolve().parent.parent.parent / "runs"
+BLOBS_DIR = ".blobs"
+MANIFEST = "artifacts.json"
+BLOB_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".webm", ".mp4", ".zip"}
+_SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def blob_key(sha256: str) -> str:
+    return f"{sha256[:2]}/{sha256}"
+
+
+def blob_sha256(key: str) -> Optional[str]:
+    """The hash a storage key holds the blob of, or None for other keys (thumbnails, manifests)."""
+    sha256 = key.rpartition("/")[2]
+    return sha256 if _SHA256_RE.fullmatch(sha256) and key == blob_key(sha256) else None
+
+
+def blob_path(runs_dir: Path, sha256: str) -> Path:
+    """Where a blob lives with local storage."""
+    return Path(runs_dir) / BLOBS_DIR / blob_key(sha256)
+
+
+def manifest_key(run_id: str) -> str:
+    return f"runs/{run_id}/{MANIFEST}"
+
+
+def load_manifest(run_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """{relative path: {"sha256", "size"}} of a run's stored artifacts."""
+    try:
+        return json.loads((Path(run_dir) / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(run_dir: Path, manifest: Dict[str, Dict[str, Any]]):
+    fd, tmp = tempfile.mkstemp(dir=run_dir, prefix=".artifacts-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, Path(run_dir) / MANIFEST)
+
+
+class BlobStore(RawSQLStore):
+    probe_table = "artifact_blob"
+    switch_env = "ARTIFACT_DEDUP"
+    unavailable_message = "Artifact blob store unavailable"
+
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        storage: Optional[ArtifactStorage] = None,
+    ):
+        super().__init__(database_url)
+        # None: local disk under the .blobs directory of whichever runs directory is used
+        self.storage = storage if storage is not None else storage_from_env()
+
+    def storage_for(self, runs_dir: Path) -> ArtifactStorage:
+        return self.storage or LocalStorage(Path(runs_dir) / BLOBS_DIR)
+
+    def _write_manifest(self, run_dir: Path, manifest: Dict[str, Dict[str, Any]]):
+        write_manifest(run_dir, manifest)
+        if self.storage is not None:
+            self.storage.put_bytes(
+                manifest_key(run_dir.name),
+                json.dumps(manifest, sort_keys=True).encode(),
+            )
+
+    def manifest(self, run_dir: Path) -> Dict[str, Dict[str, Any]]:
+        """The run's artifacts.json, or its copy in shared storage when the run directory isn't here."""
+        run_dir = Path(run_dir)
+        if (run_dir / MANIFEST).exists() or self.storage is None:
+            return load_manifest(run_dir)
+        try:
+            data = self.storage.get_bytes(manifest_key(run_dir.name))
+            return json.loads(data) if data else {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not fetch artifact manifest of {run_dir.name}: {e}")
+            return {}
+
+    def _adjust(self, conn, sha256: str, size: int, delta: int):
+        now = time.time()
+        updated = conn.execute(
+            text(
+                "UPDATE artifact_blob SET refcount = refcount + :delta, updated_at = :now WHERE sha256 = :sha"
+            ),
+            {"delta": delta, "now": now, "sha": sha256},
+        ).rowcount
+        if not updated:
+            conn.execute(
+                text(
+                    "INSERT INTO artifact_blob (sha256, size, refcount, created_at, updated_at) "
+                    "VALUES (:sha, :size, :refcount, :now, :now)"
+                ),
+                {"sha": sha256, "size": size, "refcount": max(delta, 0), "now": now},
+            )
+
+    def ingest_run(self, run_dir: Path) -> Optional[Dict[str, int]]:
+        """
+        Move a run's artifacts into the store and record them in artifacts.json.
+        Returns counts and bytes, or None when the store is off or unavailable.
+        """
+        run_dir = Path(run_dir)
+        if not self.is_available():
+            return None
+        for attempt in range(3):
+            try:
+                return self._ingest(run_dir)
+            except IntegrityError as e:
+                # Another run stored the same new blob at the same time; its row exists now
+                error = e
+            except (SQLAlchemyError, OSError) as e:
+                error = e
+                break
+        print(
+            f"⚠️ Failed to store artifacts of {run_dir.name}: {str(error).splitlines()[0]}"
+        )
+        return None
+
+    def _ingest(self, run_dir: Path) -> Dict[str, int]:
+        storage = self.storage_for(run_dir.parent)
+        manifest = load_manifest(run_dir)
+        stats = {"files": 0, "bytes": 0, "new_blobs": 0, "deduplicated_bytes": 0}
+        stored: List[Path] = []
+        with self.db().begin() as conn:
+            for path in sorted(
+                p
+                for p in run_dir.rglob("*")
+                if p.suffix.lower() in BLOB_SUFFIXES and p.is_file()
+            ):
+                rel = path.relative_to(run_dir).as_posix()
+                sha256, size = file_sha256(path), path.stat().st_size
+                key = blob_key(sha256)
+                if storage.exists(key):
+                    stats["deduplicated_bytes"] += size
+                else:
+                    storage.put_file(key, path)
+                    stats["new_blobs"] += 1
+                self._adjust(conn, sha256, size, 1)
+                if not storage.exists(key):
+                    # gc() deleted it between the check and the count
+                    storage.put_file(key, path)
+                previous = manifest.get(rel)
+                if previous:
+                    self._adjust(conn, previous["sha256"], previous["size"], -1)
+                manifest[rel] = {"sha256": sha256, "size": size}
+                stored.append(path)
+                stats["files"] += 1
+                stats["bytes"] += size
+        # Counted before referenced: a crash here leaks a blob instead of losing one
+        if stored:
+            self._write_manifest(run_dir, manifest)
+        for path in stored:
+            path.unlink(missing_ok=True)
+        if stored:
+            # Thumbnails of the files now come from the blobs
+            shutil.rmtree(
+                run_dir.parent / THUMBS_DIR / run_dir.name, ignore_errors=True
+            )
+        return stats
+
+    def release(self, run_dir: Path, paths: Iterable[str]) -> int:
+        """Drop artifacts (relative paths) from a run's manifest and release their blobs; returns how many."""
+        run_dir = Path(run_dir)
+        manifest = load_manifest(run_dir)
+        entries = [(rel, manifest.pop(rel)) for rel in list(paths) if rel in manifest]
+        if not entries:
+            return 0
+        # Unreferenced before released: a crash here leaks a blob instead of losing one
+        self._write_manifest(run_dir, manifest)
+        if self.is_available():
+            with self.db().begin() as conn:
+                for _, entry in entries:
+                    self._adjust(conn, entry["sha256"], entry["size"], -1)
+        return len(entries)
+
+    def resolve(self, run_dir: Path, rel_path: str) -> Optional[Dict[str, Any]]:
+        """
+        {"sha256", "size", "key", "storage", "path"} of the blob behind an
+        artifact of the run, if stored. "path" is the local file, None when
+        the blob is in remote storage (not checked for existence there).
+        """
+        entry = self.manifest(run_dir).get(rel_path)
+        if not entry:
+            return None
+        storage = self.storage_for(Path(run_dir).parent)
+        key = blob_key(entry["sha256"])
+        path = storage.local_path(key)
+        if path is None and isinstance(storage, LocalStorage):
+            return None
+        return {**entry, "key": key, "storage": storage, "path": path}
+
+    def gc(self, runs_dir: Path = RUNS_DIR, dry_run: bool = False) -> Dict[str, int]:
+        """Delete blobs with no references left, and their thumbnails."""
+        result = {"blobs": 0, "bytes": 0}
+        if not self.is_available():
+            return result
+        storage = self.storage_for(runs_dir)
+        with self.db().begin() as conn:
+            rows = conn.execute(
+                text("SELECT sha256, size FROM artifact_blob WHERE refcount <= 0")
+            ).all()
+            for sha256, size in rows:
+                result["blobs"] += 1
+                result["bytes"] += size
+                if dry_run:
+                    continue
+                deleted = conn.execute(
+                    text(
+                        "DELETE FROM artifact_blob WHERE sha256 = :sha AND refcount <= 0"
+                    ),
+                    {"sha": sha256},
+                ).rowcount
+                if deleted:
+                    storage.delete(blob_key(sha256))
+                    storage.delete(thumbnail_key(sha256))
+        return result
+
+    def rebuild_refcounts(self, runs_dir: Path = RUNS_DIR) -> Dict[str, int]:
+        """Recount references from every run's manifest; stored blobs nobody references get refcount 0."""
+        runs_dir = Path(runs_dir)
+        counts: Dict[str, List[int]] = {}
+        for manifest_path in runs_dir.glob(f"*/{MANIFEST}"):
+            for entry in load_manifest(manifest_path.parent).values():
+                counts.setdefault(entry["sha256"], [entry["size"], 0])[1] += 1
+        for key, size in self.storage_for(runs_dir).list():
+            sha256 = blob_sha256(key)
+            if sha256 and sha256 not in counts:
+                counts[sha256] = [size, 0]
+        now = time.time()
+        with self.db().begin() as conn:
+            conn.execute(text("DELETE FROM artifact_blob"))
+            for sha256, (size, refcount) in counts.items():
+                conn.execute(
+                    text(
+                        "INSERT INTO artifact_blob (sha256, size, refcount, created_at, updated_at) "
+                        "VALUES (:sha, :size, :refcount, :now, :now)"
+                    ),
+                    {"sha": sha256, "size": size, "refcount": refcount, "now": now},
+                )
+        return {"blobs": len(counts), "references": sum(c[1] for c in counts.values())}
+
+    def stats(self) -> Dict[str, int]:
+        """Blobs and bytes stored, references to them, and bytes saved by storing each blob once."""
+        if not self.is_available():
+            return {}
+        with self.db().connect() as conn:
+            blobs, stored, references, referenced = conn.execute(
+                text(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(refcount), 0), "
+                    "COALESCE(SUM(size * refcount), 0) FROM artifact_blob"
+                )
+            ).one()
+        return {
+            "blobs": blobs,
+            "stored_bytes": stored,
+            "references": references,
+            "referenced_bytes": referenced,
+            "saved_bytes": max(0, referenced - stored),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed artifact store")
+    parser.add_argument("command", choices=["ingest", "gc", "fsck", "stats"])
+    parser.add_argument("--runs-dir", type=Path, default=RUNS_DIR)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="gc: report without deleting"
+    )
+    args = parser.parse_args()
+    store = BlobStore()
+
+    if args.command == "ingest":
+        # Existing runs: deduplicate what's already on disk
+        total = {"files": 0, "bytes": 0, "new_blobs": 0, "deduplicated_bytes": 0}
+        for run_dir in sorted(
+            p
+            for p in args.runs_dir.iterdir()
+            if p.is_dir() and not p.name.startswith(".")
+        ):
+            for key, value in (store.ingest_run(run_dir) or {}).items():
+                total[key] += value
+        print(
+            f"📦 Stored {total['files']} artifacts ({total['bytes'] / 1e6:.1f} MB) as {total['new_blobs']} "
+            f"new blobs, {total['deduplicated_bytes'] / 1e6:.1f} MB deduplicated"
+        )
+    elif args.command == "gc":
+        result = store.gc(args.runs_dir, dry_run=args.dry_run)
+        print(
+            f"🧹 {'Would delete' if args.dry_run else 'Deleted'} {result['blobs']} unreferenced blobs "
+            f"({result['bytes'] / 1e6:.1f} MB)"
+        )
+    elif args.command == "fsck":
+        result = store.rebuild_refcounts(args.runs_dir)
+        print(
+            f"✅ Recounted {result['references']} references to {result['blobs']} blobs"
+        )
+    else:
+        print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
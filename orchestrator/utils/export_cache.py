@@ -0,0 +1,232 @@
+"""
+Cache of exporter results keyed on the normalized run trace.
+
+Two runs whose traces differ only in timestamps, durations, details,
+snapshots or screenshots produce the same key, so the second export reuses
+the generated code without an LLM round trip. Entries record the exporter
+prompt version that produced them; an entry from another version is a miss
+and is dropped, and `invalidate()` purges entries in bulk.
+
+Entries are one JSON file per key under EXPORT_CACHE_DIR (default
+<project>/.cache/exporter). Hits, misses, stores and invalidations are
+appended to events.jsonl so concurrent exporter processes can share the
+cache. Once the log passes EXPORT_CACHE_EVENTS_MAX_BYTES it is folded into
+the running totals in counters.json and started afresh, so `stats()` reads
+at most that much.
+
+    EXPORT_CACHE=off                       disable lookups and stores
+    EXPORT_CACHE_EVENTS_MAX_BYTES=262144   roll events.jsonl up past this size
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: roll-ups are not serialized between processes
+    fcntl = None
+
+DEFAULT_CACHE_DIR = (
+    Path(__file__).resolve().parent.parent.parent / ".cache" / "exporter"
+)
+EVENTS_FILE = "events.jsonl"
+COUNTERS_FILE = "counters.json"
+ROLLUP_LOCK_FILE = ".rollup.lock"
+EVENTS_MAX_BYTES = int(os.environ.get("EXPORT_CACHE_EVENTS_MAX_BYTES", str(256 * 1024)))
+EVENT_TYPES = ("hit", "miss", "store", "invalidate")
+
+# Step fields that change from run to run without changing the test
+VOLATILE_STEP_FIELDS = {
+    "timestamp",
+    "duration",
+    "details",
+    "snapshot",
+    "screenshot",
+    "error",
+    "stepNumber",
+}
+TRACE_FIELDS = ("testName", "steps")
+
+
+def normalize_trace(run: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of a run trace the generated code depends on."""
+    steps = []
+    for step in run.get("steps", []):
+        normalized = {
+            k: v
+            for k, v in step.items()
+            if k not in VOLATILE_STEP_FIELDS and v is not None
+        }
+        if isinstance(normalized.get("action"), str):
+            normalized["action"] = normalized["action"].strip().lower()
+        steps.append(normalized)
+    return {"testName": run.get("testName"), "steps": steps}
+
+
+def trace_hash(run: Dict[str, Any]) -> str:
+    payload = json.dumps(normalize_trace(run), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def count_events(
+    lines: Iterable[str], counts: Optional[Dict[str, int]] = None
+) -> Dict[str, int]:
+    """Add the events in events.jsonl lines to `counts` (hit/miss/store/invalidate)."""
+    counts = dict(counts or {})
+    for line in lines:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if event.get("event") in EVENT_TYPES:
+            counts[event["event"]] = counts.get(event["event"], 0) + event.get(
+                "count", 1
+            )
+    return counts
+
+
+class ExportCache:
+    def __init__(self, cache_dir: Optional[Path] = None, prompt_version: str = "1"):
+        self.cache_dir = Path(
+            cache_dir or os.environ.get("EXPORT_CACHE_DIR") or DEFAULT_CACHE_DIR
+        )
+        self.prompt_version = str(prompt_version)
+        self.enabled = os.environ.get("EXPORT_CACHE", "on").lower() not in (
+            "off",
+            "0",
+            "false",
+        )
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _entries(self):
+        return [
+            path for path in self.cache_dir.glob("*.json") if path.name != COUNTERS_FILE
+        ]
+
+    def _event(self, event: str, key: Optional[str] = None, **extra):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_dir / EVENTS_FILE, "a") as f:
+                f.write(
+                    json.dumps({"event": event, "key": key, "at": time.time(), **extra})
+                    + "\n"
+                )
+                size = f.tell()
+            if size >= EVENTS_MAX_BYTES:
+                self._roll_up()
+        except OSError as e:
+            print(f"⚠️ Failed to record export cache event: {e}")
+
+    def _counters(self) -> Dict[str, int]:
+        try:
+            return json.loads((self.cache_dir / COUNTERS_FILE).read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _roll_up(self):
+        """Fold events.jsonl into counters.json and start a new log."""
+        with open(self.cache_dir / ROLLUP_LOCK_FILE, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            events = self.cache_dir / EVENTS_FILE
+            if not events.exists() or events.stat().st_size < EVENTS_MAX_BYTES:
+                return  # Another process rolled it up first
+            # Writers reopen the log per event, so after the rename they start a new one
+            rolling = events.with_name(f"{EVENTS_FILE}.{os.getpid()}.rolling")
+            os.replace(events, rolling)
+            counts = count_events(rolling.read_text().splitlines(), self._counters())
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(counts, f)
+            os.replace(tmp, self.cache_dir / COUNTERS_FILE)
+            rolling.unlink()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The cached export result for `key`, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            self._event("miss", key)
+            return None
+        if str(entry.get("promptVersion")) != self.prompt_version:
+            path.unlink(missing_ok=True)
+            self._event(
+                "invalidate", key, reason=f"prompt version {entry.get('promptVersion')}"
+            )
+            self._event("miss", key)
+            return None
+        self._event("hit", key)
+        return entry["result"]
+
+    def put(
+        self, key: str, result: Dict[str, Any], trace: Optional[Dict[str, Any]] = None
+    ):
+        if not self.enabled:
+            return
+        entry = {
+            "key": key,
+            "promptVersion": self.prompt_version,
+            "createdAt": time.time(),
+            "trace": trace,
+            "result": result,
+        }
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write-then-rename so a concurrent reader never sees half an entry
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            print(f"⚠️ Failed to write export cache entry: {e}")
+            return
+        self._event("store", key)
+
+    def invalidate(self, keep_version: Optional[str] = None) -> int:
+        """Remove entries not produced by `keep_version` (all entries if None)."""
+        removed = 0
+        for path in self._entries():
+            if keep_version is not None:
+                try:
+                    if str(json.loads(path.read_text()).get("promptVersion")) == str(
+                        keep_version
+                    ):
+                        continue
+                except (OSError, ValueError):
+                    pass
+            path.unlink(missing_ok=True)
+            removed += 1
+        if removed:
+            self._event("invalidate", count=removed, keep_version=keep_version)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            lines = (self.cache_dir / EVENTS_FILE).read_text().splitlines()
+        except OSError:
+            lines = []
+        counts = {event: 0 for event in EVENT_TYPES}
+        counts.update(count_events(lines, self._counters()))
+        entries = self._entries()
+        lookups = counts["hit"] + counts["miss"]
+        return {
+            "enabled": self.enabled,
+            "cacheDir": str(self.cache_dir),
+            "entries": len(entries),
+            "bytes": sum(p.stat().st_size for p in entries if p.exists()),
+            "hits": counts["hit"],
+            "misses": counts["miss"],
+            "stores": counts["store"],
+            "invalidations": counts["invalidate"],
+            "hitRate": round(counts["hit"] / lookups, 3) if lookups else None,
+        }
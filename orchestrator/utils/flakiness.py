@@ -0,0 +1,254 @@
+"""
+Flaky-test detection from per-test execution history (test_result table,
+migration 0010).
+
+The validator records every Playwright run of a test: pass/fail, a hash of
+the test code, whether it was a plain rerun, and what kind of failure it
+was. A test is flaky to the extent its result flips between consecutive
+runs of the same code; a flip can't be a bug in the test, so rerunning is
+the cheap fix. The rerun policy uses that score plus the failure itself to
+decide whether to rerun before paying for an LLM fix.
+
+    VALIDATOR_RERUN_POLICY=auto   never | auto | always
+    VALIDATOR_MAX_RERUNS=1        reruns before each fix attempt
+    FLAKE_THRESHOLD=0.2           flip rate at which a test counts as flaky
+    FLAKE_HISTORY=off             don't record or read history
+"""
+
+import hashlib
+import os
+import re
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from orchestrator.api.db import RawSQLStore
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+FLAKE_THRESHOLD = float(os.environ.get("FLAKE_THRESHOLD", "0.2"))
+# Results per test considered, and how far back
+HISTORY_WINDOW = 30
+HISTORY_DAYS = 30
+MIN_HISTORY = 3
+
+# Infrastructure trouble that says nothing about the test itself
+TRANSIENT_RE = re.compile(
+    r"net::ERR_|ECONNRESET|ECONNREFUSED|ETIMEDOUT|EAI_AGAIN|socket hang up|"
+    r"Target (?:page, context or browser|closed)|has been closed|browser has disconnected|"
+    r"Navigation timeout|page\.goto: Timeout|timed out after \d+ seconds|"
+    r"status (?:code )?(?:of )?50[234]\b|Service Unavailable|Bad Gateway",
+    re.IGNORECASE,
+)
+# Failures no rerun can fix
+DETERMINISTIC_RE = re.compile(
+    r"strict mode violation|SyntaxError|ReferenceError|TypeError|Cannot find module|"
+    r"is not a function|No tests found|Unexpected token",
+)
+
+
+def history_key(test_file: str) -> str:
+    """Stable id for a test: its path relative to the project root when inside it."""
+    path = Path(test_file).resolve()
+    try:
+        return str(path.relative_to(PROJECT_ROOT))
+    except ValueError:
+        return str(test_file)
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode()).hexdigest()[:16]
+
+
+def failure_kind(result: Dict[str, Any]) -> Optional[str]:
+    """ "transient", "deterministic" or "unknown" for a failed run, None if it passed."""
+    if result.get("passed"):
+        return None
+    messages = [result.get("excerpt") or ""] + [
+        f.get("error") or "" for f in result.get("failures", [])
+    ]
+    message = "\n".join(messages)
+    if DETERMINISTIC_RE.search(message):
+        return "deterministic"
+    if TRANSIENT_RE.search(message):
+        return "transient"
+    return "unknown"
+
+
+@dataclass
+class FlakeScore:
+    test_key: str
+    runs: int = 0
+    passes: int = 0
+    failures: int = 0
+    flips: int = 0
+    score: float = 0.0
+    classification: str = "unknown"  # unknown, stable, flaky, failing
+    last_passed: Optional[bool] = None
+    last_run_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def score_history(
+    key: str,
+    rows: List[Tuple[bool, Optional[str], float]],
+    threshold: float = FLAKE_THRESHOLD,
+) -> FlakeScore:
+    """Score (passed, code_hash, created_at) rows, oldest first."""
+    result = FlakeScore(test_key=key, runs=len(rows))
+    if not rows:
+        return result
+    result.passes = sum(1 for passed, _, _ in rows if passed)
+    result.failures = result.runs - result.passes
+    result.last_passed, result.last_run_at = bool(rows[-1][0]), rows[-1][2]
+
+    # Only consecutive runs of the same code tell flakiness from a fix or a break
+    comparisons = 0
+    for (prev_passed, prev_hash, _), (passed, hash_, _) in zip(rows, rows[1:]):
+        if prev_hash and prev_hash == hash_:
+            comparisons += 1
+            result.flips += bool(prev_passed) != bool(passed)
+    result.score = round(result.flips / comparisons, 3) if comparisons else 0.0
+
+    if result.flips and result.score >= threshold:
+        result.classification = "flaky"
+    elif result.runs < MIN_HISTORY:
+        result.classification = "unknown"
+    elif not any(passed for passed, _, _ in rows[-MIN_HISTORY:]):
+        result.classification = "failing"
+    else:
+        result.classification = "stable"
+    return result
+
+
+@dataclass
+class RerunPolicy:
+    """How many times to rerun a failed test, unchanged, before asking the LLM to fix it."""
+
+    mode: str = "auto"
+    max_reruns: int = 1
+    threshold: float = FLAKE_THRESHOLD
+
+    @classmethod
+    def from_env(cls) -> "RerunPolicy":
+        return cls(
+            mode=os.environ.get("VALIDATOR_RERUN_POLICY", "auto").lower(),
+            max_reruns=int(os.environ.get("VALIDATOR_MAX_RERUNS", "1")),
+            threshold=float(os.environ.get("FLAKE_THRESHOLD", str(FLAKE_THRESHOLD))),
+        )
+
+    def reruns_for(self, kind: Optional[str], score: FlakeScore) -> Tuple[int, str]:
+        """(reruns, reason) for a failure of `kind` on a test with history `score`."""
+        if self.mode == "never" or self.max_reruns <= 0:
+            return 0, "reruns disabled"
+        if self.mode == "always":
+            return self.max_reruns, "policy always reruns"
+        if kind == "deterministic":
+            return 0, "deterministic failure"
+        if kind == "transient":
+            return self.max_reruns, "transient failure"
+        if score.flips and score.score >= self.threshold:
+            return (
+                self.max_reruns,
+                f"flaky history ({score.flips} flips, score {score.score})",
+            )
+        return 0, "no sign of flakiness"
+
+
+class FlakeHistory(RawSQLStore):
+    probe_table = "test_result"
+    switch_env = "FLAKE_HISTORY"
+    unavailable_message = "Test result history unavailable"
+
+    def record(
+        self,
+        key: str,
+        passed: bool,
+        run_id: Optional[str] = None,
+        browser: Optional[str] = None,
+        code_hash: Optional[str] = None,
+        rerun: bool = False,
+        failure_kind: Optional[str] = None,
+        duration_ms: Optional[float] = None,
+    ):
+        if not self.is_available():
+            return
+        try:
+            with self.db().begin() as conn:
+                conn.execute(
+                    text(
+                        "INSERT INTO test_result (test_key, run_id, browser, code_hash, passed, rerun, failure_kind, "
+                        "duration_ms, created_at) VALUES (:key, :run_id, :browser, :code_hash, :passed, :rerun, "
+                        ":failure_kind, :duration_ms, :now)"
+                    ),
+                    {
+                        "key": key,
+                        "run_id": run_id,
+                        "browser": browser,
+                        "code_hash": code_hash,
+                        "passed": passed,
+                        "rerun": rerun,
+                        "failure_kind": failure_kind,
+                        "duration_ms": duration_ms,
+                        "now": time.time(),
+                    },
+                )
+        except SQLAlchemyError as e:
+            print(f"⚠️ Failed to record test result: {str(e).splitlines()[0]}")
+
+    def _rows(
+        self, key: Optional[str] = None
+    ) -> Dict[str, List[Tuple[bool, Optional[str], float]]]:
+        """Recent (passed, code_hash, created_at) rows per test, oldest first."""
+        where = "created_at >= :since" + (" AND test_key = :key" if key else "")
+        with self.db().connect() as conn:
+            rows = conn.execute(
+                text(
+                    f"SELECT test_key, passed, code_hash, created_at FROM test_result WHERE {where} "
+                    "ORDER BY test_key, created_at DESC"
+                ),
+                {"since": time.time() - HISTORY_DAYS * 86400, "key": key},
+            )
+            history: Dict[str, List[Tuple[bool, Optional[str], float]]] = {}
+            for test, passed, hash_, created_at in rows:
+                recent = history.setdefault(test, [])
+                if len(recent) < HISTORY_WINDOW:
+                    recent.append((bool(passed), hash_, created_at))
+        return {test: recent[::-1] for test, recent in history.items()}
+
+    def score(self, key: str, threshold: float = FLAKE_THRESHOLD) -> FlakeScore:
+        if not self.is_available():
+            return FlakeScore(test_key=key)
+        try:
+            rows = self._rows(key).get(key, [])
+        except SQLAlchemyError as e:
+            print(f"⚠️ Failed to read test history: {str(e).splitlines()[0]}")
+            rows = []
+        return score_history(key, rows, threshold)
+
+    def scores(
+        self,
+        min_score: float = 0.0,
+        limit: int = 200,
+        threshold: float = FLAKE_THRESHOLD,
+    ) -> List[FlakeScore]:
+        """Every recently run test, flakiest first."""
+        if not self.is_available():
+            return []
+        try:
+            history = self._rows()
+        except SQLAlchemyError as e:
+            print(f"⚠️ Failed to read test history: {str(e).splitlines()[0]}")
+            return []
+        scores = [score_history(key, rows, threshold) for key, rows in history.items()]
+        scores = [s for s in scores if s.score >= min_score]
+        scores.sort(key=lambda s: (-s.score, -s.failures, s.test_key))
+        return scores[:limit]
+
+
+flake_history = FlakeHistory()
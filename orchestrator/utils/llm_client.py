@@ -0,0 +1,451 @@
+"""
+Shared LLM query client used by every workflow stage and agent.
+
+`query_llm` wraps claude_agent_sdk.query() with:
+
+- the fleet-wide limiter (one slot per attempt, see llm_limiter.py),
+- retries with exponential backoff and full jitter for transient failures
+  (dropped CLI connections, 408/429/5xx/529 and rate-limit or overloaded
+  API errors),
+- a circuit breaker per provider, so a dead provider fails fast instead of
+  every caller sitting through its own retries; once the cooldown has passed
+  a single trial call decides whether it closes again. Its state is kept in
+  the database next to the limiter's buckets (llm_breaker, migration 0015),
+  so the API and every stage subprocess share one circuit; against a
+  database without the table each process keeps its own,
+- per-call telemetry (latency, queue wait, attempts, tokens, cost) appended
+  to <RUN_DIR>/llm_calls.jsonl and the llm_call table (migration 0007).
+
+RUN_DIR is exported by the CLI for the stage subprocesses it starts. Each
+call is an "llm.query" tracing span when tracing is enabled (tracing.py).
+
+Configuration:
+
+    LLM_MAX_RETRIES=3            retries after the first attempt
+    LLM_BACKOFF_BASE=2           seconds; doubled per retry
+    LLM_BACKOFF_MAX=30           cap per sleep
+    LLM_BREAKER_THRESHOLD=5      consecutive failed calls that open the circuit
+    LLM_BREAKER_COOLDOWN=60      seconds before a trial call is let through
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from claude_agent_sdk import (
+    query,
+    ClaudeAgentOptions,
+    CLIConnectionError,
+    CLINotFoundError,
+    ProcessError,
+)
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from orchestrator.api.db import RawSQLStore
+from . import tracing
+from .llm_limiter import LEASE_SECONDS, llm_limiter, detect_provider
+
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "2"))
+BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "30"))
+BREAKER_THRESHOLD = int(os.environ.get("LLM_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", "60"))
+
+# Retryable API failures as the CLI reports them, e.g. "API Error: 529 {...overloaded_error...}"
+_TRANSIENT_RE = re.compile(
+    r"\b(?:API Error|status(?: code)?|HTTP)\W{0,3}(?:408|429|500|502|503|504|529)\b"
+    r"|\b(?:rate_limit_error|overloaded_error)\b",
+    re.IGNORECASE,
+)
+
+
+class TransientLLMError(Exception):
+    """A failure worth retrying (rate limit, overload, dropped connection)."""
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit is open."""
+
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, CLINotFoundError):
+        return False  # Missing CLI: retrying won't install it
+    if isinstance(error, (TransientLLMError, CLIConnectionError, ConnectionError)):
+        return True
+    if isinstance(error, ProcessError):
+        # The CLI exited; only retry when it reported a retryable API status
+        return bool(_TRANSIENT_RE.search(str(error)))  # Includes the CLI's stderr
+    return False
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (1-based)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+class BreakerStore(RawSQLStore):
+    probe_table = "llm_breaker"
+    unavailable_message = (
+        "Shared LLM circuit breaker unavailable, keeping circuits per process"
+    )
+
+    def load(self, provider: str):
+        with self.db().connect() as conn:
+            return conn.execute(
+                text(
+                    "SELECT failures, opened_at, probe_expires_at FROM llm_breaker WHERE provider = :provider"
+                ),
+                {"provider": provider},
+            ).first()
+
+    def claim_probe(self, provider: str, cooled_before: float) -> bool:
+        """Take the half-open trial call unless another process holds it."""
+        now = time.time()
+        with self.db().begin() as conn:
+            # The claim expires, so a prober that crashed can't wedge the circuit
+            updated = conn.execute(
+                text(
+                    "UPDATE llm_breaker SET probe_expires_at = :expires WHERE provider = :provider "
+                    "AND opened_at <= :cooled AND (probe_expires_at IS NULL OR probe_expires_at < :now)"
+                ),
+                {
+                    "expires": now + LEASE_SECONDS,
+                    "provider": provider,
+                    "cooled": cooled_before,
+                    "now": now,
+                },
+            )
+        return updated.rowcount == 1
+
+    def record_failure(self, provider: str, threshold: int, probe: bool):
+        """Count a failed call; (re)open the circuit at `threshold` or when the trial call failed."""
+        with self.db().begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO llm_breaker (provider, failures) VALUES (:provider, 1) "
+                    "ON CONFLICT (provider) DO UPDATE SET failures = llm_breaker.failures + 1"
+                ),
+                {"provider": provider},
+            )
+            conn.execute(
+                text(
+                    "UPDATE llm_breaker SET opened_at = :now, probe_expires_at = NULL "
+                    "WHERE provider = :provider AND (failures >= :threshold OR :probe)"
+                ),
+                {
+                    "now": time.time(),
+                    "provider": provider,
+                    "threshold": threshold,
+                    "probe": probe,
+                },
+            )
+
+    def reset(self, provider: str):
+        with self.db().begin() as conn:
+            conn.execute(
+                text("DELETE FROM llm_breaker WHERE provider = :provider"),
+                {"provider": provider},
+            )
+
+    def end_probe(self, provider: str):
+        with self.db().begin() as conn:
+            conn.execute(
+                text(
+                    "UPDATE llm_breaker SET probe_expires_at = NULL WHERE provider = :provider"
+                ),
+                {"provider": provider},
+            )
+
+
+breaker_store = BreakerStore()
+LOCAL = object()  # Result of a breaker store call when circuits are kept per process
+
+
+class CircuitBreaker:
+    """
+    One provider's circuit. The fields hold its last known state, refreshed
+    from breaker_store before each call; when the store is unavailable (or a
+    query on it fails) they are the whole state, private to this process.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        threshold: int = BREAKER_THRESHOLD,
+        cooldown: float = BREAKER_COOLDOWN,
+        store: Optional[BreakerStore] = None,
+    ):
+        self.provider = provider
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.store = store or breaker_store
+        self.failures = 0
+        self.opened_at: Optional[float] = None  # Epoch seconds, shared across processes
+        self.probing = False  # A half-open trial call is in flight
+
+    def _shared(self, method: Callable, *args):
+        """Apply a store method to this provider; LOCAL when the circuit is only kept here."""
+        if not self.store.is_available():
+            return LOCAL
+        try:
+            return method(self.provider, *args)
+        except SQLAlchemyError as e:
+            print(f"⚠️ Shared LLM circuit breaker failed: {str(e).splitlines()[0]}")
+            return LOCAL
+
+    def refresh(self):
+        row = self._shared(self.store.load)
+        if row is LOCAL:
+            return
+        self.failures, self.opened_at, self.probing = (
+            (row.failures, row.opened_at, (row.probe_expires_at or 0) > time.time())
+            if row
+            else (0, None, False)
+        )
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.time() - self.opened_at >= self.cooldown else "open"
+
+    def check(self) -> bool:
+        """Raise CircuitOpenError unless a call may go ahead; True when that call is the half-open trial."""
+        self.refresh()
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "half-open" and not self.probing:
+            claimed = self._shared(self.store.claim_probe, time.time() - self.cooldown)
+            if claimed is LOCAL or claimed:  # Unless another process took the trial
+                self.probing = True
+                return True
+        if state == "half-open":
+            raise CircuitOpenError(
+                f"LLM circuit half-open for {self.provider}, waiting for the trial call"
+            )
+        remaining = self.cooldown - (time.time() - self.opened_at)
+        raise CircuitOpenError(
+            f"LLM circuit open for {self.provider} ({remaining:.0f}s left) after "
+            f"{self.failures} consecutive failures"
+        )
+
+    def record_success(self):
+        if self.failures or self.opened_at is not None or self.probing:
+            self._shared(self.store.reset)
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self, probe: bool = False):
+        """Count a failed call; `probe` when it was the half-open trial call."""
+        self.failures += 1
+        if self.failures >= self.threshold or probe:
+            self.opened_at = time.time()
+        self.probing = False
+        if self._shared(self.store.record_failure, self.threshold, probe) is not LOCAL:
+            self.refresh()  # Pick up failures other processes recorded meanwhile
+
+    def end_probe(self):
+        """The trial call ended without an outcome (timeout, cancellation): let the next call try."""
+        self.probing = False
+        self._shared(self.store.end_probe)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(provider: str) -> CircuitBreaker:
+    return _breakers.setdefault(provider, CircuitBreaker(provider))
+
+
+@dataclass
+class LLMCall:
+    """Telemetry for one query_llm() call, across all of its attempts."""
+
+    stage: str
+    provider: str
+    model: Optional[str] = None
+    run_id: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    status: str = "ok"
+    error: Optional[str] = None
+    attempts: int = 0
+    duration_ms: float = 0
+    api_duration_ms: float = 0
+    queue_wait_ms: float = 0
+    num_turns: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_creation_tokens: int = 0
+    cost_usd: float = 0
+    prompt_chars: int = 0
+
+    def add_result(self, message):
+        usage = getattr(message, "usage", None) or {}
+        self.input_tokens += int(usage.get("input_tokens") or 0)
+        self.output_tokens += int(usage.get("output_tokens") or 0)
+        self.cache_read_tokens += int(usage.get("cache_read_input_tokens") or 0)
+        self.cache_creation_tokens += int(usage.get("cache_creation_input_tokens") or 0)
+        self.cost_usd += float(getattr(message, "total_cost_usd", None) or 0)
+        self.api_duration_ms += float(getattr(message, "duration_api_ms", None) or 0)
+        self.num_turns += int(getattr(message, "num_turns", None) or 0)
+
+
+# Called with every finished call in this process (e.g. the API's metrics)
+CALL_LISTENERS: List[Callable[["LLMCall"], None]] = []
+
+
+def _run_dir() -> Optional[Path]:
+    value = os.environ.get("RUN_DIR")
+    return Path(value) if value else None
+
+
+def record_call(call: LLMCall):
+    """Append the call to the run dir log and the llm_call table (best effort)."""
+    for listener in CALL_LISTENERS:
+        try:
+            listener(call)
+        except Exception as e:
+            print(f"⚠️ LLM call listener failed: {e}")
+
+    run_dir = _run_dir()
+    if run_dir and run_dir.exists():
+        try:
+            with open(run_dir / "llm_calls.jsonl", "a") as f:
+                f.write(json.dumps(asdict(call)) + "\n")
+        except OSError as e:
+            print(f"⚠️ Failed to write LLM call log: {e}")
+
+    if not llm_limiter.is_available():
+        return
+    try:
+        with llm_limiter.db().begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO llm_call (run_id, stage, provider, model, status, error, attempts, created_at, "
+                    "duration_ms, api_duration_ms, queue_wait_ms, num_turns, input_tokens, output_tokens, "
+                    "cache_read_tokens, cache_creation_tokens, cost_usd, prompt_chars) VALUES (:run_id, :stage, "
+                    ":provider, :model, :status, :error, :attempts, :started_at, :duration_ms, :api_duration_ms, "
+                    ":queue_wait_ms, :num_turns, :input_tokens, :output_tokens, :cache_read_tokens, "
+                    ":cache_creation_tokens, :cost_usd, :prompt_chars)"
+                ),
+                asdict(call),
+            )
+    except SQLAlchemyError as e:
+        print(f"⚠️ Failed to record LLM call: {str(e).splitlines()[0]}")
+
+
+async def _attempt(
+    prompt: str, options: ClaudeAgentOptions, call: LLMCall
+) -> Optional[str]:
+    """One query() round trip through the limiter. Returns the final result text."""
+    result = None
+    async with llm_limiter.slot(prompt, provider=call.provider) as lease:
+        call.queue_wait_ms += lease.queue_wait_ms
+        try:
+            async for message in query(prompt=prompt, options=options):
+                if hasattr(message, "result"):
+                    lease.record_usage(getattr(message, "usage", None))
+                    call.add_result(message)
+                    if getattr(message, "is_error", False) and _TRANSIENT_RE.search(
+                        message.result or ""
+                    ):
+                        raise TransientLLMError(message.result)
+                    result = message.result
+                    # Keep consuming so the SDK can shut down cleanly
+        except Exception as e:
+            # The SDK can raise during cleanup after the result arrived (e.g. anyio
+            # "cancel scope" errors); the result is still good
+            if result is None:
+                raise
+            if "cancel scope" not in str(e).lower():
+                print(f"⚠️ Ignoring LLM error after result: {e}")
+    return result
+
+
+async def query_llm(
+    prompt: str,
+    options: ClaudeAgentOptions,
+    stage: str,
+    timeout_seconds: Optional[float] = None,
+) -> Optional[str]:
+    """
+    Send `prompt` and return the final result text (None if the agent gave none).
+
+    Args:
+        prompt: Full prompt
+        options: SDK options (tools, setting sources, permissions)
+        stage: Label for telemetry, e.g. "planner" or "ExploratoryAgent"
+        timeout_seconds: Per-attempt timeout (timeouts are not retried)
+    """
+    provider = detect_provider()
+    breaker = breaker_for(provider)
+    run_dir = _run_dir()
+    call = LLMCall(
+        stage=stage,
+        provider=provider,
+        run_id=run_dir.name if run_dir else None,
+        model=os.environ.get("ANTHROPIC_MODEL")
+        or os.environ.get("ANTHROPIC_DEFAULT_SONNET_MODEL"),
+        prompt_chars=len(prompt),
+    )
+    started = time.monotonic()
+    with tracing.span(
+        "llm.query",
+        kind="client",
+        **{"llm.stage": stage, "llm.provider": provider, "llm.model": call.model},
+    ) as current:
+        probe = False
+        try:
+            probe = await asyncio.to_thread(breaker.check)
+            while True:
+                call.attempts += 1
+                try:
+                    attempt = _attempt(prompt, options, call)
+                    result = await (
+                        asyncio.wait_for(attempt, timeout_seconds)
+                        if timeout_seconds
+                        else attempt
+                    )
+                    await asyncio.to_thread(breaker.record_success)
+                    return result
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    raise
+                except Exception as e:
+                    if not is_transient(e) or call.attempts > MAX_RETRIES:
+                        await asyncio.to_thread(breaker.record_failure, probe)
+                        raise
+                    delay = backoff_delay(call.attempts)
+                    print(
+                        f"⚠️ {stage} LLM call failed ({str(e)[:200]}), retry {call.attempts}/{MAX_RETRIES} in {delay:.1f}s"
+                    )
+                    await asyncio.sleep(delay)
+        except BaseException as e:
+            call.status = "error"
+            call.error = f"{type(e).__name__}: {str(e)[:500]}"
+            raise
+        finally:
+            if probe:
+                await asyncio.to_thread(breaker.end_probe)
+            call.duration_ms = (time.monotonic() - started) * 1000
+            tracing.set_attributes(
+                current,
+                **{
+                    "llm.attempts": call.attempts,
+                    "llm.queue_wait_ms": call.queue_wait_ms,
+                    "llm.input_tokens": call.input_tokens,
+                    "llm.output_tokens": call.output_tokens,
+                    "llm.cost_usd": call.cost_usd,
+                    "llm.status": call.status,
+                },
+            )
+            await asyncio.to_thread(record_call, call)
@@ -0,0 +1,389 @@
+"""
+Fleet-wide LLM rate limiter.
+
+Every agent query() goes through `llm_limiter.slot(...)`, which waits for:
+
+- its turn in a priority queue (interactive runs before bulk runs),
+- a free concurrency slot for the provider,
+- a request and enough tokens in the provider's token buckets (requests/min
+  and tokens/min).
+
+State lives in the database (tables from migration 0006) so the limit holds
+across the API process and every workflow subprocess it spawns, on any node
+sharing DATABASE_URL. Bucket updates use optimistic versioning, so no
+database-specific locking is needed. When the tables aren't there (e.g. a CLI
+run against an unmigrated database) queries run unthrottled.
+
+Configuration (per provider overrides take a _<PROVIDER> suffix, e.g.
+LLM_RPM_OPENROUTER):
+
+    LLM_LIMITER=off              disable entirely
+    LLM_RPM=50                   requests per minute
+    LLM_TPM=40000                tokens per minute
+    LLM_MAX_CONCURRENCY=4        queries in flight at once
+    LLM_PRIORITY=interactive     priority of this process (interactive|bulk|<int>)
+"""
+
+import asyncio
+import os
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from orchestrator.api.db import RawSQLStore
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+PRIORITIES = {"interactive": PRIORITY_INTERACTIVE, "bulk": PRIORITY_BULK}
+
+# Waiters poll with jittered exponential backoff, so a long queue doesn't
+# keep the database busy; the cap bounds the delay after a slot frees up
+POLL_SECONDS = 0.1
+MAX_POLL_SECONDS = 2.0
+STALE_TICKET_SECONDS = 30  # waiting tickets whose owner stopped polling
+QUEUE_WAIT_RETENTION_SECONDS = 24 * 3600  # longest queue_stats window served by the API
+LEASE_SECONDS = float(
+    os.environ.get("LLM_LEASE_SECONDS", "900")
+)  # longest expected query
+CHARS_PER_TOKEN = 4
+EXPECTED_OUTPUT_TOKENS = 1024
+
+
+def _env(name: str, provider: str, default: str) -> str:
+    return os.environ.get(f"{name}_{provider.upper()}", os.environ.get(name, default))
+
+
+def detect_provider(base_url: Optional[str] = None) -> str:
+    """Provider behind ANTHROPIC_BASE_URL (same inference as the settings API)."""
+    base_url = (
+        base_url if base_url is not None else os.environ.get("ANTHROPIC_BASE_URL", "")
+    ).lower()
+    if "openrouter.ai" in base_url:
+        return "openrouter"
+    if "z.ai" in base_url:
+        return "zai"
+    return "anthropic"
+
+
+def current_priority() -> int:
+    value = os.environ.get("LLM_PRIORITY", "interactive").lower()
+    if value in PRIORITIES:
+        return PRIORITIES[value]
+    try:
+        return int(value)
+    except ValueError:
+        return PRIORITY_INTERACTIVE
+
+
+def estimate_tokens(prompt: str) -> int:
+    return len(prompt or "") // CHARS_PER_TOKEN + EXPECTED_OUTPUT_TOKENS
+
+
+@dataclass
+class Limits:
+    rpm: float
+    tpm: float
+    max_concurrency: int
+
+    @classmethod
+    def for_provider(cls, provider: str) -> "Limits":
+        return cls(
+            rpm=float(_env("LLM_RPM", provider, "50")),
+            tpm=float(_env("LLM_TPM", provider, "40000")),
+            max_concurrency=int(_env("LLM_MAX_CONCURRENCY", provider, "4")),
+        )
+
+
+@dataclass
+class Lease:
+    """A granted query slot. Report real usage with `record_usage` before release."""
+
+    ticket_id: Optional[str]
+    provider: str
+    priority: int
+    estimated_tokens: int
+    queue_wait_ms: float
+    actual_tokens: Optional[int] = None
+
+    def record_usage(self, usage: Optional[Dict[str, Any]]):
+        """Take token counts from an SDK ResultMessage.usage dict."""
+        if not usage:
+            return
+        self.actual_tokens = sum(
+            int(usage.get(k) or 0)
+            for k in (
+                "input_tokens",
+                "output_tokens",
+                "cache_creation_input_tokens",
+                "cache_read_input_tokens",
+            )
+        )
+
+
+class LLMLimiter(RawSQLStore):
+    probe_table = "llm_rate_bucket"
+    unavailable_message = "LLM limiter unavailable, running unthrottled"
+
+    @property
+    def enabled(self) -> bool:
+        return os.environ.get("LLM_LIMITER", "on").lower() not in ("off", "false", "0")
+
+    # ----- queue -----
+
+    def _enqueue(self, provider: str, priority: int) -> str:
+        ticket_id = uuid.uuid4().hex
+        now = time.time()
+        with self.db().begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO llm_queue (id, provider, priority, state, enqueued_at, heartbeat_at, lease_expires_at) "
+                    "VALUES (:id, :provider, :priority, 'waiting', :now, :now, NULL)"
+                ),
+                {
+                    "id": ticket_id,
+                    "provider": provider,
+                    "priority": priority,
+                    "now": now,
+                },
+            )
+        return ticket_id
+
+    def _try_acquire(
+        self, ticket_id: str, provider: str, tokens: int, limits: Limits
+    ) -> bool:
+        """One attempt to move `ticket_id` from waiting to active."""
+        now = time.time()
+        with self.db().begin() as conn:
+            conn.execute(
+                text(
+                    "DELETE FROM llm_queue WHERE provider = :provider AND ("
+                    "(state = 'waiting' AND heartbeat_at < :stale) OR (state = 'active' AND lease_expires_at < :now))"
+                ),
+                {"provider": provider, "stale": now - STALE_TICKET_SECONDS, "now": now},
+            )
+            conn.execute(
+                text("UPDATE llm_queue SET heartbeat_at = :now WHERE id = :id"),
+                {"now": now, "id": ticket_id},
+            )
+
+            head = conn.execute(
+                text(
+                    "SELECT id FROM llm_queue WHERE provider = :provider AND state = 'waiting' "
+                    "ORDER BY priority, enqueued_at, id LIMIT 1"
+                ),
+                {"provider": provider},
+            ).scalar()
+            if head != ticket_id:
+                return False
+            active = conn.execute(
+                text(
+                    "SELECT COUNT(*) FROM llm_queue WHERE provider = :provider AND state = 'active'"
+                ),
+                {"provider": provider},
+            ).scalar()
+            if active >= limits.max_concurrency:
+                return False
+
+            bucket = conn.execute(
+                text(
+                    "SELECT request_tokens, tokens, updated_at, version FROM llm_rate_bucket WHERE provider = :provider"
+                ),
+                {"provider": provider},
+            ).first()
+            if bucket is None:
+                conn.execute(
+                    text(
+                        "INSERT INTO llm_rate_bucket (provider, request_tokens, tokens, updated_at, version) "
+                        "VALUES (:provider, :rpm, :tpm, :now, 0)"
+                    ),
+                    {
+                        "provider": provider,
+                        "rpm": limits.rpm,
+                        "tpm": limits.tpm,
+                        "now": now,
+                    },
+                )
+                return False
+
+            elapsed = max(0.0, now - bucket.updated_at)
+            requests_left = min(
+                limits.rpm, bucket.request_tokens + elapsed * limits.rpm / 60
+            )
+            tokens_left = min(limits.tpm, bucket.tokens + elapsed * limits.tpm / 60)
+            # A single query larger than the whole bucket only needs a full bucket
+            needed = min(tokens, limits.tpm)
+            if requests_left < 1 or tokens_left < needed:
+                return False
+
+            updated = conn.execute(
+                text(
+                    "UPDATE llm_rate_bucket SET request_tokens = :requests, tokens = :tokens, updated_at = :now, "
+                    "version = version + 1 WHERE provider = :provider AND version = :version"
+                ),
+                {
+                    "requests": requests_left - 1,
+                    "tokens": tokens_left - needed,
+                    "now": now,
+                    "provider": provider,
+                    "version": bucket.version,
+                },
+            )
+            if updated.rowcount != 1:
+                return False  # Another process took tokens first
+            conn.execute(
+                text(
+                    "UPDATE llm_queue SET state = 'active', lease_expires_at = :expires WHERE id = :id"
+                ),
+                {"expires": now + LEASE_SECONDS, "id": ticket_id},
+            )
+            return True
+
+    def _attempt(
+        self, ticket_id: str, provider: str, tokens: int, limits: Limits
+    ) -> bool:
+        try:
+            return self._try_acquire(ticket_id, provider, tokens, limits)
+        except SQLAlchemyError:
+            # Lock contention or a concurrent bucket insert; try again next poll
+            return False
+
+    def _release(self, ticket_id: str, lease: Optional[Lease]):
+        """Drop the ticket; for a granted lease also log its queue wait and settle its tokens."""
+        with self.db().begin() as conn:
+            conn.execute(
+                text("DELETE FROM llm_queue WHERE id = :id"), {"id": ticket_id}
+            )
+            if lease is None:
+                return  # Never left the queue, so nothing was taken from the buckets
+            now = time.time()
+            conn.execute(
+                text(
+                    "INSERT INTO llm_queue_wait (provider, priority, wait_ms, created_at) "
+                    "VALUES (:provider, :priority, :wait_ms, :now)"
+                ),
+                {
+                    "provider": lease.provider,
+                    "priority": lease.priority,
+                    "wait_ms": lease.queue_wait_ms,
+                    "now": now,
+                },
+            )
+            # Samples older than any stats window are never read again
+            conn.execute(
+                text("DELETE FROM llm_queue_wait WHERE created_at < :cutoff"),
+                {"cutoff": now - QUEUE_WAIT_RETENTION_SECONDS},
+            )
+            self._settle(conn, lease)
+
+    def _settle(self, conn, lease: Lease):
+        """
+        Correct the token bucket from the estimate taken at acquisition to real
+        usage (may push it below zero). This runs for every granted lease,
+        whether its query succeeded or failed; a query that failed before
+        reporting usage keeps its estimate charged.
+        """
+        if lease.actual_tokens is None:
+            return
+        conn.execute(
+            text(
+                "UPDATE llm_rate_bucket SET tokens = tokens - :delta, version = version + 1 "
+                "WHERE provider = :provider"
+            ),
+            {
+                "delta": lease.actual_tokens - lease.estimated_tokens,
+                "provider": lease.provider,
+            },
+        )
+
+    # ----- public API -----
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        prompt: str = "",
+        provider: Optional[str] = None,
+        priority: Optional[int] = None,
+    ):
+        """Wait for permission to send one query; yields a Lease."""
+        provider = provider or detect_provider()
+        priority = current_priority() if priority is None else priority
+        tokens = estimate_tokens(prompt)
+
+        if not self.enabled or not await asyncio.to_thread(self.is_available):
+            yield Lease(None, provider, priority, tokens, queue_wait_ms=0.0)
+            return
+
+        limits = Limits.for_provider(provider)
+        started = time.monotonic()
+        ticket_id = await asyncio.to_thread(self._enqueue, provider, priority)
+        lease = None
+        delay = POLL_SECONDS
+        try:
+            while not await asyncio.to_thread(
+                self._attempt, ticket_id, provider, tokens, limits
+            ):
+                await asyncio.sleep(delay * (0.5 + random.random()))
+                delay = min(delay * 2, MAX_POLL_SECONDS)
+            lease = Lease(
+                ticket_id,
+                provider,
+                priority,
+                tokens,
+                queue_wait_ms=(time.monotonic() - started) * 1000,
+            )
+            yield lease
+        finally:
+            try:
+                await asyncio.to_thread(self._release, ticket_id, lease)
+            except SQLAlchemyError as e:
+                print(f"⚠️ Failed to release LLM slot: {e}")
+
+
+def queue_stats(conn, since_seconds: float = 3600) -> Dict[str, Any]:
+    """Queue depth, in-flight queries and queue-wait percentiles per provider."""
+    now = time.time()
+    stats: Dict[str, Any] = {}
+    for provider, priority, state, count in conn.execute(
+        text(
+            "SELECT provider, priority, state, COUNT(*) FROM llm_queue GROUP BY provider, priority, state"
+        )
+    ):
+        entry = stats.setdefault(provider, {"waiting": {}, "active": 0})
+        if state == "active":
+            entry["active"] += count
+        else:
+            entry["waiting"][str(priority)] = count
+
+    waits: Dict[str, list] = {}
+    for provider, wait_ms in conn.execute(
+        text(
+            "SELECT provider, wait_ms FROM llm_queue_wait WHERE created_at >= :since ORDER BY wait_ms"
+        ),
+        {"since": now - since_seconds},
+    ):
+        waits.setdefault(provider, []).append(float(wait_ms))
+    for provider, samples in waits.items():
+        entry = stats.setdefault(provider, {"waiting": {}, "active": 0})
+        entry["queue_wait_ms"] = {
+            "count": len(samples),
+            "p50": samples[int(0.50 * (len(samples) - 1))],
+            "p95": samples[int(0.95 * (len(samples) - 1))],
+            "max": samples[-1],
+        }
+    for provider, entry in stats.items():
+        limits = Limits.for_provider(provider)
+        entry["limits"] = {
+            "rpm": limits.rpm,
+            "tpm": limits.tpm,
+            "max_concurrency": limits.max_concurrency,
+        }
+    return stats
+
+
+llm_limiter = LLMLimiter()
@@ -0,0 +1,249 @@
+"""
+Compressed, seekable run logs.
+
+A finished execution.log is compacted into execution.log.zst (or .gz when
+zstandard isn't installed) plus execution.log.idx. The compressed file is a
+sequence of independently compressed chunks of about LOG_CHUNK_KB each,
+always cut after a newline; the index records where each chunk starts in the
+original text (byte offset and line number) and in the compressed file. A
+byte range, a line range or the tail then decompresses only the chunks it
+overlaps. The chunks are plain zstd frames / gzip members, so `zstdcat` and
+`zcat` read the file as is.
+
+`LogReader` serves the same calls from a live execution.log, a compacted
+log, or a whole-file .gz without an index.
+
+    RUN_LOG_CODEC=zstd       zstd | gzip | none (keep logs as plain text)
+    LOG_CHUNK_KB=256
+"""
+
+import bisect
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # gzip only
+    zstandard = None
+
+CHUNK_BYTES = int(os.environ.get("LOG_CHUNK_KB", "256")) * 1024
+EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+INDEX_SUFFIX = ".idx"
+
+
+def default_codec() -> Optional[str]:
+    codec = os.environ.get("RUN_LOG_CODEC", "zstd").lower()
+    if codec == "none":
+        return None
+    if codec == "zstd" and zstandard is None:
+        return "gzip"
+    return codec
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this log")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _split_lines(data: bytes) -> List[str]:
+    """
+    Lines of `data` without their newlines, split on newline bytes only, the
+    way the index counts them (str.splitlines() also splits on carriage
+    returns, form feeds, U+2028 and more, which would shift line numbers).
+    """
+    if not data:
+        return []
+    lines = data.decode(errors="replace").split("\n")
+    if data.endswith(b"\n"):
+        lines.pop()
+    return lines
+
+
+def _chunks(path: Path, chunk_bytes: int):
+    """Blocks of about chunk_bytes ending on a newline (or at end of file); longer lines get a block of their own."""
+    pending = b""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_bytes)
+            pending += block
+            while len(pending) >= chunk_bytes:
+                cut = pending.rfind(b"\n", 0, chunk_bytes)
+                if cut < 0:
+                    cut = pending.find(b"\n", chunk_bytes)
+                if cut < 0:
+                    break
+                yield pending[: cut + 1]
+                pending = pending[cut + 1 :]
+            if not block:
+                if pending:
+                    yield pending
+                return
+
+
+def compact_log(
+    path: Path, codec: Optional[str] = None, chunk_bytes: int = CHUNK_BYTES
+) -> Optional[Path]:
+    """
+    Replace a plain log with its chunked, compressed form and index.
+    Returns the compressed file, or None when compaction is off or there is no log.
+    """
+    path = Path(path)
+    codec = codec or default_codec()
+    if codec is None or not path.exists():
+        return None
+    target = path.with_name(path.name + EXTENSIONS[codec])
+    chunks, offset, line, pos = [], 0, 0, 0
+    with open(target, "wb") as out:
+        for block in _chunks(path, chunk_bytes):
+            compressed = _compress(codec, block)
+            out.write(compressed)
+            # [original offset, first line, compressed offset, compressed length]
+            chunks.append([offset, line, pos, len(compressed)])
+            offset, line, pos = (
+                offset + len(block),
+                line + block.count(b"\n"),
+                pos + len(compressed),
+            )
+    index = {
+        "codec": codec,
+        "size": offset,
+        "lines": line + (0 if not offset or block.endswith(b"\n") else 1),
+        "chunks": chunks,
+    }
+    path.with_name(path.name + INDEX_SUFFIX).write_text(json.dumps(index))
+    stat = path.stat()
+    os.utime(target, (stat.st_atime, stat.st_mtime))
+    path.unlink()
+    return target
+
+
+class LogReader:
+    """Byte ranges, line ranges and the tail of a run log, in whichever form it is stored."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.index = None
+        self.data_path = None
+        index_path = self.path.with_name(self.path.name + INDEX_SUFFIX)
+        if self.path.exists():
+            self.kind = "plain"
+        elif index_path.exists():
+            self.index = json.loads(index_path.read_text())
+            self.data_path = self.path.with_name(
+                self.path.name + EXTENSIONS[self.index["codec"]]
+            )
+            self.kind = "chunked"
+        elif self.path.with_name(self.path.name + ".gz").exists():
+            self.data_path = self.path.with_name(self.path.name + ".gz")
+            self.kind = "gzip"
+        else:
+            self.kind = None
+        self._whole: Optional[bytes] = None
+
+    @property
+    def exists(self) -> bool:
+        return self.kind is not None
+
+    @property
+    def size(self) -> int:
+        if self.kind == "plain":
+            return self.path.stat().st_size
+        if self.kind == "chunked":
+            return self.index["size"]
+        return len(self._read_whole()) if self.kind else 0
+
+    @property
+    def line_count(self) -> int:
+        if self.kind == "chunked":
+            return self.index["lines"]
+        data = self._read_whole()
+        return data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
+
+    def _read_whole(self) -> bytes:
+        if self._whole is None:
+            if self.kind == "plain":
+                self._whole = self.path.read_bytes()
+            elif self.kind == "gzip":
+                self._whole = gzip.decompress(self.data_path.read_bytes())
+            elif self.kind == "chunked":
+                self._whole = self._read_chunks(0, len(self.index["chunks"]))[1]
+            else:
+                self._whole = b""
+        return self._whole
+
+    def _read_chunks(self, first: int, last: int) -> Tuple[int, bytes]:
+        """Decompressed chunks [first, last) and the original offset they start at."""
+        chunks = self.index["chunks"][first:last]
+        if not chunks:
+            return self.index["size"], b""
+        parts = []
+        with open(self.data_path, "rb") as f:
+            for _, _, pos, length in chunks:
+                f.seek(pos)
+                parts.append(_decompress(self.index["codec"], f.read(length)))
+        return chunks[0][0], b"".join(parts)
+
+    def read_bytes(self, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Bytes [start, end) of the original log."""
+        size = self.size
+        end = size if end is None else min(end, size)
+        if start >= end:
+            return b""
+        if self.kind == "plain":
+            with open(self.path, "rb") as f:
+                f.seek(start)
+                return f.read(end - start)
+        if self.kind != "chunked":
+            return self._read_whole()[start:end]
+        offsets = [chunk[0] for chunk in self.index["chunks"]]
+        first = bisect.bisect_right(offsets, start) - 1
+        last = bisect.bisect_left(offsets, end)
+        base, data = self._read_chunks(first, last)
+        return data[start - base : end - base]
+
+    def read_lines(self, start: int = 0, end: Optional[int] = None) -> List[str]:
+        """Lines [start, end) of the original log, without their newlines."""
+        if end is not None and start >= end:
+            return []
+        if self.kind != "chunked":
+            return _split_lines(self._read_whole())[start:end]
+        line_starts = [chunk[1] for chunk in self.index["chunks"]]
+        first = max(0, bisect.bisect_right(line_starts, start) - 1)
+        last = len(line_starts) if end is None else bisect.bisect_left(line_starts, end)
+        _, data = self._read_chunks(first, last)
+        skip = start - line_starts[first] if line_starts else 0
+        lines = _split_lines(data)
+        return lines[skip : None if end is None else end - line_starts[first]]
+
+    def tail(self, lines: int = 100) -> List[str]:
+        """The last `lines` lines."""
+        if lines <= 0:
+            return []
+        if self.kind == "chunked":
+            return self.read_lines(max(0, self.line_count - lines))
+        if self.kind == "plain":
+            # Read backwards from the end until there are enough lines
+            size, data = self.size, b""
+            with open(self.path, "rb") as f:
+                while size > 0 and data.count(b"\n") <= lines:
+                    step = min(CHUNK_BYTES, size)
+                    size -= step
+                    f.seek(size)
+                    data = f.read(step) + data
+            return _split_lines(data)[-lines:]
+        return _split_lines(self._read_whole())[-lines:]
+
+    def read_text(self) -> str:
+        return self._read_whole().decode(errors="replace")
@@ -0,0 +1,174 @@
+"""
+Structured results from Playwright's JSON reporter.
+
+`npx playwright test --reporter=json` (with PLAYWRIGHT_JSON_OUTPUT_NAME)
+writes every test, its results, errors, steps and attachments. The
+validator turns that into one FailureRecord per failing test and sends
+only `failure_excerpt()` to the fix prompt, instead of all of stdout.
+Tests that failed and then passed on a Playwright retry ("flaky") count
+as passing; they are recorded separately so they can still be reported.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+_ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+# "waiting for getByRole('button', { name: 'Login' })" / "locator('#flash')"
+_LOCATOR_RE = re.compile(
+    r"waiting for ((?:page\.)?(?:getBy\w+|locator)\(.*?\))(?:\s|$)|"
+    r"Locator: ((?:getBy\w+|locator)\(.*?\))\s*$",
+    re.MULTILINE,
+)
+
+MAX_ERROR_CHARS = 1500
+MAX_EXCERPT_CHARS = 6000
+FAILED_STATUSES = {"unexpected"}
+FLAKY_STATUS = "flaky"  # Failed, then passed on a retry
+
+
+@dataclass
+class FailureRecord:
+    test: str
+    file: Optional[str] = None
+    line: Optional[int] = None
+    project: Optional[str] = None
+    status: Optional[str] = None
+    step: Optional[str] = None
+    error: str = ""
+    locator: Optional[str] = None
+    location: Optional[str] = None
+    snippet: Optional[str] = None
+    attachments: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def strip_ansi(text: str) -> str:
+    return _ANSI_RE.sub("", text or "")
+
+
+def _failing_step(steps: List[Dict[str, Any]]) -> Optional[str]:
+    """Title path of the innermost step that recorded an error."""
+    for step in steps or []:
+        if step.get("error"):
+            inner = _failing_step(step.get("steps"))
+            return f"{step.get('title')} > {inner}" if inner else step.get("title")
+    return None
+
+
+def _find_locator(message: str) -> Optional[str]:
+    match = _LOCATOR_RE.search(message)
+    return (match.group(1) or match.group(2)) if match else None
+
+
+def _walk_specs(suite: Dict[str, Any], titles: List[str]):
+    title = suite.get("title")
+    # File-level suites are titled with the file name; keep describe() titles only
+    path = titles + [title] if title and not title.endswith((".ts", ".js")) else titles
+    for spec in suite.get("specs", []):
+        yield path, spec
+    for child in suite.get("suites", []):
+        yield from _walk_specs(child, path)
+
+
+def _failure_record(
+    titles: List[str], spec: Dict[str, Any], test: Dict[str, Any]
+) -> FailureRecord:
+    results = test.get("results") or [{}]
+    # The last failed retry has the most relevant error
+    result = next(
+        (r for r in reversed(results) if r.get("status") not in ("passed", "skipped")),
+        results[-1],
+    )
+    error = result.get("error") or next(iter(result.get("errors") or []), {}) or {}
+    message = strip_ansi(error.get("message") or error.get("value") or "")
+    location = error.get("location") or {}
+    return FailureRecord(
+        test=" > ".join(titles + [spec.get("title", "")]),
+        file=spec.get("file"),
+        line=spec.get("line"),
+        project=test.get("projectName"),
+        status=result.get("status") or test.get("status"),
+        step=_failing_step(result.get("steps")),
+        error=message[:MAX_ERROR_CHARS],
+        locator=_find_locator(message),
+        location=(
+            f"{location.get('file')}:{location.get('line')}"
+            if location.get("file")
+            else None
+        ),
+        snippet=strip_ansi(error.get("snippet") or "") or None,
+        attachments=[a["path"] for a in result.get("attachments", []) if a.get("path")],
+    )
+
+
+def parse_report(report: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    {"stats": {...}, "failures": [FailureRecord], "flaky": [FailureRecord],
+    "errors": [str]} from a JSON report. Flaky tests passed on a retry, so
+    they are not failures; their records hold the error of the failed try.
+    """
+    failures: List[FailureRecord] = []
+    flaky: List[FailureRecord] = []
+    for titles, spec in (
+        item for suite in report.get("suites", []) for item in _walk_specs(suite, [])
+    ):
+        for test in spec.get("tests", []):
+            if test.get("status") in FAILED_STATUSES:
+                failures.append(_failure_record(titles, spec, test))
+            elif test.get("status") == FLAKY_STATUS:
+                flaky.append(_failure_record(titles, spec, test))
+    errors = [
+        strip_ansi(e.get("message", ""))[:MAX_ERROR_CHARS]
+        for e in report.get("errors", [])
+    ]
+    return {
+        "stats": report.get("stats", {}),
+        "failures": failures,
+        "flaky": flaky,
+        "errors": errors,
+    }
+
+
+def load_report(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return parse_report(json.loads(Path(path).read_text()))
+    except (OSError, ValueError):
+        return None
+
+
+def failure_excerpt(
+    failures: List[FailureRecord],
+    errors: List[str] = (),
+    max_chars: int = MAX_EXCERPT_CHARS,
+) -> str:
+    """Compact text of what failed, for the fix prompt."""
+    parts = [f"Error: {e}" for e in errors]
+    for failure in failures:
+        lines = [f"Test: {failure.test}"]
+        if failure.step:
+            lines.append(f"Step: {failure.step}")
+        if failure.locator:
+            lines.append(f"Locator: {failure.locator}")
+        if failure.location:
+            lines.append(f"At: {failure.location}")
+        lines.append(f"Error: {failure.error}")
+        if failure.snippet:
+            lines.append(failure.snippet)
+        parts.append("\n".join(lines))
+    text = "\n\n".join(parts)
+    return text if len(text) <= max_chars else text[:max_chars] + "\n... (truncated)"
+
+
+def output_tail(output: str, max_chars: int = MAX_EXCERPT_CHARS) -> str:
+    """Last part of raw output, when there is no JSON report to go on."""
+    output = strip_ansi(output)
+    return (
+        output
+        if len(output) <= max_chars
+        else "... (truncated)\n" + output[-max_chars:]
+    )
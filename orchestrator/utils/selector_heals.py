@@ -0,0 +1,286 @@
+"""
+Selector healing memory shared across runs and specs (selector_heal table,
+migration 0009).
+
+When the validator's LLM fixer repairs a test, the locators it changed are
+recorded as heals: old selector + page URL pattern -> healed selector. The
+next test that fails on the same old selector on a matching page gets the
+known heal applied and re-run locally before any LLM call; the operator is
+told about heals for the pages in its plan, and the exporter rewrites
+generated code with confident heals. Heals are tied to the page they were
+learned on: a fix in code without a page.goto() is not remembered, and code
+without one gets no heals.
+
+Confidence is the Laplace estimate (successes + 1) / (successes + failures + 2),
+updated every time a heal is verified by a test run.
+
+    SELECTOR_HEAL_MIN_CONFIDENCE=0.6   applied without verification (exporter, operator)
+    SELECTOR_HEAL_TRY_CONFIDENCE=0.3   tried by the validator, which re-runs the test
+    SELECTOR_HEALS=off                 disable the store
+"""
+
+import difflib
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from orchestrator.api.db import RawSQLStore
+
+MIN_CONFIDENCE = float(os.environ.get("SELECTOR_HEAL_MIN_CONFIDENCE", "0.6"))
+TRY_CONFIDENCE = float(os.environ.get("SELECTOR_HEAL_TRY_CONFIDENCE", "0.3"))
+
+_STRING = r"'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\""
+_STRING_RE = re.compile(_STRING)
+# getByRole('button', { name: 'Login' }) / locator('#id'), one level of nested parens
+LOCATOR_RE = re.compile(
+    r"(?:getBy\w+|locator)\((?:" + _STRING + r"|\([^()]*\)|[^()'\"])*\)"
+)
+_GOTO_RE = re.compile(r"page\.goto\(\s*(" + _STRING + r")")
+_VARIABLE_SEGMENT_RE = re.compile(
+    r"^(\d+|[0-9a-f]{8}-[0-9a-f-]{27,}|[0-9a-f]{16,})$", re.IGNORECASE
+)
+
+
+def selector_key(selector: str) -> str:
+    """Comparable form: no "page." prefix, no whitespace outside string literals."""
+    selector = selector.strip().rstrip(";")
+    if selector.startswith("page."):
+        selector = selector[len("page.") :]
+    parts, last = [], 0
+    for match in _STRING_RE.finditer(selector):
+        parts.append(re.sub(r"\s+", "", selector[last : match.start()]))
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(re.sub(r"\s+", "", selector[last:]))
+    return "".join(parts)
+
+
+def url_pattern(url: Optional[str]) -> str:
+    """host + path with ids replaced by *, e.g. example.com/users/*/edit. "" if unknown."""
+    if not url:
+        return ""
+    parsed = urlparse(url.strip())
+    segments = [
+        "*" if _VARIABLE_SEGMENT_RE.match(s) else s for s in parsed.path.split("/")
+    ]
+    path = "/".join(segments).rstrip("/") or "/"
+    return f"{parsed.netloc}{path}" if parsed.netloc else path
+
+
+def _pattern_matches(stored: str, wanted: str) -> bool:
+    if not stored or not wanted:
+        return False  # An unknown page must not match every page
+    if stored == wanted:
+        return True
+    # Relative goto('/login') against a recorded host pattern, or the reverse
+    stored_path = stored[stored.find("/") :] if "/" in stored else stored
+    wanted_path = wanted[wanted.find("/") :] if "/" in wanted else wanted
+    return (
+        stored.startswith("/") or wanted.startswith("/")
+    ) and stored_path == wanted_path
+
+
+def first_url(code: str) -> Optional[str]:
+    match = _GOTO_RE.search(code)
+    return match.group(1)[1:-1] if match else None
+
+
+def locators_in(code: str) -> List[str]:
+    return LOCATOR_RE.findall(code)
+
+
+def diff_heals(old_code: str, new_code: str) -> List[Tuple[str, str]]:
+    """(old, new) locator pairs for lines where a fix swapped one locator for another."""
+    old_lines, new_lines = old_code.splitlines(), new_code.splitlines()
+    heals = []
+    matcher = difflib.SequenceMatcher(a=old_lines, b=new_lines, autojunk=False)
+    for op, a1, a2, b1, b2 in matcher.get_opcodes():
+        if op != "replace" or a2 - a1 != b2 - b1:
+            continue
+        for old_line, new_line in zip(old_lines[a1:a2], new_lines[b1:b2]):
+            old_locators, new_locators = locators_in(old_line), locators_in(new_line)
+            if len(old_locators) != len(new_locators):
+                continue
+            for old, new in zip(old_locators, new_locators):
+                if selector_key(old) != selector_key(new):
+                    heals.append((old, new))
+    return heals
+
+
+def _flexible_pattern(key: str) -> re.Pattern:
+    """Regex for a selector key allowing whitespace between tokens, not inside strings."""
+    parts, last = [], 0
+    for match in _STRING_RE.finditer(key):
+        parts.extend(re.escape(c) for c in key[last : match.start()])
+        parts.append(re.escape(match.group(0)))
+        last = match.end()
+    parts.extend(re.escape(c) for c in key[last:])
+    return re.compile(r"\s*".join(parts))
+
+
+def apply_heals(code: str, heals: List["Heal"]) -> Tuple[str, List["Heal"]]:
+    """Replace each heal's old selector (whitespace-insensitively) in `code`."""
+    applied = []
+    for heal in heals:
+        pattern = _flexible_pattern(selector_key(heal.old_selector))
+        code, count = pattern.subn(lambda _: heal.healed_selector, code)
+        if count:
+            applied.append(heal)
+    return code, applied
+
+
+@dataclass
+class Heal:
+    id: int
+    old_selector: str
+    url_pattern: str
+    healed_selector: str
+    confidence: float
+    successes: int
+    failures: int
+    last_verified_at: Optional[float]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+class HealingStore(RawSQLStore):
+    probe_table = "selector_heal"
+    switch_env = "SELECTOR_HEALS"
+    unavailable_message = "Selector healing store unavailable"
+
+    def _select(
+        self, where: str = "", params: Optional[Dict[str, Any]] = None
+    ) -> List[Heal]:
+        with self.db().connect() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT id, old_selector, url_pattern, healed_selector, confidence, successes, failures, "
+                    f"last_verified_at FROM selector_heal {where} ORDER BY confidence DESC, last_verified_at DESC"
+                ),
+                params or {},
+            )
+            return [Heal(*row) for row in rows]
+
+    def find(
+        self, selector: str, url: Optional[str], min_confidence: float = TRY_CONFIDENCE
+    ) -> List[Heal]:
+        """Known heals for `selector` on a page matching `url`, most confident first (none without a url)."""
+        if not url_pattern(url) or not self.is_available():
+            return []
+        try:
+            heals = self._select(
+                "WHERE selector_key = :key AND confidence >= :min",
+                {"key": selector_key(selector), "min": min_confidence},
+            )
+        except SQLAlchemyError as e:
+            print(f"⚠️ Failed to look up selector heals: {str(e).splitlines()[0]}")
+            return []
+        wanted = url_pattern(url)
+        return [h for h in heals if _pattern_matches(h.url_pattern, wanted)]
+
+    def known_heals(
+        self,
+        urls: List[Optional[str]],
+        min_confidence: float = MIN_CONFIDENCE,
+        limit: int = 50,
+    ) -> List[Heal]:
+        """Confident heals for pages matching any of `urls` (none if no url is known)."""
+        wanted = [pattern for pattern in (url_pattern(u) for u in urls) if pattern]
+        if not wanted:
+            return []
+        heals = self.list_heals(min_confidence, limit=None)
+        return [
+            h for h in heals if any(_pattern_matches(h.url_pattern, w) for w in wanted)
+        ][:limit]
+
+    def list_heals(
+        self, min_confidence: float = 0.0, limit: Optional[int] = 200
+    ) -> List[Heal]:
+        """Every stored heal, most confident first, for listing rather than applying."""
+        if not self.is_available():
+            return []
+        try:
+            heals = self._select("WHERE confidence >= :min", {"min": min_confidence})
+        except SQLAlchemyError as e:
+            print(f"⚠️ Failed to look up selector heals: {str(e).splitlines()[0]}")
+            return []
+        return heals[:limit]
+
+    def record_heal(
+        self,
+        old_selector: str,
+        healed_selector: str,
+        url: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> Optional[int]:
+        """
+        Store a heal that was just verified by a passing run (or count another
+        verification). Not stored without a url: it could never be matched.
+        """
+        key, pattern, now = selector_key(old_selector), url_pattern(url), time.time()
+        if not pattern or not self.is_available():
+            return None
+        try:
+            with self.db().begin() as conn:
+                row = conn.execute(
+                    text(
+                        "SELECT id FROM selector_heal WHERE selector_key = :key AND url_pattern = :pattern "
+                        "AND healed_selector = :healed"
+                    ),
+                    {"key": key, "pattern": pattern, "healed": healed_selector},
+                ).first()
+                if row:
+                    heal_id = row[0]
+                else:
+                    heal_id = conn.execute(
+                        text(
+                            "INSERT INTO selector_heal (selector_key, old_selector, url_pattern, healed_selector, "
+                            "confidence, successes, failures, source, created_at, last_verified_at) VALUES (:key, :old, "
+                            ":pattern, :healed, 0.5, 0, 0, :source, :now, NULL) RETURNING id"
+                        ),
+                        {
+                            "key": key,
+                            "old": old_selector,
+                            "pattern": pattern,
+                            "healed": healed_selector,
+                            "source": source,
+                            "now": now,
+                        },
+                    ).scalar_one()
+        except SQLAlchemyError as e:
+            print(f"⚠️ Failed to record selector heal: {str(e).splitlines()[0]}")
+            return None
+        self.record_result(heal_id, ok=True)
+        return heal_id
+
+    def record_result(self, heal_id: int, ok: bool):
+        """Update confidence after a test run with the heal applied."""
+        column = "successes" if ok else "failures"
+        try:
+            with self.db().begin() as conn:
+                conn.execute(
+                    text(
+                        f"UPDATE selector_heal SET {column} = {column} + 1, "
+                        "last_verified_at = CASE WHEN :ok THEN :now ELSE last_verified_at END WHERE id = :id"
+                    ),
+                    {"id": heal_id, "ok": ok, "now": time.time()},
+                )
+                conn.execute(
+                    text(
+                        "UPDATE selector_heal SET confidence = (successes + 1.0) / (successes + failures + 2.0) "
+                        "WHERE id = :id"
+                    ),
+                    {"id": heal_id},
+                )
+        except SQLAlchemyError as e:
+            print(f"⚠️ Failed to update selector heal: {str(e).splitlines()[0]}")
+
+
+healing_store = HealingStore()
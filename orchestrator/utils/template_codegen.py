@@ -0,0 +1,166 @@
+"""
+Deterministic Playwright code generation for simple run traces.
+
+Most traces only navigate, click, fill, assert and take screenshots, and
+the Operator records the exact selector it used for each interaction. For
+those, the TypeScript can be written directly from run.json without an LLM
+round trip. `generate_from_trace` returns None for anything it can't
+translate faithfully (unknown actions, missing selectors or URLs, failed
+steps), and the exporter falls back to the LLM.
+
+    EXPORT_TEMPLATES=off      always use the LLM exporter
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+ACTION_ALIASES = {"goto": "navigate", "type": "fill", "verify": "assert"}
+SUPPORTED_ACTIONS = {"navigate", "click", "fill", "assert", "screenshot"}
+OK_RESULTS = {"success", None}
+
+_PLACEHOLDER_RE = re.compile(r"\{\{(\w+)\}\}")
+# A recorded Playwright locator expression: page.getByRole(...), page.locator(...), chained or not
+_LOCATOR_RE = re.compile(r"^page\.(getBy\w+|locator|frameLocator)\(.*\)$", re.DOTALL)
+_STRING_RE = re.compile(r"'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\"")
+
+
+def is_enabled() -> bool:
+    return os.environ.get("EXPORT_TEMPLATES", "on").lower() not in ("off", "0", "false")
+
+
+def js_string(value: str) -> str:
+    escaped = (
+        value.replace("\\", "\\\\")
+        .replace("'", "\\'")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+    return f"'{escaped}'"
+
+
+def js_value(value: str) -> str:
+    """A string literal, with {{VAR}} placeholders read from process.env."""
+    match = _PLACEHOLDER_RE.fullmatch(value)
+    if match:
+        return f"process.env.{match.group(1)}!"
+    if _PLACEHOLDER_RE.search(value):
+        escaped = value.replace("\\", "\\\\").replace("`", "\\`").replace("${", "\\${")
+        return (
+            "`"
+            + _PLACEHOLDER_RE.sub(
+                lambda m: "${process.env." + m.group(1) + "}", escaped
+            )
+            + "`"
+        )
+    return js_string(value)
+
+
+def locator_expression(
+    selector: Optional[str], selector_type: Optional[str] = None
+) -> Optional[str]:
+    """Turn a recorded selector into a locator expression, or None if it isn't usable."""
+    if not isinstance(selector, str) or not selector.strip():
+        return None
+    selector = selector.strip().rstrip(";")
+    if selector.startswith("await ") or "\n" in selector:
+        return None
+    if selector.startswith(("getBy", "locator(")):
+        selector = f"page.{selector}"
+    if selector.startswith("page."):
+        # One expression only: no statements hiding outside the string arguments
+        code = _STRING_RE.sub("''", selector)
+        if not _LOCATOR_RE.match(selector) or any(
+            token in code for token in (";", "`", "await", "=>")
+        ):
+            return None
+        return selector
+    if selector_type == "text":
+        return f"page.getByText({js_string(selector)})"
+    if selector_type in ("css", "xpath", "selector") or selector.startswith(
+        ("#", ".", "[", "//", "xpath=", "css=")
+    ):
+        return f"page.locator({js_string(selector)})"
+    return None
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", value.lower()).strip("-")
+
+
+def _step_lines(step: Dict[str, Any]) -> Optional[List[str]]:
+    action = str(step.get("action", "")).strip().lower()
+    action = ACTION_ALIASES.get(action, action)
+    if action not in SUPPORTED_ACTIONS or step.get("result") not in OK_RESULTS:
+        return None
+
+    if action == "navigate":
+        url = (
+            step.get("target")
+            if isinstance(step.get("target"), str)
+            else step.get("value")
+        )
+        if not isinstance(url, str) or not re.match(r"^(https?://|/)", url.strip()):
+            return None
+        return [f"await page.goto({js_value(url.strip())});"]
+
+    locator = locator_expression(step.get("selector"), step.get("selectorType"))
+    if action == "screenshot":
+        name = (
+            _slug(str(step.get("description") or ""))
+            or f"step-{step.get('stepNumber', 0)}"
+        )
+        return [
+            f"await expect({locator or 'page'}).toHaveScreenshot({js_string(name + '.png')});"
+        ]
+    if locator is None:
+        return None
+    if action == "click":
+        return [f"await {locator}.click();"]
+    if action == "fill":
+        if not isinstance(step.get("value"), str):
+            return None
+        return [f"await {locator}.fill({js_value(step['value'])});"]
+    # assert: expected text when the step recorded one, otherwise visibility
+    if isinstance(step.get("value"), str) and step["value"]:
+        return [f"await expect({locator}).toContainText({js_value(step['value'])});"]
+    return [f"await expect({locator}).toBeVisible();"]
+
+
+def generate_from_trace(run: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Build an export result (same shape as the LLM exporter's) from a run
+    trace, or None if any step can't be generated from a template.
+    """
+    steps = run.get("steps") or []
+    if not steps:
+        return None
+
+    body: List[str] = []
+    for index, step in enumerate(steps, 1):
+        lines = _step_lines(step)
+        if lines is None:
+            return None
+        title = step.get("description") or f"Step {step.get('stepNumber', index)}"
+        body.append(f"  await test.step({js_string(str(title))}, async () => {{")
+        body.extend(f"    {line}" for line in lines)
+        body.append("  });")
+
+    test_name = run.get("testName") or "Generated test"
+    code = "\n".join(
+        [
+            "import { test, expect } from '@playwright/test';",
+            "",
+            f"test({js_string(test_name)}, async ({{ page }}) => {{",
+            *body,
+            "});",
+            "",
+        ]
+    )
+    return {
+        "testFilePath": f"tests/generated/{_slug(test_name) or 'generated-test'}.spec.ts",
+        "code": code,
+        "dependencies": ["@playwright/test"],
+        "notes": ["Generated from recorded selectors without an LLM"],
+        "generator": "template",
+    }
@@ -0,0 +1,74 @@
+"""
+WebP thumbnails of run screenshots for the run page gallery.
+
+A thumbnail is rendered the first time it is requested and then kept. For
+a screenshot in the blob store, it is stored next to the blob in the same
+storage, so runs sharing the screenshot and all API replicas reuse it, and
+gc() deletes it together with the blob. For a screenshot still in its run
+directory (a run in progress, or ARTIFACT_DEDUP=off), it is cached under
+runs/.thumbs and re-rendered when the screenshot changes.
+
+    ARTIFACT_THUMB_PX=480    thumbnail width
+"""
+
+import io
+import os
+from pathlib import Path
+from typing import Any, Dict
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+THUMB_PX = int(os.environ.get("ARTIFACT_THUMB_PX", "480"))
+THUMB_QUALITY = 80
+THUMBS_DIR = ".thumbs"
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg"}
+
+
+def is_available() -> bool:
+    return Image is not None
+
+
+def thumbnail_key(sha256: str, size: int = THUMB_PX) -> str:
+    """Storage key of a blob's thumbnail, next to the blob itself."""
+    return f"{sha256[:2]}/{sha256}.w{size}.webp"
+
+
+def render(data: bytes, size: int = THUMB_PX) -> bytes:
+    """WebP of an image scaled to `size` wide; full-page screenshots are cut to their top."""
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (size, size))  # JPEG: decode at a reduced scale
+        width, height = image.size
+        if height > 2 * width:
+            image = image.crop((0, 0, width, 2 * width))
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        image.thumbnail((size, 2 * size))
+        out = io.BytesIO()
+        image.save(out, "WEBP", quality=THUMB_QUALITY, method=4)
+        return out.getvalue()
+
+
+def blob_thumbnail(blob: Dict[str, Any]) -> str:
+    """Key of the thumbnail of a stored screenshot (BlobStore.resolve()), rendering it if needed."""
+    storage, key = blob["storage"], thumbnail_key(blob["sha256"])
+    if not storage.exists(key):
+        data = (
+            blob["path"].read_bytes()
+            if blob["path"] is not None
+            else b"".join(storage.read_range(blob["key"]))
+        )
+        storage.put_bytes(key, render(data))
+    return key
+
+
+def file_thumbnail(source: Path, runs_dir: Path, rel_path: str) -> Path:
+    """Cached thumbnail of a screenshot in a run directory; `rel_path` is relative to `runs_dir`."""
+    target = Path(runs_dir) / THUMBS_DIR / f"{rel_path}.w{THUMB_PX}.webp"
+    if not target.exists() or target.stat().st_mtime_ns < source.stat().st_mtime_ns:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(render(source.read_bytes()))
+        os.replace(tmp, target)
+    return target
@@ -0,0 +1,168 @@
+"""
+Per-stage timing and resource usage for a run, written to <run_dir>/timeline.json.
+
+Each entry records wall time, CPU time (this process plus the stage
+subprocesses it waited for) and peak RSS, plus the LLM time and queue wait
+of calls the stage made (from llm_calls.jsonl). Peak RSS is the high-water
+mark of the process tree when the stage ended: getrusage() can't attribute a
+peak to one child, so a stage lighter than an earlier one reports the
+earlier peak.
+
+The CLI records its stages (source "cli"); the API runner adds the time a
+run waited for an execution slot and the cost of the whole CLI process
+(source "api").
+
+Each stage is also a tracing span (see tracing.py) when tracing is enabled.
+"""
+
+import json
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import tracing
+
+TIMELINE_FILE = "timeline.json"
+
+
+def _cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def maxrss_mb(maxrss: int) -> float:
+    """ru_maxrss is KiB on Linux and bytes on macOS."""
+    return round(maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _peak_rss_mb() -> float:
+    return max(
+        maxrss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
+        maxrss_mb(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss),
+    )
+
+
+def _llm_usage(run_dir: Path, llm_stage: str, since: float) -> Dict[str, float]:
+    totals = {"llm_calls": 0, "llm_ms": 0.0, "llm_queue_wait_ms": 0.0}
+    try:
+        lines = (run_dir / "llm_calls.jsonl").read_text().splitlines()
+    except OSError:
+        return totals
+    for line in lines:
+        try:
+            call = json.loads(line)
+        except ValueError:
+            continue
+        if call.get("stage") == llm_stage and call.get("started_at", 0) >= since:
+            totals["llm_calls"] += 1
+            totals["llm_ms"] += call.get("duration_ms") or 0
+            totals["llm_queue_wait_ms"] += call.get("queue_wait_ms") or 0
+    totals["llm_ms"] = round(totals["llm_ms"], 1)
+    totals["llm_queue_wait_ms"] = round(totals["llm_queue_wait_ms"], 1)
+    return totals
+
+
+def load_timeline(run_dir: Path) -> List[Dict[str, Any]]:
+    try:
+        return json.loads((Path(run_dir) / TIMELINE_FILE).read_text()).get("stages", [])
+    except (OSError, ValueError, AttributeError):
+        return []
+
+
+def append_stages(run_dir: Path, entries: List[Dict[str, Any]]):
+    """Add entries to a run's timeline.json, keeping what's already there."""
+    run_dir = Path(run_dir)
+    stages = load_timeline(run_dir) + entries
+    (run_dir / TIMELINE_FILE).write_text(json.dumps({"stages": stages}, indent=2))
+
+
+def stage_entry(
+    name: str,
+    source: str,
+    started_at: float,
+    wall_ms: float,
+    cpu_ms: Optional[float],
+    peak_rss_mb: Optional[float],
+    status: str = "ok",
+    **extra,
+) -> Dict[str, Any]:
+    """One timeline.json entry. `started_at` is epoch seconds, durations are ms."""
+    return {
+        "stage": name,
+        "source": source,
+        "started_at": datetime.fromtimestamp(started_at).isoformat(),
+        "ended_at": datetime.fromtimestamp(started_at + wall_ms / 1000).isoformat(),
+        "wall_ms": round(wall_ms, 1),
+        "cpu_ms": round(cpu_ms, 1) if cpu_ms is not None else None,
+        "peak_rss_mb": peak_rss_mb,
+        "status": status,
+        **extra,
+    }
+
+
+class Timeline:
+    """Records stages of one run; the file is rewritten after every stage."""
+
+    def __init__(self, run_dir: Path, source: str = "cli", reset: bool = False):
+        self.run_dir = Path(run_dir)
+        self.source = source
+        if reset:
+            (self.run_dir / TIMELINE_FILE).unlink(missing_ok=True)
+
+    @contextmanager
+    def stage(self, name: str, llm_stage: Optional[str] = None):
+        """Time the block. Yields a dict the caller can put extra fields in,
+        e.g. {"status": "failed"} when a stage subprocess exits non-zero."""
+        started_at = time.time()
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_seconds()
+        info: Dict[str, Any] = {"status": "ok"}
+        with tracing.span(
+            f"stage {name}",
+            **{
+                "run.id": self.run_dir.name,
+                "run.stage": name,
+                "run.stage.source": self.source,
+            },
+        ) as current:
+            try:
+                yield info
+            except SystemExit as e:
+                if e.code:
+                    info["status"] = "failed"
+                raise
+            except BaseException:
+                info["status"] = "failed"
+                raise
+            finally:
+                extra = (
+                    _llm_usage(self.run_dir, llm_stage, started_at) if llm_stage else {}
+                )
+                entry = stage_entry(
+                    name,
+                    self.source,
+                    started_at,
+                    wall_ms=(time.perf_counter() - wall_start) * 1000,
+                    cpu_ms=(_cpu_seconds() - cpu_start) * 1000,
+                    peak_rss_mb=_peak_rss_mb(),
+                    **{**extra, **info},
+                )
+                tracing.set_attributes(
+                    current,
+                    **{
+                        "run.stage.status": entry["status"],
+                        "run.stage.cpu_ms": entry["cpu_ms"],
+                        "run.stage.peak_rss_mb": entry["peak_rss_mb"],
+                    },
+                )
+                if entry["status"] == "failed":
+                    tracing.mark_failed(current)
+                try:
+                    append_stages(self.run_dir, [entry])
+                except OSError as e:
+                    print(f"⚠️ Failed to write timeline: {e}")
@@ -0,0 +1,175 @@
+"""
+Optional OpenTelemetry tracing for the API, the CLI and its stage subprocesses.
+
+Tracing is off unless OTEL_TRACES_EXPORTER is set and the opentelemetry
+packages are installed (pip install opentelemetry-sdk); otherwise every
+helper here is a no-op.
+
+    OTEL_TRACES_EXPORTER=console     spans printed to stdout
+    OTEL_TRACES_EXPORTER=file        one JSON span per line in OTEL_TRACES_FILE
+                                     (default ./traces.jsonl)
+    OTEL_TRACES_EXPORTER=otlp        OTLP/HTTP, needs opentelemetry-exporter-otlp;
+                                     configured with the usual OTEL_EXPORTER_OTLP_* vars
+    OTEL_SERVICE_NAME                overrides the per-process service name
+
+Trace context crosses process boundaries through the environment:
+`inject_env()` adds TRACEPARENT/TRACESTATE for a child process, and spans
+started in the child without a local parent attach to that context. All
+processes of one run (API -> CLI -> workflow stages -> npx playwright) end
+up in one trace.
+"""
+
+import os
+from contextlib import contextmanager
+from typing import Dict, Mapping, Optional
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor,
+        ConsoleSpanExporter,
+        SimpleSpanProcessor,
+    )
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+    from opentelemetry.trace.propagation.tracecontext import (
+        TraceContextTextMapPropagator,
+    )
+except ImportError:  # tracing is optional
+    trace = None
+
+DEFAULT_SERVICE_NAME = "playwright-agent"
+ENV_KEYS = ("TRACEPARENT", "TRACESTATE")
+
+_tracer = None
+_initialized = False
+_parent_context = None
+
+
+def _exporter_name() -> str:
+    return os.environ.get("OTEL_TRACES_EXPORTER", "").strip().lower()
+
+
+def _make_processor(name: str):
+    if name == "console":
+        return SimpleSpanProcessor(ConsoleSpanExporter())
+    if name == "file":
+        path = os.environ.get("OTEL_TRACES_FILE", "traces.jsonl")
+        # Several processes append to the same file; one flushed line per span
+        out = open(path, "a", buffering=1)
+        return SimpleSpanProcessor(
+            ConsoleSpanExporter(
+                out=out, formatter=lambda span: span.to_json(indent=None) + "\n"
+            )
+        )
+    if name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError:
+            print(
+                "⚠️ OTEL_TRACES_EXPORTER=otlp needs opentelemetry-exporter-otlp; tracing disabled"
+            )
+            return None
+        return BatchSpanProcessor(OTLPSpanExporter())
+    if name not in ("", "none"):
+        print(f"⚠️ Unknown OTEL_TRACES_EXPORTER '{name}'; tracing disabled")
+    return None
+
+
+def init_tracing(service_name: str = DEFAULT_SERVICE_NAME) -> bool:
+    """Set up the tracer for this process once. Returns whether tracing is on."""
+    global _tracer, _initialized, _parent_context
+    if _initialized:
+        return _tracer is not None
+    _initialized = True
+    if trace is None:
+        return False
+    processor = _make_processor(_exporter_name())
+    if processor is None:
+        return False
+
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        # Module may be imported as utils.tracing and orchestrator.utils.tracing
+        # in one process; only the first sets the global provider
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": service_name})
+        )
+        provider.add_span_processor(processor)
+        trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("playwright-agent")
+
+    carrier = {key.lower(): os.environ[key] for key in ENV_KEYS if os.environ.get(key)}
+    if carrier:
+        _parent_context = TraceContextTextMapPropagator().extract(carrier)
+    return True
+
+
+def is_enabled() -> bool:
+    return init_tracing()
+
+
+def _clean(attributes: Mapping) -> Dict:
+    return {
+        k: (v if isinstance(v, (bool, int, float, str)) else str(v))
+        for k, v in attributes.items()
+        if v is not None
+    }
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", context=None, **attributes):
+    """
+    Start a span as the current span. Yields the span, or None when tracing
+    is off. Exceptions raised in the block are recorded on the span.
+
+    Dotted attribute names can be passed with dict unpacking:
+    span("x", **{"run.id": run_id}).
+    """
+    if not is_enabled():
+        yield None
+        return
+    if context is None and not trace.get_current_span().get_span_context().is_valid:
+        context = _parent_context
+    with _tracer.start_as_current_span(
+        name,
+        context=context,
+        kind=getattr(SpanKind, kind.upper()),
+        attributes=_clean(attributes),
+    ) as current:
+        yield current
+
+
+def set_attributes(current, **attributes):
+    if current is not None:
+        current.set_attributes(_clean(attributes))
+
+
+def mark_failed(current, description: Optional[str] = None):
+    if current is not None:
+        current.set_status(Status(StatusCode.ERROR, description))
+
+
+def inject_env(env: Optional[Mapping[str, str]] = None) -> Dict[str, str]:
+    """Copy of `env` (default os.environ) carrying the current trace context."""
+    env = dict(os.environ if env is None else env)
+    if not is_enabled():
+        return env
+    carrier: Dict[str, str] = {}
+    TraceContextTextMapPropagator().inject(carrier)
+    for key in ENV_KEYS:
+        env.pop(key, None)
+    env.update({key.upper(): value for key, value in carrier.items()})
+    return env
+
+
+def extract_headers(headers: Mapping[str, str]):
+    """Trace context from incoming HTTP headers (None when tracing is off)."""
+    if not is_enabled():
+        return None
+    return TraceContextTextMapPropagator().extract(
+        {key.lower(): value for key, value in headers.items()}
+    )
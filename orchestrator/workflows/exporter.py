@@ -3,6 +3,7 @@ Exporter Workflow - Converts execution traces to Playwright test code
 """
 
 import asyncio
+import hashlib
 import sys
 import os
 import json
@@ -16,15 +17,77 @@ from load_env import setup_claude_env
 
 setup_claude_env()
 
-from claude_agent_sdk import query, ClaudeAgentOptions
+from claude_agent_sdk import ClaudeAgentOptions
 from utils.json_utils import extract_json_from_markdown, validate_json_schema, save_json
+from utils.llm_client import query_llm
+from utils.export_cache import ExportCache, normalize_trace, trace_hash
+from utils import template_codegen
+from utils import selector_heals
+
+# The trace is substituted with str.replace, the template's other braces are literal
+EXPORT_PROMPT_TEMPLATE = """You are a test code generation expert. Convert this test execution trace into production-ready Playwright test code in TypeScript.
+
+CRITICAL INSTRUCTIONS:
+1. Follow Playwright best practices
+2. Use role-based selectors (getByRole, getByLabel, getByText)
+3. Group related steps with test.step()
+4. Add helpful comments
+5. Output ONLY valid JSON in a ```json code block
+
+EXECUTION TRACE:
+```json
+{trace}
+```
+
+CODE STYLE REQUIREMENTS:
+- Use async/await properly
+- Use getByRole() for buttons, links, headings
+- Use getByLabel() for form inputs
+- Use getByText() for text content
+- Add proper assertions with expect()
+- **VISUAL REGRESSION**: If a step implies verifying layout, "check visual", or "screenshot", use `await expect(page).toHaveScreenshot('name.png')`.
+- Group steps with test.step() when logical
+- Make code readable and maintainable
+
+OUTPUT FORMAT:
+```json
+{
+  "testFilePath": "tests/generated/test-name.spec.ts",
+  "code": "import { test, expect } from '@playwright/test';\\n\\ntest.describe(...",
+  "dependencies": ["@playwright/test"],
+  "notes": ["Brief note about the code"]
+}
+```
+
+SELECTOR MAPPING:
+- **CRITICAL**: If the execution trace has a "selector" field, USE IT EXACTLY. Do not invent a new one.
+- Navigate: page.goto('URL')
+- Manual Fallback (only if selector missing):
+  - Button: page.getByRole('button', { name: '...' })
+  - Field: page.getByLabel('...')
+  - Text: page.getByText('...')
+
+SECURITY HANDLING:
+- If you see `{{VAR_NAME}}` in an input value or text:
+  - DO NOT output the raw string or the placeholder.
+  - Use `process.env.VAR_NAME` directly.
+  - DO NOT include fallback values like `|| 'password'`.
+  - Example: `await page.fill('...', process.env.LOGIN_PASSWORD);`
+
+Now convert the execution trace to Playwright code and return the result as JSON. No other text.
+"""
+
+# Cached exports record the version of the prompt that generated them, so
+# editing the template regenerates them
+PROMPT_VERSION = hashlib.sha256(EXPORT_PROMPT_TEMPLATE.encode()).hexdigest()[:12]
 
 
 class Exporter:
     """Converts test execution traces into Playwright test code"""
 
-    def __init__(self, schema_path: str = "schemas/export.schema.json"):
+    def __init__(self, schema_path: str = "schemas/export.schema.json", cache: ExportCache = None):
         self.schema_path = schema_path
+        self.cache = cache or ExportCache(prompt_version=PROMPT_VERSION)
 
     async def export(self, run: Dict, test_dir: str = "tests/generated") -> Dict:
         """
@@ -40,15 +103,36 @@ class Exporter:
         print(f"📤 Generating test code for: {run.get('testName', 'Unnamed')}")
         print(f"   Steps to convert: {len(run.get('steps', []))}")
 
-        # Build the export prompt
-        prompt = self._build_export_prompt(run)
-
-        # Query the agent
-        export_result = await self._query_agent(prompt)
-
-        # Validate against schema
-        print("✅ Validating export against schema...")
-        validate_json_schema(export_result, self.schema_path)
+        # Simple traces with recorded selectors don't need an LLM at all
+        key = trace_hash(run)
+        export_result = template_codegen.generate_from_trace(run) if template_codegen.is_enabled() else None
+        if export_result is not None:
+            print("⚡ Every step has a recorded selector, generated code from templates")
+            validate_json_schema(export_result, self.schema_path)
+        # Identical traces (ignoring timestamps, durations, details) reuse the cached code
+        elif (export_result := self.cache.get(key)) is not None:
+            print(f"♻️  Reusing cached export for trace {key[:12]}")
+            export_result["notes"] = export_result.get("notes", []) + [f"Reused cached export ({key[:12]})"]
+        else:
+            # Build the export prompt
+            prompt = self._build_export_prompt(run)
+
+            # Query the agent
+            export_result = await self._query_agent(prompt)
+
+            # Validate against schema
+            print("✅ Validating export against schema...")
+            validate_json_schema(export_result, self.schema_path)
+            self.cache.put(key, export_result, trace=normalize_trace(run))
+        export_result["traceHash"] = key
+
+        # Swap selectors that validator fixes showed to be broken on these pages
+        heals = selector_heals.healing_store.known_heals([selector_heals.first_url(export_result["code"])])
+        export_result["code"], applied = selector_heals.apply_heals(export_result["code"], heals)
+        if applied:
+            print(f"🩹 Applied {len(applied)} known selector heal(s)")
+            export_result["notes"] = export_result.get("notes", []) + [
+                f"Healed selector {h.old_selector} -> {h.healed_selector}" for h in applied]
 
         # Determine test file path
         test_path = export_result.get("testFilePath")
@@ -89,80 +173,22 @@ class Exporter:
 
     def _build_export_prompt(self, run: Dict) -> str:
         """Build the prompt for the agent"""
-        import json
-
-        prompt = (
-            """You are a test code generation expert. Convert this test execution trace into production-ready Playwright test code in TypeScript.
-
-CRITICAL INSTRUCTIONS:
-1. Follow Playwright best practices
-2. Use role-based selectors (getByRole, getByLabel, getByText)
-3. Group related steps with test.step()
-4. Add helpful comments
-5. Output ONLY valid JSON in a ```json code block
-
-EXECUTION TRACE:
-```json
-"""
-            + json.dumps(run, indent=2)
-            + """
-```
-
-CODE STYLE REQUIREMENTS:
-- Use async/await properly
-- Use getByRole() for buttons, links, headings
-- Use getByLabel() for form inputs
-- Use getByText() for text content
-- Add proper assertions with expect()
-- **VISUAL REGRESSION**: If a step implies verifying layout, "check visual", or "screenshot", use `await expect(page).toHaveScreenshot('name.png')`.
-- Group steps with test.step() when logical
-- Make code readable and maintainable
-
-OUTPUT FORMAT:
-```json
-{
-  "testFilePath": "tests/generated/test-name.spec.ts",
-  "code": "import { test, expect } from '@playwright/test';\\n\\ntest.describe(...",
-  "dependencies": ["@playwright/test"],
-  "notes": ["Brief note about the code"]
-}
-```
-
-SELECTOR MAPPING:
-- **CRITICAL**: If the execution trace has a "selector" field, USE IT EXACTLY. Do not invent a new one.
-- Navigate: page.goto('URL')
-- Manual Fallback (only if selector missing):
-  - Button: page.getByRole('button', { name: '...' })
-  - Field: page.getByLabel('...')
-  - Text: page.getByText('...')
-
-SECURITY HANDLING:
-- If you see `{{VAR_NAME}}` in an input value or text:
-  - DO NOT output the raw string or the placeholder.
-  - Use `process.env.VAR_NAME` directly.
-  - DO NOT include fallback values like `|| 'password'`.
-  - Example: `await page.fill('...', process.env.LOGIN_PASSWORD);`
-
-Now convert the execution trace to Playwright code and return the result as JSON. No other text.
-"""
-        )
-
-        return prompt
+        return EXPORT_PROMPT_TEMPLATE.replace("{trace}", json.dumps(run, indent=2))
 
     async def _query_agent(self, prompt: str) -> Dict:
         """Query the agent"""
         try:
-            async for message in query(
-                prompt=prompt,
-                options=ClaudeAgentOptions(
+            result = await query_llm(
+                prompt,
+                ClaudeAgentOptions(
                     allowed_tools=["Write"], setting_sources=["project"]
                 ),
-            ):
-                if hasattr(message, "result"):
-                    result = message.result
-                    # Extract JSON from markdown
-                    export_data = extract_json_from_markdown(result)
-                    return export_data
+                stage="exporter",
+            )
+            if result is not None:
+                # Extract JSON from markdown
+                export_data = extract_json_from_markdown(result)
+                return export_data
 
         except Exception as e:
             error_msg = str(e)
@@ -32,8 +32,10 @@ except ImportError:
 except Exception as e:
     print(f"WARNING: Monkeypatch failed: {e}")
 
-from claude_agent_sdk import query, ClaudeAgentOptions
+from claude_agent_sdk import ClaudeAgentOptions
 from utils.json_utils import extract_json_from_markdown, validate_json_schema
+from utils.llm_client import query_llm
+from utils.selector_heals import healing_store
 
 
 class Operator:
@@ -204,10 +206,22 @@ OUTPUT FORMAT:
 }}
 ```
 """
+        prompt += self._known_heals_prompt(plan)
         if run_dir:
             prompt += f"\nSave screenshots to current directory."
         return prompt
 
+    def _known_heals_prompt(self, plan: Dict) -> str:
+        """Selectors known to have changed on the plan's pages (from earlier validator fixes)"""
+        urls = [s.get("target") for s in plan.get("steps", [])
+                if s.get("action") == "navigate" and isinstance(s.get("target"), str)]
+        heals = healing_store.known_heals(urls, limit=20)
+        if not heals:
+            return ""
+        lines = "\n".join(f"- {h.old_selector} -> {h.healed_selector} (confidence {h.confidence:.2f})"
+                          for h in heals)
+        return f"\n\nKNOWN SELECTOR CHANGES (use the new selector if the old one no longer matches):\n{lines}\n"
+
     def _print_summary(self, run: Dict):
         success_count = run.get("successCount", 0)
         failure_count = run.get("failureCount", 0)
@@ -324,6 +338,7 @@ MUST DO:
 - NO accessibility trees in output
 - Execute steps now and return ONLY the JSON
 """
+        prompt += self._known_heals_prompt(plan)
 
         if run_dir:
             # DO NOT pass path to agent to avoid buffer overflow/scanning
@@ -334,19 +349,18 @@ MUST DO:
         """Query the agent with Playwright MCP access"""
         run = None
         try:
-            async for message in query(
-                prompt=prompt,
-                options=ClaudeAgentOptions(
+            result = await query_llm(
+                prompt,
+                ClaudeAgentOptions(
                     allowed_tools=["*"],  # All tools including MCP
                     setting_sources=["project"],  # Enable .claude/ and .mcp.json
                     permission_mode="bypassPermissions",  # Auto-approve tools
                 ),
-            ):
-                if hasattr(message, "result"):
-                    result = message.result
-                    # Extract JSON from markdown
-                    run = extract_json_from_markdown(result)
-                    # Do not break, consume remaining messages to allow clean exit
+                stage="operator",
+            )
+            if result is not None:
+                # Extract JSON from markdown
+                run = extract_json_from_markdown(result)
 
             return run
 
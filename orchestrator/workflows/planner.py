@@ -16,8 +16,9 @@ from load_env import setup_claude_env
 
 setup_claude_env()
 
-from claude_agent_sdk import query, ClaudeAgentOptions
+from claude_agent_sdk import ClaudeAgentOptions
 from utils.json_utils import extract_json_from_markdown, validate_json_schema
+from utils.llm_client import query_llm
 
 
 class Planner:
@@ -109,18 +110,18 @@ Now convert this specification to JSON:
     async def _query_agent(self, prompt: str) -> Dict:
         """Query the agent and extract JSON"""
         try:
-            async for message in query(
-                prompt=prompt,
-                options=ClaudeAgentOptions(
+            result = await query_llm(
+                prompt,
+                ClaudeAgentOptions(
                     allowed_tools=["Read"],
                     setting_sources=["project"],  # Enable .claude/ config
                 ),
-            ):
-                if hasattr(message, "result"):
-                    result = message.result
-                    # Extract JSON from markdown
-                    plan = extract_json_from_markdown(result)
-                    return plan
+                stage="planner",
+            )
+            if result is not None:
+                # Extract JSON from markdown
+                plan = extract_json_from_markdown(result)
+                return plan
 
         except Exception as e:
             raise RuntimeError(f"Failed to query agent for planning: {e}")
@@ -6,6 +6,7 @@ import asyncio
 import sys
 import os
 import json
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Dict
@@ -17,15 +18,23 @@ from load_env import setup_claude_env
 
 setup_claude_env()
 
-from claude_agent_sdk import query, ClaudeAgentOptions
+from claude_agent_sdk import ClaudeAgentOptions
 from utils.json_utils import extract_json_from_markdown
+from utils.llm_client import query_llm
+from utils import tracing
+from utils import playwright_report
+from utils import selector_heals
+from utils.selector_heals import healing_store
+from utils import flakiness
+from utils.flakiness import RerunPolicy, flake_history
 
 
 class Validator:
     """Validates and fixes generated Playwright tests"""
 
-    def __init__(self, max_attempts: int = 3):
+    def __init__(self, max_attempts: int = 3, rerun_policy: RerunPolicy = None):
         self.max_attempts = max_attempts
+        self.rerun_policy = rerun_policy or RerunPolicy.from_env()
 
     async def validate_and_fix(self, test_file: str, output_dir: str = None, browser: str = "chromium") -> Dict:
         """
@@ -48,38 +57,83 @@ class Validator:
 
         test_code = test_path.read_text()
         validation_result = None
+        # Per attempt: run time, failures, and the fix prompt size and latency
+        attempt_log = []
+        # Code the LLM fixer first saw and the locators that failed, to learn heals from
+        code_before_llm = None
+        failing_locators = set()
+        passed_on_rerun = False
 
         for attempt in range(1, self.max_attempts + 1):
             print(f"\n{'='*80}")
             print(f"Attempt {attempt}/{self.max_attempts}")
             print(f"{'='*80}\n")
 
-            # Run the test
             # Run the test
             print(f"🚀 Running test on {browser}...")
-            result = await self._run_test(test_file, output_dir, browser)
+            result = await self._execute(test_file, output_dir, browser)
+            attempt_entry = {
+                "attempt": attempt,
+                "passed": result.get("passed"),
+                "runMs": result.get("durationMs"),
+                "failures": result.get("failures", []),
+            }
+            attempt_log.append(attempt_entry)
+
+            if not result.get("passed"):
+                failing_locators.update(f["locator"] for f in result.get("failures", []) if f.get("locator"))
+                # Heals learned from earlier fixes are a rerun away, far cheaper than the LLM
+                healed = await self._try_known_heals(test_file, test_code, result, output_dir, browser)
+                if healed:
+                    attempt_entry["localHeals"] = healed["applied"]
+                    test_code = test_path.read_text()
+                    result = healed["result"]
+
+            if not result.get("passed"):
+                # A transient or historically flaky failure may pass unchanged: rerunning is cheaper than a fix
+                rerun = await self._rerun_before_fix(test_file, result, output_dir, browser)
+                attempt_entry["rerunReason"] = rerun["reason"]
+                if rerun["reruns"]:
+                    attempt_entry["reruns"] = rerun["reruns"]
+                    result = rerun["result"]
+                    passed_on_rerun = bool(result.get("passed"))
 
             if result.get("passed"):
-                print("✅ Test passed!")
+                flaky_tests = [f["test"] for f in result.get("flaky", [])]
+                if flaky_tests:
+                    print(f"⚠️ Passed on a Playwright retry (flaky): {', '.join(flaky_tests)}")
+                print("✅ Test passed!" + (" (on rerun, likely flaky)" if passed_on_rerun else ""))
+                if code_before_llm is not None:
+                    self._learn_heals(test_file, code_before_llm, test_code, failing_locators)
                 validation_result = {
                     "status": "success",
                     "attempts": attempt,
                     "testFile": test_file,
                     "browser": browser,
-                    "message": "Test passed successfully",
+                    "message": "Test passed on rerun (flaky)" if passed_on_rerun
+                    else "Test passed on retry (flaky)" if flaky_tests else "Test passed successfully",
+                    "flaky": passed_on_rerun or bool(flaky_tests),
+                    "flakyTests": flaky_tests,
                     "timestamp": datetime.now().isoformat(),
                 }
                 break
             
             # Test failed, try to fix it
             print(f"❌ Test failed (exit code: {result.get('exitCode')})")
-            print(f"Output:\n{result.get('output')}")
+            print(f"Failure:\n{result.get('excerpt')}")
 
             if attempt < self.max_attempts:
                 print(f"\n🔧 Attempting to fix...")
+                if code_before_llm is None:
+                    code_before_llm = test_code
+                fix_started = time.monotonic()
                 fix_result = await self._fix_test(
-                    test_file, result.get("output"), test_code
+                    test_file, result.get("excerpt"), test_code
                 )
+                attempt_entry["fixMs"] = round((time.monotonic() - fix_started) * 1000)
+                attempt_entry["fixPromptChars"] = fix_result.get("promptChars")
+                attempt_entry["fixStatus"] = fix_result.get("status")
+                print(f"   Fix prompt: {attempt_entry['fixPromptChars']} chars, {attempt_entry['fixMs'] / 1000:.1f}s")
 
                 if fix_result.get("status") == "fixed":
                     print("✅ Fix applied, re-running...")
@@ -95,7 +149,7 @@ class Validator:
                         "browser": browser,
                         "message": "Could not fix automatically",
                         "remainingIssues": fix_result.get("remainingIssues"),
-                        "lastError": result.get("output"),
+                        "lastError": result.get("excerpt"),
                         "timestamp": datetime.now().isoformat(),
                     }
                     break
@@ -107,10 +161,12 @@ class Validator:
                 "testFile": test_file,
                 "browser": browser,
                 "message": f"Failed after {self.max_attempts} attempts",
-                "lastError": result.get("output"),
+                "lastError": result.get("excerpt"),
                 "timestamp": datetime.now().isoformat(),
             }
 
+        validation_result["attemptDetails"] = attempt_log
+
         # Save validation result
         if output_dir and validation_result:
             output_path = Path(output_dir)
@@ -122,45 +178,174 @@ class Validator:
 
         return validation_result
 
+    async def _try_known_heals(self, test_file: str, test_code: str, result: Dict,
+                               output_dir: str = None, browser: str = "chromium") -> Dict:
+        """
+        Apply stored heals for the failing locators and re-run. Returns
+        {"applied": [...], "result": rerun result} when a heal made progress
+        (the code is left healed), None otherwise (the code is restored).
+        """
+        url = selector_heals.first_url(test_code)
+        heals = []
+        for failure in result.get("failures", []):
+            if failure.get("locator"):
+                heals.extend(healing_store.find(failure["locator"], url)[:1])
+        healed_code, applied = selector_heals.apply_heals(test_code, heals)
+        if not applied:
+            return None
+
+        print(f"🩹 Trying {len(applied)} known selector heal(s) before asking the LLM...")
+        test_path = Path(test_file)
+        test_path.write_text(healed_code)
+        rerun = await self._execute(test_file, output_dir, browser)
+
+        # A heal worked if the test passed or stopped failing on that selector
+        still_failing = {selector_heals.selector_key(f["locator"])
+                         for f in rerun.get("failures", []) if f.get("locator")}
+        progressed = []
+        for heal in applied:
+            ok = rerun.get("passed") or (rerun.get("failures") and not {
+                selector_heals.selector_key(heal.old_selector),
+                selector_heals.selector_key(heal.healed_selector)} & still_failing)
+            healing_store.record_result(heal.id, ok=bool(ok))
+            if ok:
+                progressed.append(heal)
+        if not progressed:
+            test_path.write_text(test_code)
+            return None
+        return {"applied": [h.to_dict() for h in progressed], "result": rerun}
+
+    def _learn_heals(self, test_file: str, old_code: str, new_code: str, failing_locators: set):
+        """Store the locators an LLM fix changed (only failing ones, when known)."""
+        failing = {selector_heals.selector_key(l) for l in failing_locators}
+        url = selector_heals.first_url(new_code)
+        for old, new in selector_heals.diff_heals(old_code, new_code):
+            if failing and selector_heals.selector_key(old) not in failing:
+                continue
+            if healing_store.record_heal(old, new, url=url, source=test_file):
+                print(f"🧠 Remembered selector heal: {old} -> {new}")
+
+    async def _rerun_before_fix(self, test_file: str, result: Dict, output_dir: str = None,
+                                browser: str = "chromium") -> Dict:
+        """
+        Rerun the unchanged test as often as the rerun policy allows for this
+        failure and the test's history. Returns {"reason", "reruns": [...],
+        "result": last run}; stops at the first pass.
+        """
+        kind = flakiness.failure_kind(result)
+        score = flake_history.score(flakiness.history_key(test_file), self.rerun_policy.threshold)
+        count, reason = self.rerun_policy.reruns_for(kind, score)
+        reruns = []
+        for n in range(1, count + 1):
+            print(f"🔁 Rerun {n}/{count} before fixing ({reason})...")
+            result = await self._execute(test_file, output_dir, browser, rerun=True)
+            reruns.append({"passed": result.get("passed"), "runMs": result.get("durationMs"),
+                           "failureKind": flakiness.failure_kind(result)})
+            if result.get("passed"):
+                break
+        return {"reason": reason, "reruns": reruns, "result": result}
+
+    async def _execute(self, test_file: str, output_dir: str = None, browser: str = "chromium",
+                       rerun: bool = False) -> Dict:
+        """Run the test and add the outcome to its pass/fail history."""
+        result = await self._run_test(test_file, output_dir, browser)
+        try:
+            code = Path(test_file).read_text()
+        except OSError:
+            code = ""
+        flake_history.record(
+            flakiness.history_key(test_file),
+            passed=bool(result.get("passed")),
+            run_id=Path(output_dir).name if output_dir else None,
+            browser=browser,
+            code_hash=flakiness.code_hash(code),
+            rerun=rerun,
+            failure_kind=flakiness.failure_kind(result),
+            duration_ms=result.get("durationMs"),
+        )
+        return result
+
     async def _run_test(self, test_file: str, output_dir: str = None, browser: str = "chromium") -> Dict:
-        """Run a Playwright test and return the result"""
-        import subprocess
+        """
+        Run a Playwright test and return the result.
 
+        Pass/fail and failures come from the JSON reporter; "excerpt" is the
+        part of the failure worth showing the fixer.
+        """
+        import subprocess
+        import tempfile
+
+        # Without an output dir the report only lives until it has been parsed
+        temp_dir = None if output_dir else tempfile.TemporaryDirectory(prefix="pw-validate-")
+        report_file = Path(output_dir or temp_dir.name) / "report.json"
+        report_file.parent.mkdir(parents=True, exist_ok=True)
+        report_file.unlink(missing_ok=True)
+        started = time.monotonic()
         try:
-            cmd = f"npx playwright test '{test_file}' --reporter=list,html --project {browser}"
+            cmd = f"npx playwright test '{test_file}' --reporter=list,html,json --project {browser}"
             if output_dir:
                 results_dir = Path(output_dir) / "test-results"
                 report_dir = Path(output_dir) / "report"
                 cmd = f"PLAYWRIGHT_OUTPUT_DIR='{results_dir}' PLAYWRIGHT_HTML_REPORT='{report_dir}' {cmd}"
 
-            result = subprocess.run(
-                cmd,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=60,
-            )
+            with tracing.span("npx playwright test", **{"playwright.test_file": test_file,
+                                                        "playwright.browser": browser}) as current:
+                result = subprocess.run(
+                    cmd,
+                    shell=True,
+                    capture_output=True,
+                    text=True,
+                    timeout=60,
+                    env=tracing.inject_env({**os.environ, "PLAYWRIGHT_JSON_OUTPUT_NAME": str(report_file)}),
+                )
+                tracing.set_attributes(current, **{"process.exit.code": result.returncode})
+                if result.returncode != 0:
+                    tracing.mark_failed(current)
 
             output = result.stdout + result.stderr
-
-            # Check if test passed
-            passed = result.returncode == 0 and ("passed" in output)
-
-            return {"passed": passed, "exitCode": result.returncode, "output": output}
+            report = playwright_report.load_report(report_file)
+            if report is None:
+                # No report (e.g. the config or test file didn't compile): go by the output
+                passed = result.returncode == 0 and ("passed" in output)
+                return {"passed": passed, "exitCode": result.returncode, "output": output,
+                        "failures": [], "excerpt": playwright_report.output_tail(output),
+                        "durationMs": round((time.monotonic() - started) * 1000)}
+
+            stats = report["stats"]
+            # A test that only passed on a Playwright retry (flaky) still passed
+            passed = (result.returncode == 0 and not stats.get("unexpected")
+                      and bool(stats.get("expected") or stats.get("flaky")))
+            excerpt = playwright_report.failure_excerpt(report["failures"], report["errors"])
+            return {
+                "passed": passed,
+                "exitCode": result.returncode,
+                "output": output,
+                "stats": stats,
+                "failures": [f.to_dict() for f in report["failures"]],
+                "flaky": [f.to_dict() for f in report["flaky"]],
+                "excerpt": excerpt or playwright_report.output_tail(output),
+                "durationMs": round((time.monotonic() - started) * 1000),
+            }
 
         except subprocess.TimeoutExpired:
             return {
                 "passed": False,
                 "exitCode": -1,
                 "output": "Test timed out after 60 seconds",
+                "failures": [],
+                "excerpt": "Test timed out after 60 seconds",
             }
         except Exception as e:
-            return {"passed": False, "exitCode": -1, "output": str(e)}
+            return {"passed": False, "exitCode": -1, "output": str(e), "failures": [], "excerpt": str(e)}
+        finally:
+            if temp_dir is not None:
+                temp_dir.cleanup()
 
     async def _fix_test(
         self, test_file: str, error_output: str, test_code: str
     ) -> Dict:
-        """Use Agent to fix the test based on error output"""
+        """Use Agent to fix the test based on the failure excerpt. The report
+        includes "promptChars" so callers can track prompt size."""
         test_path = Path(test_file)
 
         prompt = f"""You are a test fixing expert. Fix this failing Playwright test.
@@ -170,7 +355,7 @@ CURRENT TEST CODE:
 {test_code}
 ```
 
-ERROR OUTPUT:
+FAILURE:
 ```
 {error_output}
 ```
@@ -210,35 +395,42 @@ Fix the test now.
 """
 
         try:
-            async for message in query(
-                prompt=prompt,
-                options=ClaudeAgentOptions(
+            result = await query_llm(
+                prompt,
+                ClaudeAgentOptions(
                     allowed_tools=["*"],  # All tools including MCP and Write
                     setting_sources=["project"],
                     permission_mode="bypassPermissions",
                 ),
-            ):
-                if hasattr(message, "result"):
-                    result = message.result
-                    fix_report = extract_json_from_markdown(result)
+                stage="validator",
+            )
+            if result is not None:
+                fix_report = extract_json_from_markdown(result)
 
-                    # Read the updated test code
-                    updated_code = test_path.read_text()
+                # Read the updated test code
+                updated_code = test_path.read_text()
 
-                    if updated_code != test_code:
-                        print(f"✅ Test file updated")
-                        if fix_report.get("status") == "fixed":
-                            print(f"   Fix: {fix_report.get('fixApplied')}")
+                if updated_code != test_code:
+                    print(f"✅ Test file updated")
+                    if fix_report.get("status") == "fixed":
+                        print(f"   Fix: {fix_report.get('fixApplied')}")
 
-                    return fix_report
+                return {**fix_report, "promptChars": len(prompt)}
 
         except Exception as e:
             return {
                 "status": "failed",
                 "originalError": str(e),
                 "remainingIssues": ["Validator error: " + str(e)],
+                "promptChars": len(prompt),
             }
 
+        return {
+            "status": "failed",
+            "remainingIssues": ["Fixer returned no result"],
+            "promptChars": len(prompt),
+        }
+
 
 # Convenience function
 async def validate_from_file(test_file: str) -> Dict:
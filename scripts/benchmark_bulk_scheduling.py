@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Compare bulk run orders on fake run history.
+Generates runs with generate_fake_runs.py into a temp dir, estimates each
+scenario from all but its latest run, then replays the latest runs in request,
+longest-first and failing-first order on N execution slots.
+Usage: python3 scripts/benchmark_bulk_scheduling.py [--runs 600] [--scenarios 40] [--seed 7]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / "scripts"))
+
+from generate_fake_runs import generate_runs
+from orchestrator.api.scheduling import SpecHistory, order_jobs, simulate
+
+
+def load_history(runs_dir):
+    """Runs of each scenario, oldest first: [(duration_ms, final_state)]."""
+    runs = {}
+    for run_dir in sorted(runs_dir.iterdir()):
+        data = json.loads((run_dir / "run.json").read_text())
+        runs.setdefault(data["testName"], []).append(
+            (data["duration"] * 1000, data["finalState"])
+        )
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=600)
+    parser.add_argument("--scenarios", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="pw-agent-bench-") as tmp:
+        runs_dir = Path(tmp) / "runs"
+        generate_runs(
+            args.runs, runs_dir=runs_dir, scenarios=args.scenarios, seed=args.seed
+        )
+        scenarios = load_history(runs_dir)
+
+    history, jobs, actual = {}, [], {}
+    for name, runs in sorted(
+        scenarios.items(), key=lambda item: int(item[0].split()[-1])
+    ):
+        past, (duration_ms, state) = runs[:-1], runs[-1]
+        estimate = SpecHistory(
+            durations_ms=[ms for ms, _ in past],
+            last_status=past[-1][1] if past else None,
+        )
+        if estimate.durations_ms:
+            estimate.estimated_ms = statistics.median(estimate.durations_ms)
+        history[name] = estimate
+        jobs.append({"spec_name": name})
+        actual[name] = (duration_ms, state == "failed")
+
+    print(f"\n📊 {len(jobs)} specs, durations from the latest run of each\n")
+    print(
+        f"{'slots':>5}  {'order':<14} {'makespan':>10} {'vs request':>11} {'first failure':>14}"
+    )
+    for slots in (2, 4, 8):
+        baseline = None
+        for order in ("request", "longest_first", "failing_first"):
+            ordered = order_jobs(jobs, history, order)
+            result = simulate(
+                [actual[j["spec_name"]][0] for j in ordered],
+                slots,
+                [actual[j["spec_name"]][1] for j in ordered],
+            )
+            baseline = baseline or result["makespan_ms"]
+            change = (result["makespan_ms"] - baseline) / baseline * 100
+            first_failure = result["first_failure_ms"]
+            print(
+                f"{slots:>5}  {order:<14} {result['makespan_ms'] / 1000:>9.1f}s {change:>+10.1f}% "
+                f"{(f'{first_failure / 1000:.1f}s' if first_failure is not None else '-'):>14}"
+            )
+        total = sum(ms for ms, _ in actual.values())
+        print(
+            f"{slots:>5}  {'lower bound':<14} {max(total / slots, max(ms for ms, _ in actual.values())) / 1000:>9.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
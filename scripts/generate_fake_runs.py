@@ -22,27 +22,36 @@ ERRORS = [
     "Error: Network violation blocked request to https://analytics.google.com"
 ]
 
-def generate_runs(count=20):
+def generate_runs(count=20, runs_dir=None, scenarios=5, seed=None):
+    """
+    Write `count` runs of `scenarios` test scenarios. Each scenario has its
+    own typical duration, so run history predicts how long it takes.
+    """
+    rng = random.Random(seed)
+    runs_dir = Path(runs_dir) if runs_dir else RUNS_DIR
     print(f"🚀 Generating {count} fake runs...")
-    RUNS_DIR.mkdir(exist_ok=True)
+    runs_dir.mkdir(exist_ok=True)
+    typical = {n: rng.uniform(5.0, 45.0) for n in range(1, scenarios + 1)}
     
     end_date = datetime.now()
     start_date = end_date - timedelta(days=7)
     
     for i in range(count):
         # Random date in last 7 days
-        random_seconds = random.randint(0, int((end_date - start_date).total_seconds()))
+        random_seconds = rng.randint(0, int((end_date - start_date).total_seconds()))
         run_date = start_date + timedelta(seconds=random_seconds)
         
         run_id = run_date.strftime("%Y-%m-%d_%H-%M-%S")
-        run_dir = RUNS_DIR / run_id
+        run_dir = runs_dir / run_id
         run_dir.mkdir(exist_ok=True)
         
+        scenario = rng.randint(1, scenarios)
+
         # 80% pass rate
-        passed = random.random() < 0.8
+        passed = rng.random() < 0.8
         
         steps = []
-        duration = random.uniform(5.0, 45.0)
+        duration = typical[scenario] * rng.uniform(0.8, 1.2)
         
         if passed:
             final_state = "passed"
@@ -53,15 +62,15 @@ def generate_runs(count=20):
             ]
         else:
             final_state = "failed"
-            error_msg = random.choice(ERRORS)
+            error_msg = rng.choice(ERRORS)
             steps = [
                 {"action": "GOTO", "description": "Navigate to homepage", "result": "success"},
                 {"action": "CLICK", "description": "Click login", "result": "failed", "error": error_msg}
             ]
-            duration = random.uniform(1.0, 10.0) # Fail faster typically
+            duration = min(duration, rng.uniform(1.0, 10.0)) # Fail faster typically
 
         run_data = {
-            "testName": f"Test Scenario {random.randint(1, 5)}",
+            "testName": f"Test Scenario {scenario}",
             "finalState": final_state,
             "duration": round(duration, 2),
             "steps": steps,
@@ -79,7 +88,7 @@ def generate_runs(count=20):
         except:
             pass
 
-    print(f"✅ Generated {count} runs in {RUNS_DIR}")
+    print(f"✅ Generated {count} runs in {runs_dir}")
 
 if __name__ == "__main__":
     generate_runs()
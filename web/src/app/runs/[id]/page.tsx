@@ -12,6 +12,7 @@ import { vscDarkPlus } from 'react-syntax-highlighter/dist/esm/styles/prism';
 interface Artifact {
     name: string;
     path: string;
+    thumbnail?: string;
     type: 'image' | 'video';
 }
 
@@ -217,7 +218,7 @@ export default function RunDetailPage() {
                                                 <div>
                                                     <div style={{ marginBottom: '0.5rem', fontSize: '0.8rem', color: 'var(--text-secondary)' }}>Expected</div>
                                                     <a href={`http://localhost:8001${diff.expected.path}`} target="_blank" rel="noreferrer">
-                                                        <img src={`http://localhost:8001${diff.expected.path}`} style={{ width: '100%', borderRadius: '4px', border: '1px solid var(--border)' }} />
+                                                        <img src={`http://localhost:8001${diff.expected.thumbnail || diff.expected.path}`} loading="lazy" style={{ width: '100%', borderRadius: '4px', border: '1px solid var(--border)' }} />
                                                     </a>
                                                 </div>
                                             )}
@@ -225,7 +226,7 @@ export default function RunDetailPage() {
                                                 <div>
                                                     <div style={{ marginBottom: '0.5rem', fontSize: '0.8rem', color: 'var(--text-secondary)' }}>Actual</div>
                                                     <a href={`http://localhost:8001${diff.actual.path}`} target="_blank" rel="noreferrer">
-                                                        <img src={`http://localhost:8001${diff.actual.path}`} style={{ width: '100%', borderRadius: '4px', border: '1px solid var(--border)' }} />
+                                                        <img src={`http://localhost:8001${diff.actual.thumbnail || diff.actual.path}`} loading="lazy" style={{ width: '100%', borderRadius: '4px', border: '1px solid var(--border)' }} />
                                                     </a>
                                                 </div>
                                             )}
@@ -233,7 +234,7 @@ export default function RunDetailPage() {
                                                 <div>
                                                     <div style={{ marginBottom: '0.5rem', fontSize: '0.8rem', color: 'var(--danger)' }}>Diff</div>
                                                     <a href={`http://localhost:8001${diff.diff.path}`} target="_blank" rel="noreferrer">
-                                                        <img src={`http://localhost:8001${diff.diff.path}`} style={{ width: '100%', borderRadius: '4px', border: '1px solid var(--danger)' }} />
+                                                        <img src={`http://localhost:8001${diff.diff.thumbnail || diff.diff.path}`} loading="lazy" style={{ width: '100%', borderRadius: '4px', border: '1px solid var(--danger)' }} />
                                                     </a>
                                                 </div>
                                             )}
@@ -337,14 +338,16 @@ export default function RunDetailPage() {
                                         {art.type === 'image' ? (
                                             <a href={`http://localhost:8001${art.path}`} target="_blank" rel="noreferrer">
                                                 <img
-                                                    src={`http://localhost:8001${art.path}`}
+                                                    src={`http://localhost:8001${art.thumbnail || art.path}`}
                                                     alt={art.name}
+                                                    loading="lazy"
                                                     style={{ width: '100%', aspectRatio: '16/9', objectFit: 'cover' }}
                                                 />
                                             </a>
                                         ) : (
                                             <video
                                                 controls
+                                                preload="metadata"
                                                 src={`http://localhost:8001${art.path}`}
                                                 style={{ width: '100%' }}
                                             />
@@ -8,7 +8,10 @@ import TagEditor from '@/components/TagEditor';
 interface Spec {
     name: string;
     path: string;
-    content: string;
+    content?: string;
+    size?: number;
+    modified?: string;
+    title?: string;
     metadata?: {
         tags: string[];
         description?: string;